@@ -12,23 +12,16 @@ from bot.core.config import settings
 from bot.core.loader import bot, dp
 from bot.middlewares import register_middlewares
 from bot.runtime.hooks import ensure_bot_token_valid, on_shutdown, on_startup
+from bot.runtime.sharding import ShardForwardMiddleware, ShardRouter
+from bot.runtime.webhook import ALLOWED_UPDATES, run_webhook
 from bot.utils.banner import print_boot_banner
 
 
-async def main() -> None:
-    """机器人主入口函数。
+def configure_logging(name: str = "bot") -> None:
+    """配置 Loguru 日志：彩色控制台输出，并按名称写入 logs/bot 下的普通与错误日志。
 
-    执行以下初始化操作：
-    1. 初始化本地日志目录
-    2. 配置 Loguru 日志系统
-    3. 注册全局异常处理钩子
-    4. 验证 Bot Token 有效性
-    5. 注册中间件和生命周期钩子
-    6. 启动长轮询 (Polling)
-
-    Raises:
-        asyncio.CancelledError: 当程序接收到停止信号时
-        Exception: 启动过程中发生的其他未捕获异常
+    Args:
+        name: 日志文件名前缀，分片工作进程使用各自的前缀，避免多进程写同一文件
     """
     Path("logs/bot").mkdir(parents=True, exist_ok=True)
 
@@ -46,7 +39,7 @@ async def main() -> None:
         enqueue=True,
     )
     logger.add(
-        "logs/bot/bot.log",
+        f"logs/bot/{name}.log",
         level="DEBUG" if settings.DEBUG else "INFO",
         format="{time} | {level} | {module}:{function}:{line} | {message}",
         retention=None,
@@ -54,7 +47,7 @@ async def main() -> None:
         compression=None,
     )
     logger.add(
-        "logs/bot/bot.error.log",
+        f"logs/bot/{name}.error.log",
         level="ERROR",
         format="{time} | {level} | {module}:{function}:{line} | {message}",
         retention=None,
@@ -64,6 +57,24 @@ async def main() -> None:
         diagnose=True,
     )
 
+
+async def main() -> None:
+    """机器人主入口函数。
+
+    执行以下初始化操作：
+    1. 初始化本地日志目录
+    2. 配置 Loguru 日志系统
+    3. 注册全局异常处理钩子
+    4. 验证 Bot Token 有效性
+    5. 注册中间件和生命周期钩子 (UPDATE_PROCESSES > 1 时改为把更新分发给工作进程)
+    6. 按 UPDATE_MODE 启动长轮询 (Polling) 或 Webhook 服务
+
+    Raises:
+        asyncio.CancelledError: 当程序接收到停止信号时
+        Exception: 启动过程中发生的其他未捕获异常
+    """
+    configure_logging()
+
     def _excepthook(exc_type, exc_value, exc_traceback) -> None:
         """全局异常捕获钩子。
 
@@ -82,21 +93,31 @@ async def main() -> None:
     print_boot_banner(label)
     await ensure_bot_token_valid(bot)
 
-    register_middlewares(dp)
+    shard_router = ShardRouter(settings.UPDATE_PROCESSES) if settings.UPDATE_PROCESSES > 1 else None
+    if shard_router is None:
+        register_middlewares(dp)
+    else:
+        # 处理器只在工作进程中执行, 本进程只负责接收与分发
+        dp.update.outer_middleware(ShardForwardMiddleware(shard_router))
     dp.startup.register(on_startup)
     dp.shutdown.register(on_shutdown)
+    if shard_router is not None:
+        # 在建表等启动流程之后再启动工作进程
+        dp.startup.register(shard_router.start)
+        dp.shutdown.register(shard_router.stop)
 
     try:
         loop = asyncio.get_running_loop()
         old_sigint_handler = signal.getsignal(signal.SIGINT)
 
-        polling_task = asyncio.create_task(
-            dp.start_polling(
-                bot,
-                allowed_updates=["message", "callback_query", "chat_member", "my_chat_member"],
-            ),
-            name="polling",
-        )
+        if settings.UPDATE_MODE == "webhook":
+            runner = run_webhook(bot, dp)
+        else:
+            # 之前以 Webhook 模式运行过时需先移除 Webhook, 否则 getUpdates 会冲突
+            await bot.delete_webhook()
+            # 分片模式下逐个转发, 保证写入各工作进程的顺序与接收顺序一致
+            runner = dp.start_polling(bot, allowed_updates=ALLOWED_UPDATES, handle_as_tasks=shard_router is None)
+        polling_task = asyncio.create_task(runner, name=settings.UPDATE_MODE)
 
         shutdown_logged = False
 
@@ -122,7 +143,7 @@ async def main() -> None:
     except asyncio.CancelledError:
         return
     except Exception as e:
-        logger.exception(f"❗ 轮询启动失败: {e}")
+        logger.exception(f"❗ 更新接收启动失败: {e}")
         raise
 
 
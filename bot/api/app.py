@@ -9,17 +9,27 @@
 """
 
 from __future__ import annotations
+import asyncio
+import contextlib
+import hmac
 import time
 from contextlib import asynccontextmanager
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any
 
-from fastapi import FastAPI, Request, Response
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from loguru import logger
 
 from bot.api.routes import admins, auth, dashboard, emby_metadata, openai, redpacket, users, webhooks
 from bot.core.config import settings
+from bot.database.query_tracker import rename_current_unit, track_queries
+from bot.services.audit_sink import get_audit_sink
+from bot.services.dashboard_stats import get_dashboard_stats
 from bot.services.emby_metadata.translation import close_translation_session, init_translation_session
+from bot.services.emby_metadata.writeback_jobs import get_writeback_job_manager
+from bot.services.playback_policy import get_playback_policy
+from bot.utils.metrics import API_REQUEST_SECONDS, collect_snapshots, render_prometheus, run_metrics_snapshots
 
 if TYPE_CHECKING:
     from collections.abc import AsyncIterator, Awaitable, Callable
@@ -31,15 +41,52 @@ async def api_lifespan(app: FastAPI) -> AsyncIterator[None]:
     del app
     logger.info("🚀 API 服务启动中...")
     await init_translation_session()
+    await webhooks.get_webhook_queue().start()
+    await get_writeback_job_manager().start()
+    metrics_task = asyncio.create_task(run_metrics_snapshots("api"), name="metrics_snapshot")
+    dashboard_task = asyncio.create_task(get_dashboard_stats().run(), name="dashboard_stats")
     logger.info("✅ API 服务启动完成")
     try:
         yield
     finally:
         logger.info("⏹️ API 服务停止中...")
+        for task in (metrics_task, dashboard_task):
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        await webhooks.get_webhook_queue().stop()
+        await get_writeback_job_manager().stop()
+        await get_playback_policy().flush()
+        await get_audit_sink().stop()
         await close_translation_session()
         logger.info("✅ API 服务已停止")
 
 
+def _check_metrics_token(request: Request) -> None:
+    token = settings.METRICS_TOKEN
+    if not token:
+        return
+    provided = request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+    if not hmac.compare_digest(provided, token):
+        raise HTTPException(status_code=401, detail="Unauthorized")
+
+
+def _route_name(request: Request) -> str:
+    # 使用路由模板而非实际路径，避免 ID 等参数导致标签基数膨胀
+    route = request.scope.get("route")
+    return f"{request.method} {getattr(route, 'path', 'unmatched')}"
+
+
+def _observe_request(request: Request, start: float, status: int) -> None:
+    route = request.scope.get("route")
+    API_REQUEST_SECONDS.observe(
+        time.perf_counter() - start,
+        method=request.method,
+        route=getattr(route, "path", "unmatched"),
+        status=status,
+    )
+
+
 def create_app() -> FastAPI:
     """创建并配置 FastAPI 应用。"""
     app = FastAPI(
@@ -72,12 +119,17 @@ def create_app() -> FastAPI:
         request: Request,
         call_next: Callable[[Request], Awaitable[Response]],
     ) -> Response:
-        """记录请求方法、路径、状态码、耗时和客户端 IP。"""
+        """记录请求方法、路径、状态码、耗时和客户端 IP，并按路由模板统计耗时。"""
         start = time.perf_counter()
         try:
-            response = await call_next(request)
+            with track_queries(request.method):
+                try:
+                    response = await call_next(request)
+                finally:
+                    rename_current_unit(_route_name(request))
             status = getattr(response, "status_code", 0)
         except Exception as err:
+            _observe_request(request, start, 500)
             duration_ms = int((time.perf_counter() - start) * 1000)
             client_ip = request.client.host if request.client else "-"
             logger.error(
@@ -90,6 +142,7 @@ def create_app() -> FastAPI:
             )
             raise
         else:
+            _observe_request(request, start, status)
             duration_ms = int((time.perf_counter() - start) * 1000)
             client_ip = request.client.host if request.client else "-"
             logger.info(
@@ -112,6 +165,24 @@ def create_app() -> FastAPI:
         """健康检查端点。"""
         return {"status": "healthy"}
 
+    @app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+    async def metrics(request: Request) -> PlainTextResponse:
+        """Prometheus 文本格式的指标，合并机器人进程最近一次写出的快照。"""
+        _check_metrics_token(request)
+        return PlainTextResponse(
+            render_prometheus(collect_snapshots()),
+            media_type="text/plain; version=0.0.4; charset=utf-8",
+        )
+
+    @app.get("/metrics/queries", include_in_schema=False)
+    async def query_report(request: Request) -> dict[str, Any]:
+        """各进程按更新/请求汇总的 SQL 条数、N+1 语句与最近的慢查询。"""
+        _check_metrics_token(request)
+        return {
+            snapshot["process"]: snapshot.get("sections", {}).get("queries", {})
+            for snapshot in collect_snapshots()
+        }
+
     return app
 
 
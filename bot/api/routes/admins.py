@@ -5,17 +5,23 @@
 
 from __future__ import annotations
 from datetime import datetime, timedelta, timezone
-from typing import Annotated, NoReturn
+from typing import TYPE_CHECKING, Annotated, NoReturn
 
 from fastapi import APIRouter, HTTPException, Query
 from loguru import logger
 from pydantic import BaseModel
-from sqlalchemy import select
+from sqlalchemy import func, select
 from sqlalchemy.exc import SQLAlchemyError
 
+from bot.cache import build_key, cached
 from bot.database.database import sessionmaker
-from bot.database.models import UserModel
-from bot.services.users import get_all_users, is_admin
+from bot.database.models import UserExtendModel, UserModel, UserRole
+from bot.services.user_search import USER_COUNT_TTL, build_admins_page_query
+from bot.services.users import is_admin
+from bot.utils.pagination import InvalidCursorError, encode_cursor
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
 
 router = APIRouter()
 
@@ -55,6 +61,7 @@ class AdminsListResponse(BaseModel):
         page: 当前页码
         per_page: 每页数量
         pages: 总页数
+        next_cursor: 下一页游标, 为空表示没有更多数据
     """
 
     items: list[AdminResponse]
@@ -62,65 +69,79 @@ class AdminsListResponse(BaseModel):
     page: int
     per_page: int
     pages: int
+    next_cursor: str | None = None
+
+
+def _to_admin_response(admin: UserModel) -> AdminResponse:
+    # 判断是否活跃(最近7天有活动)
+    is_active = True
+    if admin.updated_at:
+        week_ago = datetime.now(timezone.utc) - timedelta(days=7)
+        is_active = admin.updated_at >= week_ago
+
+    return AdminResponse(
+        id=admin.id,
+        username=admin.username,
+        first_name=admin.first_name or "未知",
+        last_name=admin.last_name,
+        is_active=is_active,
+        created_at=admin.created_at.isoformat() if admin.created_at else datetime.now(timezone.utc).isoformat(),
+        updated_at=admin.updated_at.isoformat() if admin.updated_at else datetime.now(timezone.utc).isoformat(),
+        roles=["admin"],  # 基础角色, 可以根据需要扩展
+    )
+
+
+@cached(ttl=USER_COUNT_TTL, key_builder=lambda session: build_key())
+async def _count_admins(session: AsyncSession) -> int:
+    result = await session.execute(
+        select(func.count())
+        .select_from(UserExtendModel)
+        .where(UserExtendModel.role.in_([UserRole.admin, UserRole.owner]))
+    )
+    return int(result.scalar() or 0)
 
 
 @router.get("/admins", response_model=AdminsListResponse)
 async def get_admins_list(
-    page: Annotated[int, Query(ge=1, description="页码")] = 1,
+    page: Annotated[int, Query(ge=1, description="页码 (仅兼容旧客户端, 建议使用 cursor)")] = 1,
     per_page: Annotated[int, Query(ge=1, le=100, description="每页数量")] = 10,
+    cursor: Annotated[str | None, Query(description="上一页返回的 next_cursor")] = None,
 ) -> AdminsListResponse:
     """
     获取管理员列表
 
+    按用户 ID 键集分页, 传入上一页的 `next_cursor` 获取下一页。
+
     Args:
         page: 页码
         per_page: 每页数量
+        cursor: 分页游标
 
     Returns:
         AdminsListResponse: 管理员列表数据
     """
+    try:
+        query = build_admins_page_query(cursor, per_page)
+    except InvalidCursorError as err:
+        raise HTTPException(status_code=400, detail=str(err)) from err
+    if not cursor and page > 1:
+        query = query.offset((page - 1) * per_page)
+
     try:
         async with sessionmaker() as session:
-            # 获取所有用户, 然后筛选管理员
-            all_users = await get_all_users(session)
-            admin_users = [user for user in all_users if await is_admin(session, user.id)]
-
-            # 分页处理
-            total = len(admin_users)
-            start_idx = (page - 1) * per_page
-            end_idx = start_idx + per_page
-            paginated_admins = admin_users[start_idx:end_idx]
-
-            # 转换为响应模型
-            admins_data = []
-            for admin in paginated_admins:
-                # 判断是否活跃(最近7天有活动)
-                is_active = True
-                if admin.updated_at:
-                    week_ago = datetime.now(timezone.utc) - timedelta(days=7)
-                    is_active = admin.updated_at >= week_ago
-
-                admins_data.append(
-                    AdminResponse(
-                        id=admin.id,
-                        username=admin.username,
-                        first_name=admin.first_name or "未知",
-                        last_name=admin.last_name,
-                        is_active=is_active,
-                        created_at=(
-                            admin.created_at.isoformat() if admin.created_at else datetime.now(timezone.utc).isoformat()
-                        ),
-                        updated_at=(
-                            admin.updated_at.isoformat() if admin.updated_at else datetime.now(timezone.utc).isoformat()
-                        ),
-                        roles=["admin"],  # 基础角色, 可以根据需要扩展
-                    )
-                )
-
-            # 计算总页数
-            pages = (total + per_page - 1) // per_page
-
-            return AdminsListResponse(items=admins_data, total=total, page=page, per_page=per_page, pages=pages)
+            total = await _count_admins(session)
+            result = await session.execute(query)
+            admins = list(result.scalars().all())
+
+            next_cursor = encode_cursor("id", (admins[per_page - 1].id,)) if len(admins) > per_page else None
+            return AdminsListResponse(
+                items=[_to_admin_response(admin) for admin in admins[:per_page]],
+                total=total,
+                page=page,
+                per_page=per_page,
+                pages=(total + per_page - 1) // per_page,
+                next_cursor=next_cursor,
+            )
 
     except Exception as err:
         logger.error(f"❌ 获取管理员列表失败: {err}")
@@ -151,22 +172,7 @@ async def get_admin_detail(admin_id: int) -> AdminResponse:
             if not admin:
                 raise_admin_not_found()
 
-            # 判断是否活跃
-            is_active = True
-            if admin.updated_at:
-                week_ago = datetime.now(timezone.utc) - timedelta(days=7)
-                is_active = admin.updated_at >= week_ago
-
-            return AdminResponse(
-                id=admin.id,
-                username=admin.username,
-                first_name=admin.first_name or "未知",
-                last_name=admin.last_name,
-                is_active=is_active,
-                created_at=admin.created_at.isoformat() if admin.created_at else datetime.now(timezone.utc).isoformat(),
-                updated_at=admin.updated_at.isoformat() if admin.updated_at else datetime.now(timezone.utc).isoformat(),
-                roles=["admin"],
-            )
+            return _to_admin_response(admin)
 
     except HTTPException:
         raise
@@ -185,14 +191,7 @@ async def get_admins_count() -> dict[str, int]:
     """
     try:
         async with sessionmaker() as session:
-            all_users = await get_all_users(session)
-            admin_count = 0
-
-            for user in all_users:
-                if await is_admin(session, user.id):
-                    admin_count += 1
-
-            return {"total_admins": admin_count}
+            return {"total_admins": await _count_admins(session)}
 
     except SQLAlchemyError as err:
         logger.error(f"❌ 获取管理员统计失败: {err}")
@@ -1,141 +1,41 @@
 """
 仪表板API路由
-提供仪表板统计数据接口, 调用 bot 的数据库操作服务
+提供仪表板统计数据接口, 数据来自定时刷新的内存快照 (见 bot.services.dashboard_stats)
 """
 
 from __future__ import annotations
-from datetime import datetime, timedelta, timezone
-from typing import Annotated, Any
+from typing import Any
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, HTTPException
 from loguru import logger
-from sqlalchemy import func, select
+from sqlalchemy.exc import SQLAlchemyError
 
-from bot.database.database import sessionmaker
-from bot.database.models import UserModel
-from bot.services.users import get_user_count
+from bot.services.dashboard_stats import get_dashboard_stats as get_dashboard_stats_service
 
 router = APIRouter()
 
 
-async def get_user_stats() -> dict[str, Any]:
-    """
-    获取用户统计数据
-
-    Returns:
-        Dict[str, Any]: 用户统计信息
-    """
+async def _load_stats() -> dict[str, Any]:
     try:
-        async with sessionmaker() as session:
-            # 总用户数 - 使用bot的服务层
-            total_users = await get_user_count(session)
-
-            # 今日新用户(最近24小时)
-            today = datetime.now(timezone.utc) - timedelta(days=1)
-            new_users_today_result = await session.execute(
-                select(func.count(UserModel.id)).where(UserModel.created_at >= today)
-            )
-            new_users_today = new_users_today_result.scalar() or 0
-
-            # 活跃用户(最近7天注册的用户, 因为没有 updated_at 字段)
-            week_ago = datetime.now(timezone.utc) - timedelta(days=7)
-            active_users_result = await session.execute(
-                select(func.count(UserModel.id)).where(UserModel.created_at >= week_ago)
-            )
-            active_users = active_users_result.scalar() or 0
-
-            # 本周新用户
-            week_start = datetime.now(timezone.utc) - timedelta(days=7)
-            new_users_week_result = await session.execute(
-                select(func.count(UserModel.id)).where(UserModel.created_at >= week_start)
-            )
-            new_users_week = new_users_week_result.scalar() or 0
-
-            # 高级用户数
-            premium_users_result = await session.execute(select(func.count(UserModel.id)).where(UserModel.is_premium))
-            premium_users = premium_users_result.scalar() or 0
-
-            return {
-                "total_users": total_users,
-                "active_users": active_users,
-                "new_users_today": new_users_today,
-                "new_users_week": new_users_week,
-                "premium_users": premium_users,
-            }
-
-    except Exception as err:
-        logger.error(f"❌ 获取用户统计数据失败: {err}")
-        raise HTTPException(status_code=500, detail="获取用户统计数据失败") from err
+        return await get_dashboard_stats_service().get_stats()
+    except SQLAlchemyError as err:
+        logger.error(f"❌ 获取仪表板统计数据失败: {err}")
+        raise HTTPException(status_code=500, detail="获取仪表板统计数据失败") from err
 
 
 @router.get("/dashboard/stats")
-async def get_dashboard_stats(user_stats: Annotated[dict[str, Any], Depends(get_user_stats)]) -> dict[str, Any]:
+async def get_dashboard_stats() -> dict[str, Any]:
     """
     获取仪表板统计数据
 
-    Args:
-        user_stats: 用户统计数据依赖注入
+    直接返回内存中的快照, `last_updated` 为快照计算时间,
+    `snapshot_age_seconds` / `stale` 标识数据新鲜度。
 
     Returns:
         Dict[str, Any]: 仪表板统计信息
     """
-    try:
-        # 基础统计数据
-        total_users = user_stats["total_users"]
-        active_users = user_stats["active_users"]
-        new_users_today = user_stats["new_users_today"]
-        new_users_week = user_stats["new_users_week"]
-        premium_users = user_stats["premium_users"]
-
-        # 计算增长率
-        users_growth = (new_users_week / max(total_users - new_users_week, 1)) * 100 if total_users > 0 else 0
-        activity_rate = (active_users / max(total_users, 1)) * 100 if total_users > 0 else 0
-        premium_rate = (premium_users / max(total_users, 1)) * 100 if total_users > 0 else 0
-
-        # 构建统计数据
-        return {
-            "total_users": total_users,
-            "active_users": active_users,
-            "new_users_today": new_users_today,
-            "new_users_week": new_users_week,
-            "premium_users": premium_users,
-            "total_messages": total_users * 12,  # 估算消息数
-            "messages_today": new_users_today * 3,  # 估算今日消息
-            "bot_uptime": "运行中",
-            "last_updated": datetime.now(timezone.utc).isoformat(),
-            "trends": {
-                "users_growth": round(users_growth, 2),
-                "activity_rate": round(activity_rate, 2),
-                "premium_rate": round(premium_rate, 2),
-            },
-            "recent_activity": [
-                {
-                    "id": 1,
-                    "type": "user_joined",
-                    "message": f"今日新增 {new_users_today} 位用户",
-                    "timestamp": datetime.now(timezone.utc).isoformat(),
-                    "count": new_users_today,
-                },
-                {
-                    "id": 2,
-                    "type": "user_active",
-                    "message": f"本周活跃用户 {active_users} 位",
-                    "timestamp": (datetime.now(timezone.utc) - timedelta(hours=1)).isoformat(),
-                    "count": active_users,
-                },
-                {
-                    "id": 3,
-                    "type": "premium_users",
-                    "message": f"高级用户 {premium_users} 位",
-                    "timestamp": (datetime.now(timezone.utc) - timedelta(hours=2)).isoformat(),
-                    "count": premium_users,
-                },
-            ],
-        }
-
-    except Exception as err:
-        logger.error(f"❌ 获取仪表板统计数据失败: {err}")
-        raise HTTPException(status_code=500, detail="获取仪表板统计数据失败") from err
+    stats = await _load_stats()
+    return {key: value for key, value in stats.items() if key != "user_growth"}
 
 
 @router.get("/dashboard/user-growth")
@@ -144,31 +44,7 @@ async def get_user_growth() -> dict[str, Any]:
     获取用户增长趋势数据
 
     Returns:
-        Dict[str, Any]: 用户增长趋势数据
+        Dict[str, Any]: 最近 7 天每日新增用户数, 按时间顺序排列
     """
-    try:
-        async with sessionmaker() as session:
-            # 获取最近7天的用户增长数据
-            growth_data = []
-            for i in range(7):
-                date = datetime.now(timezone.utc) - timedelta(days=i)
-                start_of_day = date.replace(hour=0, minute=0, second=0, microsecond=0)
-                end_of_day = start_of_day + timedelta(days=1)
-
-                daily_users_result = await session.execute(
-                    select(func.count(UserModel.id))
-                    .where(UserModel.created_at >= start_of_day)
-                    .where(UserModel.created_at < end_of_day)
-                )
-                daily_users = daily_users_result.scalar() or 0
-
-                growth_data.append({"date": start_of_day.strftime("%Y-%m-%d"), "new_users": daily_users})
-
-            # 反转数据, 使其按时间顺序排列
-            growth_data.reverse()
-
-            return {"growth_data": growth_data}
-
-    except Exception as err:
-        logger.error(f"❌ 获取用户增长趋势失败: {err}")
-        raise HTTPException(status_code=500, detail="获取用户增长趋势失败") from err
+    stats = await _load_stats()
+    return {"growth_data": stats.get("user_growth", [])}
@@ -3,15 +3,20 @@
 from typing import Any
 
 import aiohttp
-from fastapi import APIRouter, HTTPException, Response
+from fastapi import APIRouter, HTTPException, Query, Request, Response
 from pydantic import BaseModel, Field
 
 from bot.services.emby_metadata import workbench
+from bot.services.emby_metadata.image_cache import etag_matches
 from bot.services.emby_metadata.models import MetadataCandidate
-from bot.services.emby_metadata.translation import translate_to_chinese
+from bot.services.emby_metadata.writeback_jobs import get_writeback_job_manager
+from bot.services.emby_metadata.translation import translate_many, translate_to_chinese
 
 router = APIRouter(prefix="/emby/metadata")
 
+# 同一 URL 的来源图片基本不会变化，浏览器可长期缓存，过期后凭 ETag 重新验证
+_IMAGE_CACHE_CONTROL = "private, max-age=604800"
+
 
 class QueueSearchSelection(BaseModel):
     """一次批量搜索中某个队列项目的搜索与路由选择。"""
@@ -36,12 +41,33 @@ class WritebackRequest(BaseModel):
     confirmed: bool = False
 
 
+class BatchWritebackEntry(BaseModel):
+    """批量写入中的单个队列项目。"""
+
+    notification_id: str
+    candidate: MetadataCandidate
+    fields: list[str] = Field(default_factory=list)
+
+
+class BatchWritebackRequest(BaseModel):
+    """已由管理员二次确认的批量写入请求。"""
+
+    entries: list[BatchWritebackEntry] = Field(min_length=1, max_length=500)
+    confirmed: bool = False
+
+
 class TranslationRequest(BaseModel):
     """简介翻译请求。"""
 
     text: str = Field(min_length=1, max_length=20000)
 
 
+class BatchTranslationRequest(BaseModel):
+    """多段文本的批量翻译请求。"""
+
+    texts: list[str] = Field(min_length=1, max_length=100)
+
+
 class MergeCandidateRequest(BaseModel):
     primary_source: str
     primary_source_id: str
@@ -50,9 +76,12 @@ class MergeCandidateRequest(BaseModel):
 
 
 @router.get("/queue")
-async def get_queue() -> dict[str, Any]:
-    """获取待处理队列。"""
-    return await workbench.get_queue()
+async def get_queue(
+    page: int = Query(default=1, ge=1),
+    page_size: int = Query(default=workbench.QUEUE_PAGE_SIZE, ge=1, le=200),
+) -> dict[str, Any]:
+    """分页获取待处理队列。"""
+    return await workbench.get_queue(page, page_size)
 
 
 @router.post("/translate")
@@ -66,6 +95,19 @@ async def translate_metadata(request: TranslationRequest) -> dict[str, str]:
         raise HTTPException(status_code=502, detail="xAI 翻译服务暂时不可用") from error
 
 
+@router.post("/translate/batch")
+async def translate_metadata_batch(request: BatchTranslationRequest) -> dict[str, list[str]]:
+    """批量翻译标题、简介、类型等多段文本，按输入顺序返回。"""
+    if any(len(text) > 20000 for text in request.texts):
+        raise HTTPException(status_code=422, detail="单段文本不能超过 20000 字")
+    try:
+        return {"translations": await translate_many(request.texts)}
+    except RuntimeError as error:
+        raise HTTPException(status_code=503, detail=str(error)) from error
+    except aiohttp.ClientError as error:
+        raise HTTPException(status_code=502, detail="xAI 翻译服务暂时不可用") from error
+
+
 @router.post("/queue/search")
 async def search_queue(request: SearchRequest) -> list[dict[str, Any]]:
     """批量搜索选中项目。"""
@@ -103,10 +145,18 @@ async def merge_candidate(
 
 
 @router.get("/images")
-async def proxy_source_image(url: str, referer: str | None = None) -> Response:
-    """使用数据源所需请求头代理候选图片。"""
-    image_data, content_type = await workbench.proxy_source_image(url, referer)
-    return Response(content=image_data, media_type=content_type)
+async def proxy_source_image(
+    request: Request,
+    url: str,
+    referer: str | None = None,
+    width: int | None = Query(default=None, ge=16, le=4096),
+) -> Response:
+    """使用数据源所需请求头代理候选图片，``width`` 用于请求缩略图。"""
+    image = await workbench.proxy_source_image(url, referer, width)
+    headers = {"Cache-Control": _IMAGE_CACHE_CONTROL, "ETag": image.etag}
+    if etag_matches(request.headers.get("if-none-match"), image.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=image.body, media_type=image.content_type, headers=headers)
 
 
 @router.post("/queue/{notification_id}/writeback")
@@ -122,3 +172,25 @@ async def writeback(notification_id: str, request: WritebackRequest) -> dict[str
             fields=request.fields,
         ),
     }
+
+
+@router.post("/writeback-jobs")
+async def create_writeback_job(request: BatchWritebackRequest) -> dict[str, Any]:
+    """确认后创建后台批量写入任务，立即返回任务进度。"""
+    if not request.confirmed:
+        raise HTTPException(status_code=400, detail="写入操作需要明确确认")
+    return await get_writeback_job_manager().create(
+        [entry.model_dump(mode="json") for entry in request.entries],
+    )
+
+
+@router.get("/writeback-jobs/{job_id}")
+async def get_writeback_job(job_id: str) -> dict[str, Any]:
+    """轮询批量写入任务的逐条结果。"""
+    return await get_writeback_job_manager().get(job_id)
+
+
+@router.post("/writeback-jobs/{job_id}/resume")
+async def resume_writeback_job(job_id: str) -> dict[str, Any]:
+    """重试失败或因重启中断的条目。"""
+    return await get_writeback_job_manager().resume(job_id)
@@ -7,13 +7,17 @@ from __future__ import annotations
 from typing import Annotated, NoReturn
 
 from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from loguru import logger
 from pydantic import BaseModel
-from sqlalchemy import func, or_, select
+from sqlalchemy import select
 
 from bot.database.database import sessionmaker
 from bot.database.models import UserModel
+from bot.services.user_search import build_users_page_query, count_users, next_users_cursor, resolve_user_sort
 from bot.services.users import get_user_count, user_exists
+from bot.utils.pagination import InvalidCursorError
+from bot.utils.users_export import UnsupportedExportFormatError, export_users
 
 router = APIRouter()
 
@@ -65,10 +69,11 @@ class UsersListResponse(BaseModel):
 
     Attributes:
         items: 用户列表
-        total: 总数
+        total: 总数 (按搜索词缓存, 近似值)
         page: 当前页码
         per_page: 每页数量
         pages: 总页数
+        next_cursor: 下一页游标, 为空表示没有更多数据
     """
 
     items: list[UserResponse]
@@ -76,115 +81,117 @@ class UsersListResponse(BaseModel):
     page: int
     per_page: int
     pages: int
+    next_cursor: str | None = None
+
+
+def _to_user_response(u: UserModel) -> UserResponse:
+    return UserResponse(
+        id=u.id,
+        is_bot=u.is_bot,
+        first_name=u.first_name,
+        last_name=u.last_name,
+        username=u.username,
+        language_code=u.language_code,
+        is_premium=u.is_premium,
+        added_to_attachment_menu=u.added_to_attachment_menu,
+        remark=u.remark,
+        created_at=u.created_at.isoformat() if u.created_at else None,
+        created_by=u.created_by,
+        updated_at=u.updated_at.isoformat() if u.updated_at else None,
+        updated_by=u.updated_by,
+        is_deleted=u.is_deleted,
+        deleted_at=u.deleted_at.isoformat() if u.deleted_at else None,
+        deleted_by=u.deleted_by,
+    )
 
 
 @router.get("/users", response_model=UsersListResponse)
 async def get_users_list(
-    page: Annotated[int, Query(ge=1, description="页码")] = 1,
+    page: Annotated[int, Query(ge=1, description="页码 (仅兼容旧客户端, 建议使用 cursor)")] = 1,
     per_page: Annotated[int, Query(ge=1, le=100, description="每页数量")] = 10,
-    search: Annotated[str | None, Query(description="搜索关键词")] = None,
+    search: Annotated[str | None, Query(description="搜索关键词 (用户名/姓名前缀或用户 ID)")] = None,
     sort_by: Annotated[str | None, Query(description="排序字段")] = "created_at",
     sort_order: Annotated[str, Query(description="排序方向 (asc/desc)")] = "desc",
+    cursor: Annotated[str | None, Query(description="上一页返回的 next_cursor")] = None,
 ) -> UsersListResponse:
     """
     获取用户列表
 
+    使用键集分页: 传入上一页的 `next_cursor` 获取下一页, 耗时与翻页深度无关;
+    未传游标且 `page > 1` 时退回 OFFSET 分页以兼容旧客户端。
+
     Args:
         page: 页码
         per_page: 每页数量
         search: 搜索关键词
         sort_by: 排序字段
         sort_order: 排序方向 (asc/desc)
+        cursor: 分页游标
 
     Returns:
         UsersListResponse: 用户列表数据
     """
+    sort, descending = resolve_user_sort(sort_by, sort_order)
     try:
-        async with sessionmaker() as session:
-            # 构建查询
-            query = select(UserModel)
-            count_query = select(func.count(UserModel.id))
-
-            # 搜索过滤
-            if search:
-                search_filter = or_(
-                    UserModel.username.ilike(f"%{search}%"),
-                    UserModel.first_name.ilike(f"%{search}%"),
-                    UserModel.last_name.ilike(f"%{search}%"),
-                )
-                query = query.where(search_filter)
-                count_query = count_query.where(search_filter)
-
-            # 获取总数
-            total_result = await session.execute(count_query)
-            total = total_result.scalar() or 0
-
-            # 排序处理
-            valid_sort_fields = {
-                "id": UserModel.id,
-                "first_name": UserModel.first_name,
-                "last_name": UserModel.last_name,
-                "username": UserModel.username,
-                "created_at": UserModel.created_at,
-                "updated_at": UserModel.updated_at,
-                "is_premium": UserModel.is_premium,
-            }
-
-            # 验证排序字段
-            if sort_by not in valid_sort_fields:
-                sort_by = "created_at"
-
-            # 验证排序方向
-            if sort_order.lower() not in ["asc", "desc"]:
-                sort_order = "desc"
-
-            # 应用排序
-            sort_column = valid_sort_fields[sort_by]
-            if sort_order.lower() == "asc":
-                query = query.order_by(sort_column.asc())
-            else:
-                query = query.order_by(sort_column.desc())
-
-            # 分页查询
-            offset = (page - 1) * per_page
-            query = query.offset(offset).limit(per_page)
+        query = build_users_page_query(search=search, sort=sort, descending=descending, cursor=cursor, limit=per_page)
+    except InvalidCursorError as err:
+        raise HTTPException(status_code=400, detail=str(err)) from err
+    if not cursor and page > 1:
+        query = query.offset((page - 1) * per_page)
 
+    try:
+        async with sessionmaker() as session:
+            total = await count_users(session, search)
             result = await session.execute(query)
-            users = result.scalars().all()
-
-            # 转换为响应模型
-            users_data = [
-                UserResponse(
-                    id=u.id,
-                    is_bot=u.is_bot,
-                    first_name=u.first_name,
-                    last_name=u.last_name,
-                    username=u.username,
-                    language_code=u.language_code,
-                    is_premium=u.is_premium,
-                    added_to_attachment_menu=u.added_to_attachment_menu,
-                    remark=u.remark,
-                    created_at=u.created_at.isoformat() if u.created_at else None,
-                    created_by=u.created_by,
-                    updated_at=u.updated_at.isoformat() if u.updated_at else None,
-                    updated_by=u.updated_by,
-                    is_deleted=u.is_deleted,
-                    deleted_at=u.deleted_at.isoformat() if u.deleted_at else None,
-                    deleted_by=u.deleted_by,
-                )
-                for u in users
-            ]
-
-            # 计算总页数
-            pages = (total + per_page - 1) // per_page
-
-            return UsersListResponse(items=users_data, total=total, page=page, per_page=per_page, pages=pages)
+            users = list(result.scalars().all())
+
+            return UsersListResponse(
+                items=[_to_user_response(u) for u in users[:per_page]],
+                total=total,
+                page=page,
+                per_page=per_page,
+                pages=(total + per_page - 1) // per_page,
+                next_cursor=next_users_cursor(users, sort, per_page),
+            )
 
     except Exception as err:
         logger.error(f"❌ 获取用户列表失败: {err}")
         raise HTTPException(status_code=500, detail="获取用户列表失败") from err
 
 
+@router.get("/users/export")
+async def export_users_file(
+    export_format: Annotated[str, Query(alias="format", description="导出格式 (csv/xlsx)")] = "csv",
+    compress: Annotated[bool, Query(alias="gzip", description="是否 gzip 压缩 CSV")] = False,
+) -> StreamingResponse:
+    """
+    流式下载全部用户
+
+    先用服务端游标把用户分批写入临时文件, 再分块返回, 内存占用不随用户数增长。
+
+    Args:
+        export_format: 导出格式
+        compress: 是否 gzip 压缩 CSV
+
+    Returns:
+        StreamingResponse: 导出文件
+    """
+    try:
+        async with sessionmaker() as session:
+            export = await export_users(session, export_format, compress=compress)
+    except UnsupportedExportFormatError as err:
+        raise HTTPException(status_code=400, detail=str(err)) from err
+    except Exception as err:
+        logger.error(f"❌ 导出用户失败: {err}")
+        raise HTTPException(status_code=500, detail="导出用户失败") from err
+
+    return StreamingResponse(
+        export.iter_chunks(),
+        media_type=export.media_type,
+        headers={"Content-Disposition": f'attachment; filename="{export.filename}"'},
+    )
+
+
 @router.get("/users/{user_id}", response_model=UserResponse)
 async def get_user_detail(user_id: int) -> UserResponse:
     """
@@ -209,24 +216,7 @@ async def get_user_detail(user_id: int) -> UserResponse:
             if not user:
                 raise_user_not_found()
 
-            return UserResponse(
-                id=user.id,
-                is_bot=user.is_bot,
-                first_name=user.first_name,
-                last_name=user.last_name,
-                username=user.username,
-                language_code=user.language_code,
-                is_premium=user.is_premium,
-                added_to_attachment_menu=user.added_to_attachment_menu,
-                remark=user.remark,
-                created_at=user.created_at.isoformat() if user.created_at else None,
-                created_by=user.created_by,
-                updated_at=user.updated_at.isoformat() if user.updated_at else None,
-                updated_by=user.updated_by,
-                is_deleted=user.is_deleted,
-                deleted_at=user.deleted_at.isoformat() if user.deleted_at else None,
-                deleted_by=user.deleted_by,
-            )
+            return _to_user_response(user)
 
     except HTTPException:
         raise
@@ -4,8 +4,6 @@ Webhooks 路由
 """
 
 from __future__ import annotations
-import json
-from datetime import timedelta
 from typing import TYPE_CHECKING, Annotated, Any
 
 from aiogram.exceptions import TelegramAPIError
@@ -14,53 +12,39 @@ from fastapi import APIRouter, Header, HTTPException, Request
 from sqlalchemy import select
 from sqlalchemy.orm.attributes import flag_modified
 
-from bot.config.constants import KEY_EMBY_WHITELIST_USER_IDS, KEY_TG_WHITELIST_USER_IDS
 from bot.core.constants import (
     EVENT_TYPE_LIBRARY_NEW,
     EVENT_TYPE_PLAYBACK_START,
 )
 from bot.core.loader import bot as telegram_bot
 from bot.database.database import sessionmaker
+from bot.database.models.audit_log import ActionType
 from bot.database.models.emby_user import EmbyUserModel
-from bot.database.models.library_new_notification import LibraryNewNotificationModel
-from bot.database.models.notification import NotificationModel
 from bot.database.models.user_extend import UserExtendModel
-from bot.services.config_service import get_config
+from bot.services.audit_sink import record_audit
 from bot.services.emby_update_helper import detect_and_update_emby_user
-from bot.utils.datetime import format_datetime, now, parse_formatted_datetime
+from bot.services.emby_webhook_queue import EmbyWebhookQueue, get_emby_webhook_queue
+from bot.services.playback_policy import (
+    WARNING_KEY_RESTRICTED_CLIENT,
+    WARNING_KEY_WEB_PLAYBACK,
+    get_playback_policy,
+)
+from bot.utils.datetime import format_datetime, now
 from bot.utils.emby import get_emby_client
 
-try:
-    import orjson
-except ImportError:
-    orjson = None
 from loguru import logger
 
 if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable
+
     from sqlalchemy.ext.asyncio import AsyncSession
 
 router = APIRouter()
 
-WARNING_COOLDOWN_MINUTES = 10
 WARNING_SECOND = 2
 WARNING_DISABLE_THRESHOLD = 3
 
 
-def _parse_whitelist(whitelist_val: Any) -> list[str]:
-    if isinstance(whitelist_val, list):
-        return [str(x) for x in whitelist_val]
-    if isinstance(whitelist_val, str):
-        loaded: Any | None
-        try:
-            loaded = json.loads(whitelist_val)
-        except json.JSONDecodeError:
-            loaded = None
-        if isinstance(loaded, list):
-            return [str(x) for x in loaded]
-        return [x.strip() for x in whitelist_val.split(",") if x.strip()]
-    return []
-
-
 async def _get_emby_user_and_extend(
     session: AsyncSession,
     user_id: str,
@@ -77,59 +61,18 @@ async def _get_emby_user_and_extend(
     return emby_user, user_extend
 
 
-async def _increment_warning(
-    session: AsyncSession,
-    emby_user: EmbyUserModel,
-    warning_key: str,
-    client_device: tuple[str, str],
-    item: dict[str, Any],
-) -> int | None:
-    client, device_name = client_device
-    extra_data = dict(emby_user.extra_data) if emby_user.extra_data else {}
-    warning_data = extra_data.get(warning_key, {})
-
-    last_warning_time_str = warning_data.get("last_warning_time")
-    if last_warning_time_str:
-        last_time = parse_formatted_datetime(last_warning_time_str)
-        if last_time and (now() - last_time < timedelta(minutes=WARNING_COOLDOWN_MINUTES)):
-            return None
-
-    count = int(warning_data.get("count", 0)) + 1
-    warning_data["count"] = count
-    warning_data["last_warning_time"] = format_datetime(now())
-
-    history = warning_data.get("history", [])
-    history.append(
-        {
-            "time": format_datetime(now()),
-            "item_name": item.get("Name"),
-            "item_id": item.get("Id"),
-            "client": client,
-            "device": device_name,
-        }
-    )
-    warning_data["history"] = history
-
-    extra_data[warning_key] = warning_data
-    emby_user.extra_data = extra_data
-    flag_modified(emby_user, "extra_data")
-    session.add(emby_user)
-    await session.commit()
-    return count
-
-
 async def _send_telegram_warning(
     *,
-    user_extend: UserExtendModel | None,
+    telegram_id: int | None,
     emby_user_id: str,
     text: str,
     count: int,
     label: str,
 ) -> None:
-    if user_extend and user_extend.user_id:
+    if telegram_id:
         try:
-            await telegram_bot.send_message(chat_id=user_extend.user_id, text=text)
-            logger.info(f"🔔 已向用户 {user_extend.user_id} 发送{label} (第 {count} 次)")
+            await telegram_bot.send_message(chat_id=telegram_id, text=text)
+            logger.info(f"🔔 已向用户 {telegram_id} 发送{label} (第 {count} 次)")
         except (TelegramAPIError, ClientError, RuntimeError, ValueError) as e:
             logger.error(f"❌ 发送 Telegram 警告失败: {e}")
         return
@@ -155,35 +98,17 @@ def _is_web_playback(client: str, device_name: str) -> bool:
     return "Emby Web" in client or "Web" in device_name
 
 
-def _is_restricted_client(client: str, device_name: str) -> bool:
-    keywords = ["网易", "爆米花"]
-    return any(k in client for k in keywords) or any(k in device_name for k in keywords)
-
-
-async def _is_user_in_whitelist(session: AsyncSession, user_id: str) -> bool:
-    # Emby 用户ID白名单
-    emby_whitelist_val = await get_config(session, KEY_EMBY_WHITELIST_USER_IDS)
-    emby_whitelist = set(_parse_whitelist(emby_whitelist_val))
-    if user_id in emby_whitelist:
-        return True
-    # Telegram 用户ID白名单（需要关联 UserExtend）
-    tg_whitelist_val = await get_config(session, KEY_TG_WHITELIST_USER_IDS)
-    tg_whitelist: set[int] = set()
-    for x in _parse_whitelist(tg_whitelist_val):
-        sid = str(x).strip()
-        if not sid.isdigit():
-            continue
-        uid = int(sid)
-        if uid <= 0:
-            continue
-        tg_whitelist.add(uid)
-    if not tg_whitelist:
-        return False
-    # 查询 emby_user_id 对应的 telegram user_id
-    stmt = select(UserExtendModel.user_id).where(UserExtendModel.emby_user_id == user_id)
-    res = await session.execute(stmt)
-    tg_id = res.scalar_one_or_none()
-    return tg_id in tg_whitelist if tg_id is not None else False
+def _record_auto_disable(user_id: str, reason: str, label: str) -> None:
+    record_audit(
+        operator_id=0,
+        action_type=ActionType.USER_BLOCK,
+        target_type="emby_user",
+        target_id=user_id,
+        description=f"系统自动禁用 Emby 用户 {user_id}：{label}",
+        details={"action": "disable", "reason": reason, "source": "emby_webhook"},
+        ip_address="127.0.0.1",
+        user_agent="System/Bot",
+    )
 
 
 async def _maybe_disable_user_for_web_playback(
@@ -214,12 +139,30 @@ async def _maybe_disable_user_for_web_playback(
     flag_modified(emby_user, "extra_data")
     session.add(emby_user)
     await session.commit()
+    _record_auto_disable(user_id, "web_playback_violation", "网页端播放违规")
     logger.info(f"💾 已更新用户 {user_id} 数据库状态为封禁，并保存历史快照")
     logger.info(f"🚫 用户 {user_id} 已成功封禁")
 
 
+async def _disable_violating_user(
+    emby_client: Any,
+    user_id: str,
+    disable: Callable[[AsyncSession, Any, EmbyUserModel, str], Awaitable[None]],
+) -> None:
+    """先写回内存中的警告计数，再加载用户记录执行封禁。"""
+    await get_playback_policy().flush()
+    async with sessionmaker() as session:
+        record = await _get_emby_user_and_extend(session, user_id)
+        if not record:
+            logger.warning(f"⚠️ 用户 {user_id} 不在本地数据库中，无法封禁")
+            return
+        try:
+            await disable(session, emby_client, record[0], user_id)
+        except (ClientError, RuntimeError, ValueError) as e:
+            logger.error(f"❌ 封禁用户失败: {e}")
+
+
 async def _handle_web_playback_warning(
-    session: AsyncSession,
     payload: dict[str, Any],
     user_id: str,
     session_info: dict[str, Any],
@@ -228,17 +171,17 @@ async def _handle_web_playback_warning(
     client = session_info.get("Client", "")
     device_name = session_info.get("DeviceName", "")
 
-    record = await _get_emby_user_and_extend(session, user_id)
-    if not record:
+    policy = get_playback_policy()
+    state = await policy.user_state(user_id)
+    if state is None:
         logger.warning(f"⚠️ 用户 {user_id} 不在本地数据库中，无法记录警告")
         return
-    emby_user, user_extend = record
 
     item = payload.get("Item", {})
-    count = await _increment_warning(
-        session=session,
-        emby_user=emby_user,
-        warning_key="web_playback_warning",
+    count = policy.record_warning(
+        user_id,
+        state,
+        WARNING_KEY_WEB_PLAYBACK,
         client_device=(client, device_name),
         item=item,
     )
@@ -249,7 +192,7 @@ async def _handle_web_playback_warning(
     msg_data = _get_warning_message(count)
     msg_text = f"{msg_data['Header']}\n\n{msg_data['Text']}"
     await _send_telegram_warning(
-        user_extend=user_extend,
+        telegram_id=state.telegram_id,
         emby_user_id=user_id,
         text=msg_text,
         count=count,
@@ -273,10 +216,7 @@ async def _handle_web_playback_warning(
 
     if count >= WARNING_DISABLE_THRESHOLD:
         logger.info(f"🚨 用户 {user_id} 达到警告上限，执行封禁")
-        try:
-            await _maybe_disable_user_for_web_playback(session, emby_client, emby_user, user_id)
-        except (ClientError, RuntimeError, ValueError) as e:
-            logger.error(f"❌ 封禁用户失败: {e}")
+        await _disable_violating_user(emby_client, user_id, _maybe_disable_user_for_web_playback)
 
 
 async def _maybe_disable_user_for_restricted_client(
@@ -307,28 +247,28 @@ async def _maybe_disable_user_for_restricted_client(
     flag_modified(emby_user, "extra_data")
     session.add(emby_user)
     await session.commit()
+    _record_auto_disable(user_id, "restricted_client_violation", "使用违规客户端")
     logger.info(f"💾 已更新用户 {user_id} 数据库状态为封禁，并保存历史快照")
     logger.info(f"🚫 用户 {user_id} 已成功封禁")
 
 
 async def _handle_restricted_client_warning(
-    session: AsyncSession,
     payload: dict[str, Any],
     user_id: str,
     client: str,
     device_name: str,
 ) -> None:
-    record = await _get_emby_user_and_extend(session, user_id)
-    if not record:
+    policy = get_playback_policy()
+    state = await policy.user_state(user_id)
+    if state is None:
         logger.warning(f"⚠️ 用户 {user_id} 不在本地数据库中，无法记录警告")
         return
-    emby_user, user_extend = record
 
     item = payload.get("Item", {})
-    count = await _increment_warning(
-        session=session,
-        emby_user=emby_user,
-        warning_key="restricted_client_warning",
+    count = policy.record_warning(
+        user_id,
+        state,
+        WARNING_KEY_RESTRICTED_CLIENT,
         client_device=(client, device_name),
         item=item,
     )
@@ -338,7 +278,7 @@ async def _handle_restricted_client_warning(
 
     msg_text = _get_restricted_client_warning_text(count)
     await _send_telegram_warning(
-        user_extend=user_extend,
+        telegram_id=state.telegram_id,
         emby_user_id=user_id,
         text=msg_text,
         count=count,
@@ -354,10 +294,7 @@ async def _handle_restricted_client_warning(
         logger.error("❌ Emby 客户端未配置，无法执行封禁")
         return
 
-    try:
-        await _maybe_disable_user_for_restricted_client(session, emby_client, emby_user, user_id)
-    except (ClientError, RuntimeError, ValueError) as e:
-        logger.error(f"❌ 封禁用户失败: {e}")
+    await _disable_violating_user(emby_client, user_id, _maybe_disable_user_for_restricted_client)
 
 
 @router.post("/webhooks/emby")
@@ -370,10 +307,9 @@ async def handle_emby_webhook(
 
     功能说明:
     - 接收 Emby Webhooks 插件发送的事件回调 (POST JSON)
-    - 所有事件都存入数据库，但只有 library.new 事件设置状态
-    - library.new 事件状态设置为 pending_completion
-    - 其他事件状态字段为 None（不设置状态）
-    - 为所有事件提供详细的日志记录
+    - 校验载荷后写入本地暂存并放入后台队列，立即返回，不等待数据库与 Emby/Telegram 调用
+    - 后台队列批量入库：library.new 事件状态设置为 pending_completion，其他事件状态为 None
+    - 带 Session 的事件由后台检测协程执行违规客户端与网页端播放检测
 
     输入参数:
     - request: FastAPI 的请求对象, 用于读取原始 JSON 载荷
@@ -381,9 +317,6 @@ async def handle_emby_webhook(
 
     返回值:
     - dict: 处理结果，包含状态和已处理的事件信息
-
-    依赖安装方式:
-    - `pip install orjson` (已在项目依赖中声明)
     """
 
     # 读取 JSON 载荷
@@ -393,90 +326,23 @@ async def handle_emby_webhook(
         logger.exception("❌ 解析 Emby Webhook JSON 失败")
         raise HTTPException(status_code=400, detail="Invalid JSON body") from err
 
-    # 提取事件类型
-    event_title = payload.get("Title")
-    event_type = payload.get("Event")
-
-    # 提取 Item 信息（如果存在）
-    item = payload.get("Item", {})
-    item_id = item.get("Id")
-    item_name = item.get("Name")
-    item_type = item.get("Type")
-
-    # 提取剧集相关信息
-    series_id = item.get("SeriesId")
-    series_name = item.get("SeriesName")
-    season_number = item.get("ParentIndexNumber")
-    episode_number = item.get("IndexNumber")
-
-    # 处理非官方客户端警告（网易/爆米花）
-    if payload.get("Session"):
-        await _process_restricted_client_check(payload)
+    if not isinstance(payload, dict):
+        raise HTTPException(status_code=400, detail="Invalid JSON body")
 
-    # 所有事件都存入数据库，但只有 library.new 事件设置状态
+    event_type = payload.get("Event")
     if event_type:
-        # logger.info(f"📥 收到 Emby Webhook 事件: {event_type}")
-
-        # 根据事件类型决定是否设置状态
-        event_status = None  # 默认不设置状态
-
-        # 只有 library.new 事件设置状态
         if event_type == EVENT_TYPE_LIBRARY_NEW:
-            event_status = "pending_completion"
             logger.info("🆕 收到新媒体入库通知")
-
-        # 处理网页端播放警告
-        if event_type == EVENT_TYPE_PLAYBACK_START:
-            await _process_playback_start(payload)
-
-        # 存入数据库
-        async with sessionmaker() as session:
-            # library.new 事件使用专门的表
-            if event_type == EVENT_TYPE_LIBRARY_NEW:
-                notification = LibraryNewNotificationModel(
-                    title=event_title,
-                    type=event_type,
-                    status=event_status,
-                    item_id=item_id,
-                    item_name=item_name,
-                    item_type=item_type,
-                    series_id=series_id,
-                    series_name=series_name,
-                    season_number=season_number,
-                    episode_number=episode_number,
-                    payload=payload
-                )
-            else:
-                # 其他事件仍使用原来的表
-                notification = NotificationModel(
-                    title=event_title,
-                    type=event_type,
-                    status=event_status,  # library.new 事件有状态，其他事件状态为 None
-                    item_id=item_id,
-                    item_name=item_name,
-                    item_type=item_type,
-                    series_id=series_id,
-                    series_name=series_name,
-                    season_number=season_number,
-                    episode_number=episode_number,
-                    payload=payload
-                )
-            session.add(notification)
-            await session.commit()
-            await session.refresh(notification)
-
-            # 记录入库日志
-            logger.info(f"💾 通知入库, 标题: {event_title}, 事件类型: {event_type}, 状态: {event_status}")
-
-        # 针对 library.new 事件的特殊处理
-        if event_type == EVENT_TYPE_LIBRARY_NEW and not item_id:
-            logger.warning("⚠️ Webhook 载荷中缺少 Item.Id")
+            if not (payload.get("Item") or {}).get("Id"):
+                logger.warning("⚠️ Webhook 载荷中缺少 Item.Id")
+        # 入库与播放检测均由后台队列处理，这里只负责暂存后立即返回
+        queue = get_webhook_queue()
+        if not queue.running:
+            await queue.start()
+        await queue.submit(payload)
     else:
         logger.warning("⚠️ Webhook 载荷中缺少事件类型")
 
-    format_json_pretty(payload)
-    # logger.debug("📥 Emby Webhook 详细载荷:\n{}", pretty)
-
     return {
         "status": "ok",
         "x_emby_event": x_emby_event,
@@ -484,6 +350,18 @@ async def handle_emby_webhook(
     }
 
 
+def get_webhook_queue() -> EmbyWebhookQueue:
+    """返回以播放检测为回调的共享 Webhook 入库队列。"""
+    return get_emby_webhook_queue(session_check=_process_session_checks)
+
+
+async def _process_session_checks(payload: dict[str, Any]) -> None:
+    """后台检测协程入口：违规客户端检测与网页端播放检测"""
+    await _process_restricted_client_check(payload)
+    if payload.get("Event") == EVENT_TYPE_PLAYBACK_START:
+        await _process_playback_start(payload)
+
+
 async def _process_playback_start(payload: dict[str, Any]) -> None:
     """处理播放开始事件，检测网页端播放并警告"""
     session_info = payload.get("Session", {})
@@ -500,17 +378,15 @@ async def _process_playback_start(payload: dict[str, Any]) -> None:
 
     logger.info(f"🔍 检测到用户 {user_id} 使用网页端播放 (Client: {client}, Device: {device_name})")
 
-    async with sessionmaker() as session:
-        if await _is_user_in_whitelist(session, str(user_id)):
-            logger.info(f"✅ 用户 {user_id} 在白名单中，跳过网页端播放警告")
-            return
+    if await get_playback_policy().is_whitelisted(str(user_id)):
+        logger.info(f"✅ 用户 {user_id} 在白名单中，跳过网页端播放警告")
+        return
 
-        await _handle_web_playback_warning(
-            session=session,
-            payload=payload,
-            user_id=str(user_id),
-            session_info=session_info,
-        )
+    await _handle_web_playback_warning(
+        payload=payload,
+        user_id=str(user_id),
+        session_info=session_info,
+    )
 
 
 def _get_warning_message(count: int) -> dict[str, str]:
@@ -546,40 +422,13 @@ def _get_warning_message(count: int) -> dict[str, str]:
     }
 
 
-def format_json_pretty(data: Any) -> str:
-    """将对象美化为 JSON 字符串
-
-    功能说明：
-    - 优先使用 `orjson` 进行缩进美化并保持非 ASCII 字符
-    - 兼容回退到标准库 `json.dumps`，`ensure_ascii=False` 防止中文被转义
-
-    输入参数：
-    - data: 任意可序列化对象（通常为 dict / list）
-
-    返回值：
-    - str: 缩进美化后的 JSON 字符串
-
-    依赖安装方式：
-    - `pip install orjson`（已在项目依赖中声明）
-    """
-    if orjson is not None:
-        try:
-            return orjson.dumps(data, option=orjson.OPT_INDENT_2).decode("utf-8")
-        except TypeError:
-            pass
-    try:
-        return json.dumps(data, ensure_ascii=False, indent=2)
-    except (TypeError, ValueError):
-        return json.dumps({"unserializable": str(type(data))}, ensure_ascii=False)
-
-
 async def _process_restricted_client_check(payload: dict[str, Any]) -> None:
     """处理非官方客户端检测（网易/爆米花）"""
     session_info = payload.get("Session", {})
     client = session_info.get("Client", "")
     device_name = session_info.get("DeviceName", "")
 
-    if not _is_restricted_client(client, device_name):
+    if not get_playback_policy().is_restricted_client(client, device_name):
         return
 
     user_info = payload.get("User", {})
@@ -589,17 +438,15 @@ async def _process_restricted_client_check(payload: dict[str, Any]) -> None:
 
     logger.info(f"🔍 检测到用户 {user_id} 使用违规客户端 (Client: {client}, Device: {device_name})")
 
-    async with sessionmaker() as session:
-        if await _is_user_in_whitelist(session, str(user_id)):
-            logger.info(f"✅ 用户 {user_id} 在白名单中，跳过违规客户端警告")
-            return
-        await _handle_restricted_client_warning(
-            session=session,
-            payload=payload,
-            user_id=str(user_id),
-            client=client,
-            device_name=device_name,
-        )
+    if await get_playback_policy().is_whitelisted(str(user_id)):
+        logger.info(f"✅ 用户 {user_id} 在白名单中，跳过违规客户端警告")
+        return
+    await _handle_restricted_client_warning(
+        payload=payload,
+        user_id=str(user_id),
+        client=client,
+        device_name=device_name,
+    )
 
 
 def _get_restricted_client_warning_text(count: int) -> str:
@@ -75,3 +75,6 @@ KEY_EMBY_WHITELIST_USER_IDS = "emby.whitelist.user_ids"
 
 # Telegram 白名单（Telegram 用户ID）
 KEY_TG_WHITELIST_USER_IDS = "tg.whitelist.user.ids"
+
+# 限流策略（按命令 / 回调前缀覆盖默认令牌桶参数）
+KEY_THROTTLE_POLICIES = "throttle.policies"
@@ -100,6 +100,9 @@ DEFAULT_CONFIGS: dict[str, tuple[Any, ConfigType]] = {
     # Emby 配置
     KEY_EMBY_WHITELIST_USER_IDS: (["52588e7dbcbe4ea7a575dfe86a7f4a28", "945e1aa74d964da183b3e6a0f0075d6f"], ConfigType.LIST),
     KEY_TG_WHITELIST_USER_IDS: ([], ConfigType.LIST),
+
+    # 限流策略
+    KEY_THROTTLE_POLICIES: ({}, ConfigType.DICT),
 }
 
 # 用户功能开关映射 - 用于用户功能管理
@@ -41,7 +41,11 @@ class BotSettings(EnvBaseSettings):
 
     BOT_TOKEN: str = Field(..., description="Telegram Bot Token")
     SUPPORT_URL: str | None = None
-    RATE_LIMIT: float = Field(default=0.5, description="限流配置，每秒请求数")
+    RATE_LIMIT: float = Field(default=0.5, gt=0, description="同一用户两次请求的平均最小间隔（秒），令牌桶按此速度补充")
+    THROTTLE_BURST: int = Field(default=3, ge=1, description="同一用户可连续发出的请求数（令牌桶容量）")
+    THROTTLE_CHAT_RATE: float = Field(default=10.0, gt=0, description="同一群组每秒允许的请求数")
+    THROTTLE_CHAT_BURST: int = Field(default=30, ge=1, description="同一群组可连续发出的请求数（令牌桶容量）")
+    THROTTLE_MAX_BUCKETS: int = Field(default=50_000, ge=100, description="内存中最多保留的令牌桶数，超出按最久未用淘汰")
     DEBUG: bool = False
     OWNER_ID: int = Field(..., description="所有者用户ID（唯一，必填）")
     ADMIN_IDS: str = Field(default="", description="管理员ID列表（逗号分隔）")
@@ -58,9 +62,41 @@ class BotSettings(EnvBaseSettings):
     XAI_API_KEY: str | None = Field(default=None, description="xAI API 密钥")
     XAI_API_BASE: str = Field(default="https://api.x.ai/v1/responses", description="xAI Responses API 地址")
     XAI_MODEL: str = Field(default="grok-4.20-0309-non-reasoning", description="xAI 翻译模型")
+    EMBY_METADATA_HTTP_CACHE_MODE: str = Field(
+        default="default",
+        description="元数据来源页面缓存模式: default / off / record / replay",
+    )
+    EMBY_METADATA_HTTP_CACHE_MAX_MB: int = Field(default=256, description="元数据来源页面磁盘缓存上限（MB）")
+    EMBY_METADATA_IMAGE_CACHE_MAX_MB: int = Field(default=512, description="元数据工作台图片代理磁盘缓存上限（MB）")
+    EMBY_METADATA_HTML_BACKENDS: str = Field(
+        default="",
+        description="元数据解析器 HTML 后端，逗号分隔，例如 default=lxml,ko-shop=html.parser; 为空时优先使用 lxml",
+    )
+    EMBY_WEBHOOK_WORKERS: int = Field(default=2, ge=1, description="Emby Webhook 事件批量入库协程数")
+    EMBY_WEBHOOK_BATCH_SIZE: int = Field(default=200, ge=1, description="Emby Webhook 事件单次批量入库的最大条数")
+    EMBY_WEBHOOK_COALESCE_SECONDS: int = Field(
+        default=60,
+        ge=0,
+        description="同一作品的 library.new 事件合并窗口（秒），0 表示不等待、仅按批合并",
+    )
     EMBY_SYNC_TIME: str = Field(default="00:00", description="每日定时同步 Emby 数据的时间 (HH:MM)")
+    RETENTION_TIME: str = Field(default="04:30", description="每日执行通知/审计表瘦身与归档的时间 (HH:MM)")
+    RETENTION_BATCH_SIZE: int = Field(default=500, ge=1, description="数据保留任务单批处理的最大行数")
     NOTIFICATION_CHANNEL_ID: str | None = Field(default=None, description="通知频道ID列表，逗号分隔，支持Username(@channel)或数字ID")
     OWNER_MSG_GROUP: int | str | None = Field(default=None, description="管理员通知群组ID")
+    UPDATE_MODE: str = Field(default="polling", description="接收 Telegram 更新的方式: polling (长轮询) 或 webhook")
+    WEBHOOK_BASE_URL: str | None = Field(default=None, description="Telegram 可访问的公网地址, 例如 https://bot.example.com")
+    WEBHOOK_PATH: str = Field(default="/telegram/webhook", description="Webhook 接收路径")
+    WEBHOOK_SECRET: str | None = Field(default=None, description="Webhook 密钥 (secret_token)，为空时每次启动随机生成")
+    WEBHOOK_HOST: str = Field(default="0.0.0.0", description="Webhook 服务监听地址")  # noqa: S104
+    WEBHOOK_PORT: int = Field(default=8080, description="Webhook 服务监听端口")
+    UPDATE_WORKERS: int = Field(default=8, ge=1, description="每个进程内同时处理的更新数上限，同一会话的更新始终按序逐个处理")
+    UPDATE_QUEUE_SIZE: int = Field(default=1000, ge=1, description="每个进程内更新队列总容量，Webhook 模式下队列满时由 Telegram 重试")
+    UPDATE_PROCESSES: int = Field(
+        default=1,
+        ge=1,
+        description="处理更新的工作进程数，大于 1 时主进程只接收更新并按会话哈希分发给工作进程",
+    )
 
     @field_validator("BOT_TOKEN")
     @classmethod
@@ -70,6 +106,24 @@ class BotSettings(EnvBaseSettings):
             raise ValueError(msg)
         return v
 
+    @field_validator("UPDATE_MODE")
+    @classmethod
+    def validate_update_mode(cls, v: str) -> str:
+        value = v.strip().lower()
+        if value not in {"polling", "webhook"}:
+            msg = "UPDATE_MODE 只能是 polling 或 webhook"
+            raise ValueError(msg)
+        return value
+
+    @field_validator("WEBHOOK_PATH")
+    @classmethod
+    def validate_webhook_path(cls, v: str) -> str:
+        return "/" + v.strip().strip("/")
+
+    def get_webhook_url(self) -> str:
+        """返回注册给 Telegram 的完整 Webhook 地址。"""
+        return f"{(self.WEBHOOK_BASE_URL or '').rstrip('/')}{self.WEBHOOK_PATH}"
+
     @field_validator("ADMIN_IDS")
     @classmethod
     def validate_admin_ids(cls, v: str) -> str:
@@ -162,6 +216,27 @@ class BotSettings(EnvBaseSettings):
             raise ValueError(msg)
         return s.rstrip("/")
 
+    @field_validator("EMBY_METADATA_HTTP_CACHE_MODE")
+    @classmethod
+    def validate_emby_metadata_http_cache_mode(cls, v: str) -> str:
+        """校验元数据页面缓存模式。"""
+        value = v.strip().lower() or "default"
+        if value not in {"default", "off", "record", "replay"}:
+            msg = "EMBY_METADATA_HTTP_CACHE_MODE 只能是 default / off / record / replay"
+            raise ValueError(msg)
+        return value
+
+    @field_validator("EMBY_METADATA_HTML_BACKENDS")
+    @classmethod
+    def validate_emby_metadata_html_backends(cls, v: str) -> str:
+        """校验元数据解析器后端配置。"""
+        for item in v.split(","):
+            backend = item.rpartition("=")[2].strip().lower()
+            if item.strip() and backend not in {"html.parser", "lxml", "html5lib"}:
+                msg = "EMBY_METADATA_HTML_BACKENDS 的后端只能是 html.parser / lxml / html5lib"
+                raise ValueError(msg)
+        return v.strip()
+
     def get_emby_base_url(self) -> str | None:
         """获取 Emby 基础地址。
 
@@ -325,6 +400,14 @@ class DBSettings(EnvBaseSettings):
     DB_MAX_OVERFLOW: int = 20
     DB_POOL_TIMEOUT: int = 30
     DB_ECHO: bool = False
+    DB_SLOW_QUERY_MS: int = Field(default=200, ge=1, description="单条 SQL 耗时超过该值（毫秒）记为慢查询")
+    DB_N_PLUS_ONE_THRESHOLD: int = Field(
+        default=5,
+        ge=2,
+        description="同一次更新/请求中相同语句执行次数达到该值时记为 N+1 查询",
+    )
+    FSM_STORAGE: str = Field(default="database", description="FSM 状态存储: database (持久化到数据库) 或 memory")
+    FSM_STATE_TTL_HOURS: int = Field(default=72, ge=1, description="FSM 状态超过该时长未更新即视为放弃并清理（小时）")
 
     @field_validator("DB_PORT")
     @classmethod
@@ -334,6 +417,15 @@ class DBSettings(EnvBaseSettings):
             raise ValueError(msg)
         return v
 
+    @field_validator("FSM_STORAGE")
+    @classmethod
+    def validate_fsm_storage(cls, v: str) -> str:
+        value = v.strip().lower()
+        if value not in {"database", "memory"}:
+            msg = "FSM_STORAGE 只能是 database 或 memory"
+            raise ValueError(msg)
+        return value
+
     @property
     def database_url(self) -> str:
         password = f":{self.DB_PASS}" if self.DB_PASS else ""
@@ -360,6 +452,17 @@ class APIMixin(EnvBaseSettings):
 
     API_DEBUG: bool = True
 
+    METRICS_TOKEN: str | None = Field(
+        default=None,
+        description="访问 /metrics 需要的 Bearer 令牌；为空时不校验",
+    )
+
+    DASHBOARD_REFRESH_SECONDS: int = Field(
+        default=60,
+        ge=5,
+        description="仪表板统计快照的刷新间隔（秒）",
+    )
+
     API_ALLOWED_ORIGINS_RAW: str | list[str] | None = Field(
         default_factory=lambda: [
             "http://localhost:3000",
@@ -401,6 +504,9 @@ class Settings(BotSettings, DBSettings, APIMixin):
             raise ValueError(msg)
         # 强制要求 OWNER_ID 存在或可回退
         _ = self.get_owner_id()
+        if self.UPDATE_MODE == "webhook" and not self.WEBHOOK_BASE_URL:
+            msg = "UPDATE_MODE=webhook 时必须配置 WEBHOOK_BASE_URL"
+            raise ValueError(msg)
         return self
 
     @property
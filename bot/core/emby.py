@@ -15,7 +15,8 @@ class EmbyClient:
             headers={
                 "X-Emby-Token": api_key,
             },
-            base_path="/emby"
+            base_path="/emby",
+            service="emby",
         )
 
     async def close(self) -> None:
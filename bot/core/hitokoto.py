@@ -10,7 +10,8 @@ def init_hitokoto_client() -> None:
 
     if _hitokoto_client is None:
         _hitokoto_client = HttpClient(
-            "https://v1.hitokoto.cn"
+            "https://v1.hitokoto.cn",
+            service="hitokoto",
         )
 
 
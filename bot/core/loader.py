@@ -4,12 +4,15 @@ from aiogram.enums import ParseMode
 from aiogram.fsm.storage.memory import MemoryStorage
 
 from bot.core.config import settings
+from bot.database.fsm_storage import DatabaseStorage
+from bot.utils.metrics import TelegramRequestMetricsMiddleware
 
 token = settings.BOT_TOKEN
 
 bot = Bot(token=token, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+bot.session.middleware(TelegramRequestMetricsMiddleware())
 
-storage = MemoryStorage()
+storage = DatabaseStorage() if settings.FSM_STORAGE == "database" else MemoryStorage()
 
 dp = Dispatcher(storage=storage)
 
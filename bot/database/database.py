@@ -1,9 +1,11 @@
 from __future__ import annotations
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any
 
 from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 
 from bot.core.config import settings
+from bot.database.query_tracker import install_query_hooks
+from bot.utils.metrics import registry
 
 if TYPE_CHECKING:
     from sqlalchemy.engine.url import URL
@@ -19,13 +21,29 @@ def get_engine(url: URL | str = settings.database_url, echo: bool = False) -> As
     Returns:
         AsyncEngine: SQLAlchemy 异步数据库引擎实例。
     """
-    return create_async_engine(
+    engine = create_async_engine(
         url=url,
         echo=echo,
         pool_size=settings.DB_POOL_SIZE,
         max_overflow=settings.DB_MAX_OVERFLOW,
         pool_pre_ping=True,
     )
+    # 统计每条语句并归属到当前更新/请求，见 bot/database/query_tracker.py
+    install_query_hooks(engine.sync_engine)
+    return engine
+
+
+def pool_usage(engine: AsyncEngine) -> list[tuple[dict[str, Any], float]]:
+    """返回连接池的容量、已借出、空闲与溢出连接数，供指标采集。"""
+    pool: Any = engine.sync_engine.pool
+    if not hasattr(pool, "checkedout"):
+        return []
+    return [
+        ({"state": "size"}, float(pool.size())),
+        ({"state": "checked_out"}, float(pool.checkedout())),
+        ({"state": "checked_in"}, float(pool.checkedin())),
+        ({"state": "overflow"}, float(max(pool.overflow(), 0))),
+    ]
 
 
 def get_sessionmaker(engine: AsyncEngine) -> async_sessionmaker[AsyncSession]:
@@ -47,3 +65,4 @@ def get_sessionmaker(engine: AsyncEngine) -> async_sessionmaker[AsyncSession]:
 db_url = settings.database_url
 engine = get_engine(url=db_url, echo=settings.DB_ECHO)
 sessionmaker = get_sessionmaker(engine)
+registry.gauge("db_pool_connections", "数据库连接池连接数", ("state",), lambda: pool_usage(engine))
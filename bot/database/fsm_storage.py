@@ -0,0 +1,319 @@
+"""基于数据库的 aiogram FSM 存储。
+
+:class:`DatabaseStorage` 把每个 ``StorageKey`` 的状态与数据保存在 ``fsm_states``
+表中，重启不丢失，多个机器人进程可共享：
+
+- 读：先查待写缓冲，再查进程内 ``TTLCache``，都未命中才查库；不存在的键
+  也会被缓存，避免每条更新都为状态过滤器查一次库；
+- 写：立即更新缓存（后续读马上可见），同时记入待写缓冲；后台协程每
+  ``flush_interval`` 秒或缓冲达到 ``batch_size`` 时批量 upsert，同一个键的多次
+  写入只落库最后一次；状态与数据都清空的键直接删除；
+- 清理：超过 ``FSM_STATE_TTL_HOURS`` 未更新的状态视为放弃，读取时按空处理，
+  后台每小时批量删除。
+
+数据以 JSON 保存，``set_data`` 时立即序列化：含有无法序列化的值或非字符串的
+字典键时直接抛出 ``TypeError``，而不是悄悄转成字符串、在缓存过期或重启后读出
+不同的类型。元组会以列表读回。
+
+缓存只在本进程内有效，多进程部署时应保证同一会话的更新由同一进程处理
+（或容忍最多 ``cache_ttl`` 秒的陈旧读）。:meth:`DatabaseStorage.close` 会写入
+剩余的缓冲。
+"""
+
+from __future__ import annotations
+import asyncio
+import contextlib
+import json
+import time
+from copy import copy
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import TYPE_CHECKING, Any
+
+from aiogram.exceptions import DataNotDictLikeError
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from cachetools import TTLCache
+from loguru import logger
+from sqlalchemy import delete, select
+from sqlalchemy.dialects import mysql, sqlite
+from sqlalchemy.exc import SQLAlchemyError
+
+from bot.core.config import settings
+from bot.database.database import sessionmaker
+from bot.database.models.fsm_state import FsmStateModel
+from bot.utils.datetime import now
+from bot.utils.metrics import record_cache
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping
+
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+FSM_CACHE_SIZE = 10_000
+FSM_CACHE_TTL = 600
+FSM_BATCH_SIZE = 200
+FSM_FLUSH_INTERVAL = 0.5
+FSM_CLEANUP_INTERVAL = 3600
+_CLEANUP_BATCH = 1000
+_UPSERT_COLUMNS = ("bot_id", "chat_id", "user_id", "state", "data", "updated_at")
+
+
+@dataclass(slots=True)
+class _Record:
+    state: str | None = None
+    data: dict[str, Any] = field(default_factory=dict)
+    # data 的 JSON 文本，空数据为 None
+    encoded: str | None = None
+
+    def is_empty(self) -> bool:
+        return self.state is None and not self.data
+
+
+def _check_keys(value: Any) -> None:
+    # json.dumps 会把非字符串键悄悄转成字符串，读回后类型不同
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if not isinstance(key, str):
+                msg = f"FSM 数据的字典键必须是字符串: {key!r}"
+                raise TypeError(msg)
+            _check_keys(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            _check_keys(item)
+
+
+def encode_data(data: dict[str, Any]) -> str | None:
+    """把 FSM 数据编码为 JSON；含有无法序列化的值或非字符串字典键时抛出 ``TypeError``。"""
+    if not data:
+        return None
+    _check_keys(data)
+    try:
+        return json.dumps(data, ensure_ascii=False)
+    except (TypeError, ValueError) as error:
+        msg = f"FSM 数据必须可以序列化为 JSON: {error}"
+        raise TypeError(msg) from error
+
+
+def serialize_key(key: StorageKey) -> str:
+    """把 ``StorageKey`` 编码为表主键。"""
+    parts = (
+        key.bot_id,
+        key.chat_id,
+        key.user_id,
+        key.thread_id if key.thread_id is not None else "",
+        key.business_connection_id or "",
+        key.destiny,
+    )
+    return ":".join(str(part) for part in parts)
+
+
+def _upsert_statement(dialect: str) -> Any:
+    if dialect == "sqlite":
+        stmt = sqlite.insert(FsmStateModel)
+        return stmt.on_conflict_do_update(
+            index_elements=["storage_key"],
+            set_={column: stmt.excluded[column] for column in _UPSERT_COLUMNS},
+        )
+    stmt = mysql.insert(FsmStateModel)
+    return stmt.on_duplicate_key_update({column: stmt.inserted[column] for column in _UPSERT_COLUMNS})
+
+
+class DatabaseStorage(BaseStorage):
+    """写穿缓存 + 批量落库的数据库 FSM 存储。"""
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession] = sessionmaker,
+        *,
+        cache_size: int = FSM_CACHE_SIZE,
+        cache_ttl: float = FSM_CACHE_TTL,
+        batch_size: int = FSM_BATCH_SIZE,
+        flush_interval: float = FSM_FLUSH_INTERVAL,
+        state_ttl: timedelta | None = None,
+    ) -> None:
+        self._session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.state_ttl = state_ttl or timedelta(hours=settings.FSM_STATE_TTL_HOURS)
+        self._cache: TTLCache[str, _Record] = TTLCache(maxsize=cache_size, ttl=cache_ttl)
+        self._pending: dict[str, tuple[StorageKey, _Record]] = {}
+        self._wakeup: asyncio.Event | None = None
+        self._flush_lock: asyncio.Lock | None = None
+        self._task: asyncio.Task[None] | None = None
+
+    # ==================== BaseStorage 接口 ====================
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        current = await self._load(key)
+        name = state.state if isinstance(state, State) else state
+        self._write(key, _Record(state=name, data=current.data, encoded=current.encoded))
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        return (await self._load(key)).state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        if not isinstance(data, dict):
+            msg = f"Data must be a dict or dict-like object, got {type(data).__name__}"
+            raise DataNotDictLikeError(msg)
+        encoded = encode_data(data)
+        current = await self._load(key)
+        self._write(key, _Record(state=current.state, data=data.copy(), encoded=encoded))
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        return (await self._load(key)).data.copy()
+
+    async def get_value(self, storage_key: StorageKey, dict_key: str, default: Any | None = None) -> Any | None:
+        return copy((await self._load(storage_key)).data.get(dict_key, default))
+
+    async def close(self) -> None:
+        """停止后台协程并写入剩余缓冲，可重复调用。"""
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        try:
+            await self.flush()
+        except SQLAlchemyError as error:
+            logger.error(f"❌ 关闭时写入 FSM 状态失败，丢弃 {len(self._pending)} 个: {error}")
+
+    # ==================== 缓存与缓冲 ====================
+
+    def pending(self) -> int:
+        return len(self._pending)
+
+    async def _load(self, key: StorageKey) -> _Record:
+        self._ensure_started()
+        name = serialize_key(key)
+        entry = self._pending.get(name)
+        if entry is not None:
+            return entry[1]
+        record = self._cache.get(name)
+        record_cache("fsm_storage", hit=record is not None)
+        if record is not None:
+            return record
+        record = await self._fetch(name)
+        # 查库期间可能已有新的写入，以新写入为准
+        entry = self._pending.get(name)
+        if entry is not None:
+            return entry[1]
+        return self._cache.setdefault(name, record)
+
+    async def _fetch(self, name: str) -> _Record:
+        async with self._session_factory() as session:
+            result = await session.execute(
+                select(FsmStateModel.state, FsmStateModel.data, FsmStateModel.updated_at).where(
+                    FsmStateModel.storage_key == name
+                )
+            )
+            row = result.one_or_none()
+        if row is None or row.updated_at < now() - self.state_ttl:
+            return _Record()
+        try:
+            data = json.loads(row.data) if row.data else {}
+        except ValueError:
+            logger.warning(f"⚠️ FSM 数据无法解析，按空数据处理: {name}")
+            data = {}
+        if not isinstance(data, dict):
+            data = {}
+        return _Record(state=row.state, data=data, encoded=row.data if data else None)
+
+    def _write(self, key: StorageKey, record: _Record) -> None:
+        name = serialize_key(key)
+        self._cache[name] = record
+        self._pending[name] = (key, record)
+        self._ensure_started()
+        if len(self._pending) >= self.batch_size and self._wakeup is not None:
+            self._wakeup.set()
+
+    def _ensure_started(self) -> None:
+        if self._task is not None and not self._task.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task = loop.create_task(self._run(), name="fsm_storage_flush")
+
+    async def _run(self) -> None:
+        assert self._wakeup is not None
+        next_cleanup = time.monotonic()
+        while True:
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            self._wakeup.clear()
+            try:
+                await self.flush()
+                if time.monotonic() >= next_cleanup:
+                    next_cleanup = time.monotonic() + FSM_CLEANUP_INTERVAL
+                    await self.cleanup()
+            except SQLAlchemyError as error:
+                logger.error(f"❌ FSM 状态写入失败，稍后重试: {error}")
+
+    # ==================== 落库与清理 ====================
+
+    async def flush(self) -> int:
+        """把待写缓冲分批写入数据库，返回写入的键数；失败的批次在未被新写入覆盖时放回。"""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        written = 0
+        async with self._flush_lock:
+            while self._pending:
+                names = list(self._pending)[: self.batch_size]
+                batch = {name: self._pending.pop(name) for name in names}
+                try:
+                    await self._write_batch(batch)
+                except SQLAlchemyError:
+                    for name, entry in batch.items():
+                        self._pending.setdefault(name, entry)
+                    raise
+                written += len(batch)
+        return written
+
+    async def _write_batch(self, batch: dict[str, tuple[StorageKey, _Record]]) -> None:
+        timestamp = now()
+        removed = [name for name, (_, record) in batch.items() if record.is_empty()]
+        rows = [
+            {
+                "storage_key": name,
+                "bot_id": key.bot_id,
+                "chat_id": key.chat_id,
+                "user_id": key.user_id,
+                "state": record.state,
+                "data": record.encoded,
+                "updated_at": timestamp,
+            }
+            for name, (key, record) in batch.items()
+            if not record.is_empty()
+        ]
+        async with self._session_factory() as session:
+            if removed:
+                await session.execute(delete(FsmStateModel).where(FsmStateModel.storage_key.in_(removed)))
+            if rows:
+                await session.execute(_upsert_statement(session.bind.dialect.name), rows)
+            await session.commit()
+
+    async def cleanup(self) -> int:
+        """删除超过 ``state_ttl`` 未更新的状态，返回删除的行数。"""
+        cutoff = now() - self.state_ttl
+        removed = 0
+        async with self._session_factory() as session:
+            while True:
+                result = await session.execute(
+                    select(FsmStateModel.storage_key).where(FsmStateModel.updated_at < cutoff).limit(_CLEANUP_BATCH)
+                )
+                names = list(result.scalars().all())
+                if not names:
+                    break
+                await session.execute(delete(FsmStateModel).where(FsmStateModel.storage_key.in_(names)))
+                await session.commit()
+                for name in names:
+                    if name not in self._pending:
+                        self._cache.pop(name, None)
+                removed += len(names)
+        if removed:
+            logger.info(f"🧹 已清理 {removed} 个过期的 FSM 状态")
+        return removed
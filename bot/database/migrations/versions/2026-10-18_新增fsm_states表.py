@@ -0,0 +1,38 @@
+"""新增 fsm_states 表，持久化 FSM 状态
+
+Revision ID: add_fsm_states
+Revises: add_user_search_terms
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_fsm_states'
+down_revision = 'add_user_search_terms'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """创建 fsm_states 表及索引"""
+    op.create_table('fsm_states',
+        sa.Column('storage_key', sa.String(length=255), nullable=False, comment='序列化后的 StorageKey'),
+        sa.Column('bot_id', sa.BigInteger(), nullable=False, comment='机器人 ID'),
+        sa.Column('chat_id', sa.BigInteger(), nullable=False, comment='会话 ID'),
+        sa.Column('user_id', sa.BigInteger(), nullable=False, comment='用户 ID'),
+        sa.Column('state', sa.String(length=255), nullable=True, comment='当前状态名'),
+        sa.Column('data', sa.Text(), nullable=True, comment='JSON 序列化的状态数据'),
+        sa.Column('updated_at', sa.DateTime(), nullable=False, comment='最后写入时间'),
+        sa.PrimaryKeyConstraint('storage_key'),
+    )
+    op.create_index('idx_fsm_states_chat_user', 'fsm_states', ['chat_id', 'user_id'])
+    op.create_index('idx_fsm_states_updated', 'fsm_states', ['updated_at'])
+
+
+def downgrade() -> None:
+    """删除 fsm_states 表"""
+    op.drop_index('idx_fsm_states_updated', table_name='fsm_states')
+    op.drop_index('idx_fsm_states_chat_user', table_name='fsm_states')
+    op.drop_table('fsm_states')
@@ -0,0 +1,81 @@
+"""新增 user_search_terms 用户搜索词条表并回填现有用户
+
+Revision ID: add_user_search_terms
+Revises: rename_library_new_target_user_id
+Create Date: 2026-10-18
+
+"""
+import re
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+# revision identifiers, used by Alembic.
+revision = 'add_user_search_terms'
+down_revision = 'rename_library_new_target_user_id'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+TERM_LENGTH = 64
+_WORD_SPLIT = re.compile(r"[\s_\-.]+")
+
+
+def name_terms(first_name, last_name, username):
+    """生成一个用户的全部搜索词条（本迁移写入时的规则，与应用代码解耦）"""
+    names = [name for name in (username, first_name, last_name) if name]
+    full_name = " ".join(name for name in (first_name, last_name) if name)
+    if full_name:
+        names.append(full_name)
+    terms = set()
+    for name in names:
+        normalized = name.strip().lstrip("@").lower()
+        terms.add(normalized)
+        terms.update(_WORD_SPLIT.split(normalized))
+    return {term[:TERM_LENGTH] for term in terms if term}
+
+
+def upgrade() -> None:
+    """创建词条表，并按主键分批为现有用户生成词条"""
+    terms_table = op.create_table('user_search_terms',
+        sa.Column(
+            'term',
+            sa.String(length=TERM_LENGTH).with_variant(mysql.VARCHAR(TERM_LENGTH, collation='utf8mb4_bin'), 'mysql'),
+            nullable=False,
+            comment='小写名称词条',
+        ),
+        sa.Column('user_id', sa.BigInteger(), nullable=False, comment='用户 ID (逻辑关联 users.id)'),
+        sa.PrimaryKeyConstraint('term', 'user_id'),
+    )
+    op.create_index('idx_user_search_terms_user', 'user_search_terms', ['user_id'])
+
+    users = sa.table('users',
+        sa.column('id', sa.BigInteger),
+        sa.column('first_name', sa.String),
+        sa.column('last_name', sa.String),
+        sa.column('username', sa.String),
+    )
+    bind = op.get_bind()
+    last_id = None
+    while True:
+        query = sa.select(users.c.id, users.c.first_name, users.c.last_name, users.c.username)
+        if last_id is not None:
+            query = query.where(users.c.id > last_id)
+        rows = bind.execute(query.order_by(users.c.id).limit(BATCH_SIZE)).all()
+        if not rows:
+            break
+        terms = [
+            {'term': term, 'user_id': user_id}
+            for user_id, first_name, last_name, username in rows
+            for term in name_terms(first_name, last_name, username)
+        ]
+        if terms:
+            op.bulk_insert(terms_table, terms)
+        last_id = rows[-1][0]
+
+
+def downgrade() -> None:
+    """回滚：删除词条表"""
+    op.drop_index('idx_user_search_terms_user', table_name='user_search_terms')
+    op.drop_table('user_search_terms')
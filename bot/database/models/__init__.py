@@ -9,6 +9,7 @@ from .emby_device_history import EmbyDeviceHistoryModel
 from .emby_item import EmbyItemModel
 from .emby_user import EmbyUserModel
 from .emby_user_history import EmbyUserHistoryModel
+from .fsm_state import FsmStateModel
 from .group_config import GroupConfigModel, GroupType, MessageSaveMode
 from .hitokoto import HitokotoModel
 from .library_new_notification import LibraryNewNotificationModel
@@ -23,6 +24,7 @@ from .statistics import StatisticsModel, StatisticType
 from .user import UserModel
 from .user_extend import UserExtendModel, UserRole
 from .user_history import UserHistoryModel
+from .user_search_term import UserSearchTermModel
 from .user_submission import UserSubmissionModel
 
 __all__ = [
@@ -39,6 +41,7 @@ __all__ = [
     "EmbyItemModel",
     "EmbyUserHistoryModel",
     "EmbyUserModel",
+    "FsmStateModel",
     "GroupConfigModel",
     "GroupType",
     "HitokotoModel",
@@ -64,5 +67,6 @@ __all__ = [
     "UserHistoryModel",
     "UserModel",
     "UserRole",
+    "UserSearchTermModel",
     "UserSubmissionModel",
 ]
@@ -0,0 +1,40 @@
+from __future__ import annotations
+from datetime import datetime as dt
+
+from sqlalchemy import BigInteger, Index, String, Text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from bot.database.models.base import Base
+from bot.utils.datetime import now
+
+
+class FsmStateModel(Base):
+    """FSM 状态持久化模型
+
+    功能说明:
+    - 每行保存一个 aiogram `StorageKey` 的状态与数据，供 `DatabaseStorage` 读写
+    - 状态与数据都为空时删除整行；超过 `FSM_STATE_TTL_HOURS` 未更新的行视为放弃并清理
+    - 高频写入的运行态数据，不带审计字段
+
+    字段:
+    - storage_key: 序列化后的 StorageKey (主键)
+    - bot_id / chat_id / user_id: 便于按会话排查
+    - state: 当前状态名
+    - data: JSON 序列化的状态数据
+    - updated_at: 最后写入时间
+    """
+
+    __tablename__ = "fsm_states"
+
+    storage_key: Mapped[str] = mapped_column(String(255), primary_key=True, comment="序列化后的 StorageKey")
+    bot_id: Mapped[int] = mapped_column(BigInteger, nullable=False, comment="机器人 ID")
+    chat_id: Mapped[int] = mapped_column(BigInteger, nullable=False, comment="会话 ID")
+    user_id: Mapped[int] = mapped_column(BigInteger, nullable=False, comment="用户 ID")
+    state: Mapped[str | None] = mapped_column(String(255), nullable=True, comment="当前状态名")
+    data: Mapped[str | None] = mapped_column(Text, nullable=True, comment="JSON 序列化的状态数据")
+    updated_at: Mapped[dt] = mapped_column(default=now, nullable=False, comment="最后写入时间")
+
+    __table_args__ = (
+        Index("idx_fsm_states_chat_user", "chat_id", "user_id"),
+        Index("idx_fsm_states_updated", "updated_at"),
+    )
@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+from sqlalchemy import BigInteger, Index, String
+from sqlalchemy.dialects.mysql import VARCHAR
+from sqlalchemy.orm import Mapped, mapped_column
+
+from bot.database.models.base import Base
+
+USER_SEARCH_TERM_LENGTH = 64
+# 主键比较必须与 Python 去重一致：MySQL 默认排序规则忽略大小写和重音，
+# 会把 "josé" 与 "jose"、"straße" 与 "strasse" 视为重复主键
+USER_SEARCH_TERM_COLLATION = "utf8mb4_bin"
+
+
+class UserSearchTermModel(Base):
+    """用户名称前缀搜索索引
+
+    功能说明:
+    - 每行是某个用户的一个小写名称词条（用户名、名、姓、全名及其中的单词）
+    - 以 (term, user_id) 为主键，`term LIKE 'abc%'` 走主键范围扫描
+    - 由 `upsert_user_on_interaction` 在用户名称变化时维护，属于可重建的派生数据，不带审计字段
+    - MySQL 下 term 使用二进制排序规则，按字节比较
+
+    字段:
+    - term: 小写词条
+    - user_id: 用户 ID (逻辑关联 users.id)
+    """
+
+    __tablename__ = "user_search_terms"
+
+    term: Mapped[str] = mapped_column(
+        String(USER_SEARCH_TERM_LENGTH).with_variant(
+            VARCHAR(USER_SEARCH_TERM_LENGTH, collation=USER_SEARCH_TERM_COLLATION), "mysql"
+        ),
+        primary_key=True,
+        comment="小写名称词条",
+    )
+    user_id: Mapped[int] = mapped_column(BigInteger, primary_key=True, comment="用户 ID (逻辑关联 users.id)")
+
+    __table_args__ = (Index("idx_user_search_terms_user", "user_id"),)
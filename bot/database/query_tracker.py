@@ -0,0 +1,267 @@
+"""SQL 语句统计与 N+1 检测。
+
+:func:`install_query_hooks` 在引擎上注册游标事件，把每条语句归属到当前的
+“工作单元”——一次 aiogram 更新、一次 FastAPI 请求或一个被 :func:`tracked`
+装饰的后台任务。工作单元通过 ``ContextVar`` 传递；SQLAlchemy 异步引擎在
+greenlet 中执行同步代码时沿用调用方的上下文，因此事件回调能看到它。
+
+每个单元结束时：
+
+- 统计语句条数与总耗时，按单元名汇总到 :data:`query_report`；
+- 同一条（参数化、``IN`` 列表折叠后的）语句重复达到
+  ``DB_N_PLUS_ONE_THRESHOLD`` 次时记为 N+1；
+- 单条耗时超过 ``DB_SLOW_QUERY_MS`` 的语句记为慢查询。
+
+报告随指标快照写出，由 API 的 ``/metrics/queries`` 合并展示；测试中可用
+:func:`query_budget` 锁定某段代码的查询次数上限。
+"""
+
+from __future__ import annotations
+
+import functools
+import re
+import time
+from collections import Counter, deque
+from collections.abc import Awaitable, Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, ParamSpec, TypeVar
+
+from loguru import logger
+from sqlalchemy import event
+
+from bot.core.config import settings
+from bot.utils.metrics import registry
+
+if TYPE_CHECKING:
+    from sqlalchemy.engine import Engine
+
+P = ParamSpec("P")
+R = TypeVar("R")
+
+MAX_TRACKED_UNITS = 500
+MAX_STATEMENT_CHARS = 300
+_SLOW_QUERY_HISTORY = 50
+_START_KEY = "query_tracker_start"
+
+_IN_LIST = re.compile(r"\(\s*(?:%s|\?|:\w+)(?:\s*,\s*(?:%s|\?|:\w+))+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+DB_QUERY_SECONDS = registry.histogram("db_query_duration_seconds", "单条 SQL 语句耗时", ("operation",))
+DB_QUERIES_PER_UNIT = registry.histogram(
+    "db_queries_per_unit",
+    "每次更新/请求执行的 SQL 条数",
+    ("unit",),
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200),
+)
+
+
+def normalize_statement(statement: str) -> str:
+    """折叠空白与 ``IN (...)`` 参数列表，使同形语句得到相同的键。"""
+    return _IN_LIST.sub("(...)", _WHITESPACE.sub(" ", statement).strip())
+
+
+@dataclass(slots=True)
+class QueryUnit:
+    """一个工作单元内执行过的语句。"""
+
+    name: str
+    count: int = 0
+    seconds: float = 0.0
+    statements: Counter[str] = field(default_factory=Counter)
+    slow: list[tuple[str, float]] = field(default_factory=list)
+    # 单元结束后，从其中派生的后台任务仍持有它的上下文，这些语句不再计入
+    closed: bool = False
+
+    def repeated(self, threshold: int) -> dict[str, int]:
+        """返回重复次数达到阈值的语句。"""
+        return {statement: count for statement, count in self.statements.items() if count >= threshold}
+
+
+@dataclass(slots=True)
+class _UnitStats:
+    runs: int = 0
+    queries: int = 0
+    seconds: float = 0.0
+    max_queries: int = 0
+    slow: int = 0
+    n_plus_one: dict[str, int] = field(default_factory=dict)
+
+
+class QueryReport:
+    """按单元名汇总的查询统计与最近的慢查询。"""
+
+    def __init__(self) -> None:
+        self._units: dict[str, _UnitStats] = {}
+        self._slow: deque[dict[str, Any]] = deque(maxlen=_SLOW_QUERY_HISTORY)
+
+    def record_slow(self, unit: str, statement: str, seconds: float) -> None:
+        self._slow.append(
+            {
+                "unit": unit,
+                "statement": statement[:MAX_STATEMENT_CHARS],
+                "ms": round(seconds * 1000, 1),
+                "at": time.time(),
+            }
+        )
+
+    def record_unit(self, unit: QueryUnit, threshold: int) -> dict[str, int]:
+        """汇总一个结束的单元，返回本次新发现的 N+1 语句。"""
+        name = unit.name
+        if name not in self._units and len(self._units) >= MAX_TRACKED_UNITS:
+            name = "_other"
+        stats = self._units.setdefault(name, _UnitStats())
+        stats.runs += 1
+        stats.queries += unit.count
+        stats.seconds += unit.seconds
+        stats.max_queries = max(stats.max_queries, unit.count)
+        stats.slow += len(unit.slow)
+        fresh = {}
+        for statement, count in unit.repeated(threshold).items():
+            if statement not in stats.n_plus_one:
+                fresh[statement] = count
+            stats.n_plus_one[statement] = max(count, stats.n_plus_one.get(statement, 0))
+        return fresh
+
+    def snapshot(self, top: int = 50) -> dict[str, Any]:
+        units = sorted(self._units.items(), key=lambda item: item[1].queries, reverse=True)[:top]
+        return {
+            "units": [
+                {
+                    "unit": name,
+                    "runs": stats.runs,
+                    "avg_queries": round(stats.queries / stats.runs, 2),
+                    "max_queries": stats.max_queries,
+                    "avg_ms": round(stats.seconds / stats.runs * 1000, 2),
+                    "slow_queries": stats.slow,
+                    "n_plus_one": [
+                        {"statement": statement[:MAX_STATEMENT_CHARS], "repeats": repeats}
+                        for statement, repeats in sorted(stats.n_plus_one.items(), key=lambda item: -item[1])
+                    ],
+                }
+                for name, stats in units
+            ],
+            "slow": list(self._slow),
+        }
+
+    def reset(self) -> None:
+        self._units.clear()
+        self._slow.clear()
+
+
+query_report = QueryReport()
+_current_unit: ContextVar[QueryUnit | None] = ContextVar("query_unit", default=None)
+
+
+def current_unit() -> QueryUnit | None:
+    return _current_unit.get()
+
+
+def rename_current_unit(name: str) -> None:
+    """在知道具体处理器或路由后修正当前单元的名字。"""
+    unit = _current_unit.get()
+    if unit is not None:
+        unit.name = name
+
+
+@contextmanager
+def track_queries(name: str, *, record: bool = True) -> Iterator[QueryUnit]:
+    """开启一个工作单元；嵌套调用时复用外层单元。"""
+    outer = _current_unit.get()
+    if outer is not None:
+        yield outer
+        return
+    unit = QueryUnit(name)
+    token = _current_unit.set(unit)
+    try:
+        yield unit
+    finally:
+        _current_unit.reset(token)
+        unit.closed = True
+        if record:
+            _finish_unit(unit)
+
+
+def tracked(name: str) -> Callable[[Callable[P, Awaitable[R]]], Callable[P, Awaitable[R]]]:
+    """把协程函数的一次调用作为一个工作单元，用于定时任务等非更新/请求入口。"""
+
+    def decorator(func: Callable[P, Awaitable[R]]) -> Callable[P, Awaitable[R]]:
+        @functools.wraps(func)
+        async def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+            with track_queries(name):
+                return await func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+@contextmanager
+def query_budget(max_queries: int, name: str = "query_budget") -> Iterator[QueryUnit]:
+    """测试辅助：代码块内执行的 SQL 超过 ``max_queries`` 条时抛出 ``AssertionError``。"""
+    with track_queries(name, record=False) as unit:
+        before = unit.count
+        yield unit
+    used = unit.count - before
+    if used > max_queries:
+        details = "\n".join(f"  {count}x {statement}" for statement, count in unit.statements.most_common(10))
+        msg = f"{name} 执行了 {used} 条 SQL，超出预算 {max_queries} 条:\n{details}"
+        raise AssertionError(msg)
+
+
+def _finish_unit(unit: QueryUnit) -> None:
+    if not unit.count:
+        return
+    DB_QUERIES_PER_UNIT.observe(unit.count, unit=unit.name)
+    fresh = query_report.record_unit(unit, settings.DB_N_PLUS_ONE_THRESHOLD)
+    for statement, count in fresh.items():
+        logger.warning(f"🐢 疑似 N+1 查询: {unit.name} 中同一语句执行 {count} 次: {statement[:MAX_STATEMENT_CHARS]}")
+
+
+def _before_cursor_execute(conn: Any, *_: Any) -> None:
+    conn.info.setdefault(_START_KEY, []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn: Any, _cursor: Any, statement: str, *_: Any) -> None:
+    starts = conn.info.get(_START_KEY)
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    _record_statement(statement, elapsed)
+
+
+def _handle_error(context: Any) -> None:
+    starts = context.connection.info.get(_START_KEY) if context.connection is not None else None
+    if starts:
+        starts.pop()
+
+
+def _record_statement(statement: str, elapsed: float) -> None:
+    normalized = normalize_statement(statement)
+    DB_QUERY_SECONDS.observe(elapsed, operation=normalized.split(" ", 1)[0].upper())
+    unit = _current_unit.get()
+    if unit is not None and unit.closed:
+        unit = None
+    unit_name = unit.name if unit is not None else "(none)"
+    if unit is not None:
+        unit.count += 1
+        unit.seconds += elapsed
+        unit.statements[normalized] += 1
+    if elapsed * 1000 >= settings.DB_SLOW_QUERY_MS:
+        if unit is not None:
+            unit.slow.append((normalized, elapsed))
+        query_report.record_slow(unit_name, normalized, elapsed)
+        logger.warning(f"🐢 慢查询 {elapsed * 1000:.0f}ms ({unit_name}): {normalized[:MAX_STATEMENT_CHARS]}")
+
+
+def install_query_hooks(engine: Engine) -> None:
+    """在同步引擎（异步引擎传 ``engine.sync_engine``）上注册统计事件。"""
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+registry.section("queries", query_report.snapshot)
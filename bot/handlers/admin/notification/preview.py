@@ -121,8 +121,8 @@ async def handle_notify_preview(
     kb = get_notification_preview_pagination_keyboard(page, total_pages, limit)
     await main_msg.update_on_callback(callback, text, kb)
 
-    # 存储预览消息信息：{message_id: notification_id}
-    preview_data = {}
+    # 存储预览消息 ID，切换页面或返回时删除
+    preview_data: list[int] = []
 
     for notif, item in rows:
         msg_text, image_url = await get_notification_content(item, session)
@@ -174,8 +174,7 @@ async def handle_notify_preview(
                     reply_markup=reject_kb,
                 )
 
-            # 关联消息ID和通知ID
-            preview_data[msg.message_id] = notif.id
+            preview_data.append(msg.message_id)
 
         except Exception as e:
             error_info = (
@@ -1,27 +1,107 @@
+from typing import Any
+
 from aiogram import F, Router
-from aiogram.types import CallbackQuery
+from aiogram.types import CallbackQuery, InlineKeyboardButton, InlineKeyboardMarkup
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from bot.keyboards.inline.buttons import BACK_TO_ADMIN_PANEL_BUTTON, BACK_TO_HOME_BUTTON
+from bot.keyboards.inline.constants import STATS_CALLBACK_DATA, STATS_LABEL
+from bot.services.main_message import MainMessageService
+from bot.utils.datetime import format_datetime, now
+from bot.utils.metrics import (
+    API_REQUEST_SECONDS,
+    HANDLER_SECONDS,
+    MIDDLEWARE_SECONDS,
+    OUTBOUND_SECONDS,
+    UPDATE_SECONDS,
+    collect_snapshots,
+    summarize_cache,
+    summarize_latency,
+)
 from bot.utils.permissions import require_admin_feature, require_admin_priv
+from bot.utils.text import escape_markdown_v2
 
 router = Router(name="admin_stats")
 
+# 主消息可能是图片，说明文字上限 1024 字符
+_CAPTION_LIMIT = 1000
+_NAME_WIDTH = 26
+
+_LATENCY_SECTIONS: tuple[tuple[str, str, tuple[str, ...]], ...] = (
+    ("更新", UPDATE_SECONDS.name, ("event_type",)),
+    ("处理器", HANDLER_SECONDS.name, ("handler",)),
+    ("中间件", MIDDLEWARE_SECONDS.name, ("middleware",)),
+    ("外部调用", OUTBOUND_SECONDS.name, ("service", "endpoint")),
+    ("API 路由", API_REQUEST_SECONDS.name, ("method", "route")),
+)
+
+
+def _shorten(text: str) -> str:
+    return text if len(text) <= _NAME_WIDTH else "…" + text[-(_NAME_WIDTH - 1) :]
+
+
+def _format_snapshot(snapshot: dict[str, Any]) -> list[str]:
+    """把一个进程的快照整理为若干行纯文本摘要。"""
+    lines = [f"[{snapshot['process']}]"]
+    for title, metric_name, label_names in _LATENCY_SECTIONS:
+        rows = summarize_latency(snapshot, metric_name, top=3)
+        if not rows:
+            continue
+        lines.append(f"{title} Top{len(rows)} (次数 平均 p95)")
+        for row in rows:
+            name = " ".join(row["labels"].get(label, "") for label in label_names)
+            lines.append(f" {_shorten(name)} {row['count']} {row['avg_ms']:.0f}ms {row['p95_ms']:.0f}ms")
 
-@router.callback_query(F.data == "admin:stats")
+    pool = {
+        series["labels"]["state"]: int(series["value"])
+        for series in snapshot.get("metrics", {}).get("db_pool_connections", {}).get("series", [])
+    }
+    if pool:
+        lines.append(f"连接池 借出 {pool.get('checked_out', 0)}/{pool.get('size', 0)} 溢出 {pool.get('overflow', 0)}")
+    for cache, (total, ratio) in summarize_cache(snapshot).items():
+        lines.append(f"缓存 {_shorten(cache)} {total} 次 命中 {ratio:.0%}")
+    return lines
+
+
+def build_stats_caption(snapshots: list[dict[str, Any]]) -> str:
+    """构建管理员面板中的性能指标摘要（MarkdownV2）。"""
+    body: list[str] = []
+    for snapshot in snapshots:
+        body.extend(_format_snapshot(snapshot))
+    text = "\n".join(body) or "暂无数据"
+    if len(text) > _CAPTION_LIMIT:
+        text = text[: _CAPTION_LIMIT - 1] + "…"
+    code = text.replace("\\", "\\\\").replace("`", "\\`")
+    return (
+        f"*{escape_markdown_v2(STATS_LABEL)}*\n"
+        f"{escape_markdown_v2('统计时间: ' + format_datetime(now()))}\n"
+        f"```\n{code}\n```"
+    )
+
+
+@router.callback_query(F.data == STATS_CALLBACK_DATA)
 @require_admin_priv
 @require_admin_feature("admin.stats")
-async def open_stats_feature(callback: CallbackQuery, _session: AsyncSession) -> None:
+async def open_stats_feature(callback: CallbackQuery, session: AsyncSession, main_msg: MainMessageService) -> None:
     """打开统计数据功能
 
     功能说明:
-    - 管理员面板中的统计数据入口占位处理, 功能关闭时提示不可用
+    - 展示机器人与 API 进程的耗时、外部调用、连接池与缓存命中率摘要
+    - 完整指标可通过 API 的 /metrics 由 Prometheus 采集
 
     输入参数:
     - callback: 回调对象
-    - session: 异数据库会话
+    - session: 异步数据库会话
+    - main_msg: 主消息服务
 
     返回值:
     - None
     """
-    await callback.answer("功能建设中, 请使用 /admin_stats 命令", show_alert=True)
-
+    kb = InlineKeyboardMarkup(
+        inline_keyboard=[
+            [InlineKeyboardButton(text="🔄 刷新", callback_data=STATS_CALLBACK_DATA)],
+            [BACK_TO_ADMIN_PANEL_BUTTON, BACK_TO_HOME_BUTTON],
+        ]
+    )
+    await main_msg.update_on_callback(callback, build_stats_caption(collect_snapshots()), kb)
+    await callback.answer()
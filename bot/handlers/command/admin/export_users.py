@@ -0,0 +1,50 @@
+"""
+导出用户命令模块
+"""
+
+from aiogram import Router
+from aiogram.filters import Command, CommandObject
+from aiogram.types import Message
+from loguru import logger
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from bot.handlers.command._usage import build_usage_text
+from bot.utils.decorators import private_chat_only
+from bot.utils.permissions import require_admin_command_access, require_admin_priv
+from bot.utils.users_export import ExportInputFile, UnsupportedExportFormatError, export_users
+
+router = Router(name="command_export_users")
+
+COMMAND_META = {
+    "name": "export_users",
+    "alias": "eu",
+    "usage": "/eu [csv|xlsx] [gz]",
+    "example": {
+        "command": "/eu csv gz",
+        "explain": "导出全部用户为 gzip 压缩的 CSV 文件",
+    },
+    "desc": "导出用户数据",
+}
+
+
+@router.message(Command("export_users", "eu"))
+@private_chat_only
+@require_admin_priv
+@require_admin_command_access(COMMAND_META["name"])
+async def export_users_command(message: Message, command: CommandObject, session: AsyncSession) -> None:
+    args = (command.args or "csv").lower().split()
+    export_format = args[0]
+    compress = "gz" in args[1:]
+
+    try:
+        export = await export_users(session, export_format, compress=compress)
+    except UnsupportedExportFormatError as err:
+        await message.reply(f"{err}\n\n{build_usage_text(COMMAND_META)}", parse_mode="Markdown")
+        return
+    except SQLAlchemyError as err:
+        logger.error(f"❌ 导出用户失败: {err}")
+        await message.reply("🔴 导出用户时发生错误")
+        return
+
+    await message.answer_document(ExportInputFile(export), caption=f"✅ 已导出 {export.rows} 位用户")
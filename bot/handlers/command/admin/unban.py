@@ -115,5 +115,4 @@ async def process_unban(
     )
     results.extend(service_results)
 
-    await session.commit()
     await message.reply("\n".join(results))
@@ -7,23 +7,34 @@ from .bot_enabled import BotEnabledMiddleware
 from .database import DatabaseMiddleware
 from .logging import LoggingMiddleware
 from .main_message import MainMessageMiddleware
+from .metrics import HandlerMetricsMiddleware, TimedMiddleware, UpdateMetricsMiddleware
 from .quiz_trigger import QuizTriggerMiddleware
 from .throttling import ThrottlingMiddleware
 
 
 def register_middlewares(dp: Dispatcher) -> None:
+    # 0. 最外层记录每个更新的总耗时，其余中间件用 TimedMiddleware 包装以统计各自耗时
+    dp.update.outer_middleware(UpdateMetricsMiddleware())
+
     # 1. 首先注册相册中间件 (外层)，把多条消息合并成一条
-    dp.message.outer_middleware(AlbumMiddleware())
-    dp.message.outer_middleware(ThrottlingMiddleware())
-    dp.update.outer_middleware(LoggingMiddleware())
-    dp.update.outer_middleware(MainMessageMiddleware())
-    dp.update.outer_middleware(DatabaseMiddleware())
+    dp.message.outer_middleware(TimedMiddleware(AlbumMiddleware(), "message"))
+    # 2. 消息与回调共用一个限流器（按用户 / 群组令牌桶）
+    dp.message.outer_middleware(TimedMiddleware(ThrottlingMiddleware(), "message"))
+    dp.callback_query.outer_middleware(TimedMiddleware(ThrottlingMiddleware(), "callback_query"))
+    dp.update.outer_middleware(TimedMiddleware(LoggingMiddleware(), "update"))
+    dp.update.outer_middleware(TimedMiddleware(MainMessageMiddleware(), "update"))
+    dp.update.outer_middleware(TimedMiddleware(DatabaseMiddleware(), "update"))
+
+    dp.message.middleware(TimedMiddleware(BotEnabledMiddleware(), "message"))
+    dp.message.middleware(TimedMiddleware(AuthMiddleware(), "message"))
+    dp.message.middleware(TimedMiddleware(QuizTriggerMiddleware(), "message"))
 
-    dp.message.middleware(BotEnabledMiddleware())
-    dp.message.middleware(AuthMiddleware())
-    dp.message.middleware(QuizTriggerMiddleware())
+    dp.callback_query.middleware(TimedMiddleware(BotEnabledMiddleware(), "callback_query"))
+    dp.callback_query.middleware(TimedMiddleware(AuthMiddleware(), "callback_query"))
+    dp.callback_query.middleware(TimedMiddleware(QuizTriggerMiddleware(), "callback_query"))
+    dp.callback_query.middleware(TimedMiddleware(CallbackAnswerMiddleware(), "callback_query"))
 
-    dp.callback_query.middleware(BotEnabledMiddleware())
-    dp.callback_query.middleware(AuthMiddleware())
-    dp.callback_query.middleware(QuizTriggerMiddleware())
-    dp.callback_query.middleware(CallbackAnswerMiddleware())
+    # 最后注册的内层中间件最靠近处理器，用于按处理器统计耗时
+    for observer_name, observer in dp.observers.items():
+        if observer_name not in {"update", "error"}:
+            observer.middleware(HandlerMetricsMiddleware(observer_name))
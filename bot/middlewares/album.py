@@ -1,35 +1,102 @@
+"""相册（media group）合并中间件。
+
+同一相册的多条消息以各自的更新到达。第一条消息成为“领头”，在中间件里等待；
+后续消息只加入缓冲并终止本次链路。领头在以下任一条件满足时带着
+``data["album"]``（按 message_id 排序）进入处理器：
+
+- 静默期：最近一条到达后 ``quiet_period`` 秒内没有新消息（每条新消息都会重置）；
+- 最长等待：自第一条起已等待 ``max_wait`` 秒；
+- 数量上限：已收满 ``max_size`` 条（Telegram 相册最多 10 条）。
+
+因此延迟取决于各条消息的实际到达间隔，而不是固定的 1 秒。缓冲在领头结束时
+（包括处理器出错或被取消）一定移除，另外每次调用顺带淘汰早已超时的缓冲。
+"""
+
+from __future__ import annotations
 import asyncio
-from typing import Any
+import contextlib
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any
 
 from aiogram import BaseMiddleware
 from aiogram.types import Message, TelegramObject
 
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable
+
+ALBUM_QUIET_PERIOD = 0.3
+ALBUM_MAX_WAIT = 2.0
+ALBUM_MAX_SIZE = 10
+
+
+@dataclass(slots=True)
+class _AlbumBuffer:
+    messages: list[Message]
+    started: float
+    last_part: float
+    full: asyncio.Event = field(default_factory=asyncio.Event)
+
 
 class AlbumMiddleware(BaseMiddleware):
-    def __init__(self, latency: float = 1) -> None: # 稍微加长到0.6s，确保相册收全
-        self.latency = latency
-        self.cache: dict[str, list[Message]] = {}
+    def __init__(
+        self,
+        quiet_period: float = ALBUM_QUIET_PERIOD,
+        max_wait: float = ALBUM_MAX_WAIT,
+        max_size: int = ALBUM_MAX_SIZE,
+    ) -> None:
+        self.quiet_period = quiet_period
+        self.max_wait = max_wait
+        self.max_size = max_size
+        # 按开始时间排列，最旧的在最前，便于淘汰
+        self.cache: dict[str, _AlbumBuffer] = {}
 
     async def __call__(
         self,
-        handler,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
         event: TelegramObject,
-        data: dict[str, Any]
+        data: dict[str, Any],
     ) -> Any:
         if not isinstance(event, Message) or not event.media_group_id:
             return await handler(event, data)
 
         mid = event.media_group_id
+        now = asyncio.get_running_loop().time()
+        self._evict_stale(now)
 
-        # 如果是该相册的第一条消息
-        if mid not in self.cache:
-            self.cache[mid] = [event]
-            await asyncio.sleep(self.latency)
+        buffer = self.cache.get(mid)
+        if buffer is not None:
+            # 后续消息只加入缓冲并终止本次链路（不进入后面的 Throttling 和 Handler）
+            buffer.messages.append(event)
+            buffer.last_part = now
+            if len(buffer.messages) >= self.max_size:
+                buffer.full.set()
+            return None
 
-            # 收集完毕，准备传给 Handler
-            data["album"] = self.cache.pop(mid)
-            return await handler(event, data)
+        buffer = _AlbumBuffer(messages=[event], started=now, last_part=now)
+        self.cache[mid] = buffer
+        try:
+            await self._collect(buffer)
+        finally:
+            if self.cache.get(mid) is buffer:
+                del self.cache[mid]
+
+        data["album"] = sorted(buffer.messages, key=lambda message: message.message_id)
+        return await handler(event, data)
+
+    async def _collect(self, buffer: _AlbumBuffer) -> None:
+        loop = asyncio.get_running_loop()
+        while len(buffer.messages) < self.max_size:
+            deadline = min(buffer.last_part + self.quiet_period, buffer.started + self.max_wait)
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(buffer.full.wait(), timeout=remaining)
 
-        # 如果是后续消息，直接加入缓存并终止本次链路（不进入后面的 Throttling 和 Handler）
-        self.cache[mid].append(event)
-        return None # 关键：这里不执行 handler，这样就不会触发频率限制和多次保存
+    def _evict_stale(self, now: float) -> None:
+        limit = self.max_wait + self.quiet_period
+        while self.cache:
+            mid, buffer = next(iter(self.cache.items()))
+            if now - buffer.started <= limit:
+                return
+            del self.cache[mid]
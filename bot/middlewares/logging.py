@@ -4,7 +4,8 @@ from typing import TYPE_CHECKING, Any
 from aiogram import BaseMiddleware
 from loguru import logger
 
-from bot.database.models.audit_log import ActionType, AuditLogModel
+from bot.database.models.audit_log import ActionType
+from bot.services.audit_sink import record_audit
 
 if TYPE_CHECKING:
     from collections.abc import Awaitable, Callable
@@ -17,7 +18,6 @@ if TYPE_CHECKING:
         PreCheckoutQuery,
         TelegramObject,
     )
-    from sqlalchemy.ext.asyncio import AsyncSession
 
 
 class LoggingMiddleware(BaseMiddleware):
@@ -33,8 +33,8 @@ class LoggingMiddleware(BaseMiddleware):
         self.logger = logger
         super().__init__()
 
-    async def _record_command_audit(self, message: Message, session: AsyncSession) -> None:
-        """记录命令审计日志"""
+    def _record_command_audit(self, message: Message) -> None:
+        """记录命令审计日志（交给审计通道批量写入，不阻塞处理器）"""
         if not message.text or not message.text.startswith("/"):
             return
 
@@ -43,7 +43,7 @@ class LoggingMiddleware(BaseMiddleware):
             return
 
         try:
-            audit = AuditLogModel(
+            record_audit(
                 operator_id=message.from_user.id if message.from_user else None,
                 operator_name=message.from_user.full_name if message.from_user else None,
                 user_id=message.from_user.id if message.from_user else None,
@@ -60,8 +60,6 @@ class LoggingMiddleware(BaseMiddleware):
                 ip_address=None,  # Telegram API 不提供用户 IP
                 user_agent="Telegram Bot"
             )
-            session.add(audit)
-            await session.commit()
         except Exception as e:
             self.logger.exception(f"记录审计日志失败: {e}")
 
@@ -184,8 +182,8 @@ class LoggingMiddleware(BaseMiddleware):
                 self._log_event(log_prefix, process_func(target_obj))
 
                 # 记录特定命令的审计日志
-                if attr_name == "message" and "session" in data:
-                    await self._record_command_audit(target_obj, data["session"])
+                if attr_name == "message":
+                    self._record_command_audit(target_obj)
                 break
         else:
             # 2. 备用检查：如果 event 本身就是 Message/CallbackQuery 等对象（非 Update 包裹）
@@ -194,8 +192,7 @@ class LoggingMiddleware(BaseMiddleware):
 
             if event_type == "Message":
                 self._log_event("收到消息", self.process_message(event))  # type: ignore
-                if "session" in data:
-                    await self._record_command_audit(event, data["session"])  # type: ignore
+                self._record_command_audit(event)  # type: ignore
             elif event_type == "CallbackQuery":
                 self._log_event("收到按钮回调", self.process_callback_query(event))  # type: ignore
             elif event_type == "InlineQuery":
@@ -0,0 +1,95 @@
+from __future__ import annotations
+import time
+from typing import TYPE_CHECKING, Any
+
+from aiogram import BaseMiddleware
+
+from bot.database.query_tracker import rename_current_unit, track_queries
+from bot.utils.metrics import HANDLER_ERRORS, HANDLER_SECONDS, MIDDLEWARE_SECONDS, UPDATE_SECONDS
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable
+
+    from aiogram.types import TelegramObject
+
+_HANDLER_MODULE_PREFIX = "bot.handlers."
+
+
+def _handler_name(data: dict[str, Any]) -> str:
+    handler_object = data.get("handler")
+    callback = getattr(handler_object, "callback", None)
+    if callback is None:
+        return "unknown"
+    module = getattr(callback, "__module__", "") or ""
+    return f"{module.removeprefix(_HANDLER_MODULE_PREFIX)}.{getattr(callback, '__qualname__', repr(callback))}"
+
+
+class UpdateMetricsMiddleware(BaseMiddleware):
+    """最外层的 Update 中间件，记录每个更新的总耗时，并开启 SQL 统计单元。"""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        event_type = getattr(event, "event_type", type(event).__name__)
+        with UPDATE_SECONDS.time(event_type=event_type), track_queries(f"update:{event_type}"):
+            return await handler(event, data)
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """最内层中间件，按处理器函数记录耗时与异常次数。"""
+
+    def __init__(self, observer: str) -> None:
+        self.observer = observer
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        name = _handler_name(data)
+        # 外层中间件执行的查询也计入该处理器
+        rename_current_unit(f"{self.observer}:{name}")
+        start = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            HANDLER_ERRORS.inc(observer=self.observer, handler=name)
+            raise
+        finally:
+            HANDLER_SECONDS.observe(time.perf_counter() - start, observer=self.observer, handler=name)
+
+
+class TimedMiddleware(BaseMiddleware):
+    """包装另一个中间件，只统计它自身的耗时（扣除调用下游所花的时间）。"""
+
+    def __init__(self, inner: BaseMiddleware, observer: str) -> None:
+        self.inner = inner
+        self.observer = observer
+        self.name = type(inner).__name__
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        downstream = 0.0
+
+        async def timed_handler(inner_event: TelegramObject, inner_data: dict[str, Any]) -> Any:
+            nonlocal downstream
+            handler_start = time.perf_counter()
+            try:
+                return await handler(inner_event, inner_data)
+            finally:
+                downstream += time.perf_counter() - handler_start
+
+        start = time.perf_counter()
+        try:
+            return await self.inner(timed_handler, event, data)
+        finally:
+            elapsed = time.perf_counter() - start - downstream
+            MIDDLEWARE_SECONDS.observe(max(elapsed, 0.0), observer=self.observer, middleware=self.name)
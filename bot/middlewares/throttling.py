@@ -1,22 +1,35 @@
 from __future__ import annotations
+import asyncio
+import contextlib
 from typing import TYPE_CHECKING, Any
 
 from aiogram import BaseMiddleware
-from cachetools import TTLCache
+from aiogram.exceptions import TelegramAPIError
+from aiogram.types import CallbackQuery, Message
 
-from bot.core.config import settings
+from bot.services.throttling import Throttler, get_throttler
 
 if TYPE_CHECKING:
     from collections.abc import Awaitable, Callable
 
-    from aiogram.types import Chat, TelegramObject
+    from aiogram.types import Chat, TelegramObject, User
+
+THROTTLED_CALLBACK_TEXT = "操作太频繁，请稍后再试"
+
+
+def command_name(text: str | None) -> str | None:
+    """提取消息中的命令名（小写、去掉 @机器人名），不是命令时返回 None。"""
+    if not text or not text.startswith("/"):
+        return None
+    parts = text[1:].split(maxsplit=1)
+    return parts[0].split("@", 1)[0].lower() if parts else None
 
 
 class ThrottlingMiddleware(BaseMiddleware):
-    cache: TTLCache[int, Any]
+    """按用户与群组令牌桶限流消息和回调，策略见 :mod:`bot.services.throttling`。"""
 
-    def __init__(self, rate_limit: float = settings.RATE_LIMIT) -> None:
-        self.cache = TTLCache(maxsize=10_000, ttl=rate_limit)
+    def __init__(self, throttler: Throttler | None = None) -> None:
+        self.throttler = throttler
 
     async def __call__(
         self,
@@ -24,11 +37,29 @@ class ThrottlingMiddleware(BaseMiddleware):
         event: TelegramObject,
         data: dict[str, Any],
     ) -> Any:
-        chat: Chat | None = getattr(event, "chat", None)
-        if not chat:
-            return await handler(event, data)
+        throttler = self.throttler if self.throttler is not None else get_throttler()
+        await throttler.ensure_policies()
+
+        user: User | None = data.get("event_from_user")
+        chat: Chat | None = data.get("event_chat")
+        command = callback = None
+        if isinstance(event, Message):
+            command = command_name(event.text)
+        elif isinstance(event, CallbackQuery):
+            callback = event.data or ""
 
-        if chat.id in self.cache:
+        decision = throttler.acquire(
+            user.id if user else None,
+            chat.id if chat else None,
+            command=command,
+            callback=callback,
+        )
+        if not decision.allowed:
+            if isinstance(event, CallbackQuery):
+                # 不应答的话客户端按钮会一直转圈
+                with contextlib.suppress(TelegramAPIError):
+                    await event.answer(THROTTLED_CALLBACK_TEXT)
             return None
-        self.cache[chat.id] = None
+        if decision.delay:
+            await asyncio.sleep(decision.delay)
         return await handler(event, data)
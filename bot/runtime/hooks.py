@@ -21,12 +21,15 @@ from bot.database.seed_media_categories import init_media_categories
 from bot.database.seed_quiz import seed_quiz_data
 from bot.handlers import get_handlers_router
 from bot.keyboards.default_commands import remove_default_commands, set_default_commands
+from bot.services.audit_sink import get_audit_sink
 from bot.services.config_service import ensure_config_defaults, sync_notification_channels
 from bot.services.currency import CurrencyService
 from bot.services.emby_service import run_emby_sync, start_scheduler
 from bot.services.quiz_service import QuizService
+from bot.services.retention import start_retention_scheduler
 from bot.services.users import sync_roles_from_settings_on_startup
 from bot.utils.emby import get_emby_client
+from bot.utils.metrics import run_metrics_snapshots
 from bot.core.hitokoto import init_hitokoto_client, close_hitokoto_client
 
 if TYPE_CHECKING:
@@ -96,6 +99,10 @@ async def on_startup() -> None:
         _track_runtime_task(asyncio.create_task(QuizService.start_scheduler(bot), name="quiz_scheduler"))
         # 启动 Emby 定时同步调度器
         _track_runtime_task(asyncio.create_task(start_scheduler(bot), name="emby_scheduler"))
+        # 启动通知/审计表数据保留调度器
+        _track_runtime_task(asyncio.create_task(start_retention_scheduler(), name="retention_scheduler"))
+        # 定期写出指标快照，供 API 的 /metrics 合并
+        _track_runtime_task(asyncio.create_task(run_metrics_snapshots("bot"), name="metrics_snapshot"))
 
         await start_api_server()
     except (OSError, ValueError, RuntimeError) as err:
@@ -117,8 +124,32 @@ async def on_shutdown() -> None:
     """
     logger.info("⏹️ 机器人停止中...")
     await _stop_runtime_tasks()
-    await QuizService.stop_background_tasks()
     await remove_default_commands(bot)
+    await release_process_resources()
+    try:
+        await stop_api_server()
+    except (RuntimeError, AttributeError) as err:
+        logger.warning("⚠️ API 服务停止时发生错误: {}", err)
+    logger.info("✅ 机器人已停止")
+
+
+async def release_process_resources() -> None:
+    """释放本进程持有的资源
+
+    功能说明:
+    - 停止问答后台任务并写出审计缓冲
+    - 关闭 FSM 存储、Emby 客户端、Bot 会话与一言客户端
+    - 释放数据库连接池
+    - 主进程与分片工作进程退出时共用
+
+    输入参数:
+    - 无
+
+    返回值:
+    - None
+    """
+    await QuizService.stop_background_tasks()
+    await get_audit_sink().stop()
     await dp.storage.close()
     await dp.fsm.storage.close()
 
@@ -133,11 +164,6 @@ async def on_shutdown() -> None:
         await engine.dispose()
     except TypeError:
         engine.dispose()
-    try:
-        await stop_api_server()
-    except (RuntimeError, AttributeError) as err:
-        logger.warning("⚠️ API 服务停止时发生错误: {}", err)
-    logger.info("✅ 机器人已停止")
 
 
 async def ensure_bot_token_valid(target_bot: Bot) -> None:
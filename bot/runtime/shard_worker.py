@@ -0,0 +1,80 @@
+"""分片工作进程入口：``python -m bot.runtime.shard_worker <序号>``。
+
+由 :class:`bot.runtime.sharding.ShardRouter` 启动。从标准输入逐行读取主进程转发的
+更新，交给本进程的 Dispatcher（注册全部中间件与处理器）按会话串行处理。只执行
+处理器，不运行数据库建表、种子数据、定时任务与 API 服务，这些仍由主进程负责。
+
+标准输入关闭即表示主进程要求退出：处理完已收到的更新后释放资源。Ctrl+C 由主进程
+统一处理，本进程忽略 SIGINT。
+"""
+
+from __future__ import annotations
+import asyncio
+import contextlib
+import signal
+import sys
+
+from aiogram.types import Update
+from loguru import logger
+
+from bot.__main__ import configure_logging
+from bot.core.config import settings
+from bot.core.hitokoto import init_hitokoto_client
+from bot.core.loader import bot, dp
+from bot.handlers import get_handlers_router
+from bot.middlewares import register_middlewares
+from bot.runtime.hooks import release_process_resources
+from bot.runtime.update_pool import UpdateWorkerPool
+from bot.utils.metrics import run_metrics_snapshots
+
+# 单条更新 JSON 的最大长度
+MAX_LINE_BYTES = 16 * 1024 * 1024
+
+
+async def _stdin_reader() -> asyncio.StreamReader:
+    reader = asyncio.StreamReader(limit=MAX_LINE_BYTES)
+    loop = asyncio.get_running_loop()
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+    return reader
+
+
+async def run_shard(index: int) -> None:
+    """运行一个分片工作进程，直到标准输入关闭。"""
+    register_middlewares(dp)
+    dp.include_router(get_handlers_router())
+    init_hitokoto_client()
+
+    # 队列满时不拒绝而是暂停读取，压力沿管道反馈给主进程
+    pool = UpdateWorkerPool(
+        dp, bot, workers=settings.UPDATE_WORKERS, queue_size=settings.UPDATE_QUEUE_SIZE, enqueue_timeout=None
+    )
+    pool.start()
+    metrics_task = asyncio.create_task(run_metrics_snapshots(f"bot-shard-{index}"), name="metrics_snapshot")
+    logger.info(f"🧩 工作进程 shard-{index} 已启动")
+    try:
+        reader = await _stdin_reader()
+        while line := await reader.readline():
+            try:
+                update = Update.model_validate_json(line, context={"bot": bot})
+            except ValueError as error:
+                logger.warning(f"⚠️ 无法解析转发的更新: {error}")
+                continue
+            await pool.submit(update)
+    finally:
+        await pool.stop()
+        metrics_task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await metrics_task
+        await release_process_resources()
+        logger.info(f"✅ 工作进程 shard-{index} 已停止")
+
+
+def main() -> None:
+    index = int(sys.argv[1]) if len(sys.argv) > 1 else 0
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    configure_logging(f"shard-{index}")
+    asyncio.run(run_shard(index))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""多进程分片处理 Telegram 更新。
+
+``UPDATE_PROCESSES`` 大于 1 时，主进程照常接收更新（长轮询或 Webhook）并运行
+定时任务、API 子进程等，但不再执行处理器：:class:`ShardForwardMiddleware` 在最外层
+拦截每个更新，由 :class:`ShardRouter` 按 ``路由键 % 进程数`` 写入对应工作进程的
+标准输入（每行一个 JSON）。同一会话始终落在同一进程，管道本身有序，进程内再由
+:class:`~bot.runtime.update_pool.UpdateWorkerPool` 按会话串行处理，因此会话内顺序
+不变；不同会话分散到多个进程，CPU 密集的处理不再互相阻塞。
+
+工作进程见 :mod:`bot.runtime.shard_worker`。FSM 状态通过数据库存储共享；进程内
+缓存各自独立，因会话固定在同一进程，会话相关的缓存不会出现跨进程的不一致。
+工作进程意外退出时会自动重启，期间发往该分片的更新等待重启完成后再写入。
+"""
+
+from __future__ import annotations
+import asyncio
+import contextlib
+import sys
+from typing import TYPE_CHECKING, Any
+
+from aiogram import BaseMiddleware
+from loguru import logger
+
+from bot.runtime.update_pool import UPDATE_DRAIN_TIMEOUT, routing_key
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable
+
+    from aiogram.types import TelegramObject, Update
+
+SHARD_RESTART_DELAY = 1.0
+SHARD_STOP_TIMEOUT = UPDATE_DRAIN_TIMEOUT + 5.0
+
+
+def shard_index(update: Update, shards: int) -> int:
+    """按会话（无会话时按用户）计算更新所属的分片。"""
+    return routing_key(update) % shards
+
+
+def worker_command(index: int) -> list[str]:
+    return [sys.executable, "-m", "bot.runtime.shard_worker", str(index)]
+
+
+class ShardRouter:
+    """管理分片工作进程，并把更新按分片写入各进程的标准输入。"""
+
+    def __init__(self, processes: int, command: Callable[[int], list[str]] = worker_command) -> None:
+        self.processes = processes
+        self._command = command
+        self._procs: list[asyncio.subprocess.Process | None] = [None] * processes
+        self._ready = [asyncio.Event() for _ in range(processes)]
+        self._watchers: list[asyncio.Task[None]] = []
+        self._stopping = False
+
+    async def start(self) -> None:
+        if self._watchers:
+            return
+        self._stopping = False
+        for index in range(self.processes):
+            await self._spawn(index)
+        self._watchers = [
+            asyncio.create_task(self._watch(index), name=f"shard_watch_{index}") for index in range(self.processes)
+        ]
+        logger.info(f"🧩 已启动 {self.processes} 个更新处理工作进程")
+
+    async def _spawn(self, index: int) -> None:
+        self._procs[index] = await asyncio.create_subprocess_exec(
+            *self._command(index), stdin=asyncio.subprocess.PIPE
+        )
+        self._ready[index].set()
+
+    async def _watch(self, index: int) -> None:
+        while not self._stopping:
+            proc = self._procs[index]
+            if proc is not None:
+                code = await proc.wait()
+                if self._stopping:
+                    return
+                self._ready[index].clear()
+                logger.error(f"❌ 工作进程 shard-{index} 意外退出 (code={code})，{SHARD_RESTART_DELAY:.0f} 秒后重启")
+            await asyncio.sleep(SHARD_RESTART_DELAY)
+            try:
+                await self._spawn(index)
+            except OSError as error:
+                logger.error(f"❌ 重启工作进程 shard-{index} 失败: {error}")
+                self._procs[index] = None
+
+    async def forward(self, update: Update) -> None:
+        """把更新写入所属分片；该分片正在重启时等待其就绪。"""
+        index = shard_index(update, self.processes)
+        line = update.model_dump_json(exclude_unset=True, by_alias=True).encode() + b"\n"
+        while True:
+            await self._ready[index].wait()
+            proc = self._procs[index]
+            if proc is None or proc.stdin is None:
+                return
+            try:
+                proc.stdin.write(line)
+                await proc.stdin.drain()
+            except (BrokenPipeError, ConnectionResetError):
+                # 进程已退出，等待重启后重发；期间若已重启完成，不能清掉新进程的就绪标记
+                if self._procs[index] is proc:
+                    self._ready[index].clear()
+                continue
+            return
+
+    async def stop(self) -> None:
+        """关闭各进程的标准输入，让其处理完已收到的更新后退出；超时则终止。"""
+        self._stopping = True
+        for task in self._watchers:
+            task.cancel()
+        for task in self._watchers:
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        self._watchers = []
+        for index, proc in enumerate(self._procs):
+            if proc is None:
+                continue
+            if proc.stdin is not None:
+                proc.stdin.close()
+            try:
+                await asyncio.wait_for(proc.wait(), timeout=SHARD_STOP_TIMEOUT)
+            except asyncio.TimeoutError:
+                logger.warning(f"⚠️ 工作进程 shard-{index} 停止超时，已强制终止")
+                with contextlib.suppress(ProcessLookupError):
+                    proc.kill()
+                await proc.wait()
+            self._procs[index] = None
+            self._ready[index].clear()
+
+
+class ShardForwardMiddleware(BaseMiddleware):
+    """主进程最外层的更新中间件：只转发给工作进程，不执行处理器。"""
+
+    def __init__(self, router: ShardRouter) -> None:
+        self.router = router
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        del handler, data
+        await self.router.forward(event)
@@ -0,0 +1,167 @@
+"""有界的 Telegram 更新处理协程池。
+
+Webhook 模式下每个更新不再各自创建一个任务，而是按会话排队：每个会话（无会话时
+按用户）有自己的先进先出队列，同一时刻至多一个协程按到达顺序处理它，因此只有
+同一会话的更新互相等待；所有会话共享一个全局信号量，同时处理的更新不超过
+``workers`` 个。排队的更新总数有上限，已满时 :meth:`UpdateWorkerPool.submit`
+在 ``enqueue_timeout`` 秒内仍无法入队就返回 ``False``，由调用方拒绝请求，把压力
+反馈给 Telegram；``enqueue_timeout`` 为 ``None`` 时一直等待，压力沿输入管道反馈给
+上游（分片工作进程即如此）。
+
+相册的各条消息需要同时进入 :class:`~bot.middlewares.album.AlbumMiddleware` 才能
+合并，因此带 ``media_group_id`` 的消息不串行等待，也不占用全局信号量，而是并发
+处理；同一会话随后的普通更新会先等这些相册消息处理完，会话内顺序仍以相册为单位
+保持。
+"""
+
+from __future__ import annotations
+import asyncio
+import contextlib
+from collections import deque
+from typing import TYPE_CHECKING
+
+from aiogram.dispatcher.middlewares.user_context import UserContextMiddleware
+from loguru import logger
+
+from bot.utils.metrics import registry
+
+if TYPE_CHECKING:
+    from aiogram import Bot, Dispatcher
+    from aiogram.types import Update
+
+UPDATE_ENQUEUE_TIMEOUT = 5.0
+UPDATE_DRAIN_TIMEOUT = 10.0
+
+UPDATES_REJECTED = registry.counter("bot_updates_rejected_total", "更新队列已满、被拒绝后由 Telegram 重试的更新数")
+
+
+def routing_key(update: Update) -> int:
+    """返回更新的路由键：优先会话 ID，其次用户 ID，都没有时用 update_id。"""
+    context = UserContextMiddleware.resolve_event_context(update)
+    if context.chat is not None:
+        return context.chat.id
+    if context.user is not None:
+        return context.user.id
+    return update.update_id
+
+
+def _is_album_part(update: Update) -> bool:
+    return update.message is not None and bool(update.message.media_group_id)
+
+
+class UpdateWorkerPool:
+    """按会话排队、保证会话内顺序的更新处理协程池。"""
+
+    def __init__(
+        self,
+        dispatcher: Dispatcher,
+        bot: Bot,
+        *,
+        workers: int,
+        queue_size: int,
+        enqueue_timeout: float | None = UPDATE_ENQUEUE_TIMEOUT,
+    ) -> None:
+        self.dispatcher = dispatcher
+        self.bot = bot
+        self.enqueue_timeout = enqueue_timeout
+        # 已入队但尚未处理完的更新数上限
+        self._slots = asyncio.Semaphore(queue_size)
+        # 同时处理的更新数上限
+        self._running = asyncio.Semaphore(workers)
+        # 各会话等待处理的更新
+        self._pending: dict[int, deque[Update]] = {}
+        # 正由协程处理队列的会话
+        self._active: dict[int, asyncio.Task[None]] = {}
+        # 各会话尚未处理完的相册消息，队列协程退出后仍保留，供随后的更新等待
+        self._albums: dict[int, set[asyncio.Task[None]]] = {}
+        self._outstanding = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._started = False
+
+    def start(self) -> None:
+        if self._started:
+            return
+        self._started = True
+        for key in list(self._pending):
+            self._activate(key)
+
+    def depth(self) -> int:
+        """当前排队等待处理的更新总数。"""
+        return sum(len(updates) for updates in self._pending.values())
+
+    async def submit(self, update: Update) -> bool:
+        """把更新放入所属会话的队列；超时仍无法入队时返回 False。"""
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.enqueue_timeout)
+        except asyncio.TimeoutError:
+            UPDATES_REJECTED.inc()
+            logger.warning(f"⚠️ 更新队列已满，拒绝更新 {update.update_id}，等待 Telegram 重试")
+            return False
+        self._outstanding += 1
+        self._idle.clear()
+        key = routing_key(update)
+        self._pending.setdefault(key, deque()).append(update)
+        if self._started:
+            self._activate(key)
+        return True
+
+    def _activate(self, key: int) -> None:
+        if key not in self._active:
+            self._active[key] = asyncio.create_task(self._drain(key), name=f"update_chat_{key}")
+
+    async def _drain(self, key: int) -> None:
+        """按到达顺序处理一个会话的队列，队列空后退出。"""
+        updates = self._pending[key]
+        try:
+            while updates:
+                update = updates.popleft()
+                if _is_album_part(update):
+                    task = asyncio.create_task(self._feed(update))
+                    self._albums.setdefault(key, set()).add(task)
+                    task.add_done_callback(lambda done, key=key: self._forget_album(key, done))
+                    continue
+                pending = self._albums.get(key)
+                if pending:
+                    await asyncio.gather(*pending, return_exceptions=True)
+                async with self._running:
+                    await self._feed(update)
+        finally:
+            # 检查队列为空与移除之间没有 await，新到达的更新不会丢失
+            del self._active[key]
+            if not updates:
+                del self._pending[key]
+
+    def _forget_album(self, key: int, task: asyncio.Task[None]) -> None:
+        pending = self._albums.get(key)
+        if pending is not None:
+            pending.discard(task)
+            if not pending:
+                del self._albums[key]
+
+    async def _feed(self, update: Update) -> None:
+        try:
+            await self.dispatcher.feed_update(self.bot, update)
+        except Exception:  # noqa: BLE001
+            logger.exception(f"❌ 处理更新 {update.update_id} 失败")
+        finally:
+            self._slots.release()
+            self._outstanding -= 1
+            if not self._outstanding:
+                self._idle.set()
+
+    async def stop(self, timeout: float = UPDATE_DRAIN_TIMEOUT) -> None:
+        """等待已入队的更新处理完（最多 ``timeout`` 秒），然后停止协程。"""
+        if not self._started:
+            return
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"⚠️ 停止时仍有 {self._outstanding} 个更新未处理，已放弃")
+        tasks = [*self._active.values(), *(task for pending in self._albums.values() for task in pending)]
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        self._started = False
@@ -0,0 +1,111 @@
+"""Telegram Webhook 更新模式。
+
+``UPDATE_MODE=webhook`` 时由机器人进程内的 uvicorn 在 ``WEBHOOK_PORT`` 上提供一个
+只含 Webhook 路由的 FastAPI 应用（独立 API 进程中没有 Dispatcher，无法直接处理
+更新）：校验 ``X-Telegram-Bot-Api-Secret-Token`` 后立即应答，更新交给
+:class:`~bot.runtime.update_pool.UpdateWorkerPool` 处理；队列满时返回 503，
+Telegram 会稍后重试。
+"""
+
+from __future__ import annotations
+import asyncio
+import contextlib
+import hmac
+import secrets
+from typing import TYPE_CHECKING, Any
+
+import uvicorn
+from aiogram.types import Update
+from fastapi import FastAPI, Request, Response
+from loguru import logger
+
+from bot.core.config import settings
+from bot.runtime.update_pool import UpdateWorkerPool
+
+if TYPE_CHECKING:
+    from collections.abc import Generator
+
+    from aiogram import Bot, Dispatcher
+
+ALLOWED_UPDATES = ["message", "callback_query", "chat_member", "my_chat_member"]
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+_STARTUP_TIMEOUT = 10.0
+
+
+class _WebhookServer(uvicorn.Server):
+    """信号由 ``bot.__main__`` 统一处理，这里不再接管。"""
+
+    @contextlib.contextmanager
+    def capture_signals(self) -> Generator[None, None, None]:
+        yield
+
+
+def create_webhook_app(pool: UpdateWorkerPool, bot: Bot, *, path: str, secret: str) -> FastAPI:
+    """创建只接收 Telegram 更新的 FastAPI 应用。"""
+    app = FastAPI(docs_url=None, redoc_url=None, openapi_url=None)
+
+    @app.post(path)
+    async def telegram_webhook(request: Request) -> Response:
+        if not hmac.compare_digest(request.headers.get(SECRET_HEADER, ""), secret):
+            return Response(status_code=401)
+        try:
+            update = Update.model_validate(await request.json(), context={"bot": bot})
+        except ValueError:
+            return Response(status_code=400)
+        if not await pool.submit(update):
+            return Response(status_code=503)
+        return Response(status_code=200)
+
+    return app
+
+
+async def run_webhook(bot: Bot, dispatcher: Dispatcher, **kwargs: Any) -> None:
+    """以 Webhook 模式运行机器人，直到任务被取消。
+
+    功能说明:
+    - 触发 Dispatcher 启动钩子，启动处理协程池与 Webhook 服务
+    - 服务就绪后向 Telegram 注册 Webhook 地址与密钥
+    - 退出时先停止接收，再处理完已入队的更新，最后触发关闭钩子
+
+    输入参数:
+    - bot: Aiogram Bot 实例
+    - dispatcher: 已注册中间件与钩子的 Dispatcher
+    - kwargs: 传给启动/关闭钩子的额外数据
+
+    返回值:
+    - None
+    """
+    workflow_data = {"dispatcher": dispatcher, "bots": [bot], **dispatcher.workflow_data, **kwargs}
+    secret = settings.WEBHOOK_SECRET or secrets.token_urlsafe(32)
+    pool = UpdateWorkerPool(dispatcher, bot, workers=settings.UPDATE_WORKERS, queue_size=settings.UPDATE_QUEUE_SIZE)
+    server = _WebhookServer(
+        uvicorn.Config(
+            app=create_webhook_app(pool, bot, path=settings.WEBHOOK_PATH, secret=secret),
+            host=settings.WEBHOOK_HOST,
+            port=settings.WEBHOOK_PORT,
+            log_level="critical",
+            access_log=False,
+            lifespan="off",
+            log_config=None,
+        )
+    )
+
+    await dispatcher.emit_startup(bot=bot, **workflow_data)
+    pool.start()
+    serve_task = asyncio.create_task(server.serve(), name="webhook_server")
+    try:
+        async with asyncio.timeout(_STARTUP_TIMEOUT):
+            while not server.started:
+                if serve_task.done():
+                    msg = f"Webhook 服务无法监听 {settings.WEBHOOK_HOST}:{settings.WEBHOOK_PORT}"
+                    raise RuntimeError(msg)
+                await asyncio.sleep(0.05)
+        await bot.set_webhook(settings.get_webhook_url(), secret_token=secret, allowed_updates=ALLOWED_UPDATES)
+        logger.info("🌐 Webhook 地址: {}", settings.get_webhook_url())
+        await asyncio.shield(serve_task)
+    finally:
+        server.should_exit = True
+        with contextlib.suppress(asyncio.CancelledError, SystemExit):
+            await serve_task
+        await pool.stop()
+        await dispatcher.emit_shutdown(bot=bot, **workflow_data)
@@ -12,10 +12,10 @@ from sqlalchemy.orm.attributes import flag_modified
 
 from bot.database.models import (
     ActionType,
-    AuditLogModel,
     EmbyUserModel,
     UserExtendModel,
 )
+from bot.services.audit_sink import record_audit
 from bot.services.emby_update_helper import detect_and_update_emby_user
 from bot.utils.datetime import format_datetime, now
 from bot.utils.emby import get_emby_client
@@ -161,8 +161,10 @@ async def ban_emby_user(
     if deleted_devices_count > 0:
         results.append(f"ℹ️ 自动软删除 {deleted_devices_count} 个关联设备")
 
-    # 3. 记录审计日志
-    audit_log = AuditLogModel(
+    await session.commit()
+
+    # 3. 提交成功后记录审计日志（审计单独写库，提交失败时不应留下记录）
+    record_audit(
         operator_id=deleted_by,
         user_id=target_user_id,
         action_type=ActionType.USER_BLOCK,  # 使用 USER_BLOCK 作为封禁/移除的操作类型
@@ -177,7 +179,6 @@ async def ban_emby_user(
         ip_address="127.0.0.1", # 内部操作
         user_agent="System/Bot"
     )
-    session.add(audit_log)
 
     # 4. 发送通知到管理员群组
     if bot and user_info:
@@ -336,8 +337,10 @@ async def disable_emby_user(
         logger.error(f"禁用 Emby 用户失败: {e}")
         results.append(f"❌ API 错误: {e}")
 
-    # 3. 记录审计日志
-    audit_log = AuditLogModel(
+    await session.commit()
+
+    # 3. 提交成功后记录审计日志
+    record_audit(
         operator_id=admin_id if admin_id else 0,
         action_type=ActionType.USER_BLOCK,
         target_type="emby_user",
@@ -347,8 +350,6 @@ async def disable_emby_user(
         ip_address="127.0.0.1",
         user_agent="System/Bot"
     )
-    session.add(audit_log)
-    await session.commit()
 
     return results
 
@@ -474,8 +475,10 @@ async def enable_emby_user(
         logger.error(f"启用 Emby 用户失败: {e}")
         results.append(f"❌ API 错误: {e}")
 
-    # 3. 记录审计日志
-    audit_log = AuditLogModel(
+    await session.commit()
+
+    # 3. 提交成功后记录审计日志
+    record_audit(
         operator_id=admin_id if admin_id else 0,
         action_type=ActionType.USER_UNBLOCK,
         target_type="emby_user",
@@ -485,8 +488,6 @@ async def enable_emby_user(
         ip_address="127.0.0.1",
         user_agent="System/Bot"
     )
-    session.add(audit_log)
-    await session.commit()
 
     return results
 
@@ -520,8 +521,10 @@ async def unban_user_service(
     results = []
     operator_id = admin_id if admin_id else 0
 
-    # 记录审计日志
-    audit_log = AuditLogModel(
+    await session.commit()
+
+    # 提交成功后记录审计日志
+    record_audit(
         user_id=operator_id,
         action_type=ActionType.USER_UNBLOCK,
         target_id=str(target_user_id),
@@ -533,7 +536,6 @@ async def unban_user_service(
         ip_address="127.0.0.1",
         user_agent="System/Bot"
     )
-    session.add(audit_log)
     results.append("✅ 已记录解封审计日志")
 
     # 发送通知到管理员群组
@@ -0,0 +1,163 @@
+"""审计日志异步批量写入。
+
+审计生产者（日志中间件、管理员操作、代币购买、Emby 自动封禁等）调用
+:meth:`AuditSink.record` 把一条 ``AuditLogModel`` 的列值放入内存缓冲后立即
+返回，不等待数据库。后台协程每 ``flush_interval`` 秒或缓冲达到 ``batch_size``
+时用一次批量 INSERT 写入；缓冲上限为 ``max_pending`` 条，超出时丢弃最旧的
+记录并计数。关闭时 :meth:`AuditSink.stop` 会把剩余记录全部写入。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+from collections import deque
+from typing import Any
+
+from loguru import logger
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
+
+from bot.database.database import sessionmaker
+from bot.database.models.audit_log import ActionType, AuditLogModel
+from bot.utils.datetime import now
+
+AUDIT_MAX_PENDING = 10_000
+AUDIT_BATCH_SIZE = 200
+AUDIT_FLUSH_INTERVAL = 1.0
+
+# 批量 INSERT 要求每行的键一致，未提供的列按这些默认值补齐
+_AUDIT_DEFAULTS: dict[str, Any] = {
+    "operator_id": None,
+    "operator_name": None,
+    "user_id": None,
+    "target_type": None,
+    "target_id": None,
+    "details": None,
+    "ip_address": None,
+    "user_agent": None,
+    "session_id": None,
+    "is_success": True,
+    "error_message": None,
+    "duration_ms": None,
+}
+
+
+class AuditSink:
+    """有界内存缓冲 + 后台批量写入的审计日志通道。"""
+
+    def __init__(
+        self,
+        *,
+        max_pending: int = AUDIT_MAX_PENDING,
+        batch_size: int = AUDIT_BATCH_SIZE,
+        flush_interval: float = AUDIT_FLUSH_INTERVAL,
+    ) -> None:
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._pending: deque[dict[str, Any]] = deque()
+        self._wakeup: asyncio.Event | None = None
+        self._task: asyncio.Task[None] | None = None
+        self._flush_lock: asyncio.Lock | None = None
+
+    def record(self, *, action_type: ActionType, description: str, **fields: Any) -> None:
+        """登记一条审计日志，立即返回；未知字段会引发 ``TypeError``。"""
+        unknown = set(fields) - set(_AUDIT_DEFAULTS)
+        if unknown:
+            msg = f"未知的审计日志字段: {sorted(unknown)}"
+            raise TypeError(msg)
+        timestamp = now()
+        row = {
+            **_AUDIT_DEFAULTS,
+            **fields,
+            "action_type": action_type,
+            "description": description,
+            "created_at": timestamp,
+            "updated_at": timestamp,
+        }
+        if len(self._pending) >= self.max_pending:
+            self._pending.popleft()
+            self.dropped += 1
+            if self.dropped % 1000 == 1:
+                logger.warning(f"⚠️ 审计日志缓冲已满，已丢弃 {self.dropped} 条最旧记录")
+        self._pending.append(row)
+        self._ensure_started()
+        if len(self._pending) >= self.batch_size and self._wakeup is not None:
+            self._wakeup.set()
+
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def _ensure_started(self) -> None:
+        if self._task is not None and not self._task.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # 没有事件循环时只缓冲，等下一次在循环内登记或 stop() 时写入
+            return
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task = loop.create_task(self._run())
+
+    async def _run(self) -> None:
+        assert self._wakeup is not None
+        while True:
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except SQLAlchemyError as error:
+                logger.error(f"❌ 审计日志批量写入失败，稍后重试: {error}")
+
+    async def flush(self) -> int:
+        """把当前缓冲全部写入数据库，返回写入条数；失败的批次放回缓冲头部。"""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        written = 0
+        async with self._flush_lock:
+            while self._pending:
+                batch = [self._pending.popleft() for _ in range(min(self.batch_size, len(self._pending)))]
+                try:
+                    async with sessionmaker() as session:
+                        await session.execute(insert(AuditLogModel), batch)
+                        await session.commit()
+                except SQLAlchemyError:
+                    # 放回时仍受上限约束，优先保留较新的记录
+                    room = max(self.max_pending - len(self._pending), 0)
+                    self.dropped += len(batch) - min(room, len(batch))
+                    self._pending.extendleft(reversed(batch[len(batch) - min(room, len(batch)):]))
+                    raise
+                written += len(batch)
+        return written
+
+    async def stop(self) -> None:
+        """停止后台协程并写入剩余记录。"""
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        try:
+            await self.flush()
+        except SQLAlchemyError as error:
+            logger.error(f"❌ 关闭时写入审计日志失败，丢弃 {len(self._pending)} 条: {error}")
+
+
+_sink: AuditSink | None = None
+
+
+def get_audit_sink() -> AuditSink:
+    """返回进程内共享的审计日志通道。"""
+    global _sink  # noqa: PLW0603
+    if _sink is None:
+        _sink = AuditSink()
+    return _sink
+
+
+def record_audit(*, action_type: ActionType, description: str, **fields: Any) -> None:
+    """登记一条审计日志，见 :meth:`AuditSink.record`。"""
+    get_audit_sink().record(action_type=action_type, description=description, **fields)
@@ -4,6 +4,7 @@ import json as _json
 from datetime import datetime, timedelta
 from typing import TYPE_CHECKING, Any
 
+from loguru import logger
 from sqlalchemy import select, update
 from sqlalchemy.exc import SQLAlchemyError
 
@@ -23,8 +24,37 @@ from bot.utils.datetime import now as get_now
 from bot.utils.datetime import parse_formatted_datetime
 
 if TYPE_CHECKING:
+    from collections.abc import Callable
+
     from sqlalchemy.ext.asyncio import AsyncSession
 
+# 配置写入成功后的回调，参数为配置键；供进程内缓存（如播放策略索引）失效
+_config_listeners: list[Callable[[str], None]] = []
+
+
+def add_config_listener(listener: Callable[[str], None]) -> None:
+    """注册配置变更回调
+
+    功能说明:
+    - `set_config` 提交成功后以配置键调用回调, 回调应只做轻量的缓存失效
+
+    输入参数:
+    - listener: 接收配置键的同步回调
+
+    返回值:
+    - None
+    """
+    if listener not in _config_listeners:
+        _config_listeners.append(listener)
+
+
+def _notify_config_listeners(key: str) -> None:
+    for listener in list(_config_listeners):
+        try:
+            listener(key)
+        except Exception:  # noqa: BLE001
+            logger.exception(f"❌ 配置变更回调执行失败: {key}")
+
 
 async def get_config(session: AsyncSession, key: str) -> Any:
     """读取配置键
@@ -103,6 +133,7 @@ async def set_config(
         return False
     else:
         await session.commit()
+        _notify_config_listeners(key)
         return True
 
 
@@ -0,0 +1,446 @@
+"""仪表板统计快照。
+
+定时任务把仪表板需要的计数汇总成一份快照，写入 ``statistics`` 表
+（``category = "dashboard"``）并保存在内存中，``/api/dashboard/stats`` 直接
+返回内存里预先渲染好的结果，请求耗时与各业务表的大小无关。
+
+- 用户、活跃用户（``user_extend.last_interaction_at``）、Emby 账号：每次刷新
+  各用一条聚合语句重新统计；
+- 消息与代币流水只追加不修改：按主键水位增量统计新增行，按日累加，
+  水位随快照持久化，重启后从上次的位置继续。自增 id 在插入时分配、提交顺序
+  却可能不同，水位以下最近 :data:`WATERMARK_SAFETY_IDS` 个 id 中尚未出现的
+  id 记为空洞一并持久化，之后每次刷新复查，提交后补计一次并移出空洞；
+- 按日计数只保留最近 :data:`DASHBOARD_DAYS` 天。
+"""
+
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import TYPE_CHECKING, Any
+
+from loguru import logger
+from sqlalchemy import case, delete, func, select
+from sqlalchemy.exc import SQLAlchemyError
+
+from bot.core.config import settings
+from bot.database.database import sessionmaker
+from bot.database.models import (
+    CurrencyTransactionModel,
+    EmbyUserModel,
+    MessageModel,
+    StatisticsModel,
+    StatisticType,
+    UserExtendModel,
+    UserModel,
+)
+from bot.database.models.statistics import StatisticPeriod
+from bot.database.query_tracker import tracked
+from bot.utils.datetime import now
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+DASHBOARD_CATEGORY = "dashboard"
+DASHBOARD_DAYS = 30
+_WATERMARK_PREFIX = "watermark:"
+_GAP_PREFIX = "gap:"
+# 水位以下复查未提交行的 id 范围
+WATERMARK_SAFETY_IDS = 500
+
+# 按日序列在 statistics 表中的统计类型
+_SERIES_TYPES: dict[str, StatisticType] = {
+    "new_users": StatisticType.DAILY_NEW_USERS,
+    "messages": StatisticType.DAILY_MESSAGES,
+    "currency_earned": StatisticType.BUSINESS_KPI,
+    "currency_spent": StatisticType.BUSINESS_KPI,
+}
+
+
+@dataclass(slots=True)
+class DashboardSnapshot:
+    """一次刷新得到的计数、按日序列与增量水位。"""
+
+    counters: dict[str, int] = field(default_factory=dict)
+    daily: dict[str, dict[str, int]] = field(default_factory=dict)
+    watermarks: dict[str, int] = field(default_factory=dict)
+    gaps: dict[str, set[int]] = field(default_factory=dict)
+    computed_at: datetime | None = None
+
+    def day_value(self, series: str, day: date) -> int:
+        return self.daily.get(series, {}).get(day.isoformat(), 0)
+
+    def sum_days(self, series: str, end: date, days: int) -> int:
+        return sum(self.day_value(series, end - timedelta(days=offset)) for offset in range(days))
+
+    def add_daily(self, series: str, day: Any, value: int) -> None:
+        key = str(day)[:10]
+        bucket = self.daily.setdefault(series, {})
+        bucket[key] = bucket.get(key, 0) + int(value)
+
+    def trim(self, today: date) -> None:
+        cutoff = (today - timedelta(days=DASHBOARD_DAYS - 1)).isoformat()
+        for bucket in self.daily.values():
+            for key in [key for key in bucket if key < cutoff]:
+                del bucket[key]
+
+
+def _percent(part: int, whole: int) -> float:
+    return round(part / whole * 100, 2) if whole > 0 else 0.0
+
+
+def render_dashboard(snapshot: DashboardSnapshot) -> dict[str, Any]:
+    """把快照渲染为仪表板接口的响应体（不含新鲜度字段）。"""
+    computed_at = snapshot.computed_at or now()
+    today = computed_at.date()
+    counters = snapshot.counters
+    total_users = counters.get("total_users", 0)
+    new_users_today = snapshot.day_value("new_users", today)
+    new_users_week = snapshot.sum_days("new_users", today, 7)
+    active_users = counters.get("active_users_week", 0)
+    premium_users = counters.get("premium_users", 0)
+    messages_today = snapshot.day_value("messages", today)
+    timestamp = computed_at.isoformat()
+
+    return {
+        "total_users": total_users,
+        "active_users": active_users,
+        "active_users_today": counters.get("active_users_today", 0),
+        "new_users_today": new_users_today,
+        "new_users_week": new_users_week,
+        "premium_users": premium_users,
+        "total_messages": counters.get("total_messages", 0),
+        "messages_today": messages_today,
+        "messages_week": snapshot.sum_days("messages", today, 7),
+        "emby_users": counters.get("emby_users", 0),
+        "currency": {
+            "earned_total": counters.get("currency_earned", 0),
+            "spent_total": counters.get("currency_spent", 0),
+            "earned_today": snapshot.day_value("currency_earned", today),
+            "spent_today": snapshot.day_value("currency_spent", today),
+        },
+        "bot_uptime": "运行中",
+        "last_updated": timestamp,
+        "trends": {
+            "users_growth": _percent(new_users_week, max(total_users - new_users_week, 1)) if total_users else 0,
+            "activity_rate": _percent(active_users, total_users),
+            "premium_rate": _percent(premium_users, total_users),
+        },
+        "recent_activity": [
+            {
+                "id": 1,
+                "type": "user_joined",
+                "message": f"今日新增 {new_users_today} 位用户",
+                "timestamp": timestamp,
+                "count": new_users_today,
+            },
+            {
+                "id": 2,
+                "type": "user_active",
+                "message": f"本周活跃用户 {active_users} 位",
+                "timestamp": timestamp,
+                "count": active_users,
+            },
+            {
+                "id": 3,
+                "type": "messages",
+                "message": f"今日消息 {messages_today} 条",
+                "timestamp": timestamp,
+                "count": messages_today,
+            },
+        ],
+        "user_growth": [
+            {"date": day.isoformat(), "new_users": snapshot.day_value("new_users", day)}
+            for day in (today - timedelta(days=offset) for offset in range(6, -1, -1))
+        ],
+    }
+
+
+class DashboardStatsService:
+    """维护仪表板快照：启动时从表中加载，之后定时增量刷新。"""
+
+    def __init__(self, session_factory: async_sessionmaker[AsyncSession] = sessionmaker) -> None:
+        self._session_factory = session_factory
+        self._snapshot: DashboardSnapshot | None = None
+        self._payload: dict[str, Any] | None = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def snapshot(self) -> DashboardSnapshot | None:
+        return self._snapshot
+
+    def _publish(self, snapshot: DashboardSnapshot) -> None:
+        self._snapshot = snapshot
+        self._payload = render_dashboard(snapshot)
+
+    def stats(self) -> dict[str, Any] | None:
+        """返回最近一次快照的响应体与新鲜度；尚无快照时返回 None。"""
+        if self._payload is None or self._snapshot is None or self._snapshot.computed_at is None:
+            return None
+        age = max((now() - self._snapshot.computed_at).total_seconds(), 0.0)
+        return {
+            **self._payload,
+            "snapshot_age_seconds": age,
+            "stale": age > settings.DASHBOARD_REFRESH_SECONDS * 3,
+        }
+
+    async def get_stats(self) -> dict[str, Any]:
+        """返回仪表板统计；进程刚启动且没有可用快照时同步刷新一次。"""
+        stats = self.stats()
+        if stats is None:
+            await self.refresh()
+            stats = self.stats()
+        return stats or {}
+
+    async def load(self) -> None:
+        """从 statistics 表加载上次持久化的快照。"""
+        async with self._session_factory() as session:
+            result = await session.execute(
+                select(StatisticsModel).where(StatisticsModel.category == DASHBOARD_CATEGORY)
+            )
+            rows = result.scalars().all()
+        if not rows:
+            return
+        snapshot = DashboardSnapshot()
+        for row in rows:
+            if row.period == StatisticPeriod.DAILY:
+                snapshot.add_daily(row.key or "", row.date, row.value)
+            elif (row.key or "").startswith(_WATERMARK_PREFIX):
+                snapshot.watermarks[row.key.removeprefix(_WATERMARK_PREFIX)] = row.value
+            elif (row.key or "").startswith(_GAP_PREFIX):
+                snapshot.gaps.setdefault(row.key.removeprefix(_GAP_PREFIX), set()).add(row.value)
+            elif row.key:
+                snapshot.counters[row.key] = row.value
+            if row.end_time is not None and (snapshot.computed_at is None or row.end_time > snapshot.computed_at):
+                snapshot.computed_at = row.end_time
+        async with self._lock:
+            if self._snapshot is None:
+                self._publish(snapshot)
+        logger.info(f"📊 已加载仪表板快照: {snapshot.computed_at}")
+
+    @tracked("job:dashboard_stats")
+    async def refresh(self) -> DashboardSnapshot:
+        """重新统计并持久化快照；并发调用时只执行一次。"""
+        async with self._lock:
+            previous = self._snapshot or DashboardSnapshot()
+            current = now()
+            snapshot = DashboardSnapshot(
+                counters=dict(previous.counters),
+                daily={series: dict(bucket) for series, bucket in previous.daily.items()},
+                watermarks=dict(previous.watermarks),
+                gaps={table: set(ids) for table, ids in previous.gaps.items()},
+                computed_at=current,
+            )
+            async with self._session_factory() as session:
+                await _count_users(session, snapshot, current)
+                await _count_messages(session, snapshot)
+                await _count_currency(session, snapshot)
+                snapshot.trim(current.date())
+                await _persist(session, snapshot)
+            self._publish(snapshot)
+            return snapshot
+
+    async def run(self) -> None:
+        """加载已有快照后按 ``DASHBOARD_REFRESH_SECONDS`` 周期刷新。"""
+        try:
+            await self.load()
+        except SQLAlchemyError as err:
+            logger.warning(f"⚠️ 加载仪表板快照失败: {err}")
+        while True:
+            try:
+                await self.refresh()
+            except SQLAlchemyError as err:
+                logger.error(f"❌ 刷新仪表板快照失败: {err}")
+            await asyncio.sleep(settings.DASHBOARD_REFRESH_SECONDS)
+
+
+async def _count_users(session: AsyncSession, snapshot: DashboardSnapshot, current: datetime) -> None:
+    today_start = current.replace(hour=0, minute=0, second=0, microsecond=0)
+    totals = (
+        await session.execute(
+            select(
+                func.count(UserModel.id),
+                func.coalesce(func.sum(case((UserModel.is_premium.is_(True), 1), else_=0)), 0),
+            ).where(UserModel.is_deleted.is_(False))
+        )
+    ).one()
+    snapshot.counters["total_users"] = int(totals[0] or 0)
+    snapshot.counters["premium_users"] = int(totals[1] or 0)
+
+    # 新增用户按日重新统计（表小且 created_at 有索引），覆盖旧的按日数据
+    day = func.date(UserModel.created_at)
+    growth = await session.execute(
+        select(day, func.count(UserModel.id))
+        .where(UserModel.created_at >= today_start - timedelta(days=DASHBOARD_DAYS - 1))
+        .group_by(day)
+    )
+    snapshot.daily["new_users"] = {}
+    for created, count in growth.all():
+        snapshot.add_daily("new_users", created, count)
+
+    active = (
+        await session.execute(
+            select(
+                func.coalesce(func.sum(case((UserExtendModel.last_interaction_at >= today_start, 1), else_=0)), 0),
+                func.count(UserExtendModel.user_id),
+            ).where(UserExtendModel.last_interaction_at >= current - timedelta(days=7))
+        )
+    ).one()
+    snapshot.counters["active_users_today"] = int(active[0] or 0)
+    snapshot.counters["active_users_week"] = int(active[1] or 0)
+
+    emby_users = await session.execute(
+        select(func.count(EmbyUserModel.id)).where(EmbyUserModel.is_deleted.is_(False))
+    )
+    snapshot.counters["emby_users"] = int(emby_users.scalar() or 0)
+
+
+async def _count_appended(
+    session: AsyncSession,
+    snapshot: DashboardSnapshot,
+    name: str,
+    model: Any,
+    values: list[Any],
+    apply: Callable[[Any, list[Any]], None],
+) -> None:
+    """按主键水位增量统计只追加的表，``apply(日期, 聚合值)`` 累加每个按日分组。
+
+    先确定本次的新水位并记下安全范围内的空洞，再统计水位之间除空洞外的行，
+    这样在两次查询之间提交的行不会被漏计或重复计入；之前的空洞中已提交的行
+    单独补计后移出空洞。
+    """
+    watermark = snapshot.watermarks.get(name, 0)
+    gaps = snapshot.gaps.get(name, set())
+    day = func.date(model.created_at)
+
+    if gaps:
+        found = set((await session.execute(select(model.id).where(model.id.in_(sorted(gaps))))).scalars().all())
+        if found:
+            late = await session.execute(select(day, *values).where(model.id.in_(sorted(found))).group_by(day))
+            for created, *amounts in late.all():
+                apply(created, amounts)
+            gaps -= found
+
+    latest = int((await session.execute(select(func.max(model.id)))).scalar() or 0)
+    if latest > watermark:
+        floor = max(watermark, latest - WATERMARK_SAFETY_IDS)
+        present = set(
+            (await session.execute(select(model.id).where(model.id > floor, model.id <= latest))).scalars().all()
+        )
+        fresh_gaps = set(range(floor + 1, latest + 1)) - present
+        stmt = select(day, *values).where(model.id > watermark, model.id <= latest)
+        if fresh_gaps:
+            stmt = stmt.where(model.id.not_in(sorted(fresh_gaps)))
+        for created, *amounts in (await session.execute(stmt.group_by(day))).all():
+            apply(created, amounts)
+        gaps |= fresh_gaps
+        watermark = latest
+
+    snapshot.gaps[name] = {gap for gap in gaps if gap > watermark - WATERMARK_SAFETY_IDS}
+    snapshot.watermarks[name] = watermark
+
+
+async def _count_messages(session: AsyncSession, snapshot: DashboardSnapshot) -> None:
+    def apply(created: Any, amounts: list[Any]) -> None:
+        snapshot.add_daily("messages", created, amounts[0])
+        snapshot.counters["total_messages"] = snapshot.counters.get("total_messages", 0) + int(amounts[0])
+
+    snapshot.counters.setdefault("total_messages", 0)
+    await _count_appended(session, snapshot, "messages", MessageModel, [func.count(MessageModel.id)], apply)
+
+
+async def _count_currency(session: AsyncSession, snapshot: DashboardSnapshot) -> None:
+    amount = CurrencyTransactionModel.amount
+
+    def apply(created: Any, amounts: list[Any]) -> None:
+        earned, spent = (int(value or 0) for value in amounts)
+        snapshot.add_daily("currency_earned", created, earned)
+        snapshot.add_daily("currency_spent", created, spent)
+        snapshot.counters["currency_earned"] = snapshot.counters.get("currency_earned", 0) + earned
+        snapshot.counters["currency_spent"] = snapshot.counters.get("currency_spent", 0) + spent
+
+    await _count_appended(
+        session,
+        snapshot,
+        "currency_transactions",
+        CurrencyTransactionModel,
+        [
+            func.coalesce(func.sum(case((amount > 0, amount), else_=0)), 0),
+            func.coalesce(func.sum(case((amount < 0, -amount), else_=0)), 0),
+        ],
+        apply,
+    )
+
+
+def _snapshot_rows(snapshot: DashboardSnapshot) -> list[StatisticsModel]:
+    computed_at = snapshot.computed_at or now()
+    common = {"category": DASHBOARD_CATEGORY, "end_time": computed_at}
+    rows = [
+        StatisticsModel(
+            statistic_type=StatisticType.BUSINESS_KPI,
+            period=StatisticPeriod.REAL_TIME,
+            date=computed_at.date(),
+            key=key,
+            value=value,
+            **common,
+        )
+        for key, value in snapshot.counters.items()
+    ]
+    rows.extend(
+        StatisticsModel(
+            statistic_type=StatisticType.CUSTOM_METRIC,
+            period=StatisticPeriod.REAL_TIME,
+            date=computed_at.date(),
+            key=f"{_WATERMARK_PREFIX}{table}",
+            value=value,
+            **common,
+        )
+        for table, value in snapshot.watermarks.items()
+    )
+    rows.extend(
+        StatisticsModel(
+            statistic_type=StatisticType.CUSTOM_METRIC,
+            period=StatisticPeriod.REAL_TIME,
+            date=computed_at.date(),
+            key=f"{_GAP_PREFIX}{table}",
+            value=gap,
+            **common,
+        )
+        for table, gaps in snapshot.gaps.items()
+        for gap in sorted(gaps)
+    )
+    rows.extend(
+        StatisticsModel(
+            statistic_type=_SERIES_TYPES.get(series, StatisticType.CUSTOM_METRIC),
+            period=StatisticPeriod.DAILY,
+            date=date.fromisoformat(day),
+            key=series,
+            value=value,
+            **common,
+        )
+        for series, bucket in snapshot.daily.items()
+        for day, value in bucket.items()
+    )
+    return rows
+
+
+async def _persist(session: AsyncSession, snapshot: DashboardSnapshot) -> None:
+    """用新快照整体替换表中的仪表板行（约百行）。"""
+    await session.execute(delete(StatisticsModel).where(StatisticsModel.category == DASHBOARD_CATEGORY))
+    session.add_all(_snapshot_rows(snapshot))
+    await session.commit()
+
+
+_dashboard_stats: DashboardStatsService | None = None
+
+
+def get_dashboard_stats() -> DashboardStatsService:
+    """获取仪表板统计服务单例。"""
+    global _dashboard_stats  # noqa: PLW0603
+    if _dashboard_stats is None:
+        _dashboard_stats = DashboardStatsService()
+    return _dashboard_stats
+
@@ -0,0 +1,204 @@
+"""基于 fixtures 页面快照的元数据解析器性能基准。
+
+对 ``fixtures/<分类>/<数据源>/{search,detail}`` 下的每个 HTML 页面运行对应
+解析器，记录耗时与内存分配，可在多个 BeautifulSoup 后端之间对比，并与
+保存的基线比较以发现性能回退。
+"""
+
+from __future__ import annotations
+
+import gc
+import json
+import statistics
+import time
+import tracemalloc
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from bot.services.emby_metadata.parser import (
+    acceed,
+    boy_studio,
+    ck_download,
+    hunk_ch,
+    jgvdata,
+    ko_shop,
+    ko_tube,
+    ko_video,
+    mensrush,
+    str8boys2023,
+    trance_video,
+)
+from bot.services.emby_metadata.parser.soup import PYTHON_BACKEND, forced_backend, is_backend_available
+
+FIXTURES_ROOT = Path(__file__).resolve().parent / "fixtures"
+DEFAULT_BACKENDS = ("html.parser", "lxml", "html5lib")
+REFERENCE_BACKEND = PYTHON_BACKEND
+
+_PARSERS: dict[str, type] = {
+    parser.source_name: parser
+    for parser in (
+        acceed.AcceedParser,
+        boy_studio.BoyStudioParser,
+        ck_download.CkDownloadParser,
+        hunk_ch.HunkChParser,
+        jgvdata.JgvdataParser,
+        ko_shop.KoShopParser,
+        ko_tube.KoTubeParser,
+        ko_video.KoVideoParser,
+        mensrush.MensrushParser,
+        str8boys2023.Str8BoysParser,
+        trance_video.TranceVideoParser,
+    )
+}
+
+# 详情页 ID 与文件名不一致的样本，需要使用搜索结果中的站内 ID
+_DETAIL_SOURCE_IDS = {
+    ("boy-studio", "BOY-671"): "4748",
+    ("str8boys2023", "SBM-0511"): "546:SBM-0511",
+}
+
+
+class BenchmarkCase:
+    """一个 fixture 页面与其解析入口。"""
+
+    def __init__(self, source: str, kind: str, path: Path) -> None:
+        self.source = source
+        self.kind = kind
+        self.path = path
+        self.html = path.read_text(encoding="utf-8")
+        self.source_id = _DETAIL_SOURCE_IDS.get((source, path.stem), path.stem)
+
+    @property
+    def name(self) -> str:
+        return f"{self.source}/{self.kind}/{self.path.name}"
+
+    def run(self) -> Any:
+        """执行一次解析，返回可比较的结果。"""
+        parser = _PARSERS[self.source]
+        if self.kind == "search":
+            return parser.parse_search_results(self.html, 100)
+        return parser.parse_detail(self.html, self.source_id)
+
+
+def discover_cases(fixtures_root: Path = FIXTURES_ROOT) -> list[BenchmarkCase]:
+    """收集所有已注册解析器的非空 search/detail 页面。"""
+    cases: list[BenchmarkCase] = []
+    for source_root in sorted(path for path in fixtures_root.glob("*/*") if path.is_dir()):
+        if source_root.name not in _PARSERS:
+            continue
+        for kind in ("search", "detail"):
+            for path in sorted((source_root / kind).glob("*.html")):
+                if path.stat().st_size:
+                    cases.append(BenchmarkCase(source_root.name, kind, path))
+    return cases
+
+
+def available_backends(backends: tuple[str, ...] = DEFAULT_BACKENDS) -> list[str]:
+    """过滤出当前环境已安装的 BeautifulSoup 后端。"""
+    return [backend for backend in backends if is_backend_available(backend)]
+
+
+def _fingerprint(result: Any) -> str:
+    """把解析结果序列化为稳定字符串，用于判断不同后端输出是否一致。"""
+    if isinstance(result, list):
+        return json.dumps([item.model_dump(mode="json") for item in result], ensure_ascii=False, sort_keys=True)
+    return result.model_dump_json()
+
+
+def _measure(run: Callable[[], Any], repeats: int) -> dict[str, Any]:
+    run()
+    timings: list[float] = []
+    for _ in range(repeats):
+        gc.collect()
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "median_ms": statistics.median(timings) * 1000,
+        "min_ms": min(timings) * 1000,
+        "peak_kib": peak / 1024,
+    }
+
+
+def run_benchmark(
+    cases: list[BenchmarkCase],
+    backends: list[str],
+    *,
+    repeats: int = 5,
+) -> list[dict[str, Any]]:
+    """按后端逐个 fixture 计时，并标记输出是否与参考后端一致。"""
+    reference: dict[str, str] = {}
+    with forced_backend(REFERENCE_BACKEND):
+        for case in cases:
+            reference[case.name] = _fingerprint(case.run())
+
+    rows: list[dict[str, Any]] = []
+    for backend in backends:
+        with forced_backend(backend):
+            for case in cases:
+                try:
+                    output = _fingerprint(case.run())
+                except Exception as error:  # noqa: BLE001
+                    rows.append({"case": case.name, "source": case.source, "backend": backend, "error": str(error)})
+                    continue
+                rows.append(
+                    {
+                        "case": case.name,
+                        "source": case.source,
+                        "backend": backend,
+                        "bytes": len(case.html.encode("utf-8")),
+                        "identical": output == reference[case.name],
+                        **_measure(case.run, repeats),
+                    }
+                )
+    return rows
+
+
+def summarize(rows: list[dict[str, Any]]) -> dict[str, dict[str, dict[str, float]]]:
+    """按 数据源 -> 后端 汇总总耗时与峰值内存。"""
+    summary: dict[str, dict[str, dict[str, float]]] = {}
+    for row in rows:
+        if "error" in row:
+            continue
+        totals = summary.setdefault(row["source"], {}).setdefault(
+            row["backend"],
+            {"median_ms": 0.0, "peak_kib": 0.0, "cases": 0},
+        )
+        totals["median_ms"] += row["median_ms"]
+        totals["peak_kib"] = max(totals["peak_kib"], row["peak_kib"])
+        totals["cases"] += 1
+    return summary
+
+
+def compare_to_baseline(
+    rows: list[dict[str, Any]],
+    baseline: list[dict[str, Any]],
+    *,
+    threshold: float = 0.25,
+    min_delta_ms: float = 0.5,
+) -> list[str]:
+    """返回中位耗时比基线慢超过阈值的用例说明。
+
+    ``min_delta_ms`` 用于忽略极小页面上的计时抖动。
+    """
+    previous = {(row["case"], row["backend"]): row for row in baseline if "median_ms" in row}
+    regressions: list[str] = []
+    for row in rows:
+        before = previous.get((row["case"], row["backend"]))
+        if before is None or "median_ms" not in row:
+            continue
+        delta = row["median_ms"] - before["median_ms"]
+        if delta > min_delta_ms and row["median_ms"] > before["median_ms"] * (1 + threshold):
+            regressions.append(
+                f"{row['case']} [{row['backend']}]: {before['median_ms']:.2f}ms -> {row['median_ms']:.2f}ms",
+            )
+    return regressions
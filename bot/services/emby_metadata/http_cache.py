@@ -0,0 +1,247 @@
+"""元数据数据源页面的磁盘响应缓存。
+
+缓存条目按 ``<根目录>/<数据源>/<键>.html`` 保存原始页面，并以同名 ``.json``
+记录请求方法、URL、表单、ETag/Last-Modified 和写入时间。页面文件与
+``fixtures`` 目录中的 HTML 快照格式一致，可直接复制为解析器测试样本；
+``record``/``replay`` 模式则用于录制和离线回放真实页面。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Any
+
+from cachetools import LRUCache
+
+from bot.core.config import DIR, settings
+from bot.utils.metrics import record_cache
+
+HTTP_CACHE_ROOT = DIR / "data" / "emby_metadata" / "http_cache"
+
+CACHE_MODE_DEFAULT = "default"
+CACHE_MODE_OFF = "off"
+CACHE_MODE_RECORD = "record"
+CACHE_MODE_REPLAY = "replay"
+CACHE_MODES = frozenset({CACHE_MODE_DEFAULT, CACHE_MODE_OFF, CACHE_MODE_RECORD, CACHE_MODE_REPLAY})
+
+_MEMORY_BYTES = 16 * 1024 * 1024
+_PRUNE_TARGET_RATIO = 0.9
+
+
+def cache_key(method: str, url: str, form_data: Mapping[str, str] | None = None) -> str:
+    """由请求方法、完整 URL 和排序后的表单生成稳定缓存键。"""
+    form_items = sorted((form_data or {}).items())
+    raw = json.dumps([method.upper(), url, form_items], ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class CachedResponse:
+    """一条缓存页面及其重新验证所需的响应元数据。"""
+
+    __slots__ = ("body", "content_type", "etag", "form", "last_modified", "method", "stored_at", "url")
+
+    def __init__(
+        self,
+        *,
+        method: str,
+        url: str,
+        body: str,
+        form: Mapping[str, str] | None = None,
+        etag: str | None = None,
+        last_modified: str | None = None,
+        content_type: str | None = None,
+        stored_at: float | None = None,
+    ) -> None:
+        self.method = method.upper()
+        self.url = url
+        self.body = body
+        self.form = dict(form or {})
+        self.etag = etag
+        self.last_modified = last_modified
+        self.content_type = content_type
+        self.stored_at = time.time() if stored_at is None else stored_at
+
+    def is_fresh(self, ttl_seconds: float) -> bool:
+        """判断条目是否仍在数据源声明的有效期内。"""
+        return time.time() - self.stored_at < ttl_seconds
+
+    def validator_headers(self) -> dict[str, str]:
+        """返回条件请求使用的 If-None-Match / If-Modified-Since 请求头。"""
+        headers: dict[str, str] = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def meta(self) -> dict[str, Any]:
+        """返回写入 ``.json`` 旁路文件的元数据。"""
+        return {
+            "method": self.method,
+            "url": self.url,
+            "form": self.form,
+            "etag": self.etag,
+            "last_modified": self.last_modified,
+            "content_type": self.content_type,
+            "stored_at": self.stored_at,
+        }
+
+
+class ResponseCache:
+    """带内存 LRU 前端、按总字节数淘汰的磁盘页面缓存。"""
+
+    def __init__(
+        self,
+        root: Path = HTTP_CACHE_ROOT,
+        *,
+        max_disk_bytes: int = 256 * 1024 * 1024,
+        memory_bytes: int = _MEMORY_BYTES,
+        mode: str = CACHE_MODE_DEFAULT,
+    ) -> None:
+        if mode not in CACHE_MODES:
+            msg = f"不支持的缓存模式: {mode}"
+            raise ValueError(msg)
+        self.root = Path(root)
+        self.max_disk_bytes = max_disk_bytes
+        self.mode = mode
+        self._memory: LRUCache[str, CachedResponse] = LRUCache(
+            maxsize=memory_bytes,
+            getsizeof=lambda entry: max(len(entry.body), 1),
+        )
+        self._disk_usage: int | None = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != CACHE_MODE_OFF
+
+    def _paths(self, namespace: str, key: str) -> tuple[Path, Path]:
+        directory = self.root / namespace
+        return directory / f"{key}.html", directory / f"{key}.json"
+
+    async def get(self, namespace: str, key: str) -> CachedResponse | None:
+        """读取缓存条目，内存未命中时回落到磁盘。"""
+        if not self.enabled:
+            return None
+        memory_key = f"{namespace}/{key}"
+        entry = self._memory.get(memory_key)
+        if entry is not None:
+            record_cache(f"http_cache:{namespace}", hit=True)
+            return entry
+        entry = await asyncio.to_thread(self._read_entry, namespace, key)
+        if entry is not None and len(entry.body) <= self._memory.maxsize:
+            self._memory[memory_key] = entry
+        record_cache(f"http_cache:{namespace}", hit=entry is not None)
+        return entry
+
+    async def put(self, namespace: str, key: str, entry: CachedResponse) -> None:
+        """写入缓存条目，并在超出磁盘上限时淘汰最久未访问的条目。"""
+        if not self.enabled:
+            return
+        if len(entry.body) <= self._memory.maxsize:
+            self._memory[f"{namespace}/{key}"] = entry
+        async with self._lock:
+            await asyncio.to_thread(self._write_entry, namespace, key, entry)
+
+    async def touch(self, namespace: str, key: str, entry: CachedResponse) -> None:
+        """服务端返回 304 后刷新条目写入时间。"""
+        entry.stored_at = time.time()
+        await self.put(namespace, key, entry)
+
+    async def discard(self, namespace: str, key: str) -> None:
+        """删除单个条目，用于丢弃解析失败的页面。"""
+        self._memory.pop(f"{namespace}/{key}", None)
+        async with self._lock:
+            await asyncio.to_thread(self._remove_entry, namespace, key)
+
+    def clear_memory(self) -> None:
+        """清空内存前端，磁盘条目保持不变。"""
+        self._memory.clear()
+
+    def _read_entry(self, namespace: str, key: str) -> CachedResponse | None:
+        body_path, meta_path = self._paths(namespace, key)
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            body = body_path.read_text(encoding="utf-8")
+        except (OSError, ValueError):
+            return None
+        if not isinstance(meta, dict):
+            return None
+        # 以旁路文件的修改时间记录最近访问，供磁盘 LRU 淘汰使用
+        try:
+            os.utime(meta_path)
+        except OSError:
+            pass
+        return CachedResponse(
+            method=str(meta.get("method") or "GET"),
+            url=str(meta.get("url") or ""),
+            body=body,
+            form=meta.get("form") if isinstance(meta.get("form"), dict) else None,
+            etag=meta.get("etag"),
+            last_modified=meta.get("last_modified"),
+            content_type=meta.get("content_type"),
+            stored_at=float(meta.get("stored_at") or 0),
+        )
+
+    def _write_entry(self, namespace: str, key: str, entry: CachedResponse) -> None:
+        body_path, meta_path = self._paths(namespace, key)
+        body_path.parent.mkdir(parents=True, exist_ok=True)
+        previous_size = self._entry_size(body_path, meta_path)
+        body_path.write_text(entry.body, encoding="utf-8")
+        meta_path.write_text(json.dumps(entry.meta(), ensure_ascii=False, indent=2), encoding="utf-8")
+        usage = self._current_disk_usage()
+        self._disk_usage = usage - previous_size + self._entry_size(body_path, meta_path)
+        if self._disk_usage > self.max_disk_bytes:
+            self._prune()
+
+    def _remove_entry(self, namespace: str, key: str) -> None:
+        body_path, meta_path = self._paths(namespace, key)
+        size = self._entry_size(body_path, meta_path)
+        body_path.unlink(missing_ok=True)
+        meta_path.unlink(missing_ok=True)
+        if self._disk_usage is not None:
+            self._disk_usage = max(self._disk_usage - size, 0)
+
+    @staticmethod
+    def _entry_size(body_path: Path, meta_path: Path) -> int:
+        return sum(path.stat().st_size for path in (body_path, meta_path) if path.exists())
+
+    def _current_disk_usage(self) -> int:
+        if self._disk_usage is None:
+            self._disk_usage = sum(path.stat().st_size for path in self.root.glob("*/*") if path.is_file())
+        return self._disk_usage
+
+    def _prune(self) -> None:
+        """按旁路文件访问时间从旧到新删除条目，直到回落到上限的 90%。"""
+        entries = sorted(self.root.glob("*/*.json"), key=lambda path: path.stat().st_mtime)
+        target = int(self.max_disk_bytes * _PRUNE_TARGET_RATIO)
+        usage = self._current_disk_usage()
+        for meta_path in entries:
+            if usage <= target:
+                break
+            body_path = meta_path.with_suffix(".html")
+            usage -= self._entry_size(body_path, meta_path)
+            body_path.unlink(missing_ok=True)
+            meta_path.unlink(missing_ok=True)
+            self._memory.pop(f"{meta_path.parent.name}/{meta_path.stem}", None)
+        self._disk_usage = max(usage, 0)
+
+
+_response_cache: ResponseCache | None = None
+
+
+def get_response_cache() -> ResponseCache:
+    """返回按配置初始化的进程内共享响应缓存。"""
+    global _response_cache  # noqa: PLW0603
+    if _response_cache is None:
+        _response_cache = ResponseCache(
+            max_disk_bytes=settings.EMBY_METADATA_HTTP_CACHE_MAX_MB * 1024 * 1024,
+            mode=settings.EMBY_METADATA_HTTP_CACHE_MODE,
+        )
+    return _response_cache
@@ -0,0 +1,202 @@
+"""元数据工作台图片代理的磁盘内容缓存。
+
+原图和缩略图按 ``<根目录>/<URL 哈希>[-w<宽度>].img`` 保存，同名 ``.json``
+记录来源 URL、Content-Type 和 ETag。总字节数超过上限时按最近访问时间
+淘汰；同一 URL 的并发请求只下载一次。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import io
+import json
+import os
+from collections.abc import Awaitable, Callable
+from pathlib import Path
+from typing import Any
+
+from loguru import logger
+from PIL import Image, UnidentifiedImageError
+
+from bot.core.config import DIR, settings
+
+IMAGE_CACHE_ROOT = DIR / "data" / "emby_metadata" / "image_cache"
+# 缩略图宽度向上取整到这些档位，避免任意宽度把缓存撑满
+THUMBNAIL_WIDTHS = (160, 240, 320, 480, 640, 960)
+
+_PRUNE_TARGET_RATIO = 0.9
+
+ImageFetcher = Callable[[], Awaitable[tuple[bytes, str]]]
+
+
+class CachedImage:
+    """一张已缓存的图片及其响应头信息。"""
+
+    __slots__ = ("body", "content_type", "etag")
+
+    def __init__(self, body: bytes, content_type: str, etag: str | None = None) -> None:
+        self.body = body
+        self.content_type = content_type or "application/octet-stream"
+        self.etag = etag or f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+    def meta(self) -> dict[str, Any]:
+        return {"content_type": self.content_type, "etag": self.etag}
+
+
+def image_cache_key(url: str) -> str:
+    """按图片 URL 生成稳定的缓存键。"""
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """按 RFC 9110 的弱比较判断 ``If-None-Match`` 是否命中 ``etag``。"""
+    if not if_none_match:
+        return False
+    target = etag.removeprefix("W/")
+    for token in if_none_match.split(","):
+        token = token.strip()
+        if token == "*" or token.removeprefix("W/") == target:
+            return True
+    return False
+
+
+def thumbnail_width(width: int | None) -> int | None:
+    """把请求宽度归到缩略图档位；超过最大档位时返回原图。"""
+    if not width:
+        return None
+    for candidate in THUMBNAIL_WIDTHS:
+        if width <= candidate:
+            return candidate
+    return None
+
+
+def make_thumbnail(image: CachedImage, width: int) -> CachedImage:
+    """按宽度等比缩小图片；无法处理或本身更小时原样返回。"""
+    try:
+        with Image.open(io.BytesIO(image.body)) as source:
+            if source.width <= width or getattr(source, "is_animated", False):
+                return image
+            source.thumbnail((width, source.height))
+            has_alpha = source.mode in {"RGBA", "LA"} or "transparency" in source.info
+            output = io.BytesIO()
+            if has_alpha:
+                source.save(output, format="PNG", optimize=True)
+                content_type = "image/png"
+            else:
+                source.convert("RGB").save(output, format="JPEG", quality=85, optimize=True)
+                content_type = "image/jpeg"
+    except (OSError, UnidentifiedImageError, ValueError) as error:
+        logger.debug("缩略图生成失败，返回原图: {}", error)
+        return image
+    return CachedImage(output.getvalue(), content_type)
+
+
+class ImageCache:
+    """按总字节数 LRU 淘汰、合并并发下载的图片磁盘缓存。"""
+
+    def __init__(self, root: Path = IMAGE_CACHE_ROOT, *, max_disk_bytes: int = 512 * 1024 * 1024) -> None:
+        self.root = Path(root)
+        self.max_disk_bytes = max_disk_bytes
+        self._disk_usage: int | None = None
+        self._inflight: dict[str, asyncio.Future[CachedImage]] = {}
+        self._lock = asyncio.Lock()
+
+    def _paths(self, key: str) -> tuple[Path, Path]:
+        return self.root / f"{key}.img", self.root / f"{key}.json"
+
+    async def get_or_fetch(self, url: str, fetch: ImageFetcher, *, width: int | None = None) -> CachedImage:
+        """返回缓存图片；未命中时调用 ``fetch`` 下载，同一键的并发请求共享结果。"""
+        key = image_cache_key(url)
+        width = thumbnail_width(width)
+        if width is not None:
+            key = f"{key}-w{width}"
+
+        cached = await asyncio.to_thread(self._read_entry, key)
+        if cached is not None:
+            return cached
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+
+        future: asyncio.Future[CachedImage] = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            if width is None:
+                image = CachedImage(*await fetch())
+            else:
+                original = await self.get_or_fetch(url, fetch)
+                image = await asyncio.to_thread(make_thumbnail, original, width)
+            async with self._lock:
+                await asyncio.to_thread(self._write_entry, key, image, url)
+        except BaseException as error:
+            future.set_exception(error)
+            # 避免没有其他等待者时出现 "exception was never retrieved"
+            future.exception()
+            raise
+        else:
+            future.set_result(image)
+            return image
+        finally:
+            self._inflight.pop(key, None)
+
+    def _read_entry(self, key: str) -> CachedImage | None:
+        body_path, meta_path = self._paths(key)
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            body = body_path.read_bytes()
+        except (OSError, ValueError):
+            return None
+        if not isinstance(meta, dict):
+            return None
+        # 以旁路文件的修改时间记录最近访问，供磁盘 LRU 淘汰使用
+        try:
+            os.utime(meta_path)
+        except OSError:
+            pass
+        return CachedImage(body, str(meta.get("content_type") or ""), meta.get("etag"))
+
+    def _write_entry(self, key: str, image: CachedImage, url: str) -> None:
+        body_path, meta_path = self._paths(key)
+        body_path.parent.mkdir(parents=True, exist_ok=True)
+        previous_size = self._entry_size(body_path, meta_path)
+        body_path.write_bytes(image.body)
+        meta_path.write_text(json.dumps({"url": url, **image.meta()}, ensure_ascii=False), encoding="utf-8")
+        usage = self._current_disk_usage()
+        self._disk_usage = usage - previous_size + self._entry_size(body_path, meta_path)
+        if self._disk_usage > self.max_disk_bytes:
+            self._prune()
+
+    @staticmethod
+    def _entry_size(body_path: Path, meta_path: Path) -> int:
+        return sum(path.stat().st_size for path in (body_path, meta_path) if path.exists())
+
+    def _current_disk_usage(self) -> int:
+        if self._disk_usage is None:
+            self._disk_usage = sum(path.stat().st_size for path in self.root.glob("*") if path.is_file())
+        return self._disk_usage
+
+    def _prune(self) -> None:
+        """按旁路文件访问时间从旧到新删除条目，直到回落到上限的 90%。"""
+        entries = sorted(self.root.glob("*.json"), key=lambda path: path.stat().st_mtime)
+        target = int(self.max_disk_bytes * _PRUNE_TARGET_RATIO)
+        usage = self._current_disk_usage()
+        for meta_path in entries:
+            if usage <= target:
+                break
+            body_path = meta_path.with_suffix(".img")
+            usage -= self._entry_size(body_path, meta_path)
+            body_path.unlink(missing_ok=True)
+            meta_path.unlink(missing_ok=True)
+        self._disk_usage = max(usage, 0)
+
+
+_image_cache: ImageCache | None = None
+
+
+def get_image_cache() -> ImageCache:
+    """返回按配置初始化的进程内共享图片缓存。"""
+    global _image_cache  # noqa: PLW0603
+    if _image_cache is None:
+        _image_cache = ImageCache(max_disk_bytes=settings.EMBY_METADATA_IMAGE_CACHE_MAX_MB * 1024 * 1024)
+    return _image_cache
@@ -13,6 +13,7 @@ from bot.services.emby_metadata.models import (
     MetadataPerson,
     MetadataSearchResult,
 )
+from bot.services.emby_metadata.parser.soup import make_soup
 
 _DETAIL_PATH = re.compile(r"^/detail\.([A-Za-z0-9_-]+)\.html(?:[?#]|$)", re.IGNORECASE)
 
@@ -28,7 +29,7 @@ class AcceedParser:
     def parse_search_results(cls, html: str, limit: int = 10) -> list[MetadataSearchResult]:
         if limit <= 0:
             return []
-        soup = BeautifulSoup(html, "html.parser")
+        soup = make_soup(html, cls.source_name)
         results: list[MetadataSearchResult] = []
         seen: set[str] = set()
         for link in soup.select('a[href*="/detail."]'):
@@ -63,7 +64,7 @@ class AcceedParser:
     @classmethod
     def parse_detail(cls, html: str, source_id: str) -> MetadataCandidate:
         cls._validate_source_id(source_id)
-        soup = BeautifulSoup(html, "html.parser")
+        soup = make_soup(html, cls.source_name)
         page_title = cls._clean_text(soup.title.get_text(" ", strip=True)) if soup.title else ""
         if "ログイン" in page_title:
             msg = "详情请求被重定向到登录页"
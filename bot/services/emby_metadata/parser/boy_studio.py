@@ -13,6 +13,7 @@ from bot.services.emby_metadata.models import (
     MetadataPerson,
     MetadataSearchResult,
 )
+from bot.services.emby_metadata.parser.soup import make_soup
 
 
 class BoyStudioParser:
@@ -26,7 +27,7 @@ class BoyStudioParser:
     def parse_search_results(cls, html: str, limit: int = 10) -> list[MetadataSearchResult]:
         if limit <= 0:
             return []
-        soup = BeautifulSoup(html, "html.parser")
+        soup = make_soup(html, cls.source_name)
         results: list[MetadataSearchResult] = []
         seen: set[str] = set()
         for link in soup.select('a[href^="/videos/"]'):
@@ -59,7 +60,7 @@ class BoyStudioParser:
     @classmethod
     def parse_detail(cls, html: str, source_id: str) -> MetadataCandidate:
         cls._validate_source_id(source_id)
-        soup = BeautifulSoup(html, "html.parser")
+        soup = make_soup(html, cls.source_name)
         title_node = soup.select_one(".item__lower .item__title") or soup.select_one(".item__title")
         if not isinstance(title_node, Tag) or not title_node.get_text(strip=True):
             raise MetadataSourceParseError("详情页缺少作品标题", cls.source_name)
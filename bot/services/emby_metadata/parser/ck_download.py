@@ -13,6 +13,7 @@ from bot.services.emby_metadata.models import (
     MetadataPerson,
     MetadataSearchResult,
 )
+from bot.services.emby_metadata.parser.soup import make_soup
 
 _DETAIL_PATH = re.compile(r"^/product/detail/(\d+)(?:[/?#]|$)")
 _DATE_PATTERN = re.compile(r"(\d{4})[./-](\d{2})[./-](\d{2})")
@@ -30,7 +31,7 @@ class CkDownloadParser:
         """解析搜索结果页的基础信息，不请求商品详情页。"""
         if limit <= 0:
             return []
-        soup = BeautifulSoup(html, "html.parser")
+        soup = make_soup(html, cls.source_name)
         links = soup.select("#Contents.list_page ul.title_list > li > a[href*='/product/detail/']")
         if not links:
             links = soup.select('a[href*="/product/detail/"]')
@@ -72,7 +73,7 @@ class CkDownloadParser:
     def parse_detail(cls, html: str, source_id: str) -> MetadataCandidate:
         """解析商品标题、简介、标签、演员、封面等元数据。"""
         cls._validate_source_id(source_id)
-        soup = BeautifulSoup(html, "html.parser")
+        soup = make_soup(html, cls.source_name)
         heading = soup.select_one("#Contents.detail_page > h3") or soup.select_one(".detail_page > h3")
         if not isinstance(heading, Tag) or not heading.get_text(strip=True):
             raise MetadataSourceParseError("详情页缺少作品标题", cls.source_name)
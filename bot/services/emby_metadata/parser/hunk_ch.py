@@ -12,6 +12,7 @@ from bot.services.emby_metadata.models import (
     MetadataNamedItem,
     MetadataSearchResult,
 )
+from bot.services.emby_metadata.parser.soup import make_soup
 
 
 _DATE_PATTERN = re.compile(r"(\d{4})-(\d{2})-(\d{2})")
@@ -30,7 +31,7 @@ class HunkChParser:
         """解析 hunk-ch 搜索结果页。"""
         if limit <= 0:
             return []
-        soup = BeautifulSoup(html, "html.parser")
+        soup = make_soup(html, cls.source_name)
         results: list[MetadataSearchResult] = []
         seen: set[str] = set()
         for table in soup.select("#newmovie .movie table"):
@@ -65,7 +66,7 @@ class HunkChParser:
     def parse_detail(cls, html: str, source_id: str) -> MetadataCandidate:
         """解析 hunk-ch 详情页并转换为统一元数据模型。"""
         cls._validate_source_id(source_id)
-        soup = BeautifulSoup(html, "html.parser")
+        soup = make_soup(html, cls.source_name)
         heading = soup.select_one(".product_detail_centre > h2")
         if not isinstance(heading, Tag) or not heading.get_text(strip=True):
             raise MetadataSourceParseError("详情页缺少作品标题", cls.source_name)
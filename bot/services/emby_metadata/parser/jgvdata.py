@@ -12,6 +12,7 @@ from bot.services.emby_metadata.models import (
     MetadataNamedItem,
     MetadataSearchResult,
 )
+from bot.services.emby_metadata.parser.soup import make_soup
 
 
 _DATE_PATTERN = re.compile(r"([A-Z][a-z]{2})\.?\s+(\d{1,2}),\s+(\d{4})")
@@ -30,7 +31,7 @@ class JgvdataParser:
         """解析 jgvdata 文章列表。"""
         if limit <= 0:
             return []
-        soup = BeautifulSoup(html, "html.parser")
+        soup = make_soup(html, cls.source_name)
         results: list[MetadataSearchResult] = []
         seen: set[str] = set()
         for article in soup.select("article.mg-posts-sec-post"):
@@ -66,7 +67,7 @@ class JgvdataParser:
     def parse_detail(cls, html: str, source_id: str) -> MetadataCandidate:
         """解析 jgvdata 文章详情。"""
         cls._validate_source_id(source_id)
-        soup = BeautifulSoup(html, "html.parser")
+        soup = make_soup(html, cls.source_name)
         heading = soup.select_one("h1.title.single") or soup.select_one("h1")
         if not isinstance(heading, Tag) or not heading.get_text(strip=True):
             raise MetadataSourceParseError("详情页缺少作品标题", cls.source_name)
@@ -12,6 +12,7 @@ from bot.services.emby_metadata.models import (
     MetadataNamedItem,
     MetadataSearchResult,
 )
+from bot.services.emby_metadata.parser.soup import make_soup
 
 
 class KoShopParser:
@@ -26,7 +27,7 @@ class KoShopParser:
         """解析 ko-shop 商品列表。"""
         if limit <= 0:
             return []
-        soup = BeautifulSoup(html, "html.parser")
+        soup = make_soup(html, cls.source_name)
         results: list[MetadataSearchResult] = []
         seen: set[str] = set()
         for link in soup.select('a[href*="products/detail.php"]'):
@@ -59,7 +60,7 @@ class KoShopParser:
     def parse_detail(cls, html: str, source_id: str) -> MetadataCandidate:
         """解析 ko-shop 商品详情。"""
         cls._validate_source_id(source_id)
-        soup = BeautifulSoup(html, "html.parser")
+        soup = make_soup(html, cls.source_name)
         product = soup.select_one(".detail_product")
         heading = product.select_one("h2") if isinstance(product, Tag) else soup.select_one("h2")
         if not isinstance(heading, Tag) or not heading.get_text(strip=True):
@@ -12,6 +12,7 @@ from bot.services.emby_metadata.models import (
     MetadataPerson,
     MetadataSearchResult,
 )
+from bot.services.emby_metadata.parser.soup import make_soup
 
 
 class KoTubeParser:
@@ -45,7 +46,7 @@ class KoTubeParser:
 
     @classmethod
     def parse_search_results(cls, html: str, limit: int = 10) -> list[MetadataSearchResult]:
-        soup = BeautifulSoup(html, "html.parser")
+        soup = make_soup(html, cls.source_name)
         results: list[MetadataSearchResult] = []
         for card in soup.select(".title_list > li"):
             link = card.select_one('a[href*="/product/index/"],a[href*="/package/index/"]')
@@ -79,7 +80,7 @@ class KoTubeParser:
 
     @classmethod
     def parse_detail(cls, html: str, source_id: str) -> MetadataCandidate:
-        soup = BeautifulSoup(html, "html.parser")
+        soup = make_soup(html, cls.source_name)
         heading = soup.select_one("h3")
         if not isinstance(heading, Tag):
             raise MetadataSourceParseError("详情页缺少作品标题", cls.source_name)
@@ -4,6 +4,7 @@ from urllib.parse import parse_qs, urljoin, urlparse
 from bs4 import BeautifulSoup, Tag
 from bot.services.emby_metadata.errors import MetadataSourceParseError
 from bot.services.emby_metadata.models import MediaLibraryCategory, MetadataCandidate, MetadataNamedItem, MetadataPerson, MetadataSearchResult
+from bot.services.emby_metadata.parser.soup import make_soup
 
 
 class KoVideoParser:
@@ -30,7 +31,7 @@ class KoVideoParser:
 
     @classmethod
     def parse_search_results(cls, html: str, limit: int = 10) -> list[MetadataSearchResult]:
-        soup = BeautifulSoup(html, "html.parser")
+        soup = make_soup(html, cls.source_name)
         results = []
         for link in soup.select("a[href*='products/detail.php'][href*='product_code=']"):
             code = parse_qs(urlparse(str(link.get("href"))).query).get("product_code", [""])[0]
@@ -55,7 +56,7 @@ class KoVideoParser:
 
     @classmethod
     def parse_detail(cls, html: str, source_id: str) -> MetadataCandidate:
-        soup = BeautifulSoup(html, "html.parser")
+        soup = make_soup(html, cls.source_name)
         heading = soup.select_one("h2")
         if not isinstance(heading, Tag):
             raise MetadataSourceParseError("详情页缺少作品标题", cls.source_name)
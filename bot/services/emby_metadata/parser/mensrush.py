@@ -13,6 +13,7 @@ from bot.services.emby_metadata.models import (
     MetadataPerson,
     MetadataSearchResult,
 )
+from bot.services.emby_metadata.parser.soup import make_soup
 
 
 class MensrushParser:
@@ -27,7 +28,7 @@ class MensrushParser:
         """解析 Men's Rush 搜索结果。"""
         if limit <= 0:
             return []
-        soup = BeautifulSoup(html, "html.parser")
+        soup = make_soup(html, cls.source_name)
         results: list[MetadataSearchResult] = []
         seen: set[str] = set()
         for link in soup.select('.movie_lists .movie_box > a[href*="single.php?id="]'):
@@ -59,7 +60,7 @@ class MensrushParser:
     def parse_detail(cls, html: str, source_id: str) -> MetadataCandidate:
         """解析 Men's Rush 商品详情。"""
         cls._validate_source_id(source_id)
-        soup = BeautifulSoup(html, "html.parser")
+        soup = make_soup(html, cls.source_name)
         heading = soup.select_one(".detail_title h2")
         if not isinstance(heading, Tag) or not heading.get_text(strip=True):
             raise MetadataSourceParseError("详情页缺少作品标题", cls.source_name)
@@ -0,0 +1,89 @@
+"""元数据解析器共用的 BeautifulSoup 构建入口。
+
+所有解析器都通过 :func:`make_soup` 构建文档树，具体使用哪个解析后端由
+``EMBY_METADATA_HTML_BACKENDS`` 按数据源配置。lxml 未安装时自动回退到
+标准库 ``html.parser``，各后端在 fixtures 上的输出一致性由
+``bot.services.emby_metadata.benchmark`` 校验。
+"""
+
+from __future__ import annotations
+
+import contextlib
+from collections.abc import Iterator
+from contextvars import ContextVar
+from functools import lru_cache
+
+from bs4 import BeautifulSoup
+from bs4.builder import builder_registry
+from loguru import logger
+
+from bot.core.config import settings
+
+PYTHON_BACKEND = "html.parser"
+LXML_BACKEND = "lxml"
+SUPPORTED_BACKENDS = (PYTHON_BACKEND, LXML_BACKEND, "html5lib")
+DEFAULT_SOURCE_KEY = "default"
+
+_forced_backend: ContextVar[str | None] = ContextVar("emby_metadata_forced_html_backend", default=None)
+
+
+def is_backend_available(backend: str) -> bool:
+    """判断当前环境是否安装了指定的 BeautifulSoup 后端。"""
+    return builder_registry.lookup(backend) is not None
+
+
+def parse_backend_config(value: str) -> dict[str, str]:
+    """解析 ``default=lxml,ko-shop=html.parser`` 形式的后端配置。
+
+    只写后端名（如 ``lxml``）等价于 ``default=lxml``。
+    """
+    backends: dict[str, str] = {}
+    for item in value.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        source, _, backend = item.rpartition("=")
+        source = source.strip() or DEFAULT_SOURCE_KEY
+        backend = backend.strip().lower()
+        if backend not in SUPPORTED_BACKENDS:
+            msg = f"不支持的 HTML 解析后端: {backend}"
+            raise ValueError(msg)
+        backends[source] = backend
+    return backends
+
+
+@lru_cache(maxsize=1)
+def _configured_backends() -> dict[str, str]:
+    return parse_backend_config(settings.EMBY_METADATA_HTML_BACKENDS)
+
+
+@lru_cache(maxsize=32)
+def _available_or_fallback(backend: str) -> str:
+    if is_backend_available(backend):
+        return backend
+    logger.warning("⚠️ HTML 解析后端 {} 未安装，回退到 {}", backend, PYTHON_BACKEND)
+    return PYTHON_BACKEND
+
+
+def resolve_backend(source_name: str) -> str:
+    """返回指定数据源实际使用的解析后端。"""
+    backend = _forced_backend.get()
+    if backend is None:
+        configured = _configured_backends()
+        backend = configured.get(source_name) or configured.get(DEFAULT_SOURCE_KEY) or LXML_BACKEND
+    return _available_or_fallback(backend)
+
+
+def make_soup(html: str, source_name: str) -> BeautifulSoup:
+    """按数据源配置的后端构建 BeautifulSoup 文档树。"""
+    return BeautifulSoup(html, resolve_backend(source_name))
+
+
+@contextlib.contextmanager
+def forced_backend(backend: str) -> Iterator[None]:
+    """在当前上下文内让所有解析器使用指定后端，供基准和一致性校验使用。"""
+    token = _forced_backend.set(backend)
+    try:
+        yield
+    finally:
+        _forced_backend.reset(token)
@@ -4,6 +4,7 @@ from urllib.parse import parse_qs, urljoin, urlparse
 from bs4 import BeautifulSoup, Tag
 from bot.services.emby_metadata.errors import MetadataSourceParseError
 from bot.services.emby_metadata.models import MediaLibraryCategory, MetadataCandidate, MetadataNamedItem, MetadataPerson, MetadataSearchResult
+from bot.services.emby_metadata.parser.soup import make_soup
 
 
 class Str8BoysParser:
@@ -38,7 +39,7 @@ class Str8BoysParser:
 
     @classmethod
     def parse_search_results(cls, html: str, limit: int = 10) -> list[MetadataSearchResult]:
-        soup = BeautifulSoup(html, "html.parser")
+        soup = make_soup(html, cls.source_name)
         results = []
         for card in soup.select("li.thumbox"):
             link = card.select_one('a[href*="detail.php"]')
@@ -73,7 +74,7 @@ class Str8BoysParser:
 
     @classmethod
     def parse_detail(cls, html: str, source_id: str) -> MetadataCandidate:
-        soup = BeautifulSoup(html, "html.parser"); heading = soup.select_one("h1")
+        soup = make_soup(html, cls.source_name); heading = soup.select_one("h1")
         if not isinstance(heading, Tag): raise MetadataSourceParseError("详情页缺少作品标题", cls.source_name)
         fields = {}
         for dt in soup.select("dl dt"):
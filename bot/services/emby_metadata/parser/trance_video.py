@@ -4,6 +4,7 @@ from urllib.parse import urljoin
 from bs4 import BeautifulSoup, Tag
 from bot.services.emby_metadata.errors import MetadataSourceParseError
 from bot.services.emby_metadata.models import MediaLibraryCategory, MetadataCandidate, MetadataNamedItem, MetadataSearchResult
+from bot.services.emby_metadata.parser.soup import make_soup
 
 
 class TranceVideoParser:
@@ -25,7 +26,7 @@ class TranceVideoParser:
 
     @classmethod
     def parse_search_results(cls, html: str, limit: int = 10) -> list[MetadataSearchResult]:
-        soup = BeautifulSoup(html, "html.parser")
+        soup = make_soup(html, cls.source_name)
         results = []
         for card in soup.select(".title_list > li"):
             link = card.select_one('a[href^="/product/detail/"]')
@@ -61,7 +62,7 @@ class TranceVideoParser:
 
     @classmethod
     def parse_detail(cls, html: str, source_id: str) -> MetadataCandidate:
-        soup = BeautifulSoup(html, "html.parser"); heading = soup.select_one("h3")
+        soup = make_soup(html, cls.source_name); heading = soup.select_one("h3")
         if not isinstance(heading, Tag): raise MetadataSourceParseError("详情页缺少作品标题", cls.source_name)
         fields = {}
         for tr in soup.select("table tr"):
@@ -32,11 +32,11 @@ class AcceedSource(HttpMetadataSource):
         """按关键字搜索 ACCEED。"""
         path = "/search.php?" + urlencode({"s": keyword.strip()})
         html = await self._request_text(path)
-        return AcceedParser.parse_search_results(html, limit)
+        return await self._parse(AcceedParser.parse_search_results, html, limit)
 
     async def fetch_detail(self, source_id: str) -> MetadataCandidate:
         """抓取 ACCEED 详情页。"""
         AcceedParser._validate_source_id(source_id)
         search_path = "/search.php?" + urlencode({"s": source_id})
         _, html = await self._request_text_sequence((search_path, f"/detail.{source_id}.html"))
-        return AcceedParser.parse_detail(html, source_id)
+        return await self._parse(AcceedParser.parse_detail, html, source_id)
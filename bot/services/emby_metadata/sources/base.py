@@ -1,7 +1,12 @@
 """元数据数据源的抽象接口和通用 HTTP 能力。"""
 
+import asyncio
 from abc import ABC, abstractmethod
-from urllib.parse import urljoin
+from collections.abc import AsyncIterator, Callable
+from contextlib import asynccontextmanager
+from http import HTTPStatus
+from typing import Any, TypeVar
+from urllib.parse import urljoin, urlsplit
 
 import aiohttp
 
@@ -12,11 +17,22 @@ from bot.services.emby_metadata.errors import (
     MetadataSourceNetworkError,
     MetadataSourceParseError,
 )
+from bot.services.emby_metadata.http_cache import (
+    CACHE_MODE_RECORD,
+    CACHE_MODE_REPLAY,
+    CachedResponse,
+    ResponseCache,
+    cache_key,
+    get_response_cache,
+)
 from bot.services.emby_metadata.models import (
     MediaLibraryCategory,
     MetadataCandidate,
     MetadataSearchResult,
 )
+from bot.utils.metrics import OUTBOUND_SECONDS, normalize_path, status_class
+
+ParseResult = TypeVar("ParseResult")
 
 
 class MetadataSource(ABC):
@@ -38,10 +54,10 @@ class MetadataSource(ABC):
 
 
 class HttpMetadataSource(MetadataSource):
-    """提供可复用的 HTTP、Cookie、重试和图片请求能力。
+    """提供可复用的 HTTP、Cookie、重试、响应缓存和图片请求能力。
 
-    子类只声明本站的请求头、证书策略和 URL/表单差异；Cookie 由公共层按
-    数据源名称读取本地配置。
+    子类只声明本站的请求头、证书策略、缓存有效期和 URL/表单差异；Cookie
+    由公共层按数据源名称读取本地配置。
     """
 
     default_headers: dict[str, str] = {}
@@ -49,16 +65,22 @@ class HttpMetadataSource(MetadataSource):
     verify_ssl = True
     max_request_attempts = 2
     request_timeout_seconds = 15.0
+    response_cache_ttl_seconds = 6 * 3600.0
+    # 超过该长度的页面放到工作线程解析，避免长时间占用事件循环
+    thread_parse_min_chars = 64 * 1024
 
     def __init__(
         self,
         timeout_seconds: float | None = None,
         cookie_manager: CookieManager | None = None,
+        response_cache: ResponseCache | None = None,
     ) -> None:
-        """初始化超时配置和 Cookie 提供者。"""
+        """初始化超时配置、Cookie 提供者和页面缓存。"""
         timeout = timeout_seconds or self.request_timeout_seconds
         self._timeout = aiohttp.ClientTimeout(total=timeout)
         self._cookie_manager = cookie_manager or CookieManager()
+        self._response_cache = response_cache or get_response_cache()
+        self._used_cache_keys: list[str] = []
 
     def image_headers(self, referer: str | None = None) -> dict[str, str]:
         """返回下载来源图片时使用的请求头。"""
@@ -112,6 +134,20 @@ class HttpMetadataSource(MetadataSource):
             raise ValueError(msg)
 
         urls = [urljoin(f"{self.base_url}/", path.lstrip("/")) for path in paths]
+        keys = [cache_key(method, url, form_data) for url in urls]
+        self._used_cache_keys.extend(keys)
+        cached = [await self._response_cache.get(self.name, key) for key in keys]
+        mode = self._response_cache.mode
+        if mode == CACHE_MODE_REPLAY:
+            if any(entry is None for entry in cached):
+                msg = "回放模式下缺少已录制的页面"
+                raise MetadataSourceNetworkError(msg, self.name)
+            return [entry.body for entry in cached if entry is not None]
+        if mode != CACHE_MODE_RECORD and all(
+            entry is not None and entry.is_fresh(self.response_cache_ttl_seconds) for entry in cached
+        ):
+            return [entry.body for entry in cached if entry is not None]
+
         last_network_error: Exception | None = None
 
         for attempt in range(self.max_request_attempts):
@@ -123,17 +159,38 @@ class HttpMetadataSource(MetadataSource):
                     connector=connector,
                 ) as session:
                     texts: list[str] = []
-                    for url in urls:
-                        async with session.request(
+                    for url, key, entry in zip(urls, keys, cached):
+                        validators = entry.validator_headers() if entry and mode != CACHE_MODE_RECORD else {}
+                        async with self._timed_request(
+                            session,
                             method,
                             url,
                             data=form_data,
                             allow_redirects=allow_redirects,
+                            headers=validators,
                         ) as response:
+                            if response.status == HTTPStatus.NOT_MODIFIED and entry is not None:
+                                await self._response_cache.touch(self.name, key, entry)
+                                texts.append(entry.body)
+                                continue
                             if response.status >= 400:
                                 message = f"HTTP {response.status}: {response.reason}"
                                 raise MetadataSourceHTTPError(message, self.name)
-                            texts.append(await response.text())
+                            text = await response.text()
+                            texts.append(text)
+                            await self._response_cache.put(
+                                self.name,
+                                key,
+                                CachedResponse(
+                                    method=method,
+                                    url=url,
+                                    body=text,
+                                    form=form_data,
+                                    etag=response.headers.get("ETag"),
+                                    last_modified=response.headers.get("Last-Modified"),
+                                    content_type=response.content_type,
+                                ),
+                            )
                     return texts
             except MetadataSourceHTTPError:
                 raise
@@ -146,3 +203,34 @@ class HttpMetadataSource(MetadataSource):
             str(last_network_error or "请求失败"),
             self.name,
         )
+
+    @asynccontextmanager
+    async def _timed_request(
+        self,
+        session: aiohttp.ClientSession,
+        method: str,
+        url: str,
+        **kwargs: Any,
+    ) -> AsyncIterator[aiohttp.ClientResponse]:
+        """发起请求并按数据源记录耗时，耗时包含读取响应体。"""
+        with OUTBOUND_SECONDS.time(
+            service=f"metadata:{self.name}",
+            method=method,
+            endpoint=normalize_path(urlsplit(url).path),
+            status="error",
+        ) as labels:
+            async with session.request(method, url, **kwargs) as response:
+                labels["status"] = status_class(response.status)
+                yield response
+
+    async def discard_cached_responses(self) -> None:
+        """丢弃本实例读取或写入过的缓存页面，避免登录页等异常页面被反复复用。"""
+        keys, self._used_cache_keys = self._used_cache_keys, []
+        for key in dict.fromkeys(keys):
+            await self._response_cache.discard(self.name, key)
+
+    async def _parse(self, parse: Callable[..., ParseResult], html: str, *args: Any) -> ParseResult:
+        """调用解析器；大页面在工作线程中解析。"""
+        if len(html) < self.thread_parse_min_chars:
+            return parse(html, *args)
+        return await asyncio.to_thread(parse, html, *args)
@@ -32,10 +32,10 @@ class BoyStudioSource(HttpMetadataSource):
         """按作品标题搜索 Boy Studio。"""
         path = "/videos/?" + urlencode({"q": keyword.strip()})
         html = await self._request_text(path)
-        return BoyStudioParser.parse_search_results(html, limit)
+        return await self._parse(BoyStudioParser.parse_search_results, html, limit)
 
     async def fetch_detail(self, source_id: str) -> MetadataCandidate:
         """抓取 Boy Studio 视频详情。"""
         BoyStudioParser._validate_source_id(source_id)
         html = await self._request_text(f"/videos/{source_id}/")
-        return BoyStudioParser.parse_detail(html, source_id)
+        return await self._parse(BoyStudioParser.parse_detail, html, source_id)
@@ -11,6 +11,7 @@ class CkDownloadSource(HttpMetadataSource):
     name = CkDownloadParser.source_name
     category = CkDownloadParser.category
     base_url = CkDownloadParser.base_url
+    response_cache_ttl_seconds = 24 * 3600.0
     default_headers = {
         "User-Agent": "EmbyMetadataManager/1.0 (+private metadata lookup)",
         "Accept-Language": "ja,en;q=0.8",
@@ -35,10 +36,10 @@ class CkDownloadSource(HttpMetadataSource):
                 "only_nm": "0",
             },
         )
-        return CkDownloadParser.parse_search_results(html, limit)
+        return await self._parse(CkDownloadParser.parse_search_results, html, limit)
 
     async def fetch_detail(self, source_id: str) -> MetadataCandidate:
         """请求详情页，并交由 ck-download parser 解析。"""
         CkDownloadParser._validate_source_id(source_id)
         html = await self._request_text(f"/product/detail/{source_id}")
-        return CkDownloadParser.parse_detail(html, source_id)
+        return await self._parse(CkDownloadParser.parse_detail, html, source_id)
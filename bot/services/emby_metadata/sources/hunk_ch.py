@@ -15,6 +15,7 @@ class HunkChSource(HttpMetadataSource):
     category = HunkChParser.category
     base_url = HunkChParser.base_url
     request_timeout_seconds = 25.0
+    response_cache_ttl_seconds = 24 * 3600.0
     default_headers = {
         "User-Agent": "EmbyMetadataManager/1.0 (+private metadata lookup)",
         "Accept-Language": "ja,en;q=0.8",
@@ -27,7 +28,7 @@ class HunkChSource(HttpMetadataSource):
             {"s": normalized_keyword, "search_flag": "all"}
         )
         html = await self._request_text(path)
-        results = HunkChParser.parse_search_results(html, limit)
+        results = await self._parse(HunkChParser.parse_search_results, html, limit)
         comparison_key = "".join(
             character for character in normalized_keyword.upper() if character.isalnum()
         )
@@ -51,4 +52,4 @@ class HunkChSource(HttpMetadataSource):
         HunkChParser._validate_source_id(source_id)
         path = "/movie_detail.php?" + urlencode({"code": source_id})
         html = await self._request_text(path)
-        return HunkChParser.parse_detail(html, source_id)
+        return await self._parse(HunkChParser.parse_detail, html, source_id)
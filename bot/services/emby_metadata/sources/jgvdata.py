@@ -22,14 +22,14 @@ class JgvdataSource(HttpMetadataSource):
     async def search(self, keyword: str, limit: int = 10) -> list[MetadataSearchResult]:
         """搜索 JGVData 文章。"""
         html = await self._request_text("/?" + urlencode({"s": keyword.strip()}))
-        return JgvdataParser.parse_search_results(html, limit)
+        return await self._parse(JgvdataParser.parse_search_results, html, limit)
 
     async def fetch_detail(self, source_id: str) -> MetadataCandidate:
         """先搜索定位 JGVData 详情链接，再抓取详情页。"""
         search_html = await self._request_text("/?" + urlencode({"s": source_id}))
-        results = JgvdataParser.parse_search_results(search_html, limit=50)
+        results = await self._parse(JgvdataParser.parse_search_results, search_html, 50)
         result = next((item for item in results if item.source_id == source_id), None)
         if result is None:
             raise ValueError(f"jgvdata 未找到作品: {source_id}")
         html = await self._request_text(result.detail_url)
-        return JgvdataParser.parse_detail(html, source_id)
+        return await self._parse(JgvdataParser.parse_detail, html, source_id)
@@ -15,6 +15,7 @@ class KoShopSource(HttpMetadataSource):
     base_url = KoShopParser.base_url
     verify_ssl = False
     request_timeout_seconds = 25.0
+    response_cache_ttl_seconds = 24 * 3600.0
     default_headers = {
         "User-Agent": "EmbyMetadataManager/1.0",
         "Accept-Language": "ja,en;q=0.8",
@@ -24,10 +25,10 @@ class KoShopSource(HttpMetadataSource):
         """搜索 Ko-Shop 商品。"""
         path = "/products/list.php?" + urlencode({"word": keyword.strip()})
         html = await self._request_text(path)
-        return KoShopParser.parse_search_results(html, limit)
+        return await self._parse(KoShopParser.parse_search_results, html, limit)
 
     async def fetch_detail(self, source_id: str) -> MetadataCandidate:
         """抓取 Ko-Shop 商品详情。"""
         KoShopParser._validate_source_id(source_id)
         html = await self._request_text(f"/products/detail.php?product_id={source_id}")
-        return KoShopParser.parse_detail(html, source_id)
+        return await self._parse(KoShopParser.parse_detail, html, source_id)
@@ -48,10 +48,10 @@ class KoTubeSource(HttpMetadataSource):
                 "data[Search][search_option1]": "1",
             },
         )
-        return KoTubeParser.parse_search_results(html, limit)
+        return await self._parse(KoTubeParser.parse_search_results, html, limit)
 
     async def fetch_detail(self, source_id: str) -> MetadataCandidate:
         """抓取 ko-tube product 或 package 详情。"""
         path = KoTubeParser.detail_url(source_id).removeprefix(self.base_url)
         html = await self._request_text(path)
-        return KoTubeParser.parse_detail(html, source_id)
+        return await self._parse(KoTubeParser.parse_detail, html, source_id)
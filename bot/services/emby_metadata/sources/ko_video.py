@@ -27,10 +27,10 @@ class KoVideoSource(HttpMetadataSource):
         html = await self._request_text(
             f"/products/list.php?name={quote_plus(keyword.strip())}"
         )
-        return KoVideoParser.parse_search_results(html, limit)
+        return await self._parse(KoVideoParser.parse_search_results, html, limit)
 
     async def fetch_detail(self, source_id: str) -> MetadataCandidate:
         """抓取 ko-video 商品详情。"""
         path = KoVideoParser.detail_url(source_id).removeprefix(self.base_url)
         html = await self._request_text(path)
-        return KoVideoParser.parse_detail(html, source_id)
+        return await self._parse(KoVideoParser.parse_detail, html, source_id)
@@ -24,7 +24,7 @@ class MensrushSource(HttpMetadataSource):
         html = await self._request_text(
             "/list.php?" + urlencode({"keyword": keyword.strip()})
         )
-        results = MensrushParser.parse_search_results(html, limit=100)
+        results = await self._parse(MensrushParser.parse_search_results, html, 100)
         normalized_keyword = keyword.strip().upper()
         if normalized_keyword:
             results = [
@@ -41,4 +41,4 @@ class MensrushSource(HttpMetadataSource):
         html = await self._request_text(
             "/single.php?" + urlencode({"id": source_id})
         )
-        return MensrushParser.parse_detail(html, source_id)
+        return await self._parse(MensrushParser.parse_detail, html, source_id)
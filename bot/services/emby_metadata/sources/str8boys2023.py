@@ -29,7 +29,7 @@ class Str8BoysSource(HttpMetadataSource):
             f"{quote_plus(keyword.strip())}&cid=1&scid=&avid=&purchased_contents="
         )
         html = await self._request_text(path)
-        return Str8BoysParser.parse_search_results(html, limit)
+        return await self._parse(Str8BoysParser.parse_search_results, html, limit)
 
     async def fetch_detail(self, source_id: str) -> MetadataCandidate:
         """抓取 str8boys2023 商品详情。"""
@@ -53,4 +53,4 @@ class Str8BoysSource(HttpMetadataSource):
             source_id = matched_result.source_id
         path = Str8BoysParser.detail_url(source_id).removeprefix(self.base_url)
         html = await self._request_text(path)
-        return Str8BoysParser.parse_detail(html, source_id)
+        return await self._parse(Str8BoysParser.parse_detail, html, source_id)
@@ -25,10 +25,10 @@ class TranceVideoSource(HttpMetadataSource):
         """先请求搜索入口并在同一请求中跟随 302 到结果页。"""
         path = f"/product/search?keyword={quote_plus(keyword.strip())}"
         html = await self._request_text(path, allow_redirects=True)
-        return TranceVideoParser.parse_search_results(html, limit)
+        return await self._parse(TranceVideoParser.parse_search_results, html, limit)
 
     async def fetch_detail(self, source_id: str) -> MetadataCandidate:
         """抓取 trance-video 商品详情。"""
         path = TranceVideoParser.detail_url(source_id).removeprefix(self.base_url)
         html = await self._request_text(path)
-        return TranceVideoParser.parse_detail(html, source_id)
+        return await self._parse(TranceVideoParser.parse_detail, html, source_id)
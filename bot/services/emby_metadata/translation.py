@@ -1,15 +1,26 @@
-"""使用 xAI Responses API 将元数据简介翻译成中文。"""
+"""使用 xAI Responses API 将元数据简介翻译成中文。
+
+译文按 ``规范化原文 + 模型 + 指令`` 的哈希保存在翻译记忆中（内存 LRU +
+磁盘），相同文本再次翻译时直接返回，并发的相同请求只调用一次 API。
+多段文本通过 :func:`translate_many` 打包成 JSON 数组批量翻译。
+"""
 
 from __future__ import annotations
 import asyncio
+import hashlib
 import json
+import re
+import time
+import unicodedata
 from collections.abc import Mapping
 from typing import Any
 
 import aiohttp
 from loguru import logger
 
-from bot.core.config import settings
+from bot.core.config import DIR, settings
+from bot.services.emby_metadata.http_cache import CachedResponse, ResponseCache
+from bot.utils.metrics import OUTBOUND_SECONDS, status_class
 
 TRANSLATION_INSTRUCTIONS = """你是一个专业的多语言到中文翻译器。请先自动识别用户输入的语言，再把原文翻译成自然、准确的中文；输入通常是日语，也可能是英语或其他语言。
 
@@ -30,12 +41,30 @@ TRANSLATION_INSTRUCTIONS = """你是一个专业的多语言到中文翻译器
 - 无论原文是什么语言，都必须输出中文译文；不要原样复述原文。
 - 如果原文已经是中文，也只需保持其中文内容，不要添加说明。"""
 
+BATCH_TRANSLATION_INSTRUCTIONS = TRANSLATION_INSTRUCTIONS + """
+
+批量模式（优先于上面的输出格式要求）：
+- 输入是一个 JSON 字符串数组，每个元素都是一段相互独立的原文。
+- 按上面的要求逐个翻译，输出与输入等长、顺序一致的 JSON 字符串数组。
+- 不要合并、拆分或遗漏任何元素，只输出这个 JSON 数组本身。"""
+
 _MAX_RETRIES = 3
 _RETRYABLE_STATUSES = frozenset({429, 500, 502, 503, 504})
 _RETRY_BACKOFF_SECONDS = 1
 _TRANSLATION_CONCURRENCY = 5
 _HTTP_ERROR_STATUS = 400
 
+TRANSLATION_MEMORY_ROOT = DIR / "data" / "emby_metadata" / "translation_memory"
+_TRANSLATION_MEMORY_MAX_BYTES = 64 * 1024 * 1024
+_TRANSLATION_MEMORY_NAMESPACE = "xai"
+_INLINE_WHITESPACE_PATTERN = re.compile(r"[^\S\n]+")
+# 批量请求的打包上限，以及长文本按句切分的片段长度
+_BATCH_MAX_SEGMENTS = 20
+_BATCH_MAX_CHARS = 4000
+_SEGMENT_MAX_CHARS = 1500
+_SENTENCE_SPLIT_PATTERN = re.compile(r"(?<=[。！？!?])|(?<=\.)(?=\s)")
+_CODE_FENCE_PATTERN = re.compile(r"^```(?:json)?\s*|\s*```$")
+
 
 class _TranslationRuntime:
     """保存翻译服务的进程内共享资源。"""
@@ -44,6 +73,8 @@ class _TranslationRuntime:
         self.session: aiohttp.ClientSession | None = None
         self.session_lock = asyncio.Lock()
         self.semaphore = asyncio.Semaphore(_TRANSLATION_CONCURRENCY)
+        self.memory: ResponseCache | None = None
+        self.inflight: dict[str, asyncio.Future[str]] = {}
 
 
 _runtime = _TranslationRuntime()
@@ -113,12 +144,12 @@ def extract_output_text(body: Mapping[str, Any]) -> str | None:
     return None
 
 
-def _request_payload(text: str) -> dict[str, Any]:
+def _request_payload(text: str, instructions: str = TRANSLATION_INSTRUCTIONS) -> dict[str, Any]:
     """构建单次 xAI Responses API 翻译请求。"""
     payload: dict[str, Any] = {
         "model": settings.XAI_MODEL,
         "store": False,
-        "instructions": TRANSLATION_INSTRUCTIONS,
+        "instructions": instructions,
         "input": text,
     }
     if "non-reasoning" not in settings.XAI_MODEL.casefold():
@@ -126,13 +157,21 @@ def _request_payload(text: str) -> dict[str, Any]:
     return payload
 
 
-async def _post_translation(text: str) -> dict[str, Any]:
+def _observe_xai(start: float, status: int | None) -> None:
+    OUTBOUND_SECONDS.observe(
+        time.perf_counter() - start, service="xai", method="POST", endpoint="/responses", status=status_class(status)
+    )
+
+
+async def _post_translation(text: str, instructions: str = TRANSLATION_INSTRUCTIONS) -> dict[str, Any]:
     """发送翻译请求，并对暂时性失败执行指数退避重试。"""
     session = await _get_session()
     for attempt in range(_MAX_RETRIES + 1):
         try:
-            async with session.post(settings.XAI_API_BASE, json=_request_payload(text)) as response:
+            start = time.perf_counter()
+            async with session.post(settings.XAI_API_BASE, json=_request_payload(text, instructions)) as response:
                 raw_body = await response.text()
+                _observe_xai(start, response.status)
                 if response.status in _RETRYABLE_STATUSES and attempt < _MAX_RETRIES:
                     logger.warning(
                         "xAI 翻译请求返回 HTTP {}，将重试（{}/{}）",
@@ -158,6 +197,7 @@ async def _post_translation(text: str) -> dict[str, Any]:
                     error_message = message if isinstance(message, str) else f"xAI API 请求失败: HTTP {response.status}"
                     raise RuntimeError(error_message)
         except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+            _observe_xai(start, None)
             if attempt == _MAX_RETRIES:
                 msg = "xAI 翻译服务暂时不可用"
                 raise RuntimeError(msg) from error
@@ -169,15 +209,89 @@ async def _post_translation(text: str) -> dict[str, Any]:
     raise RuntimeError(msg)
 
 
-async def translate_to_chinese(input_text: str) -> str:
-    """调用 xAI Responses API 翻译简介并返回纯文本结果。"""
-    text = input_text.strip()
+def _normalize_source_text(text: str) -> str:
+    """统一 Unicode 形式、换行和行内空白，让仅排版不同的原文命中同一条记忆。"""
+    text = unicodedata.normalize("NFC", text).replace("\r\n", "\n").replace("\r", "\n")
+    lines = (_INLINE_WHITESPACE_PATTERN.sub(" ", line).strip() for line in text.split("\n"))
+    return "\n".join(lines).strip()
+
+
+def translation_memory_key(text: str, instructions: str = TRANSLATION_INSTRUCTIONS) -> str:
+    """按规范化原文、模型和实际产生译文的翻译指令生成翻译记忆键。"""
+    raw = json.dumps(
+        [_normalize_source_text(text), settings.XAI_MODEL, instructions],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _get_memory() -> ResponseCache:
+    """返回进程内共享的翻译记忆。"""
+    if _runtime.memory is None:
+        _runtime.memory = ResponseCache(TRANSLATION_MEMORY_ROOT, max_disk_bytes=_TRANSLATION_MEMORY_MAX_BYTES)
+    return _runtime.memory
+
+
+def split_for_translation(text: str, limit: int = _SEGMENT_MAX_CHARS) -> list[tuple[str, str]]:
+    """按段落和句子把长文本切成不超过 ``limit`` 的片段。
+
+    返回 ``(片段, 片段后的分隔符)`` 列表，译文按同样的分隔符拼回原结构。
+    """
+    if len(text) <= limit:
+        return [(text, "")]
+    chunks: list[tuple[str, str]] = []
+    for paragraph in text.split("\n"):
+        current = ""
+        for sentence in _SENTENCE_SPLIT_PATTERN.split(paragraph):
+            while len(sentence) > limit:
+                if current:
+                    chunks.append((current, ""))
+                    current = ""
+                chunks.append((sentence[:limit], ""))
+                sentence = sentence[limit:]
+            if current and len(current) + len(sentence) > limit:
+                chunks.append((current, ""))
+                current = ""
+            current += sentence
+        chunks.append((current, "\n"))
+    last_chunk, _ = chunks[-1]
+    chunks[-1] = (last_chunk, "")
+    return chunks
+
+
+def _pack_segments(segments: list[str]) -> list[list[str]]:
+    """把短片段按数量和总长度上限打包成批。"""
+    batches: list[list[str]] = []
+    current: list[str] = []
+    size = 0
+    for segment in segments:
+        if current and (len(current) >= _BATCH_MAX_SEGMENTS or size + len(segment) > _BATCH_MAX_CHARS):
+            batches.append(current)
+            current, size = [], 0
+        current.append(segment)
+        size += len(segment)
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _parse_batch_output(text: str | None, expected: int) -> list[str] | None:
+    """解析批量译文 JSON 数组，结构不符时返回 None。"""
     if not text:
-        return ""
-    if not settings.XAI_API_KEY:
-        msg = "XAI_API_KEY 未配置"
-        raise RuntimeError(msg)
+        return None
+    try:
+        values = json.loads(_CODE_FENCE_PATTERN.sub("", text.strip()))
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(values, list) or len(values) != expected:
+        return None
+    if not all(isinstance(value, str) and value.strip() for value in values):
+        return None
+    return [value.strip() for value in values]
 
+
+async def _translate_uncached(text: str) -> str:
+    """直接调用 xAI 翻译单段文本。"""
     async with _runtime.semaphore:
         body = await _post_translation(text)
     result = extract_output_text(body)
@@ -185,3 +299,107 @@ async def translate_to_chinese(input_text: str) -> str:
         return result
     msg = "xAI API 返回中没有找到翻译文本"
     raise RuntimeError(msg)
+
+
+async def _translate_batch(segments: list[str]) -> tuple[list[str], str]:
+    """用一次请求翻译多段文本；译文无法按段解析时逐段单独请求。
+
+    同时返回实际使用的翻译指令，用于生成翻译记忆键。
+    """
+    if len(segments) == 1:
+        return [await _translate_uncached(segments[0])], TRANSLATION_INSTRUCTIONS
+    async with _runtime.semaphore:
+        body = await _post_translation(json.dumps(segments, ensure_ascii=False), BATCH_TRANSLATION_INSTRUCTIONS)
+    results = _parse_batch_output(extract_output_text(body), len(segments))
+    if results is not None:
+        return results, BATCH_TRANSLATION_INSTRUCTIONS
+    logger.warning("xAI 批量翻译结果无法解析，改为逐段翻译 {} 段", len(segments))
+    return list(await asyncio.gather(*(_translate_uncached(segment) for segment in segments))), TRANSLATION_INSTRUCTIONS
+
+
+async def _translate_segments(segments: list[str]) -> dict[str, str]:
+    """翻译去重后的片段：先查翻译记忆，再把未命中的片段打包请求。
+
+    同一片段的并发请求共享结果，失败的片段不会写入记忆。
+    """
+    memory = _get_memory()
+    results: dict[str, str] = {}
+    waiting: dict[str, asyncio.Future[str]] = {}
+    owned: dict[str, asyncio.Future[str]] = {}
+    loop = asyncio.get_running_loop()
+    for segment in segments:
+        key = translation_memory_key(segment)
+        entry = None
+        for instructions in (TRANSLATION_INSTRUCTIONS, BATCH_TRANSLATION_INSTRUCTIONS):
+            entry = await memory.get(_TRANSLATION_MEMORY_NAMESPACE, translation_memory_key(segment, instructions))
+            if entry is not None:
+                break
+        if entry is not None:
+            results[segment] = entry.body
+        elif key in _runtime.inflight:
+            waiting[segment] = _runtime.inflight[key]
+        else:
+            owned[segment] = _runtime.inflight[key] = loop.create_future()
+
+    errors: list[BaseException] = []
+    try:
+        batches = _pack_segments(list(owned))
+        outcomes = await asyncio.gather(*(_translate_batch(batch) for batch in batches), return_exceptions=True)
+        for batch, outcome in zip(batches, outcomes):
+            if isinstance(outcome, BaseException):
+                errors.append(outcome)
+                continue
+            translations, instructions = outcome
+            for segment, translated in zip(batch, translations):
+                results[segment] = translated
+                await memory.put(
+                    _TRANSLATION_MEMORY_NAMESPACE,
+                    translation_memory_key(segment, instructions),
+                    CachedResponse(
+                        method="TRANSLATE",
+                        url=f"translation:{settings.XAI_MODEL}",
+                        body=translated,
+                        content_type="text/plain",
+                    ),
+                )
+    finally:
+        error = errors[0] if errors else RuntimeError("翻译已取消")
+        for segment, future in owned.items():
+            _runtime.inflight.pop(translation_memory_key(segment), None)
+            if segment in results:
+                future.set_result(results[segment])
+            else:
+                future.set_exception(error)
+                # 避免没有其他等待者时出现 "exception was never retrieved"
+                future.exception()
+    if errors:
+        raise errors[0]
+    for segment, future in waiting.items():
+        results[segment] = await asyncio.shield(future)
+    return results
+
+
+async def translate_many(input_texts: list[str]) -> list[str]:
+    """批量翻译多段文本，按输入顺序返回译文；空文本原样返回空字符串。
+
+    长文本按句切分，短片段打包进同一次请求，已翻译过的片段直接取自翻译记忆。
+    """
+    texts = [text.strip() for text in input_texts]
+    if not any(texts):
+        return ["" for _ in texts]
+    if not settings.XAI_API_KEY:
+        msg = "XAI_API_KEY 未配置"
+        raise RuntimeError(msg)
+
+    plans = [split_for_translation(text) if text else [] for text in texts]
+    segments = list(dict.fromkeys(chunk for plan in plans for chunk, _ in plan if chunk.strip()))
+    translated = await _translate_segments(segments)
+    return [
+        "".join((translated[chunk] if chunk.strip() else chunk) + separator for chunk, separator in plan)
+        for plan in plans
+    ]
+
+
+async def translate_to_chinese(input_text: str) -> str:
+    """调用 xAI Responses API 翻译简介并返回纯文本结果，优先使用翻译记忆。"""
+    return (await translate_many([input_text]))[0]
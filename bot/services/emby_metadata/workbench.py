@@ -3,15 +3,20 @@
 from __future__ import annotations
 
 import asyncio
+import json
 from typing import Any
-from urllib.parse import quote, urlencode
+from urllib.parse import quote, urlencode, urlparse
 
+from cachetools import TTLCache
 from fastapi import HTTPException
-from sqlalchemy import select
+from sqlalchemy import func, select
 
-from bot.core.config import settings
+from bot.core.config import DIR, settings
 from bot.database.database import sessionmaker
 from bot.database.models import LibraryNewNotificationModel
+from bot.services.emby_metadata.errors import MetadataSourceParseError
+from bot.services.emby_metadata.http_cache import CachedResponse, ResponseCache
+from bot.services.emby_metadata.image_cache import CachedImage, get_image_cache
 from bot.services.emby_metadata.models import MediaLibraryCategory, MetadataCandidate
 from bot.services.emby_metadata.matching import extract_product_number, normalize_search_keyword
 from bot.services.emby_metadata.sources.ck_download import CkDownloadSource
@@ -25,7 +30,7 @@ from bot.services.emby_metadata.sources.ko_video import KoVideoSource
 from bot.services.emby_metadata.sources.trance_video import TranceVideoSource
 from bot.services.emby_metadata.sources.ko_tube import KoTubeSource
 from bot.services.emby_metadata.sources.str8boys2023 import Str8BoysSource
-from bot.services.emby_metadata.sources.base import MetadataSource
+from bot.services.emby_metadata.sources.base import HttpMetadataSource, MetadataSource
 from bot.services.emby_metadata.writer import (
     apply_metadata_candidate_to_item,
     download_image,
@@ -34,7 +39,55 @@ from bot.services.emby_metadata.writer import (
 )
 
 
-_search_cache: dict[str, list[dict[str, Any]]] = {}
+SEARCH_RESULTS_ROOT = DIR / "data" / "emby_metadata" / "workbench_search"
+_SEARCH_RESULTS_MAX_BYTES = 32 * 1024 * 1024
+_SEARCH_RESULTS_NAMESPACE = "workbench-search"
+_search_results: ResponseCache | None = None
+
+QUEUE_PAGE_SIZE = 50
+# 队列加载时同时向 Emby 请求快照的上限
+_QUEUE_SNAPSHOT_CONCURRENCY = 8
+_queue_snapshots: TTLCache[str, dict[str, Any]] = TTLCache(maxsize=2048, ttl=60)
+
+
+def _get_search_results_store() -> ResponseCache:
+    """返回独立于页面缓存的搜索结果存储，不受 ``EMBY_METADATA_HTTP_CACHE_MODE`` 和页面淘汰影响。"""
+    global _search_results  # noqa: PLW0603
+    if _search_results is None:
+        _search_results = ResponseCache(SEARCH_RESULTS_ROOT, max_disk_bytes=_SEARCH_RESULTS_MAX_BYTES)
+    return _search_results
+
+
+async def _cached_search_results(notification_id: str) -> list[dict[str, Any]]:
+    """读取队列项目最近一次搜索的候选结果。"""
+    entry = await _get_search_results_store().get(_SEARCH_RESULTS_NAMESPACE, notification_id)
+    if entry is None:
+        return []
+    try:
+        results = json.loads(entry.body)
+    except ValueError:
+        return []
+    return results if isinstance(results, list) else []
+
+
+async def _store_search_results(notification_id: str, results: list[dict[str, Any]]) -> None:
+    """把搜索候选写入磁盘，重启后工作台仍能显示搜索数量。"""
+    await _get_search_results_store().put(
+        _SEARCH_RESULTS_NAMESPACE,
+        notification_id,
+        CachedResponse(
+            method="SEARCH",
+            url=f"notification:{notification_id}",
+            body=json.dumps(results, ensure_ascii=False),
+            content_type="application/json",
+        ),
+    )
+
+
+async def _discard_source_cache(source: MetadataSource) -> None:
+    """解析失败时丢弃本次使用的来源页面，避免异常页面在有效期内被反复复用。"""
+    if isinstance(source, HttpMetadataSource):
+        await source.discard_cached_responses()
 
 
 def _merge_named_items(primary: list[Any], supplement: list[Any]) -> list[Any]:
@@ -172,6 +225,7 @@ def _item_emby_url(item_id: str | None) -> str | None:
 def _queue_item(
     notification: LibraryNewNotificationModel,
     current_item: dict[str, Any] | None = None,
+    search_count: int = 0,
 ) -> dict[str, Any]:
     """把新媒体通知转换为前端队列的数据结构。"""
     path = _path_from_payload(notification, current_item)
@@ -205,7 +259,7 @@ def _queue_item(
         "source": "",
         "status": "pending" if notification.status == "pending_completion" else notification.status or "pending",
         "search_keyword": search_keyword,
-        "search_count": len(_search_cache.get(str(notification.id), [])),
+        "search_count": search_count,
         "image_url": _item_image_url(notification, payload_item),
         "category_options": _CATEGORY_OPTIONS,
         "source_options": [
@@ -234,28 +288,55 @@ async def _get_notification(notification_id: str) -> LibraryNewNotificationModel
         return notification
 
 
-async def get_queue() -> dict[str, Any]:
-    """返回符合元数据补全条件的电影通知队列。"""
+async def _load_queue_snapshot(item_id: str | None, semaphore: asyncio.Semaphore) -> dict[str, Any]:
+    """读取队列展示用的 Emby 快照，短时间内复用缓存结果。"""
+    if not item_id:
+        return {}
+    cached = _queue_snapshots.get(item_id)
+    if cached is not None:
+        return cached
+    async with semaphore:
+        try:
+            _, item = await fetch_item_snapshot(item_id)
+        except Exception:
+            return {}
+    _queue_snapshots[item_id] = item
+    return item
+
+
+def invalidate_queue_snapshot(item_id: str | None) -> None:
+    """写入 Emby 后丢弃队列快照缓存，下一次加载读取最新数据。"""
+    if item_id:
+        _queue_snapshots.pop(item_id, None)
+
+
+async def get_queue(page: int = 1, page_size: int = QUEUE_PAGE_SIZE) -> dict[str, Any]:
+    """分页返回符合元数据补全条件的电影通知队列。"""
+    conditions = (
+        LibraryNewNotificationModel.status == "pending_completion",
+        LibraryNewNotificationModel.item_type == "Movie",
+    )
     async with sessionmaker() as session:
+        total = await session.scalar(select(func.count()).select_from(LibraryNewNotificationModel).where(*conditions))
         result = await session.execute(
             select(LibraryNewNotificationModel)
-            .where(LibraryNewNotificationModel.status == "pending_completion")
-            .where(LibraryNewNotificationModel.item_type == "Movie")
+            .where(*conditions)
             .order_by(LibraryNewNotificationModel.id.desc())
+            .offset((page - 1) * page_size)
+            .limit(page_size)
         )
         notifications = list(result.scalars())
-    async def load_current_item(notification: LibraryNewNotificationModel) -> dict[str, Any]:
-        if not notification.item_id:
-            return {}
-        try:
-            _, item = await fetch_item_snapshot(notification.item_id)
-            return item
-        except Exception:
-            return {}
 
-    current_items = await asyncio.gather(*(load_current_item(notification) for notification in notifications))
-    items = [_queue_item(notification, current_item) for notification, current_item in zip(notifications, current_items)]
-    return {"items": items, "total": len(items)}
+    semaphore = asyncio.Semaphore(_QUEUE_SNAPSHOT_CONCURRENCY)
+    current_items = await asyncio.gather(
+        *(_load_queue_snapshot(notification.item_id, semaphore) for notification in notifications)
+    )
+    search_counts = [len(await _cached_search_results(str(notification.id))) for notification in notifications]
+    items = [
+        _queue_item(notification, current_item, search_count)
+        for notification, current_item, search_count in zip(notifications, current_items, search_counts)
+    ]
+    return {"items": items, "total": int(total or 0), "page": page, "page_size": page_size}
 
 
 def _resolve_source(category: str, source_name: str) -> MetadataSource:
@@ -281,9 +362,11 @@ async def search_queue(selections: list[dict[str, str]]) -> list[dict[str, Any]]
         try:
             results = await source.search(keyword)
         except Exception as error:
+            if isinstance(error, MetadataSourceParseError):
+                await _discard_source_cache(source)
             raise HTTPException(status_code=502, detail=f"数据源搜索失败：{error}") from error
         serialized = [result.model_dump(mode="json") for result in results]
-        _search_cache[notification_id] = serialized
+        await _store_search_results(notification_id, serialized)
         response.append({"notification_id": notification_id, "results": serialized})
     return response
 
@@ -301,9 +384,12 @@ async def get_candidate(source: str, source_id: str) -> MetadataCandidate:
     )
     if source_class is None:
         raise HTTPException(status_code=404, detail="不支持的数据源")
+    source = source_class()
     try:
-        return await source_class().fetch_detail(source_id)
+        return await source.fetch_detail(source_id)
     except Exception as error:
+        if isinstance(error, MetadataSourceParseError):
+            await _discard_source_cache(source)
         raise HTTPException(status_code=502, detail=f"候选详情抓取失败：{error}") from error
 
 
@@ -354,29 +440,43 @@ async def get_merged_candidate_preview(
     return {"candidate": candidate.model_dump(mode="json"), "before_item": _with_person_image_urls(preview["before_item"])}
 
 
-async def proxy_source_image(url: str, referer: str | None = None) -> tuple[bytes, str]:
-    """通过带请求头的下载器代理数据源图片，避免浏览器防盗链拦截。"""
-    try:
-        url_lower = url.lower()
-        source: MetadataSource = CkDownloadSource()
-        verify_ssl = "ko-shop.com" not in url_lower
-        if "ko-video.com" in url_lower:
-            source = KoVideoSource()
-            verify_ssl = False
-        elif "ko-tube.com" in url_lower:
-            source = KoTubeSource()
-            verify_ssl = False
-        elif "trance-video.com" in url_lower:
-            source = TranceVideoSource()
-        elif "str8boys2023.com" in url_lower:
-            source = Str8BoysSource()
-        image_headers = source.image_headers(referer) if hasattr(source, "image_headers") else None
+_image_sources: dict[str, HttpMetadataSource] = {}
+
+
+def _image_source_for(url: str) -> HttpMetadataSource:
+    """按图片 URL 的主机名匹配数据源，未知站点沿用 CK 的请求头。"""
+    host = (urlparse(url).hostname or "").lower()
+    matched: type[HttpMetadataSource] = CkDownloadSource
+    for sources in _SOURCES_BY_CATEGORY.values():
+        for source_class in sources.values():
+            if not issubclass(source_class, HttpMetadataSource):
+                continue
+            domain = (urlparse(source_class.base_url).hostname or "").lower().removeprefix("www.")
+            if domain and (host == domain or host.endswith(f".{domain}")):
+                matched = source_class
+                break
+    if matched.name not in _image_sources:
+        _image_sources[matched.name] = matched()
+    return _image_sources[matched.name]
+
+
+async def proxy_source_image(url: str, referer: str | None = None, width: int | None = None) -> CachedImage:
+    """通过带请求头的下载器代理数据源图片，避免浏览器防盗链拦截。
+
+    图片按 URL 缓存到磁盘，``width`` 用于网格视图请求缩略图。
+    """
+    source = _image_source_for(url)
+
+    async def fetch() -> tuple[bytes, str]:
         return await download_image(
             url,
             referer=referer,
-            extra_headers=image_headers,
-            verify_ssl=verify_ssl,
+            extra_headers=source.image_headers(referer),
+            verify_ssl=source.verify_ssl,
         )
+
+    try:
+        return await get_image_cache().get_or_fetch(url, fetch, width=width)
     except Exception as error:
         raise HTTPException(status_code=502, detail=f"图片加载失败：{error}") from error
 
@@ -400,4 +500,6 @@ async def writeback(
         )
     except Exception as error:
         raise HTTPException(status_code=502, detail=f"Emby 写入失败：{error}") from error
+    finally:
+        invalidate_queue_snapshot(notification.item_id)
     return result or {}
@@ -0,0 +1,296 @@
+"""元数据工作台的批量写入任务。
+
+一个任务包含多条 ``(通知 ID, 候选, 字段)``，在后台以受限并发逐条调用
+:func:`workbench.writeback`。候选数据在创建时写入
+``<根目录>/<任务 ID>.candidates.json``，每条进度变化后刷新
+``<根目录>/<任务 ID>.json``，进程重启或部分失败后可按任务 ID 继续执行
+未完成的条目。前端通过轮询任务状态获取逐条结果。
+
+API 启动时 :meth:`WritebackJobManager.start` 会自动继续上次中断的任务，并删除
+结束超过 ``WRITEBACK_JOB_RETENTION_SECONDS`` 的任务文件；创建新任务时也会顺带清理。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import re
+import time
+import uuid
+from pathlib import Path
+from typing import Any
+
+from fastapi import HTTPException
+from loguru import logger
+
+from bot.core.config import DIR
+from bot.services.emby_metadata import workbench
+from bot.services.emby_metadata.models import MetadataCandidate
+
+WRITEBACK_JOB_ROOT = DIR / "data" / "emby_metadata" / "writeback_jobs"
+WRITEBACK_JOB_CONCURRENCY = 3
+WRITEBACK_JOB_RETENTION_SECONDS = 7 * 24 * 3600
+
+_JOB_ID_PATTERN = re.compile(r"[0-9a-f]{32}")
+
+ENTRY_PENDING = "pending"
+ENTRY_RUNNING = "running"
+ENTRY_DONE = "done"
+ENTRY_FAILED = "failed"
+
+
+class WritebackJobManager:
+    """创建、执行、持久化并恢复批量写入任务。"""
+
+    def __init__(
+        self,
+        root: Path = WRITEBACK_JOB_ROOT,
+        *,
+        concurrency: int = WRITEBACK_JOB_CONCURRENCY,
+        retention: float = WRITEBACK_JOB_RETENTION_SECONDS,
+    ) -> None:
+        self.root = Path(root)
+        self.concurrency = concurrency
+        self.retention = retention
+        self._jobs: dict[str, dict[str, Any]] = {}
+        self._candidates: dict[str, list[dict[str, Any]]] = {}
+        self._tasks: dict[str, asyncio.Task[None]] = {}
+        self._lock = asyncio.Lock()
+
+    def _paths(self, job_id: str) -> tuple[Path, Path]:
+        return self.root / f"{job_id}.json", self.root / f"{job_id}.candidates.json"
+
+    async def start(self) -> None:
+        """清理过期任务文件，并继续上次进程退出时未完成的任务。"""
+        await self.sweep()
+        resumed = 0
+        for job_id in await asyncio.to_thread(self._job_ids_on_disk):
+            if job_id in self._tasks:
+                continue
+            try:
+                job = await self._load(job_id)
+            except HTTPException:
+                logger.warning(f"⚠️ 无法读取批量写入任务 {job_id}，跳过恢复")
+                continue
+            if not self._finished(job):
+                # 只继续被中断的条目，之前已失败的条目仍需管理员手动重试
+                await self._continue(job, {ENTRY_RUNNING})
+                resumed += 1
+        if resumed:
+            logger.info(f"🔁 已继续 {resumed} 个中断的批量写入任务")
+
+    async def stop(self) -> None:
+        """取消执行中的任务；进行中的条目保留为 running，下次启动时继续。"""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def sweep(self) -> int:
+        """删除已结束且超过保留期的任务文件，返回删除的任务数。"""
+        deadline = time.time() - self.retention
+        removed = 0
+        for job_id in await asyncio.to_thread(self._job_ids_on_disk):
+            if job_id in self._tasks:
+                continue
+            job_path, candidates_path = self._paths(job_id)
+            try:
+                job = self._jobs.get(job_id) or await asyncio.to_thread(self._read_json, job_path)
+            except (OSError, ValueError):
+                continue
+            if not self._finished(job) or job.get("updated_at", 0) >= deadline:
+                continue
+            for path in (job_path, candidates_path):
+                path.unlink(missing_ok=True)
+            self._jobs.pop(job_id, None)
+            self._candidates.pop(job_id, None)
+            removed += 1
+        if removed:
+            logger.info(f"🧹 已清理 {removed} 个过期的批量写入任务")
+        return removed
+
+    async def create(self, entries: list[dict[str, Any]]) -> dict[str, Any]:
+        """保存任务并在后台开始执行。"""
+        await self.sweep()
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        job = {
+            "job_id": job_id,
+            "created_at": now,
+            "updated_at": now,
+            "entries": [
+                {
+                    "notification_id": str(entry["notification_id"]),
+                    "fields": list(entry.get("fields") or []),
+                    "status": ENTRY_PENDING,
+                    "error": None,
+                    "changed_fields": [],
+                }
+                for entry in entries
+            ],
+        }
+        candidates = [entry["candidate"] for entry in entries]
+        _, candidates_path = self._paths(job_id)
+        await asyncio.to_thread(self._write_json, candidates_path, candidates)
+        self._jobs[job_id] = job
+        self._candidates[job_id] = candidates
+        await self._save(job)
+        self._start(job_id)
+        return self.describe(job)
+
+    async def get(self, job_id: str) -> dict[str, Any]:
+        """返回任务进度，不包含候选数据。"""
+        return self.describe(await self._load(job_id))
+
+    async def resume(self, job_id: str) -> dict[str, Any]:
+        """把失败或中断的条目重置为待执行并继续任务。"""
+        job = await self._load(job_id)
+        if job_id not in self._tasks:
+            await self._continue(job, {ENTRY_FAILED, ENTRY_RUNNING})
+        return self.describe(job)
+
+    async def _continue(self, job: dict[str, Any], statuses: set[str]) -> None:
+        for entry in job["entries"]:
+            if entry["status"] in statuses:
+                entry.update(status=ENTRY_PENDING, error=None)
+        await self._save(job)
+        self._start(job["job_id"])
+
+    @staticmethod
+    def _finished(job: dict[str, Any]) -> bool:
+        return all(entry["status"] in {ENTRY_DONE, ENTRY_FAILED} for entry in job["entries"])
+
+    def _job_ids_on_disk(self) -> list[str]:
+        if not self.root.is_dir():
+            return []
+        return [path.stem for path in self.root.glob("*.json") if _JOB_ID_PATTERN.fullmatch(path.stem)]
+
+    def describe(self, job: dict[str, Any]) -> dict[str, Any]:
+        """汇总任务状态和逐条结果。"""
+        counts = {status: 0 for status in (ENTRY_PENDING, ENTRY_RUNNING, ENTRY_DONE, ENTRY_FAILED)}
+        for entry in job["entries"]:
+            counts[entry["status"]] += 1
+        if job["job_id"] in self._tasks:
+            status = "running"
+        elif counts[ENTRY_PENDING] or counts[ENTRY_RUNNING]:
+            status = "interrupted"
+        else:
+            status = "failed" if counts[ENTRY_FAILED] else "completed"
+        return {
+            "job_id": job["job_id"],
+            "status": status,
+            "created_at": job["created_at"],
+            "updated_at": job["updated_at"],
+            "total": len(job["entries"]),
+            "error": job.get("error"),
+            "counts": counts,
+            "entries": [
+                {key: entry[key] for key in ("notification_id", "status", "error", "changed_fields")}
+                for entry in job["entries"]
+            ],
+        }
+
+    def _start(self, job_id: str) -> None:
+        task = asyncio.create_task(self._run(job_id))
+        self._tasks[job_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job_id, None))
+
+    async def _run(self, job_id: str) -> None:
+        job = self._jobs[job_id]
+        job.pop("error", None)
+        try:
+            await self._run_entries(job)
+        except Exception as error:  # noqa: BLE001
+            # 任务结果没有人读取，异常必须在这里记录并落到任务状态里
+            logger.exception(f"❌ 批量写入任务异常中断: {job_id}")
+            message = f"任务异常中断: {error}"
+            job["error"] = message
+            for entry in job["entries"]:
+                if entry["status"] in {ENTRY_PENDING, ENTRY_RUNNING}:
+                    entry.update(status=ENTRY_FAILED, error=message)
+            try:
+                await self._save(job)
+            except OSError:
+                logger.exception(f"❌ 保存批量写入任务状态失败: {job_id}")
+
+    async def _run_entries(self, job: dict[str, Any]) -> None:
+        candidates = self._candidates[job["job_id"]]
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run_entry(index: int, entry: dict[str, Any]) -> None:
+            async with semaphore:
+                entry.update(status=ENTRY_RUNNING, error=None)
+                await self._save(job)
+                try:
+                    result = await workbench.writeback(
+                        entry["notification_id"],
+                        MetadataCandidate.model_validate(candidates[index]),
+                        fields=entry["fields"],
+                    )
+                except HTTPException as error:
+                    entry.update(status=ENTRY_FAILED, error=str(error.detail))
+                except Exception as error:  # noqa: BLE001
+                    logger.exception(f"❌ 批量写入条目失败: {entry['notification_id']}")
+                    entry.update(status=ENTRY_FAILED, error=str(error))
+                else:
+                    changed_fields = [change["field"] for change in result.get("actual_core_changes", [])]
+                    entry.update(status=ENTRY_DONE, changed_fields=changed_fields)
+                await self._save(job)
+
+        results = await asyncio.gather(
+            *(
+                run_entry(index, entry)
+                for index, entry in enumerate(job["entries"])
+                if entry["status"] == ENTRY_PENDING
+            ),
+            return_exceptions=True,
+        )
+        # 等全部条目结束后再抛出，避免异常处理时仍有条目在后台执行
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
+    async def _load(self, job_id: str) -> dict[str, Any]:
+        job = self._jobs.get(job_id)
+        if job is not None:
+            return job
+        if not _JOB_ID_PATTERN.fullmatch(job_id):
+            raise HTTPException(status_code=404, detail="写入任务不存在")
+        job_path, candidates_path = self._paths(job_id)
+        try:
+            job = await asyncio.to_thread(self._read_json, job_path)
+            candidates = await asyncio.to_thread(self._read_json, candidates_path)
+        except (OSError, ValueError) as error:
+            raise HTTPException(status_code=404, detail="写入任务不存在") from error
+        self._jobs[job_id] = job
+        self._candidates[job_id] = candidates
+        return job
+
+    async def _save(self, job: dict[str, Any]) -> None:
+        job["updated_at"] = time.time()
+        job_path, _ = self._paths(job["job_id"])
+        snapshot = json.loads(json.dumps(job))
+        async with self._lock:
+            await asyncio.to_thread(self._write_json, job_path, snapshot)
+
+    @staticmethod
+    def _read_json(path: Path) -> Any:
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    @staticmethod
+    def _write_json(path: Path, data: Any) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_suffix(".tmp")
+        temp_path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+        temp_path.replace(path)
+
+
+_manager: WritebackJobManager | None = None
+
+
+def get_writeback_job_manager() -> WritebackJobManager:
+    """返回进程内共享的批量写入任务管理器。"""
+    global _manager  # noqa: PLW0603
+    if _manager is None:
+        _manager = WritebackJobManager()
+    return _manager
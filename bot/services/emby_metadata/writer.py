@@ -1,12 +1,16 @@
 from __future__ import annotations
 
+import asyncio
 import base64
+import io
 import re
 from pathlib import Path
 from typing import Any
 from urllib.parse import urlparse
 
 import aiohttp
+from loguru import logger
+from PIL import Image, UnidentifiedImageError
 
 from bot.core.config import settings
 from bot.services.emby_metadata.models import MetadataCandidate, MetadataNamedItem
@@ -14,6 +18,11 @@ from bot.services.emby_metadata.sources.ck_download import CkDownloadSource
 from bot.utils.emby import get_emby_client
 
 IMAGE_ARCHIVE_ROOT = Path("data/emby_metadata/images")
+# 上传前把图片缩小到最长边不超过该像素，减少发送给 Emby 的 base64 体积
+POSTER_MAX_EDGE = 2000
+PERSON_MAX_EDGE = 1000
+# 一次写入中同时下载/上传的图片数量上限
+IMAGE_PIPELINE_CONCURRENCY = 4
 
 ITEM_UPDATE_DIFF_FIELDS = (
     "Name",
@@ -73,12 +82,39 @@ def _should_verify_image_ssl(url: str) -> bool:
     )
 
 
+def normalize_image_for_upload(image_bytes: bytes, max_edge: int) -> bytes:
+    """把图片缩小到最长边不超过 ``max_edge`` 并重新编码为 JPEG。
+
+    尺寸已达标的 JPEG、无法识别的图片，或重新编码后反而更大的结果都返回原图。
+    """
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as image:
+            oversized = max(image.size) > max_edge
+            if not oversized and image.format == "JPEG":
+                return image_bytes
+            if oversized:
+                image.thumbnail((max_edge, max_edge))
+            output = io.BytesIO()
+            image.convert("RGB").save(output, format="JPEG", quality=90, optimize=True)
+    except (OSError, UnidentifiedImageError, ValueError) as error:
+        logger.debug("图片无法重新编码，按原图上传: {}", error)
+        return image_bytes
+    encoded = output.getvalue()
+    return encoded if oversized or len(encoded) < len(image_bytes) else image_bytes
+
+
+async def _encode_for_upload(image_bytes: bytes, max_edge: int) -> str:
+    normalized = await asyncio.to_thread(normalize_image_for_upload, image_bytes, max_edge)
+    return base64.b64encode(normalized).decode("ascii")
+
+
 async def _download_image_as_base64(
     url: str,
     *,
     referer: str | None = None,
     archive_path: Path | None = None,
     extra_headers: dict[str, str] | None = None,
+    max_edge: int = POSTER_MAX_EDGE,
 ) -> str:
     image_bytes, _ = await download_image(
         url,
@@ -87,9 +123,13 @@ async def _download_image_as_base64(
         verify_ssl=_should_verify_image_ssl(url),
     )
     if archive_path is not None:
-        archive_path.parent.mkdir(parents=True, exist_ok=True)
-        archive_path.write_bytes(image_bytes)
-    return base64.b64encode(image_bytes).decode("ascii")
+        await asyncio.to_thread(_archive_image, archive_path, image_bytes)
+    return await _encode_for_upload(image_bytes, max_edge)
+
+
+def _archive_image(archive_path: Path, image_bytes: bytes) -> None:
+    archive_path.parent.mkdir(parents=True, exist_ok=True)
+    archive_path.write_bytes(image_bytes)
 
 
 async def download_image(
@@ -111,12 +151,43 @@ async def download_image(
             return await response.read(), response.content_type
 
 
-def _read_local_image_as_base64(path: str, *, archive_path: Path | None = None) -> str:
-    image_bytes = Path(path).read_bytes()
+async def _read_local_image_as_base64(
+    path: str,
+    *,
+    archive_path: Path | None = None,
+    max_edge: int = PERSON_MAX_EDGE,
+) -> str:
+    image_bytes = await asyncio.to_thread(Path(path).read_bytes)
     if archive_path is not None:
-        archive_path.parent.mkdir(parents=True, exist_ok=True)
-        archive_path.write_bytes(image_bytes)
-    return base64.b64encode(image_bytes).decode("ascii")
+        await asyncio.to_thread(_archive_image, archive_path, image_bytes)
+    return await _encode_for_upload(image_bytes, max_edge)
+
+
+async def _person_image_data(person: dict[str, Any]) -> str | None:
+    """按 ImageData / ImagePath / ImageUrl 的优先级取得人物图片的 base64。"""
+    image_data = person.get("ImageData")
+    image_path = person.get("ImagePath")
+    image_url = person.get("ImageUrl")
+    archive_path = person.get("ArchivePath")
+    if image_data is None and image_path:
+        image_data = await _read_local_image_as_base64(image_path, archive_path=archive_path)
+    if image_data is None and image_url:
+        image_data = await _download_image_as_base64(
+            image_url,
+            referer=person.get("ImageReferer"),
+            archive_path=archive_path,
+            max_edge=PERSON_MAX_EDGE,
+        )
+    return image_data
+
+
+async def _gather_all(jobs: list[Any]) -> list[Any]:
+    """等待全部图片任务结束后再抛出第一个错误，避免遗留后台上传。"""
+    results = await asyncio.gather(*jobs, return_exceptions=True)
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+    return results
 
 
 def build_item_update_payload(
@@ -219,7 +290,7 @@ async def preview_metadata_candidate_update(
 
 async def apply_item_update(
     item_id: str,
-    payload: dict[str, Any],
+    payload: dict[str, Any] | None,
     *,
     apply_poster: bool = False,
     poster_data: str | None = None,
@@ -229,47 +300,80 @@ async def apply_item_update(
     poster_headers: dict[str, str] | None = None,
     people: list[dict[str, Any]] | None = None,
 ) -> dict[str, Any] | None:
-    """把载荷和图片写回指定 Emby Item。"""
+    """把载荷和图片写回指定 Emby Item；``payload`` 为 None 时只上传图片。
+
+    封面和人物图片并发下载、缩放后上传，并发数受 ``IMAGE_PIPELINE_CONCURRENCY`` 限制。
+    """
     client = get_emby_client()
     if client is None:
         raise RuntimeError("Emby 客户端未配置")
 
-    await client.update_item(item_id, payload)
+    if payload is not None:
+        await client.update_item(item_id, payload)
+    semaphore = asyncio.Semaphore(IMAGE_PIPELINE_CONCURRENCY)
 
-    if apply_poster:
+    async def upload_poster() -> None:
         image_data = poster_data
         if image_data is None and poster_url:
-            image_data = await _download_image_as_base64(
-                poster_url,
-                referer=poster_referer,
-                archive_path=poster_archive_path,
-                extra_headers=poster_headers,
-            )
+            async with semaphore:
+                image_data = await _download_image_as_base64(
+                    poster_url,
+                    referer=poster_referer,
+                    archive_path=poster_archive_path,
+                    extra_headers=poster_headers,
+                )
         if image_data:
             await client.upload_item_image(item_id, image_data, "Primary")
 
-    for person in people or []:
-        person_id = person.get("Id")
-        image_url = person.get("ImageUrl")
-        image_data = person.get("ImageData")
-        image_path = person.get("ImagePath")
-        archive_path = person.get("ArchivePath")
-        if not person_id:
-            continue
-        if image_data is None and image_path:
-            image_data = _read_local_image_as_base64(image_path, archive_path=archive_path)
-        if image_data is None and image_url:
-            image_data = await _download_image_as_base64(
-                image_url,
-                referer=person.get("ImageReferer"),
-                archive_path=archive_path,
-            )
-        if image_data:
-            await client.upload_item_image(str(person_id), image_data, "Primary")
+    async def upload_person(person: dict[str, Any]) -> None:
+        async with semaphore:
+            image_data = await _person_image_data(person)
+            if image_data:
+                await client.upload_item_image(str(person["Id"]), image_data, "Primary")
 
+    jobs = [upload_person(person) for person in people or [] if person.get("Id")]
+    if apply_poster:
+        jobs.insert(0, upload_poster())
+    await _gather_all(jobs)
     return payload
 
 
+def _expected_person_names(payload: dict[str, Any]) -> set[str]:
+    """写入后 Item 中会出现的人物名，只有这些人物能匹配到 Emby 人物并上传图片。"""
+    return {
+        person["Name"]
+        for person in payload.get("People") or []
+        if isinstance(person, dict) and person.get("Name")
+    }
+
+
+async def _prefetch_person_images(candidate: MetadataCandidate, names: set[str]) -> dict[str, str | None]:
+    """在写入元数据的同时预先下载 ``names`` 中人物的图片；失败的人物留给上传阶段重试。"""
+    semaphore = asyncio.Semaphore(IMAGE_PIPELINE_CONCURRENCY)
+
+    async def fetch(person: Any) -> tuple[str, str | None]:
+        upload = {
+            "ImageUrl": person.image_url,
+            "ImageData": person.image_data,
+            "ImagePath": person.image_path,
+            "ImageReferer": candidate.raw_url,
+            "ArchivePath": _archive_path(candidate, f"person_{person.name}.jpg"),
+        }
+        async with semaphore:
+            try:
+                return person.name, await _person_image_data(upload)
+            except Exception as error:
+                logger.warning("⚠️ 人物图片预下载失败 {}: {}", person.name, error)
+                return person.name, None
+
+    people = [
+        person
+        for person in candidate.people
+        if person.name in names and (person.image_url or person.image_data or person.image_path)
+    ]
+    return dict(await asyncio.gather(*(fetch(person) for person in people)))
+
+
 async def apply_metadata_candidate_to_item(
     item_id: str,
     candidate: MetadataCandidate,
@@ -289,23 +393,34 @@ async def apply_metadata_candidate_to_item(
         overwrite=overwrite,
     )
 
-    await apply_item_update(
-        item_id,
-        preview["payload"],
-        apply_poster=apply_poster or bool(candidate.poster_url or candidate.poster_data),
-        poster_data=poster_data or candidate.poster_data,
-        poster_url=candidate.poster_url,
-        poster_referer=candidate.raw_url,
-        poster_archive_path=_archive_path(candidate, "poster.jpg"),
-        poster_headers=(
-            CkDownloadSource().image_headers(candidate.raw_url)
-            if candidate.source == "ck-download"
-            else None
-        ),
-        people=[],
+    apply_poster = apply_poster or bool(poster_data or candidate.poster_url or candidate.poster_data)
+    prefetch = asyncio.create_task(
+        _prefetch_person_images(candidate, _expected_person_names(preview["payload"]))
     )
-
-    _, after_item = await fetch_item_snapshot(item_id, user_id=preview["resolved_user_id"])
+    try:
+        if preview["planned_changes"] or apply_poster:
+            await apply_item_update(
+                item_id,
+                preview["payload"],
+                apply_poster=apply_poster,
+                poster_data=poster_data or candidate.poster_data,
+                poster_url=candidate.poster_url,
+                poster_referer=candidate.raw_url,
+                poster_archive_path=_archive_path(candidate, "poster.jpg"),
+                poster_headers=(
+                    CkDownloadSource().image_headers(candidate.raw_url)
+                    if candidate.source == "ck-download"
+                    else None
+                ),
+                people=[],
+            )
+            _, after_item = await fetch_item_snapshot(item_id, user_id=preview["resolved_user_id"])
+        else:
+            # 字段和封面都没有变化时无需写入，也不必重新读取快照
+            after_item = preview["before_item"]
+        prefetched_images = await prefetch
+    finally:
+        prefetch.cancel()
 
     people_by_name = {
         person.name: person
@@ -325,7 +440,7 @@ async def apply_metadata_candidate_to_item(
             {
                 "Id": person_id,
                 "ImageUrl": source_person.image_url,
-                "ImageData": source_person.image_data,
+                "ImageData": prefetched_images.get(name) or source_person.image_data,
                 "ImagePath": source_person.image_path,
                 "ImageReferer": candidate.raw_url,
                 "ArchivePath": _archive_path(candidate, f"person_{name}.jpg"),
@@ -335,7 +450,7 @@ async def apply_metadata_candidate_to_item(
     if person_uploads:
         await apply_item_update(
             item_id,
-            after_item,
+            None,
             people=person_uploads,
         )
         _, after_item = await fetch_item_snapshot(item_id, user_id=preview["resolved_user_id"])
@@ -13,6 +13,7 @@ from bot.database.models.emby_device import EmbyDeviceModel
 from bot.database.models.emby_device_history import EmbyDeviceHistoryModel
 from bot.database.models.emby_user import EmbyUserModel
 from bot.database.models.emby_user_history import EmbyUserHistoryModel
+from bot.database.query_tracker import tracked
 from bot.services.emby_update_helper import detect_and_update_emby_user
 from bot.utils.datetime import now, parse_iso_datetime
 from bot.utils.emby import get_emby_client
@@ -1143,6 +1144,7 @@ async def update_user_blocked_tags(
         return False, str(e)
 
 
+@tracked("job:run_emby_sync")
 async def run_emby_sync(session: AsyncSession) -> None:
     """运行 Emby 数据同步与清理
 
@@ -0,0 +1,513 @@
+"""Emby Webhook 异步入库队列。
+
+Webhook 接口只负责校验载荷并调用 :meth:`EmbyWebhookQueue.submit`：事件先以
+``<根目录>/<接收时间>-<事件 ID>.json`` 写入本地暂存目录，再放入内存队列后立即
+返回。后台入库协程按批取出事件，用一次批量 INSERT 写入
+``LibraryNewNotificationModel`` / ``NotificationModel``，提交成功后才删除暂存
+文件；进程重启时 :meth:`EmbyWebhookQueue.start` 会重新载入未入库的暂存事件。
+只有连接断开等临时错误会整批重试；数据超长、约束冲突等永久错误改为逐条入库，
+仍失败的事件移入暂存目录下的 ``quarantine`` 子目录并记录日志，不再阻塞后续事件。
+
+library.new 事件先进入合并阶段：同一剧集（剧集按 ``SeriesId``，其他按
+``Item.Id``）在合并窗口内的事件合并为一条通知，载荷中的 ``CoalescedItems``
+记录全部条目，``EpisodeRange`` 记录集数范围（如 ``S01E01-E08``）。落库时若已有
+同一作品的待补全通知则并入该行；已在待补全/待发送通知中出现过的条目视为
+重复投递直接丢弃。
+
+带 ``Session`` 的播放事件另外进入检测队列，由独立的协程调用检测回调
+（白名单、违规客户端、网页端播放警告等），不会阻塞入库。检测只对正在进行的
+播放有意义，因此不做持久化，队列满时直接丢弃并记录日志。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import json
+import time
+import uuid
+from collections.abc import Awaitable, Callable
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from loguru import logger
+from sqlalchemy import insert, or_, select
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.orm.attributes import flag_modified
+
+from bot.core.config import DIR, settings
+from bot.core.constants import (
+    EVENT_TYPE_LIBRARY_NEW,
+    NOTIFICATION_STATUS_PENDING_COMPLETION,
+    NOTIFICATION_STATUS_PENDING_REVIEW,
+)
+from bot.database.database import sessionmaker
+from bot.database.models.library_new_notification import LibraryNewNotificationModel
+from bot.database.models.notification import NotificationModel
+from bot.utils.notification import get_check_id_for_notification
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+WEBHOOK_SPOOL_ROOT = DIR / "data" / "emby_webhooks" / "spool"
+WEBHOOK_BATCH_SIZE = 200
+WEBHOOK_CHECK_QUEUE_SIZE = 1000
+
+# 入库失败后的重试间隔（秒），按次数翻倍直到上限
+_RETRY_BASE_DELAY = 1.0
+_RETRY_MAX_DELAY = 60.0
+# 合并窗口的最长检查间隔（秒）
+_COALESCE_TICK = 1.0
+# 并入已有通知时随合并结果更新的列
+_MERGED_FIELDS = (
+    "title",
+    "item_id",
+    "item_name",
+    "item_type",
+    "series_name",
+    "season_number",
+    "episode_number",
+    "payload",
+)
+
+SessionCheck = Callable[[dict[str, Any]], Awaitable[None]]
+
+
+def is_transient_error(error: BaseException) -> bool:
+    """判断入库错误是否为重试可能成功的临时错误（连接断开、超时、文件系统错误）。"""
+    if isinstance(error, (OSError, OperationalError, InterfaceError, PoolTimeoutError)):
+        return True
+    return isinstance(error, DBAPIError) and error.connection_invalidated
+
+
+def build_notification_row(payload: dict[str, Any]) -> tuple[type[Any], dict[str, Any]]:
+    """把 Webhook 载荷转换为目标通知表和待插入的列值。
+
+    只有 library.new 事件写入专门的表并设置 ``pending_completion`` 状态，
+    其他事件写入通用通知表且状态为空。
+    """
+    event_type = payload.get("Event")
+    item = payload.get("Item") or {}
+    is_library_new = event_type == EVENT_TYPE_LIBRARY_NEW
+    row = {
+        "title": payload.get("Title"),
+        "type": event_type,
+        "status": "pending_completion" if is_library_new else None,
+        "item_id": item.get("Id"),
+        "item_name": item.get("Name"),
+        "item_type": item.get("Type"),
+        "series_id": item.get("SeriesId"),
+        "series_name": item.get("SeriesName"),
+        "season_number": item.get("ParentIndexNumber"),
+        "episode_number": item.get("IndexNumber"),
+        "payload": payload,
+    }
+    return (LibraryNewNotificationModel if is_library_new else NotificationModel), row
+
+
+def coalesce_key(payload: dict[str, Any]) -> str | None:
+    """返回 library.new 事件的合并键：剧集使用 SeriesId，其他使用 Item.Id。"""
+    item = payload.get("Item") or {}
+    if item.get("Type") == "Episode" and item.get("SeriesId"):
+        return str(item["SeriesId"])
+    return str(item["Id"]) if item.get("Id") else None
+
+
+def _coalesced_entry(item: dict[str, Any]) -> dict[str, Any]:
+    return {
+        "Id": str(item.get("Id")),
+        "Name": item.get("Name"),
+        "Type": item.get("Type"),
+        "SeasonNumber": item.get("ParentIndexNumber"),
+        "EpisodeNumber": item.get("IndexNumber"),
+    }
+
+
+def coalesced_items(payload: dict[str, Any]) -> list[dict[str, Any]]:
+    """返回通知载荷包含的全部条目；未合并过的载荷只包含自身的 Item。"""
+    entries = payload.get("CoalescedItems")
+    if isinstance(entries, list):
+        return [entry for entry in entries if isinstance(entry, dict)]
+    item = payload.get("Item") or {}
+    return [_coalesced_entry(item)] if item.get("Id") else []
+
+
+def format_episode_ranges(entries: list[dict[str, Any]]) -> str:
+    """把条目中的季/集号格式化为紧凑范围，例如 ``S01E01-E03, S01E05, S02E01``。"""
+    episodes = sorted(
+        {
+            (entry["SeasonNumber"], entry["EpisodeNumber"])
+            for entry in entries
+            if isinstance(entry.get("SeasonNumber"), int) and isinstance(entry.get("EpisodeNumber"), int)
+        }
+    )
+    ranges: list[str] = []
+    start = previous = None
+    for season, episode in [*episodes, (None, None)]:
+        if previous is not None and (season, episode) == (previous[0], previous[1] + 1):
+            previous = (season, episode)
+            continue
+        if start is not None and previous is not None:
+            text = f"S{start[0]:02d}E{start[1]:02d}"
+            if previous != start:
+                text += f"-E{previous[1]:02d}"
+            ranges.append(text)
+        start = previous = (season, episode) if season is not None else None
+    return ", ".join(ranges)
+
+
+def _episode_order(payload: dict[str, Any]) -> tuple[int, int]:
+    item = payload.get("Item") or {}
+    season, episode = item.get("ParentIndexNumber"), item.get("IndexNumber")
+    return (season if isinstance(season, int) else 0, episode if isinstance(episode, int) else 0)
+
+
+def merge_library_payloads(
+    payloads: list[dict[str, Any]],
+    base: dict[str, Any] | None = None,
+) -> dict[str, Any] | None:
+    """把同一作品的多个 library.new 载荷合并为一个。
+
+    ``base`` 为已落库通知的载荷，其中已有的条目不会重复加入；全部条目都已存在
+    （重复投递）时返回 ``None``。合并结果以季/集号最大的事件为主体。
+    """
+    entries = coalesced_items(base) if base else []
+    known = {entry["Id"] for entry in entries}
+    fresh = []
+    for payload in payloads:
+        item_id = str((payload.get("Item") or {}).get("Id"))
+        if item_id not in known:
+            known.add(item_id)
+            fresh.append(payload)
+    if not fresh:
+        return None
+    entries += [_coalesced_entry(payload.get("Item") or {}) for payload in fresh]
+    candidates = [base, *fresh] if base else fresh
+    merged = dict(max(candidates, key=_episode_order))
+    merged["CoalescedItems"] = entries
+    merged["EpisodeRange"] = format_episode_ranges(entries)
+    return merged
+
+
+class EmbyWebhookQueue:
+    """带本地暂存的 Webhook 事件批量入库队列。"""
+
+    def __init__(
+        self,
+        root: Path = WEBHOOK_SPOOL_ROOT,
+        *,
+        session_check: SessionCheck | None = None,
+        workers: int = 1,
+        check_workers: int = 2,
+        batch_size: int = WEBHOOK_BATCH_SIZE,
+        coalesce_window: float = 0.0,
+        quarantine_root: Path | None = None,
+    ) -> None:
+        self.root = Path(root)
+        self.quarantine_root = Path(quarantine_root) if quarantine_root is not None else self.root / "quarantine"
+        self.session_check = session_check
+        self.workers = max(1, workers)
+        self.check_workers = max(1, check_workers)
+        self.batch_size = max(1, batch_size)
+        self.coalesce_window = max(0.0, coalesce_window)
+        self._queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue()
+        self._check_queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue(maxsize=WEBHOOK_CHECK_QUEUE_SIZE)
+        self._tasks: list[asyncio.Task[None]] = []
+        # 已在内存队列中的暂存文件名，避免启动恢复时重复入队
+        self._queued: set[str] = set()
+        # 合并窗口中的 library.new 事件：合并键 -> (首个事件到达时间, 事件列表)
+        self._groups: dict[str, tuple[float, list[dict[str, Any]]]] = {}
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self) -> int:
+        """重新载入暂存目录中未入库的事件并启动后台协程，返回载入的事件数。"""
+        if self.running:
+            return 0
+        spooled = await asyncio.to_thread(self._load_spool)
+        records = [record for record in spooled if record["spool_name"] not in self._queued]
+        for record in records:
+            self._enqueue(record)
+        if records:
+            logger.info(f"📦 已从暂存目录恢复 {len(records)} 条 Emby Webhook 事件")
+        self._tasks = [asyncio.create_task(self._store_worker()) for _ in range(self.workers)]
+        if self.session_check is not None:
+            self._tasks += [asyncio.create_task(self._check_worker()) for _ in range(self.check_workers)]
+        if self.coalesce_window:
+            self._tasks.append(asyncio.create_task(self._coalesce_worker()))
+        return len(records)
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """等待已接收事件入库后停止后台协程；超时未入库的事件保留在暂存目录。"""
+        if not self.running:
+            return
+        with contextlib.suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(self._queue.join(), timeout=timeout)
+            await asyncio.wait_for(self._flush_groups(force=True), timeout=timeout)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, payload: dict[str, Any]) -> str:
+        """暂存事件并放入入库队列，返回事件 ID。"""
+        event_id = uuid.uuid4().hex
+        record = {"id": event_id, "received_at": time.time(), "payload": payload}
+        record["spool_name"] = f"{time.time_ns():020d}-{event_id}.json"
+        await asyncio.to_thread(self._write_spool, record)
+        self._enqueue(record)
+        if self.session_check is not None and payload.get("Session"):
+            try:
+                self._check_queue.put_nowait(payload)
+            except asyncio.QueueFull:
+                logger.warning(f"⚠️ 播放检测队列已满，丢弃事件: {payload.get('Event')}")
+        return event_id
+
+    def _enqueue(self, record: dict[str, Any]) -> None:
+        self._queued.add(record["spool_name"])
+        self._queue.put_nowait(record)
+
+    def pending(self) -> int:
+        """返回尚未入库的事件数（含合并窗口中的事件）。"""
+        return self._queue.qsize() + sum(len(records) for _, records in self._groups.values())
+
+    async def _next_batch(self) -> list[dict[str, Any]]:
+        batch = [await self._queue.get()]
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        return batch
+
+    async def _store_worker(self) -> None:
+        while True:
+            batch = await self._next_batch()
+            try:
+                await self._route_batch(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _route_batch(self, batch: list[dict[str, Any]]) -> None:
+        """library.new 事件进入合并阶段（窗口为 0 时立即合并落库），其余事件直接批量插入。"""
+        others: list[dict[str, Any]] = []
+        library_new: list[dict[str, Any]] = []
+        for record in batch:
+            payload = record["payload"]
+            if payload.get("Event") == EVENT_TYPE_LIBRARY_NEW and coalesce_key(payload):
+                library_new.append(record)
+            else:
+                others.append(record)
+        if others:
+            await self._with_retry(self.store_batch, others)
+        if not library_new:
+            return
+        if not self.coalesce_window:
+            await self._with_retry(self.store_library_new, library_new)
+            return
+        received = time.monotonic()
+        for record in library_new:
+            key = coalesce_key(record["payload"])
+            assert key is not None
+            self._groups.setdefault(key, (received, []))[1].append(record)
+
+    async def _coalesce_worker(self) -> None:
+        tick = min(self.coalesce_window, _COALESCE_TICK)
+        while True:
+            await asyncio.sleep(tick)
+            await self._flush_groups()
+
+    async def _flush_groups(self, *, force: bool = False) -> None:
+        """落库已超过合并窗口的事件组；``force`` 时落库全部事件组。"""
+        deadline = time.monotonic() - self.coalesce_window
+        due = [key for key, (first_seen, _) in self._groups.items() if force or first_seen <= deadline]
+        if not due:
+            return
+        records = [record for key in due for record in self._groups.pop(key)[1]]
+        await self._with_retry(self.store_library_new, records)
+
+    async def _with_retry(
+        self,
+        operation: Callable[[list[dict[str, Any]]], Awaitable[None]],
+        records: list[dict[str, Any]],
+    ) -> None:
+        """执行入库操作，成功后删除对应的暂存文件。
+
+        临时错误按退避间隔重试直到成功；其他错误重试也不会成功，整批改为逐条入库，
+        单条仍失败时把暂存文件移入隔离目录。
+        """
+        delay = _RETRY_BASE_DELAY
+        while True:
+            try:
+                await operation(records)
+            except Exception as error:  # noqa: BLE001
+                if not is_transient_error(error):
+                    await self._isolate_failure(operation, records, error)
+                    return
+                logger.error(f"❌ Emby Webhook 事件批量入库失败，{delay:.0f} 秒后重试: {error}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, _RETRY_MAX_DELAY)
+            else:
+                break
+        await asyncio.to_thread(self._remove_spool, records)
+        self._queued.difference_update(record["spool_name"] for record in records)
+
+    async def _isolate_failure(
+        self,
+        operation: Callable[[list[dict[str, Any]]], Awaitable[None]],
+        records: list[dict[str, Any]],
+        error: Exception,
+    ) -> None:
+        if len(records) > 1:
+            logger.warning(f"⚠️ Emby Webhook 事件批量入库失败，改为逐条入库 {len(records)} 条: {error}")
+            for record in records:
+                await self._with_retry(operation, [record])
+            return
+        record = records[0]
+        logger.opt(exception=error).error(
+            f"❌ Emby Webhook 事件无法入库，已移入隔离目录: {record['spool_name']} "
+            f"({record['payload'].get('Event')})"
+        )
+        await asyncio.to_thread(self._quarantine, record)
+        self._queued.discard(record["spool_name"])
+
+    async def store_batch(self, batch: list[dict[str, Any]]) -> None:
+        """按目标表分组，在一个事务中批量插入一批事件。"""
+        rows_by_model: dict[type[Any], list[dict[str, Any]]] = {}
+        for record in batch:
+            model, row = build_notification_row(record["payload"])
+            rows_by_model.setdefault(model, []).append(row)
+        async with sessionmaker() as session:
+            for model, rows in rows_by_model.items():
+                await session.execute(insert(model), rows)
+            await session.commit()
+        for model, rows in rows_by_model.items():
+            logger.info(f"💾 通知批量入库: {model.__tablename__} {len(rows)} 条")
+
+    async def store_library_new(self, batch: list[dict[str, Any]]) -> None:
+        """按作品合并 library.new 事件，并入已有的待补全通知或批量插入新通知。"""
+        payloads_by_key: dict[str, list[dict[str, Any]]] = {}
+        for record in batch:
+            key = coalesce_key(record["payload"])
+            assert key is not None
+            payloads_by_key.setdefault(key, []).append(record["payload"])
+
+        new_rows: list[dict[str, Any]] = []
+        merged_count = 0
+        async with sessionmaker() as session:
+            existing = await self._load_open_notifications(session, list(payloads_by_key))
+            for key, payloads in payloads_by_key.items():
+                rows = existing.get(key, [])
+                # 已出现在待补全/待发送通知中的条目属于重复投递
+                known = {entry["Id"] for row in rows for entry in coalesced_items(row.payload or {})}
+                fresh = [payload for payload in payloads if str((payload.get("Item") or {}).get("Id")) not in known]
+                target = next((row for row in rows if row.status == NOTIFICATION_STATUS_PENDING_COMPLETION), None)
+                merged = merge_library_payloads(fresh, target.payload if target else None) if fresh else None
+                if merged is None:
+                    continue
+                _, values = build_notification_row(merged)
+                if target is None:
+                    new_rows.append(values)
+                    continue
+                for field in _MERGED_FIELDS:
+                    setattr(target, field, values[field])
+                flag_modified(target, "payload")
+                merged_count += 1
+            if new_rows:
+                await session.execute(insert(LibraryNewNotificationModel), new_rows)
+            await session.commit()
+        logger.info(
+            f"💾 新片通知合并入库: {len(batch)} 个事件 -> 新增 {len(new_rows)} 条, 并入已有 {merged_count} 条"
+        )
+
+    @staticmethod
+    async def _load_open_notifications(
+        session: AsyncSession,
+        keys: list[str],
+    ) -> dict[str, list[LibraryNewNotificationModel]]:
+        """一次查询出这些作品的待补全/待发送通知，按合并键分组。"""
+        stmt = select(LibraryNewNotificationModel).where(
+            LibraryNewNotificationModel.type == EVENT_TYPE_LIBRARY_NEW,
+            LibraryNewNotificationModel.status.in_(
+                [NOTIFICATION_STATUS_PENDING_COMPLETION, NOTIFICATION_STATUS_PENDING_REVIEW]
+            ),
+            or_(LibraryNewNotificationModel.series_id.in_(keys), LibraryNewNotificationModel.item_id.in_(keys)),
+        ).order_by(LibraryNewNotificationModel.id)
+        rows = (await session.execute(stmt)).scalars().all()
+        grouped: dict[str, list[LibraryNewNotificationModel]] = {}
+        wanted = set(keys)
+        for row in rows:
+            key = get_check_id_for_notification(row)
+            if key in wanted:
+                grouped.setdefault(key, []).append(row)
+        return grouped
+
+    async def _check_worker(self) -> None:
+        assert self.session_check is not None
+        while True:
+            payload = await self._check_queue.get()
+            try:
+                await self.session_check(payload)
+            except Exception:  # noqa: BLE001
+                logger.exception(f"❌ 播放事件检测失败: {payload.get('Event')}")
+            finally:
+                self._check_queue.task_done()
+
+    def _write_spool(self, record: dict[str, Any]) -> None:
+        path = self.root / record["spool_name"]
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_suffix(".tmp")
+        data = {key: record[key] for key in ("id", "received_at", "payload")}
+        temp_path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+        temp_path.replace(path)
+
+    def _quarantine(self, record: dict[str, Any]) -> None:
+        self.quarantine_root.mkdir(parents=True, exist_ok=True)
+        source = self.root / record["spool_name"]
+        try:
+            source.replace(self.quarantine_root / record["spool_name"])
+        except FileNotFoundError:
+            data = {key: record[key] for key in ("id", "received_at", "payload")}
+            target = self.quarantine_root / record["spool_name"]
+            target.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+
+    def _remove_spool(self, batch: list[dict[str, Any]]) -> None:
+        for record in batch:
+            (self.root / record["spool_name"]).unlink(missing_ok=True)
+
+    def _load_spool(self) -> list[dict[str, Any]]:
+        records = []
+        for path in sorted(self.root.glob("*.json")):
+            try:
+                record = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                logger.warning(f"⚠️ 跳过无法读取的 Webhook 暂存文件: {path.name}")
+                continue
+            if not isinstance(record, dict) or not isinstance(record.get("payload"), dict):
+                continue
+            record["spool_name"] = path.name
+            records.append(record)
+        return records
+
+
+_queue: EmbyWebhookQueue | None = None
+
+
+def get_emby_webhook_queue(session_check: SessionCheck | None = None) -> EmbyWebhookQueue:
+    """返回按配置初始化的进程内共享 Webhook 队列。
+
+    首次调用时传入的 ``session_check`` 作为播放事件检测回调。
+    """
+    global _queue  # noqa: PLW0603
+    if _queue is None:
+        _queue = EmbyWebhookQueue(
+            session_check=session_check,
+            workers=settings.EMBY_WEBHOOK_WORKERS,
+            batch_size=settings.EMBY_WEBHOOK_BATCH_SIZE,
+            coalesce_window=settings.EMBY_WEBHOOK_COALESCE_SECONDS,
+        )
+    return _queue
@@ -22,6 +22,7 @@ class OpenAIClient:
                 "Authorization": f"Bearer {api_key}",
                 "Content-Type": "application/json",
             },
+            service="openai",
         )
 
     async def close(self) -> None:
@@ -0,0 +1,266 @@
+"""Emby 播放事件的内存策略索引。
+
+播放 Webhook 需要判断白名单、违规客户端并累计警告次数。本模块把这些状态
+预先加载到内存：
+
+- 白名单：Emby 用户 ID 白名单，以及 Telegram 白名单经 ``UserExtendModel``
+  映射出的 Emby 用户 ID，按 :data:`PLAYBACK_POLICY_REFRESH_SECONDS` 在后台刷新，
+  进程内通过 ``set_config`` 修改白名单时立即失效；
+- 违规客户端：预编译的关键字匹配；
+- 警告状态：按 Emby 用户首次需要时从 ``EmbyUserModel.extra_data`` 加载，之后
+  冷却判断与计数都在内存完成，写回数据库由后台协程合并异步执行。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import json
+import re
+import time
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Any
+
+from cachetools import TTLCache
+from loguru import logger
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm.attributes import flag_modified
+
+from bot.config.constants import KEY_EMBY_WHITELIST_USER_IDS, KEY_TG_WHITELIST_USER_IDS
+from bot.database.database import sessionmaker
+from bot.database.models.emby_user import EmbyUserModel
+from bot.database.models.user_extend import UserExtendModel
+from bot.services.config_service import add_config_listener, get_config
+from bot.utils.datetime import format_datetime, now, parse_formatted_datetime
+from bot.utils.metrics import record_cache
+
+PLAYBACK_POLICY_REFRESH_SECONDS = 60
+RESTRICTED_CLIENT_KEYWORDS = ("网易", "爆米花")
+WARNING_COOLDOWN = timedelta(minutes=10)
+WARNING_KEY_WEB_PLAYBACK = "web_playback_warning"
+WARNING_KEY_RESTRICTED_CLIENT = "restricted_client_warning"
+
+_POLICY_CONFIG_KEYS = frozenset({KEY_EMBY_WHITELIST_USER_IDS, KEY_TG_WHITELIST_USER_IDS})
+_USER_CACHE_SIZE = 4096
+_USER_CACHE_TTL = 600
+
+
+def parse_whitelist(value: Any) -> list[str]:
+    """把 LIST 配置、JSON 字符串或逗号分隔字符串解析为字符串列表。"""
+    if isinstance(value, list):
+        return [str(x) for x in value]
+    if isinstance(value, str):
+        loaded: Any | None
+        try:
+            loaded = json.loads(value)
+        except json.JSONDecodeError:
+            loaded = None
+        if isinstance(loaded, list):
+            return [str(x) for x in loaded]
+        return [x.strip() for x in value.split(",") if x.strip()]
+    return []
+
+
+def parse_telegram_whitelist(value: Any) -> frozenset[int]:
+    """解析 Telegram 白名单，忽略非正整数项。"""
+    ids = set()
+    for raw in parse_whitelist(value):
+        text = raw.strip()
+        if text.isdigit() and int(text) > 0:
+            ids.add(int(text))
+    return frozenset(ids)
+
+
+@dataclass(slots=True)
+class UserPolicyState:
+    """单个 Emby 用户的警告状态及其绑定的 Telegram 用户。"""
+
+    telegram_id: int | None
+    warnings: dict[str, dict[str, Any]] = field(default_factory=dict)
+
+
+class PlaybackPolicyIndex:
+    """白名单、违规客户端与警告计数的内存索引。"""
+
+    def __init__(self, *, refresh_interval: float = PLAYBACK_POLICY_REFRESH_SECONDS) -> None:
+        self.refresh_interval = refresh_interval
+        self._whitelisted: frozenset[str] = frozenset()
+        self._loaded_at: float | None = None
+        self._refresh_lock = asyncio.Lock()
+        self._refresh_task: asyncio.Task[None] | None = None
+        self._restricted_pattern = re.compile("|".join(re.escape(keyword) for keyword in RESTRICTED_CLIENT_KEYWORDS))
+        self._users: TTLCache[str, UserPolicyState] = TTLCache(maxsize=_USER_CACHE_SIZE, ttl=_USER_CACHE_TTL)
+        # 待写回的警告数据：(Emby 用户 ID, 警告键) -> 最新的警告数据
+        self._pending_writes: dict[tuple[str, str], dict[str, Any]] = {}
+        self._writer_task: asyncio.Task[None] | None = None
+
+    def is_restricted_client(self, client: str, device_name: str) -> bool:
+        return bool(self._restricted_pattern.search(client) or self._restricted_pattern.search(device_name))
+
+    def invalidate(self) -> None:
+        """白名单配置变化后调用，下一次查询会先同步重建索引。"""
+        self._loaded_at = None
+
+    def on_config_changed(self, key: str) -> None:
+        if key in _POLICY_CONFIG_KEYS:
+            self.invalidate()
+
+    async def is_whitelisted(self, emby_user_id: str) -> bool:
+        """判断 Emby 用户（直接或经绑定的 Telegram 账号）是否在白名单中。"""
+        await self._ensure_loaded()
+        return emby_user_id in self._whitelisted
+
+    async def refresh(self) -> None:
+        """从配置和用户绑定关系重建白名单索引。"""
+        async with self._refresh_lock:
+            self._whitelisted = await self._load_whitelist()
+            self._loaded_at = time.monotonic()
+
+    async def _ensure_loaded(self) -> None:
+        if self._loaded_at is None:
+            await self.refresh()
+            return
+        stale = time.monotonic() - self._loaded_at >= self.refresh_interval
+        if stale and (self._refresh_task is None or self._refresh_task.done()):
+            # 过期时先用旧索引回答，后台刷新
+            self._refresh_task = asyncio.create_task(self._refresh_quietly())
+
+    async def _refresh_quietly(self) -> None:
+        try:
+            await self.refresh()
+        except SQLAlchemyError as error:
+            logger.warning(f"⚠️ 刷新播放策略白名单失败，继续使用旧数据: {error}")
+
+    async def _load_whitelist(self) -> frozenset[str]:
+        async with sessionmaker() as session:
+            emby_ids = set(parse_whitelist(await get_config(session, KEY_EMBY_WHITELIST_USER_IDS)))
+            telegram_ids = parse_telegram_whitelist(await get_config(session, KEY_TG_WHITELIST_USER_IDS))
+            if telegram_ids:
+                stmt = select(UserExtendModel.emby_user_id).where(
+                    UserExtendModel.user_id.in_(telegram_ids),
+                    UserExtendModel.emby_user_id.isnot(None),
+                )
+                emby_ids.update(str(emby_id) for emby_id in (await session.execute(stmt)).scalars())
+        return frozenset(emby_ids)
+
+    async def user_state(self, emby_user_id: str) -> UserPolicyState | None:
+        """返回用户的警告状态；首次访问时从数据库加载，本地不存在的用户返回 None。"""
+        state = self._users.get(emby_user_id)
+        record_cache("playback_policy_users", hit=state is not None)
+        if state is not None:
+            return state
+        state = await self._load_user(emby_user_id)
+        if state is None:
+            return None
+        # 尚未写回的警告以内存为准，避免缓存过期后读到旧计数
+        for (user_id, warning_key), warning_data in self._pending_writes.items():
+            if user_id == emby_user_id:
+                state.warnings[warning_key] = warning_data
+        self._users[emby_user_id] = state
+        return state
+
+    async def _load_user(self, emby_user_id: str) -> UserPolicyState | None:
+        stmt = (
+            select(EmbyUserModel.extra_data, UserExtendModel.user_id)
+            .outerjoin(UserExtendModel, UserExtendModel.emby_user_id == EmbyUserModel.emby_user_id)
+            .where(EmbyUserModel.emby_user_id == emby_user_id)
+        )
+        async with sessionmaker() as session:
+            record = (await session.execute(stmt)).first()
+        if record is None:
+            return None
+        extra_data, telegram_id = record
+        warnings = {
+            key: dict(value)
+            for key, value in (extra_data or {}).items()
+            if key in {WARNING_KEY_WEB_PLAYBACK, WARNING_KEY_RESTRICTED_CLIENT} and isinstance(value, dict)
+        }
+        return UserPolicyState(telegram_id=telegram_id, warnings=warnings)
+
+    def record_warning(
+        self,
+        emby_user_id: str,
+        state: UserPolicyState,
+        warning_key: str,
+        client_device: tuple[str, str],
+        item: dict[str, Any],
+    ) -> int | None:
+        """累加一次警告并安排异步写回；处于冷却期时返回 None。"""
+        client, device_name = client_device
+        warning_data = dict(state.warnings.get(warning_key) or {})
+
+        last_warning_time_str = warning_data.get("last_warning_time")
+        if last_warning_time_str:
+            last_time = parse_formatted_datetime(last_warning_time_str)
+            if last_time and (now() - last_time < WARNING_COOLDOWN):
+                return None
+
+        count = int(warning_data.get("count", 0)) + 1
+        warning_data["count"] = count
+        warning_data["last_warning_time"] = format_datetime(now())
+        warning_data["history"] = [
+            *warning_data.get("history", []),
+            {
+                "time": format_datetime(now()),
+                "item_name": item.get("Name"),
+                "item_id": item.get("Id"),
+                "client": client,
+                "device": device_name,
+            },
+        ]
+        state.warnings[warning_key] = warning_data
+        self._pending_writes[(emby_user_id, warning_key)] = warning_data
+        if self._writer_task is None or self._writer_task.done():
+            self._writer_task = asyncio.create_task(self._write_pending())
+        return count
+
+    async def flush(self) -> None:
+        """等待所有警告写回数据库。"""
+        while self._writer_task is not None and not self._writer_task.done():
+            with contextlib.suppress(Exception):
+                await asyncio.shield(self._writer_task)
+        if self._pending_writes:
+            await self._write_pending()
+
+    async def _write_pending(self) -> None:
+        while self._pending_writes:
+            writes, self._pending_writes = self._pending_writes, {}
+            try:
+                await self._persist(writes)
+            except SQLAlchemyError as error:
+                logger.error(f"❌ 写回播放警告失败，稍后重试: {error}")
+                # 新的警告优先，失败的数据只在没有更新版本时放回
+                for key, warning_data in writes.items():
+                    self._pending_writes.setdefault(key, warning_data)
+                await asyncio.sleep(1)
+
+    @staticmethod
+    async def _persist(writes: dict[tuple[str, str], dict[str, Any]]) -> None:
+        """在一个事务中把一批警告数据合并进 ``extra_data``。"""
+        user_ids = {user_id for user_id, _ in writes}
+        async with sessionmaker() as session:
+            stmt = select(EmbyUserModel).where(EmbyUserModel.emby_user_id.in_(user_ids))
+            users = {user.emby_user_id: user for user in (await session.execute(stmt)).scalars()}
+            for (user_id, warning_key), warning_data in writes.items():
+                emby_user = users.get(user_id)
+                if emby_user is None:
+                    continue
+                extra_data = dict(emby_user.extra_data) if emby_user.extra_data else {}
+                extra_data[warning_key] = warning_data
+                emby_user.extra_data = extra_data
+                flag_modified(emby_user, "extra_data")
+            await session.commit()
+
+
+_policy: PlaybackPolicyIndex | None = None
+
+
+def get_playback_policy() -> PlaybackPolicyIndex:
+    """返回进程内共享的播放策略索引，并订阅白名单配置变更。"""
+    global _policy  # noqa: PLW0603
+    if _policy is None:
+        _policy = PlaybackPolicyIndex()
+        add_config_listener(_policy.on_config_changed)
+    return _policy
@@ -0,0 +1,205 @@
+"""问答触发资格的内存索引。
+
+:meth:`QuizService.check_trigger_conditions` 在每条私聊消息和回调之后都会被调用，
+绝大多数情况下结论都是“不出题”。本模块把判断所需的数据放在内存里：
+
+- 触发配置（总开关、概率、每日上限、冷却分钟）：首次使用时读取，之后每
+  :data:`QUIZ_CONFIG_REFRESH_SECONDS` 秒重新读取，进程内修改配置时立即失效；
+- 每个用户的活跃会话到期时间、当天出题次数与最近一次作答/超时时间：首次需要时
+  从数据库加载，之后由会话创建、作答与超时在提交后同步更新。
+
+这样概率判定可以在任何数据库访问之前完成，通过后也只是几次字典查找。用户状态
+放在有上限的 TTL 缓存里，其他进程（如分片工作进程、定时问答）造成的变化最多在
+:data:`QUIZ_USER_CACHE_TTL` 秒后被重新加载；创建会话前仍会查库确认没有活跃会话。
+"""
+
+from __future__ import annotations
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
+
+from cachetools import TTLCache
+from sqlalchemy import desc, func, select
+
+from bot.config.constants import (
+    KEY_QUIZ_COOLDOWN_MINUTES,
+    KEY_QUIZ_DAILY_LIMIT,
+    KEY_QUIZ_GLOBAL_ENABLE,
+    KEY_QUIZ_TRIGGER_PROBABILITY,
+)
+from bot.config.mappings import DEFAULT_CONFIGS
+from bot.database.models import QuizActiveSessionModel, QuizLogModel
+from bot.services.config_service import add_config_listener, get_config
+from bot.utils.datetime import now
+from bot.utils.metrics import record_cache
+
+if TYPE_CHECKING:
+    from datetime import date, datetime
+
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+QUIZ_CONFIG_REFRESH_SECONDS = 60
+QUIZ_USER_CACHE_SIZE = 10_000
+QUIZ_USER_CACHE_TTL = 3600
+
+_TRIGGER_CONFIG_KEYS = frozenset(
+    {KEY_QUIZ_GLOBAL_ENABLE, KEY_QUIZ_TRIGGER_PROBABILITY, KEY_QUIZ_DAILY_LIMIT, KEY_QUIZ_COOLDOWN_MINUTES}
+)
+
+
+def _default(key: str) -> Any:
+    return DEFAULT_CONFIGS[key][0]
+
+
+@dataclass(slots=True, frozen=True)
+class QuizTriggerConfig:
+    """问答触发配置的快照。"""
+
+    enabled: bool
+    probability: float
+    daily_limit: int
+    cooldown_minutes: float
+
+
+@dataclass(slots=True)
+class QuizUserState:
+    """单个用户的问答状态。"""
+
+    active_until: datetime | None
+    day: date
+    daily_count: int
+    last_quiz_at: datetime | None
+
+    def count_on(self, current: datetime) -> int:
+        return self.daily_count if self.day == current.date() else 0
+
+    def record_quiz(self, current: datetime) -> None:
+        if self.day != current.date():
+            self.day = current.date()
+            self.daily_count = 0
+        self.daily_count += 1
+        self.last_quiz_at = current
+
+
+class QuizEligibilityTracker:
+    """问答触发配置与用户状态的内存索引。"""
+
+    def __init__(
+        self,
+        *,
+        refresh_interval: float = QUIZ_CONFIG_REFRESH_SECONDS,
+        cache_size: int = QUIZ_USER_CACHE_SIZE,
+        cache_ttl: float = QUIZ_USER_CACHE_TTL,
+    ) -> None:
+        self.refresh_interval = refresh_interval
+        self._config: QuizTriggerConfig | None = None
+        self._loaded_at = 0.0
+        self._users: TTLCache[int, QuizUserState] = TTLCache(maxsize=cache_size, ttl=cache_ttl)
+
+    # ==================== 配置 ====================
+
+    def set_config(self, config: QuizTriggerConfig) -> None:
+        self._config = config
+        self._loaded_at = time.monotonic()
+
+    def on_config_changed(self, key: str) -> None:
+        if key in _TRIGGER_CONFIG_KEYS:
+            self._config = None
+
+    async def config(self, session: AsyncSession) -> QuizTriggerConfig:
+        """返回触发配置，过期时用当前会话重新读取。"""
+        if self._config is not None and time.monotonic() - self._loaded_at < self.refresh_interval:
+            return self._config
+        enabled = await get_config(session, KEY_QUIZ_GLOBAL_ENABLE)
+        probability = await get_config(session, KEY_QUIZ_TRIGGER_PROBABILITY)
+        daily_limit = await get_config(session, KEY_QUIZ_DAILY_LIMIT)
+        cooldown = await get_config(session, KEY_QUIZ_COOLDOWN_MINUTES)
+        self.set_config(
+            QuizTriggerConfig(
+                # 未配置时视为开启
+                enabled=enabled is not False,
+                probability=float(probability if probability is not None else _default(KEY_QUIZ_TRIGGER_PROBABILITY)),
+                daily_limit=int(daily_limit if daily_limit is not None else _default(KEY_QUIZ_DAILY_LIMIT)),
+                cooldown_minutes=float(cooldown if cooldown is not None else _default(KEY_QUIZ_COOLDOWN_MINUTES)),
+            )
+        )
+        return self._config
+
+    # ==================== 用户状态 ====================
+
+    async def user_state(self, session: AsyncSession, user_id: int) -> QuizUserState:
+        """返回用户状态，未缓存时从数据库加载。"""
+        state = self._users.get(user_id)
+        record_cache("quiz_eligibility", hit=state is not None)
+        if state is None:
+            state = await self._load(session, user_id)
+            self._users[user_id] = state
+        return state
+
+    @staticmethod
+    async def _load(session: AsyncSession, user_id: int) -> QuizUserState:
+        current = now()
+        today_start = current.replace(hour=0, minute=0, second=0, microsecond=0)
+        active_until = (
+            await session.execute(
+                select(func.max(QuizActiveSessionModel.expire_at)).where(
+                    QuizActiveSessionModel.user_id == user_id,
+                    QuizActiveSessionModel.is_deleted.is_(False),
+                )
+            )
+        ).scalar()
+        daily_count = (
+            await session.execute(
+                select(func.count(QuizLogModel.id)).where(
+                    QuizLogModel.user_id == user_id,
+                    QuizLogModel.created_at >= today_start,
+                )
+            )
+        ).scalar()
+        last_quiz_at = (
+            await session.execute(
+                select(QuizLogModel.created_at)
+                .where(QuizLogModel.user_id == user_id)
+                .order_by(desc(QuizLogModel.created_at))
+                .limit(1)
+            )
+        ).scalar()
+        return QuizUserState(
+            active_until=active_until,
+            day=current.date(),
+            daily_count=daily_count or 0,
+            last_quiz_at=last_quiz_at,
+        )
+
+    def session_started(self, user_id: int, expire_at: datetime) -> None:
+        """会话创建并提交后调用。"""
+        state = self._users.get(user_id)
+        if state is not None:
+            state.active_until = expire_at
+
+    def session_closed(self, user_id: int) -> None:
+        """会话作答、超时或被清理并提交后调用。"""
+        state = self._users.get(user_id)
+        if state is not None:
+            state.active_until = None
+
+    def quiz_logged(self, user_id: int) -> None:
+        """写入一条作答/超时日志并提交后调用，计入当天次数与冷却时间。"""
+        state = self._users.get(user_id)
+        if state is not None:
+            state.record_quiz(now())
+
+    def forget(self, user_id: int) -> None:
+        self._users.pop(user_id, None)
+
+
+_tracker: QuizEligibilityTracker | None = None
+
+
+def get_quiz_eligibility() -> QuizEligibilityTracker:
+    """返回进程内共享的问答资格索引，并在相关配置变更时使其失效。"""
+    global _tracker  # noqa: PLW0603
+    if _tracker is None:
+        _tracker = QuizEligibilityTracker()
+        add_config_listener(_tracker.on_config_changed)
+    return _tracker
@@ -7,18 +7,15 @@ from aiogram import Bot
 from aiogram.types import InlineKeyboardMarkup
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from loguru import logger
-from sqlalchemy import and_, desc, func, select
+from sqlalchemy import desc, func, select
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from bot.config.constants import (
-    KEY_QUIZ_COOLDOWN_MINUTES,
-    KEY_QUIZ_DAILY_LIMIT,
     KEY_QUIZ_GLOBAL_ENABLE,
     KEY_QUIZ_SCHEDULE_TARGET_COUNT,
     KEY_QUIZ_SCHEDULE_TARGET_TYPE,
     KEY_QUIZ_SESSION_TIMEOUT,
-    KEY_QUIZ_TRIGGER_PROBABILITY,
 )
 from bot.core.constants import CURRENCY_NAME, CURRENCY_SYMBOL
 from bot.database.models import (
@@ -28,8 +25,10 @@ from bot.database.models import (
     QuizQuestionModel,
     UserModel,
 )
+from bot.database.query_tracker import tracked
 from bot.services.config_service import get_config
 from bot.services.currency import CurrencyService
+from bot.services.quiz_eligibility import get_quiz_eligibility
 from bot.utils.datetime import compute_expire_at, now
 from bot.utils.message import safe_delete_message
 
@@ -218,27 +217,30 @@ class QuizService:
         if chat_id != user_id:
             return False
 
-        # 0. 检查总开关
-        global_enabled = await get_config(session, KEY_QUIZ_GLOBAL_ENABLE)
-        if global_enabled is False: # None 默认开启
+        # 0. 总开关与概率检查：配置常驻内存，未命中概率时不访问数据库
+        tracker = get_quiz_eligibility()
+        config = await tracker.config(session)
+        if not config.enabled:
+            return False
+        if random.random() > config.probability:
             return False
 
-        # 获取配置
-        trigger_prob = await get_config(session, KEY_QUIZ_TRIGGER_PROBABILITY)
-        daily_limit = await get_config(session, KEY_QUIZ_DAILY_LIMIT)
-        cooldown_min = await get_config(session, KEY_QUIZ_COOLDOWN_MINUTES)
-
-        # 1. 检查是否存在活跃会话
-        active_stmt = select(QuizActiveSessionModel).where(
-            QuizActiveSessionModel.user_id == user_id,
-            QuizActiveSessionModel.is_deleted.is_(False),
-        )
-        active_result = await session.execute(active_stmt)
-        active_session = active_result.scalar_one_or_none()
-
-        if active_session:
-            # 检查是否过期（expire_at 采用 datetime，精确到秒）
-            if active_session.expire_at <= now():
+        # 1. 检查是否存在活跃会话（用户状态首次使用时从数据库加载）
+        state = await tracker.user_state(session, user_id)
+        current = now()
+        if state.active_until is not None:
+            if state.active_until > current:
+                # 还有效，不触发新题目
+                return False
+            active_stmt = select(QuizActiveSessionModel).where(
+                QuizActiveSessionModel.user_id == user_id,
+                QuizActiveSessionModel.is_deleted.is_(False),
+            )
+            active_session = (await session.execute(active_stmt)).scalar_one_or_none()
+            if active_session is None:
+                # 已由其他进程或定时任务清理
+                tracker.session_closed(user_id)
+            else:
                 # 如果传入了 bot 且有消息 ID，尝试删除过期消息
                 if bot and active_session.message_id and active_session.message_id > 0:
                     try:
@@ -246,41 +248,18 @@ class QuizService:
                     except Exception as e:
                         logger.warning(f"删除过期问答消息失败: {e}")
 
-                # 过期处理：记录日志并删除
+                # 过期处理：记录日志并删除，同时计入次数与冷却
                 await QuizService.handle_timeout(session, user_id)
-                # 继续后续流程（视为无活跃会话）
-            else:
-                # 还有效，不触发新题目
-                return False
+                current = now()
 
-        # 2. 概率检查 (最先检查，减少DB查询)
-        if random.random() > trigger_prob:
+        # 2. 每日次数检查
+        if state.count_on(current) >= config.daily_limit:
             return False
 
-        # 3. 每日次数检查
-        today_start = now().replace(hour=0, minute=0, second=0, microsecond=0)
-        daily_count_stmt = select(func.count(QuizLogModel.id)).where(
-            and_(
-                QuizLogModel.user_id == user_id,
-                QuizLogModel.created_at >= today_start
-            )
-        )
-        daily_count = (await session.execute(daily_count_stmt)).scalar() or 0
-        if daily_count >= daily_limit:
+        # 3. 冷却时间检查
+        if state.last_quiz_at and current - state.last_quiz_at < timedelta(minutes=config.cooldown_minutes):
             return False
 
-        # 4. 冷却时间检查
-        last_log_stmt = select(QuizLogModel.created_at).where(
-            QuizLogModel.user_id == user_id
-        ).order_by(desc(QuizLogModel.created_at)).limit(1)
-        last_time = (await session.execute(last_log_stmt)).scalar()
-
-        if last_time:
-            # 计算时间差
-            elapsed = now() - last_time
-            if elapsed < timedelta(minutes=cooldown_min):
-                return False
-
         return True
 
     @classmethod
@@ -468,6 +447,7 @@ class QuizService:
             await session.rollback()
             logger.warning("重复的活跃会话，跳过创建")
             return None
+        get_quiz_eligibility().session_started(user_id, expire_at)
 
         builder = InlineKeyboardBuilder()
         for idx in range(len(options)):
@@ -532,6 +512,7 @@ class QuizService:
             quiz_session.deleted_at = now()
             quiz_session.remark = "题目数据异常，自动清理"
             await session.commit()
+            get_quiz_eligibility().session_closed(quiz_session.user_id)
             return False, 0, "⚠️ 题目数据异常。", ""
 
         # 重建原始 caption (在删除 session 前进行)
@@ -600,6 +581,9 @@ class QuizService:
         quiz_scope = "群组" if is_group_quiz else "私聊"
         quiz_session.remark = f"{quiz_scope}问答完成作答: {'答对' if is_correct else '答错'}"
         await session.commit()
+        tracker = get_quiz_eligibility()
+        tracker.session_closed(quiz_session.user_id)
+        tracker.quiz_logged(user_id)
 
         if is_correct:
             msg = "✅ 回答正确！"
@@ -638,6 +622,10 @@ class QuizService:
             quiz_session.deleted_at = now()
             quiz_session.remark = "会话超时，自动清理"
         await session.commit()
+        if quiz_session:
+            tracker = get_quiz_eligibility()
+            tracker.session_closed(user_id)
+            tracker.quiz_logged(user_id)
 
     @staticmethod
     async def handle_timeout_by_session_id(session: AsyncSession, session_id: int) -> None:
@@ -658,8 +646,12 @@ class QuizService:
         quiz_session.deleted_at = now()
         quiz_session.remark = "会话超时，自动清理"
         await session.commit()
+        tracker = get_quiz_eligibility()
+        tracker.session_closed(quiz_session.user_id)
+        tracker.quiz_logged(quiz_session.user_id)
 
     @staticmethod
+    @tracked("job:trigger_scheduled_quiz")
     async def trigger_scheduled_quiz(bot: Bot) -> None:
         """
         执行定时问答触发
@@ -0,0 +1,355 @@
+"""通知表与审计表的保留、瘦身与归档。
+
+按 :data:`RETENTION_POLICIES` 中的表/事件类型策略执行两类维护：
+
+- 瘦身：超过 ``strip_after_days`` 的行把体积大的 JSON 字段替换为精简版本，
+  按主键顺序处理，进度水位记录在 ``<归档根目录>/state.json``，已处理的行
+  不会被再次扫描；
+- 归档：超过 ``archive_after_days`` 的行按创建月份追加写入
+  ``<归档根目录>/<表名>/<YYYY-MM>.jsonl.gz`` 后再按主键批量删除。
+
+每批最多处理 ``RETENTION_BATCH_SIZE`` 行并单独提交，批次之间短暂让出，
+避免长事务锁住热表。先写归档再删除，中途中断时重跑可能在归档中产生重复行，
+:func:`read_archive` 会按主键去重。由 :func:`start_retention_scheduler` 每日定时执行。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import gzip
+import json
+import os
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from enum import Enum
+from pathlib import Path
+from typing import Any
+
+from loguru import logger
+from sqlalchemy import delete, inspect, select, update
+from sqlalchemy.exc import SQLAlchemyError
+
+from bot.core.config import DIR, settings
+from bot.core.constants import (
+    EVENT_TYPE_PLAYBACK_PAUSE,
+    EVENT_TYPE_PLAYBACK_START,
+    EVENT_TYPE_PLAYBACK_STOP,
+    EVENT_TYPE_PLAYBACK_UNPAUSE,
+)
+from bot.database.database import sessionmaker
+from bot.database.models.audit_log import ActionType, AuditLogModel
+from bot.database.models.notification import NotificationModel
+from bot.utils.datetime import now
+
+RETENTION_ARCHIVE_ROOT = DIR / "data" / "archives"
+# 每批之间让出的秒数，给在线请求留出锁窗口
+_BATCH_PAUSE_SECONDS = 0.2
+# 单次运行每个策略最多处理的批数，剩余部分留给下次运行
+_MAX_BATCHES_PER_RUN = 200
+
+PLAYBACK_EVENT_TYPES = (
+    EVENT_TYPE_PLAYBACK_START,
+    EVENT_TYPE_PLAYBACK_STOP,
+    EVENT_TYPE_PLAYBACK_PAUSE,
+    EVENT_TYPE_PLAYBACK_UNPAUSE,
+)
+
+# Emby 载荷瘦身后保留的字段
+_SLIM_PAYLOAD_KEYS = ("Title", "Event", "Date", "Severity")
+_SLIM_ITEM_KEYS = ("Id", "Name", "Type", "SeriesId", "SeriesName", "ParentIndexNumber", "IndexNumber")
+_SLIM_NESTED_KEYS = {"User": ("Id", "Name"), "Session": ("Id", "Client", "DeviceName")}
+
+
+def slim_emby_payload(row: dict[str, Any]) -> dict[str, Any]:
+    """只保留 Emby 载荷中用于展示与排查的字段，并标记为已瘦身。"""
+    payload = row.get("payload") or {}
+    slim: dict[str, Any] = {key: payload[key] for key in _SLIM_PAYLOAD_KEYS if key in payload}
+    item = payload.get("Item")
+    if isinstance(item, dict):
+        slim["Item"] = {key: item[key] for key in _SLIM_ITEM_KEYS if key in item}
+    for name, keys in _SLIM_NESTED_KEYS.items():
+        nested = payload.get(name)
+        if isinstance(nested, dict):
+            slim[name] = {key: nested[key] for key in keys if key in nested}
+    slim["_stripped"] = True
+    return {"payload": slim}
+
+
+def strip_audit_details(row: dict[str, Any]) -> dict[str, Any]:
+    """清空审计日志的扩展详情与 User-Agent。"""
+    del row
+    return {"details": None, "user_agent": None}
+
+
+@dataclass(frozen=True, slots=True)
+class RetentionPolicy:
+    """一张表中一类事件的保留策略。
+
+    ``event_types`` 为空表示该表中未被同表其他策略点名的全部事件类型。
+    """
+
+    name: str
+    model: type[Any]
+    event_column: str
+    event_types: tuple[str, ...] | None = None
+    archive_after_days: int | None = None
+    strip_after_days: int | None = None
+    strip: Callable[[dict[str, Any]], dict[str, Any]] | None = None
+
+
+RETENTION_POLICIES: tuple[RetentionPolicy, ...] = (
+    RetentionPolicy(
+        name="emby_notifications.playback",
+        model=NotificationModel,
+        event_column="type",
+        event_types=PLAYBACK_EVENT_TYPES,
+        strip_after_days=3,
+        archive_after_days=30,
+        strip=slim_emby_payload,
+    ),
+    RetentionPolicy(
+        name="emby_notifications.other",
+        model=NotificationModel,
+        event_column="type",
+        strip_after_days=30,
+        archive_after_days=180,
+        strip=slim_emby_payload,
+    ),
+    RetentionPolicy(
+        name="audit_logs.user_login",
+        model=AuditLogModel,
+        event_column="action_type",
+        event_types=(ActionType.USER_LOGIN,),
+        strip_after_days=30,
+        archive_after_days=90,
+        strip=strip_audit_details,
+    ),
+    RetentionPolicy(
+        name="audit_logs.other",
+        model=AuditLogModel,
+        event_column="action_type",
+        archive_after_days=365,
+    ),
+)
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    return str(value)
+
+
+def _row_to_dict(row: Any) -> dict[str, Any]:
+    return {attr.key: getattr(row, attr.key) for attr in inspect(type(row)).column_attrs}
+
+
+class ArchiveStore:
+    """按表和月份保存的 JSONL.gz 归档文件。"""
+
+    def __init__(self, root: Path = RETENTION_ARCHIVE_ROOT) -> None:
+        self.root = Path(root)
+
+    def path_for(self, table: str, month: str) -> Path:
+        return self.root / table / f"{month}.jsonl.gz"
+
+    def append(self, table: str, rows: list[dict[str, Any]]) -> int:
+        """按 ``created_at`` 所在月份追加写入，返回写入行数。
+
+        每次追加是一个独立的 gzip 成员，``gzip`` 读取时会自动拼接。
+        """
+        by_month: dict[str, list[str]] = {}
+        for row in rows:
+            created_at = row.get("created_at")
+            month = created_at.strftime("%Y-%m") if isinstance(created_at, datetime) else "unknown"
+            by_month.setdefault(month, []).append(json.dumps(row, ensure_ascii=False, default=_json_default))
+        for month, lines in by_month.items():
+            path = self.path_for(table, month)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with path.open("ab") as raw, gzip.GzipFile(fileobj=raw, mode="wb") as archive:
+                archive.write(("\n".join(lines) + "\n").encode("utf-8"))
+                archive.flush()
+                raw.flush()
+                os.fsync(raw.fileno())
+        return len(rows)
+
+    def months(self, table: str) -> list[str]:
+        directory = self.root / table
+        if not directory.exists():
+            return []
+        return sorted(path.name.removesuffix(".jsonl.gz") for path in directory.glob("*.jsonl.gz"))
+
+    def iter_rows(self, table: str, month: str) -> Iterator[dict[str, Any]]:
+        with gzip.open(self.path_for(table, month), "rt", encoding="utf-8") as archive:
+            for line in archive:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def read_archive(
+    table: str,
+    *,
+    month_from: str | None = None,
+    month_to: str | None = None,
+    event_types: set[str] | None = None,
+    predicate: Callable[[dict[str, Any]], bool] | None = None,
+    limit: int | None = None,
+    store: ArchiveStore | None = None,
+) -> list[dict[str, Any]]:
+    """查询归档行
+
+    功能说明:
+    - 按月份范围（``YYYY-MM``，闭区间）读取归档文件，按主键去重
+    - ``event_types`` 匹配 ``type`` 或 ``action_type`` 列，``predicate`` 用于其他条件
+
+    返回值:
+    - list[dict]: 按归档顺序排列的行
+    """
+    store = store or ArchiveStore()
+    results: list[dict[str, Any]] = []
+    seen: set[Any] = set()
+    for month in store.months(table):
+        if (month_from and month < month_from) or (month_to and month > month_to):
+            continue
+        for row in store.iter_rows(table, month):
+            row_id = row.get("id")
+            if row_id in seen:
+                continue
+            seen.add(row_id)
+            event_type = row.get("type", row.get("action_type"))
+            if event_types is not None and event_type not in event_types:
+                continue
+            if predicate is not None and not predicate(row):
+                continue
+            results.append(row)
+            if limit is not None and len(results) >= limit:
+                return results
+    return results
+
+
+class RetentionRunner:
+    """按策略执行瘦身与归档。"""
+
+    def __init__(
+        self,
+        policies: tuple[RetentionPolicy, ...] = RETENTION_POLICIES,
+        *,
+        store: ArchiveStore | None = None,
+        batch_size: int | None = None,
+        batch_pause: float = _BATCH_PAUSE_SECONDS,
+    ) -> None:
+        self.policies = policies
+        self.store = store or ArchiveStore()
+        self.batch_size = batch_size or settings.RETENTION_BATCH_SIZE
+        self.batch_pause = batch_pause
+        self._state_path = self.store.root / "state.json"
+
+    async def run(self) -> dict[str, dict[str, int]]:
+        """执行全部策略，返回每个策略瘦身与归档的行数。"""
+        summary: dict[str, dict[str, int]] = {}
+        for policy in self.policies:
+            stripped = await self.strip_policy(policy) if policy.strip and policy.strip_after_days else 0
+            archived = await self.archive_policy(policy) if policy.archive_after_days else 0
+            summary[policy.name] = {"stripped": stripped, "archived": archived}
+            if stripped or archived:
+                logger.info(f"🗄️ [数据保留] {policy.name}: 瘦身 {stripped} 行, 归档 {archived} 行")
+        return summary
+
+    def _conditions(self, policy: RetentionPolicy, days: int) -> list[Any]:
+        model = policy.model
+        column = getattr(model, policy.event_column)
+        conditions = [model.created_at < now() - timedelta(days=days)]
+        if policy.event_types is not None:
+            conditions.append(column.in_(policy.event_types))
+        else:
+            claimed = {
+                event_type
+                for other in self.policies
+                if other.model is model and other.event_types
+                for event_type in other.event_types
+            }
+            if claimed:
+                conditions.append(column.notin_(claimed))
+        return conditions
+
+    async def archive_policy(self, policy: RetentionPolicy) -> int:
+        """把超过保留期的行写入归档后按主键批量删除。"""
+        assert policy.archive_after_days is not None
+        model = policy.model
+        total = 0
+        for _ in range(_MAX_BATCHES_PER_RUN):
+            conditions = self._conditions(policy, policy.archive_after_days)
+            async with sessionmaker() as session:
+                stmt = select(model).where(*conditions).order_by(model.id).limit(self.batch_size)
+                rows = [_row_to_dict(row) for row in (await session.execute(stmt)).scalars().all()]
+                if not rows:
+                    break
+                await asyncio.to_thread(self.store.append, model.__tablename__, rows)
+                await session.execute(delete(model).where(model.id.in_([row["id"] for row in rows])))
+                await session.commit()
+            total += len(rows)
+            if len(rows) < self.batch_size:
+                break
+            await asyncio.sleep(self.batch_pause)
+        return total
+
+    async def strip_policy(self, policy: RetentionPolicy) -> int:
+        """把超过瘦身期限的行替换为精简字段，按主键水位推进。"""
+        assert policy.strip is not None and policy.strip_after_days is not None
+        model = policy.model
+        state = await asyncio.to_thread(self._read_state)
+        watermark = int(state.get(policy.name, {}).get("stripped_id", 0))
+        total = 0
+        for _ in range(_MAX_BATCHES_PER_RUN):
+            conditions = [*self._conditions(policy, policy.strip_after_days), model.id > watermark]
+            async with sessionmaker() as session:
+                stmt = select(model).where(*conditions).order_by(model.id).limit(self.batch_size)
+                rows = [_row_to_dict(row) for row in (await session.execute(stmt)).scalars().all()]
+                if not rows:
+                    break
+                values = [{"id": row["id"], **policy.strip(row)} for row in rows]
+                await session.execute(update(model), values)
+                await session.commit()
+            watermark = rows[-1]["id"]
+            state.setdefault(policy.name, {})["stripped_id"] = watermark
+            await asyncio.to_thread(self._write_state, state)
+            total += len(rows)
+            if len(rows) < self.batch_size:
+                break
+            await asyncio.sleep(self.batch_pause)
+        return total
+
+    def _read_state(self) -> dict[str, Any]:
+        try:
+            state = json.loads(self._state_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+        return state if isinstance(state, dict) else {}
+
+    def _write_state(self, state: dict[str, Any]) -> None:
+        self._state_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self._state_path.with_suffix(".tmp")
+        temp_path.write_text(json.dumps(state, ensure_ascii=False), encoding="utf-8")
+        temp_path.replace(self._state_path)
+
+
+async def start_retention_scheduler() -> None:
+    """每日在 ``RETENTION_TIME`` 执行一次数据保留任务"""
+    logger.info("⏰ [数据保留] 调度器启动")
+    runner = RetentionRunner()
+    while True:
+        try:
+            await asyncio.sleep(1)
+            # 秒数归零时检查，避免一分钟内重复触发
+            current = now()
+            if current.second == 0 and current.strftime("%H:%M") == settings.RETENTION_TIME:
+                logger.info("⏰ [数据保留] 时间匹配，开始瘦身与归档")
+                await runner.run()
+                await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            break
+        except (SQLAlchemyError, OSError) as e:
+            logger.error(f"❌ [数据保留] 执行出错: {e}")
+            await asyncio.sleep(5)
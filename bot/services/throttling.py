@@ -0,0 +1,259 @@
+"""基于令牌桶的请求限流。
+
+每个更新按用户与群组各取一个令牌：
+
+- 用户桶按策略分开计数，默认策略由 ``RATE_LIMIT`` / ``THROTTLE_BURST`` 决定；
+- 群组桶（私聊不计）限制整个群的请求速度，由 ``THROTTLE_CHAT_RATE`` /
+  ``THROTTLE_CHAT_BURST`` 决定；
+- 配置项 ``throttle.policies`` 可按命令名或回调数据前缀覆盖用户桶参数，也可
+  覆盖 ``default`` / ``chat`` 两个默认策略，例如::
+
+      {
+          "commands": {"checkin": {"rate": 0.1, "burst": 1}},
+          "callbacks": {"redpacket": {"rate": 1, "burst": 3, "queue": true, "max_wait": 2}},
+          "chat": {"rate": 5, "burst": 20}
+      }
+
+  回调前缀按 ``:`` 分段匹配，先查前两段（如 ``quiz:answer``），再查第一段。
+
+令牌不足时默认丢弃；策略开启 ``queue`` 且等待时间不超过 ``max_wait`` 秒时预占
+令牌并等待。所有令牌桶放在容量为 ``THROTTLE_MAX_BUCKETS`` 的 LRU 中，每个更新
+只做常数次字典操作。策略在首次使用时加载，之后后台定期刷新，进程内修改配置
+时立即失效。
+"""
+
+from __future__ import annotations
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any
+
+from cachetools import LRUCache
+from loguru import logger
+from sqlalchemy.exc import SQLAlchemyError
+
+from bot.config.constants import KEY_THROTTLE_POLICIES
+from bot.core.config import settings
+from bot.database.database import sessionmaker
+from bot.services.config_service import add_config_listener, get_config
+from bot.utils.metrics import registry
+
+THROTTLE_POLICY_REFRESH_SECONDS = 60
+
+THROTTLED_EVENTS = registry.counter(
+    "bot_throttled_total", "被限流的请求数，按策略、触发的令牌桶与处理方式统计", ("policy", "scope", "action")
+)
+
+
+@dataclass(slots=True, frozen=True)
+class ThrottlePolicy:
+    """一个令牌桶策略：每秒补充 ``rate`` 个令牌，最多积累 ``burst`` 个。"""
+
+    name: str
+    rate: float
+    burst: int
+    queue: bool = False
+    max_wait: float = 0.0
+
+
+@dataclass(slots=True)
+class ThrottlePolicies:
+    """默认策略、群组策略与按命令 / 回调前缀覆盖的策略。"""
+
+    default: ThrottlePolicy
+    chat: ThrottlePolicy
+    commands: dict[str, ThrottlePolicy] = field(default_factory=dict)
+    callbacks: dict[str, ThrottlePolicy] = field(default_factory=dict)
+
+    def match(self, command: str | None = None, callback: str | None = None) -> ThrottlePolicy:
+        if command is not None:
+            return self.commands.get(command, self.default)
+        if callback is not None and self.callbacks:
+            parts = callback.split(":", 2)
+            if len(parts) > 1:
+                policy = self.callbacks.get(f"{parts[0]}:{parts[1]}")
+                if policy is not None:
+                    return policy
+            return self.callbacks.get(parts[0], self.default)
+        return self.default
+
+
+@dataclass(slots=True, frozen=True)
+class ThrottleDecision:
+    """限流结果：``allowed`` 为 False 表示丢弃，``delay`` 为排队需要等待的秒数。"""
+
+    allowed: bool
+    delay: float = 0.0
+    policy: str = ""
+    scope: str = ""
+
+
+class TokenBucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens: float, updated: float) -> None:
+        self.tokens = tokens
+        self.updated = updated
+
+    def delay(self, policy: ThrottlePolicy, now: float) -> float:
+        """补充令牌，返回还需等待多少秒才有一个令牌。"""
+        self.tokens = min(float(policy.burst), self.tokens + (now - self.updated) * policy.rate)
+        self.updated = now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / policy.rate
+
+
+def default_policies() -> ThrottlePolicies:
+    return ThrottlePolicies(
+        default=ThrottlePolicy("default", rate=1 / settings.RATE_LIMIT, burst=settings.THROTTLE_BURST),
+        chat=ThrottlePolicy("chat", rate=settings.THROTTLE_CHAT_RATE, burst=settings.THROTTLE_CHAT_BURST),
+    )
+
+
+def _parse_policy(name: str, raw: Any, fallback: ThrottlePolicy) -> ThrottlePolicy | None:
+    if not isinstance(raw, dict):
+        logger.warning(f"⚠️ 忽略格式错误的限流策略 {name}: {raw!r}")
+        return None
+    try:
+        rate = float(raw.get("rate", fallback.rate))
+        burst = int(raw.get("burst", fallback.burst))
+        max_wait = float(raw.get("max_wait", fallback.max_wait))
+    except (TypeError, ValueError):
+        logger.warning(f"⚠️ 忽略格式错误的限流策略 {name}: {raw!r}")
+        return None
+    if rate <= 0 or burst < 1 or max_wait < 0:
+        logger.warning(f"⚠️ 忽略取值无效的限流策略 {name}: {raw!r}")
+        return None
+    return ThrottlePolicy(name, rate=rate, burst=burst, queue=bool(raw.get("queue", fallback.queue)), max_wait=max_wait)
+
+
+def parse_policies(value: Any) -> ThrottlePolicies:
+    """把 ``throttle.policies`` 配置解析为策略集合，无效项记录警告后忽略。"""
+    policies = default_policies()
+    if not isinstance(value, dict):
+        return policies
+    for name in ("default", "chat"):
+        if name in value:
+            parsed = _parse_policy(name, value[name], getattr(policies, name))
+            if parsed is not None:
+                setattr(policies, name, parsed)
+    for section, prefix in (("commands", "/"), ("callbacks", "cb:")):
+        entries = value.get(section) or {}
+        if not isinstance(entries, dict):
+            continue
+        target: dict[str, ThrottlePolicy] = getattr(policies, section)
+        for key, raw in entries.items():
+            match_key = str(key).lstrip("/").lower() if section == "commands" else str(key).rstrip(":")
+            parsed = _parse_policy(f"{prefix}{match_key}", raw, policies.default)
+            if parsed is not None:
+                target[match_key] = parsed
+    return policies
+
+
+class Throttler:
+    """令牌桶集合与策略索引。"""
+
+    def __init__(
+        self,
+        *,
+        max_buckets: int = settings.THROTTLE_MAX_BUCKETS,
+        refresh_interval: float = THROTTLE_POLICY_REFRESH_SECONDS,
+    ) -> None:
+        self.refresh_interval = refresh_interval
+        self.policies = default_policies()
+        self._buckets: LRUCache[tuple[str, int], TokenBucket] = LRUCache(maxsize=max_buckets)
+        self._loaded_at: float | None = None
+        self._refresh_lock = asyncio.Lock()
+        self._refresh_task: asyncio.Task[None] | None = None
+
+    # ==================== 策略 ====================
+
+    def set_policies(self, policies: ThrottlePolicies) -> None:
+        self.policies = policies
+        self._loaded_at = time.monotonic()
+
+    def invalidate(self) -> None:
+        self._loaded_at = None
+
+    def on_config_changed(self, key: str) -> None:
+        if key == KEY_THROTTLE_POLICIES:
+            self.invalidate()
+
+    async def ensure_policies(self) -> None:
+        """首次使用时同步加载策略，过期后先用旧策略、后台刷新。"""
+        if self._loaded_at is None:
+            await self._refresh_quietly()
+            return
+        stale = time.monotonic() - self._loaded_at >= self.refresh_interval
+        if stale and (self._refresh_task is None or self._refresh_task.done()):
+            self._refresh_task = asyncio.create_task(self._refresh_quietly())
+
+    async def refresh(self) -> None:
+        async with self._refresh_lock:
+            async with sessionmaker() as session:
+                value = await get_config(session, KEY_THROTTLE_POLICIES)
+            self.set_policies(parse_policies(value))
+
+    async def _refresh_quietly(self) -> None:
+        try:
+            await self.refresh()
+        except SQLAlchemyError as error:
+            logger.warning(f"⚠️ 加载限流策略失败，继续使用当前策略: {error}")
+            # 避免数据库不可用时每个更新都重试
+            self._loaded_at = time.monotonic()
+
+    # ==================== 令牌 ====================
+
+    def _bucket(self, key: tuple[str, int], policy: ThrottlePolicy, now: float) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(float(policy.burst), now)
+            self._buckets[key] = bucket
+        return bucket
+
+    def acquire(
+        self,
+        user_id: int | None,
+        chat_id: int | None,
+        *,
+        command: str | None = None,
+        callback: str | None = None,
+    ) -> ThrottleDecision:
+        """为一次请求同时从用户桶与群组桶各取一个令牌。"""
+        policy = self.policies.match(command, callback)
+        now = time.monotonic()
+        checks: list[tuple[str, TokenBucket, ThrottlePolicy]] = []
+        if user_id is not None:
+            checks.append(("user", self._bucket((policy.name, user_id), policy, now), policy))
+        if chat_id is not None and chat_id != user_id:
+            chat_policy = self.policies.chat
+            checks.append(("chat", self._bucket((chat_policy.name, chat_id), chat_policy, now), chat_policy))
+
+        wait, scope = 0.0, ""
+        for check_scope, bucket, bucket_policy in checks:
+            delay = bucket.delay(bucket_policy, now)
+            if delay > wait:
+                wait, scope = delay, check_scope
+        if wait > 0 and not (policy.queue and wait <= policy.max_wait):
+            THROTTLED_EVENTS.inc(policy=policy.name, scope=scope, action="dropped")
+            return ThrottleDecision(allowed=False, policy=policy.name, scope=scope)
+        for _, bucket, _ in checks:
+            # 排队时令牌可为负，相当于预占未来的令牌，后续请求随之顺延
+            bucket.tokens -= 1
+        if wait > 0:
+            THROTTLED_EVENTS.inc(policy=policy.name, scope=scope, action="queued")
+        return ThrottleDecision(allowed=True, delay=wait, policy=policy.name, scope=scope)
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+_throttler: Throttler | None = None
+
+
+def get_throttler() -> Throttler:
+    """返回进程内共享的限流器，并在配置变更时使其策略失效。"""
+    global _throttler  # noqa: PLW0603
+    if _throttler is None:
+        _throttler = Throttler()
+        add_config_listener(_throttler.on_config_changed)
+    return _throttler
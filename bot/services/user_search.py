@@ -0,0 +1,180 @@
+"""用户列表的前缀搜索与键集分页。
+
+- 搜索：用户名、名、姓、全名及其中的单词以小写词条写入 ``user_search_terms``，
+  查询 ``term LIKE '前缀%'`` 走主键范围扫描，取代 ``ILIKE '%关键词%'`` 全表扫描；
+  词条由 :func:`index_user_names` 在用户新增或改名时维护；
+- 分页：按 ``(排序列, id)`` 生成游标，见 :mod:`bot.utils.pagination`；
+- 总数：按搜索词缓存 :data:`USER_COUNT_TTL` 秒，是近似值。
+"""
+
+from __future__ import annotations
+
+import re
+from typing import TYPE_CHECKING, Any
+
+from sqlalchemy import delete, false, func, insert, select
+
+from bot.cache import build_key, cached
+from bot.database.models import UserExtendModel, UserModel, UserRole, UserSearchTermModel
+from bot.database.models.user_search_term import USER_SEARCH_TERM_LENGTH
+from bot.utils.pagination import decode_cursor, encode_cursor, keyset_after
+
+if TYPE_CHECKING:
+    from sqlalchemy import Select
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+USER_COUNT_TTL = 60
+_WORD_SPLIT = re.compile(r"[\s_\-.]+")
+_LIKE_ESCAPE = "\\"
+
+# 排序名 -> 排序表达式；可空列用 COALESCE 保证游标比较有确定结果
+USER_SORT_FIELDS: dict[str, Any] = {
+    "id": UserModel.id,
+    "first_name": UserModel.first_name,
+    "last_name": func.coalesce(UserModel.last_name, ""),
+    "username": func.coalesce(UserModel.username, ""),
+    "created_at": UserModel.created_at,
+    "updated_at": UserModel.updated_at,
+    "is_premium": func.coalesce(UserModel.is_premium, false()),
+}
+DEFAULT_USER_SORT = "created_at"
+
+
+def _normalize(text: str) -> str:
+    return text.strip().lstrip("@").lower()
+
+
+def name_terms(first_name: str | None, last_name: str | None, username: str | None) -> set[str]:
+    """生成一个用户的全部搜索词条。"""
+    names = [name for name in (username, first_name, last_name) if name]
+    full_name = " ".join(name for name in (first_name, last_name) if name)
+    if full_name:
+        names.append(full_name)
+    terms: set[str] = set()
+    for name in names:
+        normalized = _normalize(name)
+        terms.add(normalized)
+        terms.update(_WORD_SPLIT.split(normalized))
+    return {term[:USER_SEARCH_TERM_LENGTH] for term in terms if term}
+
+
+async def index_user_names(
+    session: AsyncSession,
+    user_id: int,
+    first_name: str | None,
+    last_name: str | None,
+    username: str | None,
+) -> None:
+    """重建某个用户的搜索词条（不提交，由调用方随业务写入一起提交）。"""
+    await session.execute(delete(UserSearchTermModel).where(UserSearchTermModel.user_id == user_id))
+    terms = name_terms(first_name, last_name, username)
+    if terms:
+        await session.execute(insert(UserSearchTermModel), [{"term": term, "user_id": user_id} for term in terms])
+
+
+def search_user_ids(search: str) -> Select[Any]:
+    """返回名称以 ``search`` 开头的用户 ID 子查询。"""
+    prefix = _normalize(search)[:USER_SEARCH_TERM_LENGTH]
+    escaped = prefix.replace(_LIKE_ESCAPE, _LIKE_ESCAPE * 2).replace("%", r"\%").replace("_", r"\_")
+    return select(UserSearchTermModel.user_id).where(
+        UserSearchTermModel.term.like(f"{escaped}%", escape=_LIKE_ESCAPE)
+    )
+
+
+def _search_filter(search: str) -> Any:
+    condition = UserModel.id.in_(search_user_ids(search))
+    if search.strip().lstrip("-").isdigit():
+        condition = condition | (UserModel.id == int(search.strip()))
+    return condition
+
+
+@cached(ttl=USER_COUNT_TTL, key_builder=lambda session, search=None: build_key(_normalize(search or "")))
+async def count_users(session: AsyncSession, search: str | None = None) -> int:
+    """统计（匹配搜索词的）用户数，结果缓存 ``USER_COUNT_TTL`` 秒。"""
+    query = select(func.count()).select_from(UserModel)
+    if search and _normalize(search):
+        query = query.where(_search_filter(search))
+    result = await session.execute(query)
+    return int(result.scalar() or 0)
+
+
+def resolve_user_sort(sort_by: str | None, sort_order: str | None) -> tuple[str, bool]:
+    """校验排序字段与方向，非法值回退到默认（创建时间倒序）。"""
+    sort = sort_by if sort_by in USER_SORT_FIELDS else DEFAULT_USER_SORT
+    return sort, (sort_order or "desc").lower() != "asc"
+
+
+def user_sort_key(user: UserModel, sort: str) -> tuple[Any, ...]:
+    """取出用户在指定排序下的游标值（与 ``USER_SORT_FIELDS`` 的 COALESCE 一致）。"""
+    defaults = {"last_name": "", "username": "", "is_premium": False}
+    value = getattr(user, sort)
+    if value is None:
+        value = defaults.get(sort)
+    return (value, user.id) if sort != "id" else (user.id,)
+
+
+def build_users_page_query(
+    *,
+    search: str | None,
+    sort: str,
+    descending: bool,
+    cursor: str | None,
+    limit: int,
+) -> Select[Any]:
+    """构建一页用户的查询（多取一行用于判断是否还有下一页）。
+
+    游标无效或与排序不匹配时抛出 :class:`bot.utils.pagination.InvalidCursorError`。
+    """
+    columns = (USER_SORT_FIELDS[sort], UserModel.id) if sort != "id" else (UserModel.id,)
+    query = select(UserModel)
+    if search and _normalize(search):
+        query = query.where(_search_filter(search))
+    if cursor:
+        query = query.where(keyset_after(columns, decode_cursor(cursor, sort), descending=descending))
+    order = [column.desc() if descending else column.asc() for column in columns]
+    return query.order_by(*order).limit(limit + 1)
+
+
+def next_users_cursor(users: list[UserModel], sort: str, limit: int) -> str | None:
+    """多取的一行存在时返回下一页游标。"""
+    if len(users) <= limit:
+        return None
+    return encode_cursor(sort, user_sort_key(users[limit - 1], sort))
+
+
+def build_admins_page_query(cursor: str | None, limit: int) -> Select[Any]:
+    """按用户 ID 升序构建一页管理员（含所有者）的查询。"""
+    query = (
+        select(UserModel)
+        .join(UserExtendModel, UserExtendModel.user_id == UserModel.id)
+        .where(UserExtendModel.role.in_([UserRole.admin, UserRole.owner]))
+    )
+    if cursor:
+        query = query.where(keyset_after((UserModel.id,), decode_cursor(cursor, "id"), descending=False))
+    return query.order_by(UserModel.id).limit(limit + 1)
+
+
+async def rebuild_user_search_index(session: AsyncSession, batch_size: int = 1000) -> int:
+    """按主键分批为全部用户重建搜索词条，返回处理的用户数（用于首次上线回填）。"""
+    last_id: int | None = None
+    processed = 0
+    while True:
+        query = select(UserModel.id, UserModel.first_name, UserModel.last_name, UserModel.username)
+        if last_id is not None:
+            query = query.where(UserModel.id > last_id)
+        rows = (await session.execute(query.order_by(UserModel.id).limit(batch_size))).all()
+        if not rows:
+            return processed
+        ids = [row[0] for row in rows]
+        await session.execute(delete(UserSearchTermModel).where(UserSearchTermModel.user_id.in_(ids)))
+        terms = [
+            {"term": term, "user_id": user_id}
+            for user_id, first_name, last_name, username in rows
+            for term in name_terms(first_name, last_name, username)
+        ]
+        if terms:
+            await session.execute(insert(UserSearchTermModel), terms)
+        await session.commit()
+        processed += len(rows)
+        last_id = rows[-1][0]
+
@@ -8,6 +8,7 @@ from sqlalchemy import func, select, update
 from bot.cache import build_key, cached, clear_cache
 from bot.core.config import settings
 from bot.database.models import EmbyUserModel, UserExtendModel, UserHistoryModel, UserModel, UserRole
+from bot.services.user_search import index_user_names
 from bot.utils.datetime import now
 
 if TYPE_CHECKING:
@@ -58,6 +59,7 @@ async def add_user(session: AsyncSession, user: User) -> None:
             added_to_attachment_menu=_normalize_bool(getattr(user, "added_to_attachment_menu", None)),
         )
         session.add(new_user)
+        await index_user_names(session, user.id, user.first_name, user.last_name, user.username)
         # 同步写入 user_extend（首次交互）
 
         ext_res = await session.execute(select(UserExtendModel).where(UserExtendModel.user_id == user.id))
@@ -211,6 +213,7 @@ async def upsert_user_on_interaction(session: AsyncSession, user: User) -> None:
     功能说明:
     - 用户与机器人交互（消息/回调）时，更新 `users` 表的最新字段
     - 若用户不存在则创建；存在则覆盖可变字段
+    - 新增或名称变化时重建 `user_search_terms` 搜索词条
     - 更新 `user_extend.last_interaction_at`，必要时自动创建扩展记录
     - 保存一条 `user_history` 快照以便追踪变更
 
@@ -270,6 +273,8 @@ async def upsert_user_on_interaction(session: AsyncSession, user: User) -> None:
                     update_values = changed.copy()
                     update_values["remark"] = remark
                     await session.execute(update(UserModel).where(UserModel.id == user.id).values(**update_values))
+                    if changed.keys() & {"first_name", "last_name", "username"}:
+                        await index_user_names(session, user.id, user.first_name, user.last_name, user.username)
                     await session.commit()
 
         # 更新扩展表最后交互时间（无则创建）
@@ -431,16 +436,6 @@ async def remove_admin(session: AsyncSession, user_id: int) -> bool:
         return False
 
 
-@cached(key_builder=lambda session: build_key())
-async def get_all_users(session: AsyncSession) -> list[UserModel]:
-    query = select(UserModel)
-
-    result = await session.execute(query)
-
-    users = result.scalars()
-    return list(users)
-
-
 @cached(key_builder=lambda session: build_key())
 async def get_user_count(session: AsyncSession) -> int:
     query = select(func.count()).select_from(UserModel)
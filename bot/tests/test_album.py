@@ -0,0 +1,79 @@
+"""相册合并中间件的单元测试。"""
+
+from __future__ import annotations
+import asyncio
+import time
+import unittest
+from typing import Any
+
+from aiogram.types import Message
+
+from bot.middlewares.album import AlbumMiddleware
+
+
+def make_part(message_id: int, media_group_id: str = "g1") -> Message:
+    return Message.model_validate(
+        {
+            "message_id": message_id,
+            "date": 0,
+            "chat": {"id": 1, "type": "private"},
+            "media_group_id": media_group_id,
+            "photo": [{"file_id": f"f{message_id}", "file_unique_id": f"u{message_id}", "width": 1, "height": 1}],
+        }
+    )
+
+
+class AlbumMiddlewareTests(unittest.TestCase):
+    def _run(self, middleware: AlbumMiddleware, gaps: list[float], parts: int) -> tuple[list[list[int]], float]:
+        albums: list[list[int]] = []
+
+        async def handler(event: Any, data: dict[str, Any]) -> None:
+            albums.append([message.message_id for message in data["album"]])
+
+        async def scenario() -> float:
+            start = time.monotonic()
+            tasks = []
+            for index in range(parts):
+                tasks.append(asyncio.create_task(middleware(handler, make_part(parts - index), {})))
+                if index < len(gaps):
+                    await asyncio.sleep(gaps[index])
+            await asyncio.gather(*tasks)
+            return time.monotonic() - start
+
+        elapsed = asyncio.run(scenario())
+        return albums, elapsed
+
+    def test_dispatches_after_quiet_period(self) -> None:
+        middleware = AlbumMiddleware(quiet_period=0.1, max_wait=2)
+
+        albums, elapsed = self._run(middleware, [0.05, 0.05], parts=3)
+
+        # 每条到达都会重置静默期，最终一次性分发且按 message_id 排序
+        assert albums == [[1, 2, 3]]
+        assert elapsed < 0.5
+        assert middleware.cache == {}
+
+    def test_max_wait_and_max_size_cut_the_album(self) -> None:
+        slow = AlbumMiddleware(quiet_period=0.1, max_wait=0.2)
+        albums, _ = self._run(slow, [0.06] * 5, parts=6)
+        assert len(albums) == 2
+        assert sum(len(album) for album in albums) == 6
+
+        small = AlbumMiddleware(quiet_period=5, max_wait=5, max_size=3)
+        albums, elapsed = self._run(small, [], parts=3)
+        assert albums == [[1, 2, 3]]
+        assert elapsed < 1
+
+    def test_buffer_is_removed_when_handler_fails(self) -> None:
+        middleware = AlbumMiddleware(quiet_period=0.01)
+
+        async def handler(event: Any, data: dict[str, Any]) -> None:
+            raise RuntimeError
+
+        with self.assertRaises(RuntimeError):
+            asyncio.run(middleware(handler, make_part(1), {}))
+        assert middleware.cache == {}
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+"""审计日志异步批量写入的单元测试。"""
+
+from __future__ import annotations
+import asyncio
+import unittest
+from typing import Any
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from sqlalchemy.exc import OperationalError
+
+from bot.database.models.audit_log import ActionType
+from bot.services import admin_service, audit_sink
+from bot.services.audit_sink import AuditSink
+
+
+class FakeSession:
+    def __init__(self, owner: FakeSessionmaker) -> None:
+        self.owner = owner
+        self.pending: list[dict[str, Any]] = []
+
+    async def __aenter__(self) -> FakeSession:
+        return self
+
+    async def __aexit__(self, *_: object) -> None:
+        return None
+
+    async def execute(self, statement: Any, rows: list[dict[str, Any]]) -> None:
+        if self.owner.failures:
+            self.owner.failures -= 1
+            raise OperationalError("INSERT", {}, Exception("connection lost"))
+        assert statement.table.name == "audit_logs"
+        self.pending = list(rows)
+
+    async def commit(self) -> None:
+        self.owner.batches.append(self.pending)
+
+
+class FakeSessionmaker:
+    def __init__(self, failures: int = 0) -> None:
+        self.failures = failures
+        self.batches: list[list[dict[str, Any]]] = []
+
+    def __call__(self) -> FakeSession:
+        return FakeSession(self)
+
+
+class AuditSinkTests(unittest.TestCase):
+    def test_records_are_written_in_uniform_batches(self) -> None:
+        factory = FakeSessionmaker()
+
+        async def scenario() -> None:
+            sink = AuditSink(batch_size=3, flush_interval=0.01)
+            for index in range(5):
+                sink.record(action_type=ActionType.USER_LOGIN, description=f"login {index}", user_id=index)
+            sink.record(action_type=ActionType.USER_BLOCK, description="block", details={"reason": "x"})
+            await asyncio.sleep(0.05)
+            assert sink.pending() == 0
+            await sink.stop()
+
+        with patch.object(audit_sink, "sessionmaker", factory):
+            asyncio.run(scenario())
+
+        rows = [row for batch in factory.batches for row in batch]
+        assert [row["description"] for row in rows] == [f"login {i}" for i in range(5)] + ["block"]
+        assert all(len(batch) <= 3 for batch in factory.batches)
+        assert len({frozenset(row) for row in rows}) == 1
+        assert rows[-1]["is_success"] is True
+
+    def test_buffer_is_bounded_and_failed_batches_retry_on_stop(self) -> None:
+        factory = FakeSessionmaker(failures=1)
+
+        async def scenario() -> AuditSink:
+            sink = AuditSink(max_pending=4, batch_size=10, flush_interval=60)
+            for index in range(6):
+                sink.record(action_type=ActionType.ADMIN_QUERY, description=str(index))
+            with self.assertRaises(OperationalError):
+                await sink.flush()
+            await sink.stop()
+            return sink
+
+        with patch.object(audit_sink, "sessionmaker", factory):
+            sink = asyncio.run(scenario())
+
+        assert sink.dropped == 2
+        assert [row["description"] for row in factory.batches[0]] == ["2", "3", "4", "5"]
+
+    def test_unknown_fields_are_rejected(self) -> None:
+        with self.assertRaises(TypeError):
+            AuditSink().record(action_type=ActionType.USER_LOGIN, description="x", chat_id=1)
+
+
+class AdminAuditTests(unittest.TestCase):
+    def test_audit_is_recorded_only_after_commit(self) -> None:
+        session = MagicMock()
+        session.commit = AsyncMock(side_effect=OperationalError("COMMIT", {}, Exception("connection lost")))
+
+        with patch.object(admin_service, "record_audit") as record:
+            with self.assertRaises(OperationalError):
+                asyncio.run(admin_service.unban_user_service(session, target_user_id=1, admin_id=2))
+            record.assert_not_called()
+
+            session.commit = AsyncMock()
+            asyncio.run(admin_service.unban_user_service(session, target_user_id=1, admin_id=2))
+            record.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
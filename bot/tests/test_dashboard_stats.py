@@ -0,0 +1,145 @@
+"""仪表板统计快照的单元测试。"""
+
+from __future__ import annotations
+import asyncio
+import unittest
+from datetime import date, datetime
+from typing import Any
+from unittest.mock import patch
+
+from bot.services import dashboard_stats
+from bot.services.dashboard_stats import DashboardStatsService
+
+TODAY = datetime(2026, 10, 18, 12, 0)
+
+
+class FakeResult:
+    def __init__(self, value: Any) -> None:
+        self.value = value
+
+    def one(self) -> Any:
+        return self.value
+
+    def all(self) -> list[Any]:
+        return self.value
+
+    def scalar(self) -> Any:
+        return self.value
+
+    def scalars(self) -> FakeResult:
+        return self
+
+
+class FakeSession:
+    def __init__(self, owner: FakeSessionmaker) -> None:
+        self.owner = owner
+
+    async def __aenter__(self) -> FakeSession:
+        return self
+
+    async def __aexit__(self, *_: object) -> None:
+        return None
+
+    async def execute(self, statement: Any) -> FakeResult | None:
+        if statement.is_delete:
+            self.owner.stored = []
+            return None
+        self.owner.selects.append(str(statement))
+        return FakeResult(self.owner.results.pop(0))
+
+    def add_all(self, rows: list[Any]) -> None:
+        self.owner.stored.extend(rows)
+
+    async def commit(self) -> None:
+        return None
+
+
+class FakeSessionmaker:
+    def __init__(self) -> None:
+        self.results: list[Any] = []
+        self.selects: list[str] = []
+        self.stored: list[Any] = []
+
+    def __call__(self) -> FakeSession:
+        return FakeSession(self)
+
+    def queue_refresh(self, *, messages: list[Any], currency: list[Any]) -> None:
+        """按查询顺序排入一次刷新的结果；``messages`` / ``currency`` 为各表增量统计的结果序列。"""
+        self.results.extend([(10, 3), [("2026-10-18", 2), (date(2026, 10, 12), 1)], (4, 6), 5, *messages, *currency])
+
+
+def appended(latest: int, present: list[int], rows: list[Any]) -> list[Any]:
+    """新水位、安全范围内已存在的 id、按日聚合结果。"""
+    return [latest, present, rows]
+
+
+class DashboardStatsTests(unittest.TestCase):
+    def setUp(self) -> None:
+        patcher = patch.object(dashboard_stats, "now", return_value=TODAY)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.factory = FakeSessionmaker()
+        self.service = DashboardStatsService(self.factory)
+
+    def test_messages_and_currency_are_counted_incrementally(self) -> None:
+        self.factory.queue_refresh(
+            messages=appended(42, list(range(1, 43)), [("2026-10-17", 30), ("2026-10-18", 12)]),
+            currency=appended(7, list(range(1, 8)), [("2026-10-18", 50, 20)]),
+        )
+        self.factory.queue_refresh(messages=appended(45, [43, 44, 45], [("2026-10-18", 3)]), currency=[7])
+
+        asyncio.run(self.service.refresh())
+        asyncio.run(self.service.refresh())
+        stats = self.service.stats()
+
+        assert "id > :id_1" in self.factory.selects[-2]
+        assert self.service.snapshot.gaps == {"messages": set(), "currency_transactions": set()}
+        assert stats["total_messages"] == 45
+        assert stats["messages_today"] == 15
+        assert stats["new_users_today"] == 2
+        assert stats["new_users_week"] == 3
+        assert stats["active_users"] == 6
+        assert stats["emby_users"] == 5
+        assert stats["currency"] == {"earned_total": 50, "spent_total": 20, "earned_today": 50, "spent_today": 20}
+        assert stats["user_growth"][-1] == {"date": "2026-10-18", "new_users": 2}
+        assert stats["stale"] is False
+
+    def test_persisted_snapshot_is_restored_on_load(self) -> None:
+        self.factory.queue_refresh(
+            messages=appended(42, [*range(1, 40), 41, 42], [("2026-10-18", 41)]),
+            currency=[0],
+        )
+        asyncio.run(self.service.refresh())
+        expected = self.service.stats()
+
+        restored = DashboardStatsService(self.factory)
+        self.factory.results.append(list(self.factory.stored))
+        asyncio.run(restored.load())
+
+        assert restored.snapshot.watermarks == {"messages": 42, "currency_transactions": 0}
+        assert restored.snapshot.gaps["messages"] == {40}
+        assert restored.stats() == expected
+
+    def test_rows_committed_below_the_watermark_are_counted_once(self) -> None:
+        # id 7 在统计时尚未提交，之后才提交
+        self.factory.queue_refresh(
+            messages=appended(10, [1, 2, 3, 4, 5, 6, 8, 9, 10], [("2026-10-18", 9)]),
+            currency=[0],
+        )
+        self.factory.queue_refresh(messages=[[7], [("2026-10-18", 1)], 10], currency=[0])
+        self.factory.queue_refresh(messages=[10], currency=[0])
+
+        asyncio.run(self.service.refresh())
+        assert "NOT IN" in self.factory.selects[6]
+        assert self.service.snapshot.gaps["messages"] == {7}
+        asyncio.run(self.service.refresh())
+        asyncio.run(self.service.refresh())
+
+        assert self.service.stats()["total_messages"] == 10
+        assert self.service.stats()["messages_today"] == 10
+        assert self.service.snapshot.gaps["messages"] == set()
+        assert self.factory.results == []
+
+
+if __name__ == "__main__":
+    unittest.main()
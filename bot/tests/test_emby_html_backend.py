@@ -0,0 +1,61 @@
+"""元数据解析器 HTML 后端选择的单元测试。"""
+
+from __future__ import annotations
+import asyncio
+import unittest
+from unittest.mock import patch
+
+from bot.services.emby_metadata.benchmark import REFERENCE_BACKEND, discover_cases
+from bot.services.emby_metadata.parser.soup import (
+    LXML_BACKEND,
+    PYTHON_BACKEND,
+    forced_backend,
+    is_backend_available,
+    parse_backend_config,
+    resolve_backend,
+)
+from bot.services.emby_metadata.sources.ko_shop import KoShopSource
+
+
+class HtmlBackendTests(unittest.TestCase):
+    def test_backend_config_supports_default_and_per_source_overrides(self) -> None:
+        assert parse_backend_config("lxml, ko-shop=html.parser") == {"default": "lxml", "ko-shop": "html.parser"}
+        assert parse_backend_config("") == {}
+        with self.assertRaises(ValueError):
+            parse_backend_config("ko-shop=selectolax")
+
+    def test_per_source_backend_is_resolved_and_falls_back_when_missing(self) -> None:
+        configured = {"default": PYTHON_BACKEND, "ko-shop": "html5lib"}
+        with patch("bot.services.emby_metadata.parser.soup._configured_backends", return_value=configured):
+            assert resolve_backend("hunk-ch") == PYTHON_BACKEND
+            expected = "html5lib" if is_backend_available("html5lib") else PYTHON_BACKEND
+            assert resolve_backend("ko-shop") == expected
+            with forced_backend(REFERENCE_BACKEND):
+                assert resolve_backend("ko-shop") == REFERENCE_BACKEND
+
+    @unittest.skipUnless(is_backend_available(LXML_BACKEND), "lxml 未安装")
+    def test_lxml_output_is_identical_on_every_fixture(self) -> None:
+        for case in discover_cases():
+            with forced_backend(REFERENCE_BACKEND):
+                expected = case.run()
+            with forced_backend(LXML_BACKEND):
+                actual = case.run()
+            assert actual == expected, case.name
+
+    def test_large_pages_are_parsed_off_the_event_loop(self) -> None:
+        source = KoShopSource()
+        calls: list[str] = []
+
+        async def fake_to_thread(func, *args):  # noqa: ANN001, ANN202
+            calls.append(args[0])
+            return func(*args)
+
+        with patch("bot.services.emby_metadata.sources.base.asyncio.to_thread", side_effect=fake_to_thread):
+            assert asyncio.run(source._parse(len, "x" * 10)) == 10
+            assert asyncio.run(source._parse(len, "y" * source.thread_parse_min_chars)) == source.thread_parse_min_chars
+
+        assert calls == ["y" * source.thread_parse_min_chars]
+
+
+if __name__ == "__main__":
+    unittest.main()
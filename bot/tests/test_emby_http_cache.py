@@ -0,0 +1,86 @@
+"""元数据来源页面响应缓存的单元测试。"""
+
+from __future__ import annotations
+import asyncio
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from bot.services.emby_metadata.errors import MetadataSourceNetworkError
+from bot.services.emby_metadata.http_cache import CachedResponse, ResponseCache, cache_key
+from bot.services.emby_metadata.sources.ko_shop import KoShopSource
+
+
+class ResponseCacheTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name)
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def test_cache_key_ignores_form_order_but_not_method(self) -> None:
+        url = "https://example.com/search"
+        assert cache_key("post", url, {"a": "1", "b": "2"}) == cache_key("POST", url, {"b": "2", "a": "1"})
+        assert cache_key("GET", url) != cache_key("POST", url)
+
+    def test_entry_round_trips_through_disk_as_plain_html(self) -> None:
+        cache = ResponseCache(self.root)
+        entry = CachedResponse(method="GET", url="https://example.com/a", body="<html>页面</html>", etag='"v1"')
+        asyncio.run(cache.put("ko-shop", "k1", entry))
+        cache.clear_memory()
+
+        restored = asyncio.run(cache.get("ko-shop", "k1"))
+
+        assert restored is not None
+        assert restored.body == "<html>页面</html>"
+        assert restored.validator_headers() == {"If-None-Match": '"v1"'}
+        assert (self.root / "ko-shop" / "k1.html").read_text(encoding="utf-8") == "<html>页面</html>"
+
+    def test_disk_usage_is_bounded_by_evicting_oldest_entries(self) -> None:
+        cache = ResponseCache(self.root, max_disk_bytes=3000)
+        for index in range(5):
+            asyncio.run(cache.put("src", f"k{index}", CachedResponse(method="GET", url=f"u{index}", body="x" * 800)))
+        cache.clear_memory()
+
+        assert asyncio.run(cache.get("src", "k0")) is None
+        assert asyncio.run(cache.get("src", "k4")) is not None
+        assert sum(path.stat().st_size for path in self.root.glob("*/*")) <= 3000
+
+    def test_fresh_entry_is_served_without_network(self) -> None:
+        cache = ResponseCache(self.root)
+        source = KoShopSource(response_cache=cache)
+        url = f"{source.base_url}/products/detail.php?product_id=1"
+        asyncio.run(cache.put(source.name, cache_key("GET", url), CachedResponse(method="GET", url=url, body="cached")))
+
+        with patch("aiohttp.ClientSession", side_effect=AssertionError("不应发起网络请求")):
+            assert asyncio.run(source._request_text("/products/detail.php?product_id=1")) == "cached"
+
+    def test_replay_mode_rejects_unrecorded_pages(self) -> None:
+        source = KoShopSource(response_cache=ResponseCache(self.root, mode="replay"))
+
+        with self.assertRaises(MetadataSourceNetworkError):
+            asyncio.run(source._request_text("/products/list.php?word=missing"))
+
+    def test_stale_entry_reports_not_fresh(self) -> None:
+        entry = CachedResponse(method="GET", url="u", body="b", stored_at=time.time() - 120)
+        assert entry.is_fresh(300)
+        assert not entry.is_fresh(60)
+
+    def test_discard_cached_responses_drops_pages_used_by_source(self) -> None:
+        cache = ResponseCache(self.root)
+        source = KoShopSource(response_cache=cache)
+        url = f"{source.base_url}/login"
+        key = cache_key("GET", url)
+        asyncio.run(cache.put(source.name, key, CachedResponse(method="GET", url=url, body="login page")))
+        asyncio.run(source._request_text("/login"))
+
+        asyncio.run(source.discard_cached_responses())
+
+        assert asyncio.run(cache.get(source.name, key)) is None
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+"""元数据工作台图片代理缓存的单元测试。"""
+
+from __future__ import annotations
+import asyncio
+import io
+import tempfile
+import unittest
+from pathlib import Path
+
+from PIL import Image
+
+from bot.services.emby_metadata import workbench
+from bot.services.emby_metadata.image_cache import ImageCache, etag_matches, thumbnail_width
+from bot.services.emby_metadata.sources.ck_download import CkDownloadSource
+from bot.services.emby_metadata.sources.ko_video import KoVideoSource
+
+
+def _jpeg(width: int, height: int) -> bytes:
+    output = io.BytesIO()
+    Image.new("RGB", (width, height), "red").save(output, format="JPEG")
+    return output.getvalue()
+
+
+class ImageCacheTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name)
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def test_concurrent_requests_for_same_url_download_once(self) -> None:
+        cache = ImageCache(self.root)
+        calls: list[str] = []
+
+        async def fetch() -> tuple[bytes, str]:
+            calls.append("fetch")
+            await asyncio.sleep(0.01)
+            return b"image", "image/png"
+
+        async def scenario() -> list[bytes]:
+            images = await asyncio.gather(*(cache.get_or_fetch("https://a/1.png", fetch) for _ in range(5)))
+            images.append(await cache.get_or_fetch("https://a/1.png", fetch))
+            return [image.body for image in images]
+
+        assert asyncio.run(scenario()) == [b"image"] * 6
+        assert calls == ["fetch"]
+
+    def test_etag_matching_compares_whole_tokens(self) -> None:
+        etag = '"abc123"'
+        assert etag_matches('"abc123"', etag)
+        assert etag_matches('"other", W/"abc123"', etag)
+        assert etag_matches("*", etag)
+        assert not etag_matches('"xabc123x"', etag)
+        assert not etag_matches('"abc"', etag)
+        assert not etag_matches(None, etag)
+
+    def test_thumbnail_is_resized_and_cached_separately(self) -> None:
+        cache = ImageCache(self.root)
+
+        async def fetch() -> tuple[bytes, str]:
+            return _jpeg(1200, 800), "image/jpeg"
+
+        thumbnail = asyncio.run(cache.get_or_fetch("https://a/poster.jpg", fetch, width=300))
+        original = asyncio.run(cache.get_or_fetch("https://a/poster.jpg", fetch))
+
+        with Image.open(io.BytesIO(thumbnail.body)) as image:
+            assert image.size == (320, 213)
+        assert thumbnail.etag != original.etag
+        assert len(list(self.root.glob("*.img"))) == 2
+        assert thumbnail_width(5000) is None
+
+    def test_disk_usage_is_bounded(self) -> None:
+        cache = ImageCache(self.root, max_disk_bytes=3000)
+        for index in range(5):
+
+            async def fetch() -> tuple[bytes, str]:
+                return b"x" * 800, "image/png"
+
+            asyncio.run(cache.get_or_fetch(f"https://a/{index}.png", fetch))
+
+        assert sum(path.stat().st_size for path in self.root.iterdir()) <= 3000
+
+    def test_image_source_is_selected_by_host(self) -> None:
+        assert isinstance(workbench._image_source_for("https://img.ko-video.com/a.jpg"), KoVideoSource)
+        assert isinstance(workbench._image_source_for("https://cdn.example.com/?u=ko-video.com"), CkDownloadSource)
+
+
+if __name__ == "__main__":
+    unittest.main()
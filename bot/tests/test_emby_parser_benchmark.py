@@ -0,0 +1,49 @@
+"""元数据解析器基准工具的单元测试。"""
+
+from __future__ import annotations
+import unittest
+
+from bot.services.emby_metadata.benchmark import (
+    REFERENCE_BACKEND,
+    compare_to_baseline,
+    discover_cases,
+    run_benchmark,
+    summarize,
+)
+
+
+class ParserBenchmarkTests(unittest.TestCase):
+    def test_every_fixture_page_is_discovered_and_parses(self) -> None:
+        cases = discover_cases()
+        sources = {case.source for case in cases}
+
+        assert {"ko-shop", "hunk-ch", "ck-download", "boy-studio", "str8boys2023"} <= sources
+        assert {case.kind for case in cases} == {"search", "detail"}
+        for case in cases:
+            assert case.run(), case.name
+
+    def test_run_benchmark_reports_time_and_allocations(self) -> None:
+        cases = [case for case in discover_cases() if case.source == "ko-video"]
+
+        rows = run_benchmark(cases, [REFERENCE_BACKEND], repeats=1)
+
+        assert len(rows) == len(cases)
+        assert all(row["identical"] and row["median_ms"] > 0 and row["peak_kib"] > 0 for row in rows)
+        assert summarize(rows)["ko-video"][REFERENCE_BACKEND]["cases"] == len(cases)
+
+    def test_compare_to_baseline_flags_only_significant_slowdowns(self) -> None:
+        baseline = [
+            {"case": "a", "backend": "lxml", "median_ms": 10.0},
+            {"case": "b", "backend": "lxml", "median_ms": 0.1},
+        ]
+        rows = [
+            {"case": "a", "backend": "lxml", "median_ms": 14.0},
+            {"case": "b", "backend": "lxml", "median_ms": 0.3},
+        ]
+
+        assert compare_to_baseline(rows, baseline, threshold=0.25) == ["a [lxml]: 10.00ms -> 14.00ms"]
+        assert compare_to_baseline(rows, baseline, threshold=0.5) == []
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,10 +2,19 @@
 
 from __future__ import annotations
 import asyncio
+import json
+import tempfile
 import unittest
+from pathlib import Path
+from typing import Any
 from unittest.mock import AsyncMock, patch
 
 from bot.services.emby_metadata import translation
+from bot.services.emby_metadata.http_cache import ResponseCache
+
+
+def _response(text: str) -> dict[str, Any]:
+    return {"output": [{"type": "message", "content": [{"type": "output_text", "text": text}]}]}
 
 
 class TranslationTests(unittest.TestCase):
@@ -68,5 +77,128 @@ class TranslationTests(unittest.TestCase):
         post_translation.assert_awaited_once_with("original")
 
 
+class _IsolatedMemoryTestCase(unittest.TestCase):
+    """把翻译记忆指向临时目录，并提供可用的 xAI 配置。"""
+
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.memory = ResponseCache(Path(self._tmp.name))
+        patches = [
+            patch.object(translation._runtime, "memory", self.memory),
+            patch.object(translation.settings, "XAI_API_KEY", "test-key"),
+            patch.object(translation.settings, "XAI_MODEL", "model-a"),
+        ]
+        for active_patch in patches:
+            active_patch.start()
+            self.addCleanup(active_patch.stop)
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+
+class TranslationMemoryTests(_IsolatedMemoryTestCase):
+    """验证翻译记忆命中、持久化和并发合并。"""
+
+    @patch("bot.services.emby_metadata.translation._post_translation", new_callable=AsyncMock)
+    def test_concurrent_and_repeated_texts_call_api_once(self, post_translation: AsyncMock) -> None:
+        async def slow_post(text: str) -> dict[str, Any]:
+            await asyncio.sleep(0.01)
+            return _response("译文")
+
+        post_translation.side_effect = slow_post
+
+        async def scenario() -> list[str]:
+            results = await asyncio.gather(*(translation.translate_to_chinese("original  text") for _ in range(3)))
+            results.append(await translation.translate_to_chinese(" original text\r\n"))
+            return list(results)
+
+        assert asyncio.run(scenario()) == ["译文"] * 4
+        post_translation.assert_awaited_once_with("original  text")
+
+    @patch("bot.services.emby_metadata.translation._post_translation", new_callable=AsyncMock)
+    def test_memory_persists_on_disk_and_is_keyed_by_model(self, post_translation: AsyncMock) -> None:
+        post_translation.return_value = _response("译文")
+        asyncio.run(translation.translate_to_chinese("original"))
+        self.memory.clear_memory()
+
+        assert asyncio.run(translation.translate_to_chinese("original")) == "译文"
+        assert post_translation.await_count == 1
+
+        with patch.object(translation.settings, "XAI_MODEL", "model-b"):
+            asyncio.run(translation.translate_to_chinese("original"))
+        assert post_translation.await_count == 2
+
+    @patch("bot.services.emby_metadata.translation._post_translation", new_callable=AsyncMock)
+    def test_failed_translation_is_not_remembered(self, post_translation: AsyncMock) -> None:
+        post_translation.side_effect = [RuntimeError("boom"), _response("译文")]
+
+        with self.assertRaises(RuntimeError):
+            asyncio.run(translation.translate_to_chinese("original"))
+
+        assert asyncio.run(translation.translate_to_chinese("original")) == "译文"
+
+
+class BatchTranslationTests(_IsolatedMemoryTestCase):
+    """验证片段打包、长文本切分和解析失败回退。"""
+
+    def test_long_text_is_split_at_sentence_boundaries(self) -> None:
+        text = "第一句。" * 300 + "\n" + "Second sentence. " * 10
+
+        chunks = translation.split_for_translation(text, limit=500)
+
+        assert "".join(chunk + separator for chunk, separator in chunks) == text
+        assert all(len(chunk) <= 500 for chunk, _ in chunks)
+        assert all(chunk.endswith("。") for chunk, _ in chunks[:-1])
+
+    @patch("bot.services.emby_metadata.translation._post_translation", new_callable=AsyncMock)
+    def test_short_segments_are_packed_into_one_request(self, post_translation: AsyncMock) -> None:
+        post_translation.return_value = _response('```json\n["标题", "简介", "类型"]\n```')
+
+        result = asyncio.run(translation.translate_many(["Title", "Overview", "", "Genre", "Title"]))
+
+        assert result == ["标题", "简介", "", "类型", "标题"]
+        post_translation.assert_awaited_once()
+        sent, instructions = post_translation.await_args.args
+        assert json.loads(sent) == ["Title", "Overview", "Genre"]
+        assert instructions == translation.BATCH_TRANSLATION_INSTRUCTIONS
+
+    @patch("bot.services.emby_metadata.translation._post_translation", new_callable=AsyncMock)
+    def test_batch_translations_are_keyed_by_batch_instructions(self, post_translation: AsyncMock) -> None:
+        post_translation.return_value = _response('["标题", "简介"]')
+        asyncio.run(translation.translate_many(["Title", "Overview"]))
+
+        batch_key = translation.translation_memory_key("Title", translation.BATCH_TRANSLATION_INSTRUCTIONS)
+        single_key = translation.translation_memory_key("Title")
+        assert asyncio.run(self.memory.get(translation._TRANSLATION_MEMORY_NAMESPACE, batch_key)) is not None
+        assert asyncio.run(self.memory.get(translation._TRANSLATION_MEMORY_NAMESPACE, single_key)) is None
+        # 两种指令的译文都可被复用
+        assert asyncio.run(translation.translate_to_chinese("Title")) == "标题"
+        post_translation.assert_awaited_once()
+
+    @patch("bot.services.emby_metadata.translation._post_translation", new_callable=AsyncMock)
+    def test_unparseable_batch_falls_back_to_single_requests(self, post_translation: AsyncMock) -> None:
+        post_translation.side_effect = [_response("标题和简介"), _response("标题"), _response("简介")]
+
+        result = asyncio.run(translation.translate_many(["Title", "Overview"]))
+
+        assert sorted(result) == ["标题", "简介"]
+        assert post_translation.await_count == 3
+
+    @patch("bot.services.emby_metadata.translation._post_translation", new_callable=AsyncMock)
+    def test_long_text_chunks_are_translated_and_rejoined(self, post_translation: AsyncMock) -> None:
+        async def echo(text: str, instructions: str = translation.TRANSLATION_INSTRUCTIONS) -> dict[str, Any]:
+            if instructions == translation.BATCH_TRANSLATION_INSTRUCTIONS:
+                return _response(json.dumps([f"<{part}>" for part in json.loads(text)], ensure_ascii=False))
+            return _response(f"<{text}>")
+
+        post_translation.side_effect = echo
+        paragraph = "あ。" * 800
+
+        result = asyncio.run(translation.translate_to_chinese(f"{paragraph}\n{paragraph}"))
+
+        assert result.count("\n") == 1
+        assert result.replace("<", "").replace(">", "") == f"{paragraph}\n{paragraph}"
+
+
 if __name__ == "__main__":
     unittest.main()
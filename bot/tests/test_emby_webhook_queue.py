@@ -0,0 +1,234 @@
+"""Emby Webhook 异步入库队列的单元测试。"""
+
+from __future__ import annotations
+import asyncio
+import tempfile
+import unittest
+from pathlib import Path
+from typing import Any
+from unittest.mock import patch
+
+from sqlalchemy.exc import DataError, OperationalError
+
+from bot.database.models.library_new_notification import LibraryNewNotificationModel
+from bot.services import emby_webhook_queue
+from bot.services.emby_webhook_queue import EmbyWebhookQueue
+
+
+def _event(event_type: str, item_id: str, **extra: Any) -> dict[str, Any]:
+    return {"Event": event_type, "Title": item_id, "Item": {"Id": item_id, "Name": item_id}, **extra}
+
+
+def _episode(series_id: str, season: int, episode: int) -> dict[str, Any]:
+    payload = _event("library.new", f"{series_id}-{season}-{episode}")
+    payload["Item"].update(Type="Episode", SeriesId=series_id, ParentIndexNumber=season, IndexNumber=episode)
+    return payload
+
+
+class FakeResult:
+    def __init__(self, rows: list[Any]) -> None:
+        self.rows = rows
+
+    def scalars(self) -> FakeResult:
+        return self
+
+    def all(self) -> list[Any]:
+        return self.rows
+
+
+class FakeSession:
+    def __init__(self, owner: FakeSessionmaker) -> None:
+        self.owner = owner
+        self.pending: list[tuple[str, int]] = []
+
+    async def __aenter__(self) -> FakeSession:
+        return self
+
+    async def __aexit__(self, *_: object) -> None:
+        return None
+
+    async def execute(self, statement: Any, rows: list[dict[str, Any]] | None = None) -> FakeResult | None:
+        if self.owner.failures:
+            self.owner.failures -= 1
+            raise OperationalError("INSERT", {}, Exception("connection lost"))
+        if rows is None:
+            return FakeResult(self.owner.existing)
+        if any(row["title"] in self.owner.rejected for row in rows):
+            raise DataError("INSERT", {}, Exception("Data too long for column 'title'"))
+        self.pending.append((statement.table.name, len(rows)))
+        self.owner.rows.extend(rows)
+        return None
+
+    async def commit(self) -> None:
+        self.owner.inserts.extend(self.pending)
+
+
+class FakeSessionmaker:
+    def __init__(self, failures: int = 0) -> None:
+        self.failures = failures
+        self.rejected: set[str] = set()
+        self.existing: list[LibraryNewNotificationModel] = []
+        self.inserts: list[tuple[str, int]] = []
+        self.rows: list[dict[str, Any]] = []
+
+    def __call__(self) -> FakeSession:
+        return FakeSession(self)
+
+
+class EmbyWebhookQueueTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name)
+        self.checked: list[str] = []
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    async def _check(self, payload: dict[str, Any]) -> None:
+        self.checked.append(payload["Item"]["Id"])
+
+    def _run(self, factory: FakeSessionmaker, scenario: Any) -> Any:
+        with (
+            patch.object(emby_webhook_queue, "sessionmaker", factory),
+            patch.object(emby_webhook_queue, "_RETRY_BASE_DELAY", 0.01),
+        ):
+            return asyncio.run(scenario())
+
+    def test_events_are_batched_per_table_and_spool_is_cleared(self) -> None:
+        factory = FakeSessionmaker()
+
+        async def scenario() -> None:
+            queue = EmbyWebhookQueue(self.root, session_check=self._check, batch_size=50)
+            for index in range(30):
+                await queue.submit(_event("library.new", f"ep{index}"))
+            await queue.submit(_event("playback.start", "movie", Session={"Client": "Emby Web"}))
+            assert len(list(self.root.glob("*.json"))) == 31
+            await queue.start()
+            await queue.stop()
+
+        self._run(factory, scenario)
+
+        assert sorted(factory.inserts) == [("emby_library_new_notifications", 30), ("emby_notifications", 1)]
+        assert self.checked == ["movie"]
+        assert list(self.root.glob("*.json")) == []
+
+    def test_spooled_events_survive_restart_and_failed_batches_retry(self) -> None:
+        factory = FakeSessionmaker(failures=2)
+
+        async def accept_only() -> None:
+            queue = EmbyWebhookQueue(self.root)
+            await queue.submit(_event("library.new", "a"))
+            await queue.submit(_event("item.rate", "b"))
+
+        async def restart() -> int:
+            queue = EmbyWebhookQueue(self.root)
+            restored = await queue.start()
+            await queue.stop()
+            return restored
+
+        self._run(factory, accept_only)
+        assert len(list(self.root.glob("*.json"))) == 2
+
+        assert self._run(factory, restart) == 2
+        assert factory.failures == 0
+        assert sorted(factory.inserts) == [("emby_library_new_notifications", 1), ("emby_notifications", 1)]
+        assert list(self.root.glob("*.json")) == []
+
+    def test_permanent_errors_quarantine_only_the_bad_event(self) -> None:
+        factory = FakeSessionmaker()
+        factory.rejected = {"bad", "bad-new"}
+
+        async def scenario() -> None:
+            queue = EmbyWebhookQueue(self.root, batch_size=50, coalesce_window=0.01)
+            for item_id in ("a", "bad", "b"):
+                await queue.submit(_event("item.rate", item_id))
+            for item_id in ("c", "bad-new"):
+                await queue.submit(_event("library.new", item_id))
+            await queue.start()
+            await asyncio.sleep(0.05)
+            await queue.stop()
+
+        self._run(factory, scenario)
+
+        assert sorted(row["title"] for row in factory.rows) == ["a", "b", "c"]
+        assert list(self.root.glob("*.json")) == []
+        assert len(list((self.root / "quarantine").glob("*.json"))) == 2
+
+    def test_library_new_rows_carry_pending_status(self) -> None:
+        payload = _event("library.new", "ep1")
+        payload["Item"].update(SeriesId="s1", ParentIndexNumber=1, IndexNumber=3)
+
+        model, row = emby_webhook_queue.build_notification_row(payload)
+
+        assert model.__tablename__ == "emby_library_new_notifications"
+        assert row["status"] == "pending_completion"
+        assert (row["series_id"], row["season_number"], row["episode_number"]) == ("s1", 1, 3)
+        assert emby_webhook_queue.build_notification_row(_event("playback.stop", "x"))[1]["status"] is None
+
+
+class LibraryNewCoalescingTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name)
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def test_episode_ranges_are_compacted(self) -> None:
+        entries = emby_webhook_queue.coalesced_items(
+            emby_webhook_queue.merge_library_payloads(
+                [_episode("s", 1, number) for number in (3, 1, 2, 5)] + [_episode("s", 2, 1)]
+            )
+            or {}
+        )
+
+        assert emby_webhook_queue.format_episode_ranges(entries) == "S01E01-E03, S01E05, S02E01"
+
+    def test_duplicate_deliveries_are_dropped(self) -> None:
+        base = emby_webhook_queue.merge_library_payloads([_episode("s", 1, 1), _episode("s", 1, 2)])
+        assert base is not None
+
+        assert emby_webhook_queue.merge_library_payloads([_episode("s", 1, 2)], base) is None
+        merged = emby_webhook_queue.merge_library_payloads([_episode("s", 1, 2), _episode("s", 1, 3)], base)
+        assert merged is not None
+        assert merged["EpisodeRange"] == "S01E01-E03"
+        assert merged["Item"]["IndexNumber"] == 3
+
+    def test_window_merges_season_into_one_row_and_existing_notification(self) -> None:
+        factory = FakeSessionmaker()
+        existing_payload = emby_webhook_queue.merge_library_payloads([_episode("old", 1, 1)])
+        existing = LibraryNewNotificationModel(
+            type="library.new",
+            status="pending_completion",
+            item_id="old-1-1",
+            item_type="Episode",
+            series_id="old",
+            payload=existing_payload,
+        )
+        factory.existing = [existing]
+
+        async def scenario() -> None:
+            queue = EmbyWebhookQueue(self.root, coalesce_window=0.05)
+            await queue.start()
+            for number in range(1, 9):
+                await queue.submit(_episode("new", 1, number))
+            await queue.submit(_episode("new", 1, 1))
+            await queue.submit(_episode("old", 1, 1))
+            await queue.submit(_episode("old", 1, 2))
+            await asyncio.sleep(0.2)
+            assert queue.pending() == 0
+            await queue.stop()
+
+        with patch.object(emby_webhook_queue, "sessionmaker", factory):
+            asyncio.run(scenario())
+
+        assert factory.inserts == [("emby_library_new_notifications", 1)]
+        assert factory.rows[0]["payload"]["EpisodeRange"] == "S01E01-E08"
+        assert factory.rows[0]["episode_number"] == 8
+        assert existing.payload["EpisodeRange"] == "S01E01-E02"
+        assert existing.item_id == "old-1-2"
+        assert list(self.root.glob("*.json")) == []
+
+
+if __name__ == "__main__":
+    unittest.main()
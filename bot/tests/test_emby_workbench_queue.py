@@ -0,0 +1,76 @@
+"""元数据工作台队列加载的单元测试。"""
+
+from __future__ import annotations
+import asyncio
+import tempfile
+import unittest
+from pathlib import Path
+from typing import Any
+from unittest.mock import patch
+
+from bot.services.emby_metadata import http_cache, workbench
+from bot.services.emby_metadata.http_cache import ResponseCache
+
+
+class QueueSnapshotTests(unittest.TestCase):
+    def setUp(self) -> None:
+        workbench._queue_snapshots.clear()
+        self.calls: list[str] = []
+        self.active = 0
+        self.max_active = 0
+
+    async def _fake_snapshot(self, item_id: str) -> tuple[str, dict[str, Any]]:
+        self.calls.append(item_id)
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        await asyncio.sleep(0.01)
+        self.active -= 1
+        return "user", {"Id": item_id, "Name": f"item {item_id}"}
+
+    def _load(self, item_ids: list[str], limit: int = 3) -> list[dict[str, Any]]:
+        async def scenario() -> list[dict[str, Any]]:
+            semaphore = asyncio.Semaphore(limit)
+            return await asyncio.gather(*(workbench._load_queue_snapshot(item_id, semaphore) for item_id in item_ids))
+
+        with patch.object(workbench, "fetch_item_snapshot", side_effect=self._fake_snapshot):
+            return asyncio.run(scenario())
+
+    def test_snapshot_requests_are_bounded_and_cached(self) -> None:
+        item_ids = [str(index) for index in range(12)]
+
+        first = self._load(item_ids)
+        second = self._load(item_ids)
+
+        assert self.max_active == 3
+        assert sorted(self.calls, key=int) == item_ids
+        assert first == second
+        assert self._load([""]) == [{}]
+
+    def test_writeback_invalidation_refetches_item(self) -> None:
+        self._load(["1", "2"])
+
+        workbench.invalidate_queue_snapshot("1")
+        self._load(["1", "2"])
+
+        assert sorted(self.calls) == ["1", "1", "2"]
+
+
+class SearchResultsStoreTests(unittest.TestCase):
+    def test_search_results_survive_disabled_page_cache(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            with (
+                patch.object(http_cache, "_response_cache", ResponseCache(root / "pages", mode="off")),
+                patch.object(workbench, "_search_results", None),
+                patch.object(workbench, "SEARCH_RESULTS_ROOT", root / "search"),
+            ):
+                asyncio.run(workbench._store_search_results("7", [{"source_id": "1"}, {"source_id": "2"}]))
+                workbench._get_search_results_store().clear_memory()
+
+                assert len(asyncio.run(workbench._cached_search_results("7"))) == 2
+                assert asyncio.run(workbench._cached_search_results("8")) == []
+                assert not (root / "pages").exists()
+
+
+if __name__ == "__main__":
+    unittest.main()
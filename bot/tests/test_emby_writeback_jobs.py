@@ -0,0 +1,148 @@
+"""元数据批量写入任务的单元测试。"""
+
+from __future__ import annotations
+import asyncio
+import tempfile
+import unittest
+from pathlib import Path
+from typing import Any
+from unittest.mock import patch
+
+from fastapi import HTTPException
+
+from bot.services.emby_metadata import workbench
+from bot.services.emby_metadata.models import MediaLibraryCategory, MetadataCandidate
+from bot.services.emby_metadata.writeback_jobs import WritebackJobManager
+
+
+def _candidate(source_id: str) -> dict[str, Any]:
+    return MetadataCandidate(
+        source="ko-shop",
+        source_id=source_id,
+        category=MediaLibraryCategory.JAPANESE_KOREAN,
+        title=source_id,
+        original_title=source_id,
+        sort_name=source_id,
+        forced_sort_name=source_id,
+        confidence=1.0,
+        raw_url=f"https://example.com/{source_id}",
+    ).model_dump(mode="json")
+
+
+class WritebackJobTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name)
+        self.failing = {"2"}
+        self.calls: list[str] = []
+        self.active = 0
+        self.max_active = 0
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    async def _fake_writeback(self, notification_id: str, candidate: MetadataCandidate, *, fields: list[str]) -> dict:
+        self.calls.append(notification_id)
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        await asyncio.sleep(0.01)
+        self.active -= 1
+        if notification_id in self.failing:
+            raise HTTPException(status_code=502, detail="Emby 写入失败：timeout")
+        return {"actual_core_changes": [{"field": "Name"}]}
+
+    @staticmethod
+    async def _wait(manager: WritebackJobManager, job_id: str) -> dict[str, Any]:
+        while (job := await manager.get(job_id))["status"] == "running":
+            await asyncio.sleep(0.01)
+        return job
+
+    def test_job_runs_with_bounded_parallelism_and_resumes_failures(self) -> None:
+        entries = [{"notification_id": str(index), "candidate": _candidate(str(index)), "fields": ["Name"]} for index in range(6)]
+
+        async def scenario() -> tuple[dict[str, Any], dict[str, Any]]:
+            manager = WritebackJobManager(self.root, concurrency=2)
+            created = await manager.create(entries)
+            finished = await self._wait(manager, created["job_id"])
+
+            self.failing.clear()
+            restarted = WritebackJobManager(self.root, concurrency=2)
+            await restarted.resume(created["job_id"])
+            return finished, await self._wait(restarted, created["job_id"])
+
+        with patch.object(workbench, "writeback", side_effect=self._fake_writeback):
+            finished, resumed = asyncio.run(scenario())
+
+        assert finished["status"] == "failed"
+        assert finished["counts"] == {"pending": 0, "running": 0, "done": 5, "failed": 1}
+        assert finished["entries"][2]["error"] == "Emby 写入失败：timeout"
+        assert resumed["status"] == "completed"
+        assert resumed["entries"][2]["changed_fields"] == ["Name"]
+        assert sorted(self.calls) == ["0", "1", "2", "2", "3", "4", "5"]
+        assert self.max_active == 2
+
+    def test_start_resumes_interrupted_jobs_and_sweeps_expired_ones(self) -> None:
+        entries = [{"notification_id": str(index), "candidate": _candidate(str(index)), "fields": []} for index in range(3)]
+
+        async def scenario() -> tuple[dict[str, Any], dict[str, Any], list[str]]:
+            manager = WritebackJobManager(self.root)
+            finished = await self._wait(manager, (await manager.create(entries))["job_id"])
+
+            # 模拟进程在执行中途退出：条目停留在 running 状态
+            interrupted = WritebackJobManager(self.root)
+            self.failing.clear()
+            job = await interrupted.get((await interrupted.create(entries))["job_id"])
+            await interrupted.stop()
+            job_data = await interrupted._load(job["job_id"])
+            for entry in job_data["entries"]:
+                entry["status"] = "running"
+            await interrupted._save(job_data)
+
+            restarted = WritebackJobManager(self.root, retention=0)
+            await restarted.start()
+            resumed = await self._wait(restarted, job["job_id"])
+            return finished, resumed, sorted(path.name for path in self.root.iterdir())
+
+        with patch.object(workbench, "writeback", side_effect=self._fake_writeback):
+            finished, resumed, files = asyncio.run(scenario())
+
+        assert resumed["status"] == "completed"
+        assert all(finished["job_id"] not in name for name in files)
+        assert f"{resumed['job_id']}.json" in files
+
+    def test_unexpected_error_marks_job_failed(self) -> None:
+        entries = [{"notification_id": "1", "candidate": _candidate("1"), "fields": []}]
+
+        async def scenario() -> dict[str, Any]:
+            manager = WritebackJobManager(self.root)
+            created = await manager.create(entries)
+            return await self._wait(manager, created["job_id"])
+
+        original_write = WritebackJobManager._write_json
+
+        def flaky_write(path: Path, data: Any) -> None:
+            if isinstance(data, dict) and data["entries"][0]["status"] == "running":
+                raise OSError("disk full")
+            original_write(path, data)
+
+        with (
+            patch.object(workbench, "writeback", side_effect=self._fake_writeback),
+            patch.object(WritebackJobManager, "_write_json", staticmethod(flaky_write)),
+        ):
+            job = asyncio.run(scenario())
+
+        assert job["status"] == "failed"
+        assert job["error"] == "任务异常中断: disk full"
+        assert job["entries"][0]["status"] == "failed"
+
+    def test_unknown_job_is_not_found(self) -> None:
+        manager = WritebackJobManager(self.root)
+
+        with self.assertRaises(HTTPException) as context:
+            asyncio.run(manager.get("../../etc/passwd"))
+
+        assert context.exception.status_code == 404
+
+
+if __name__ == "__main__":
+    unittest.main()
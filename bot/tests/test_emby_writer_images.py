@@ -0,0 +1,150 @@
+"""元数据写入图片流水线的单元测试。"""
+
+from __future__ import annotations
+import asyncio
+import base64
+import io
+import tempfile
+import unittest
+from pathlib import Path
+from typing import Any
+from unittest.mock import AsyncMock, patch
+
+from PIL import Image
+
+from bot.services.emby_metadata import writer
+from bot.services.emby_metadata.models import MediaLibraryCategory, MetadataCandidate, MetadataPerson
+
+
+def _image(size: tuple[int, int], image_format: str) -> bytes:
+    output = io.BytesIO()
+    Image.new("RGB", size, "blue").save(output, format=image_format)
+    return output.getvalue()
+
+
+class FakeEmbyClient:
+    def __init__(self) -> None:
+        self.updates: list[str] = []
+        self.uploads: list[str] = []
+        self.active = 0
+        self.max_active = 0
+
+    async def update_item(self, item_id: str, payload: dict[str, Any]) -> None:
+        self.updates.append(item_id)
+
+    async def upload_item_image(self, item_id: str, image_data: str, image_type: str) -> None:
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        await asyncio.sleep(0.01)
+        self.active -= 1
+        self.uploads.append(item_id)
+
+
+class WriterImagePipelineTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.candidate = MetadataCandidate(
+            source="ko-shop",
+            source_id="1",
+            category=MediaLibraryCategory.JAPANESE_KOREAN,
+            title="标题",
+            original_title="标题",
+            sort_name="标题",
+            forced_sort_name="标题",
+            confidence=1.0,
+            raw_url="https://example.com/detail/1",
+            people=[MetadataPerson(name=f"演员{index}", image_url=f"https://example.com/{index}.jpg") for index in range(10)],
+        )
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def test_large_images_are_downscaled_and_small_jpegs_kept(self) -> None:
+        small = _image((300, 400), "JPEG")
+        large = _image((3000, 1500), "PNG")
+
+        assert writer.normalize_image_for_upload(small, 1000) is small
+        with Image.open(io.BytesIO(writer.normalize_image_for_upload(large, 1000))) as image:
+            assert image.format == "JPEG"
+            assert image.size == (1000, 500)
+
+    def test_person_images_are_uploaded_concurrently_within_limit(self) -> None:
+        client = FakeEmbyClient()
+        people = [
+            {"Id": f"person-{index}", "ImageUrl": f"https://example.com/{index}.jpg", "ArchivePath": None}
+            for index in range(10)
+        ]
+
+        async def fake_download(url: str, **_: Any) -> tuple[bytes, str]:
+            await asyncio.sleep(0.01)
+            return _image((1600, 1600), "JPEG"), "image/jpeg"
+
+        with (
+            patch.object(writer, "get_emby_client", return_value=client),
+            patch.object(writer, "download_image", side_effect=fake_download),
+        ):
+            asyncio.run(writer.apply_item_update("item-1", None, people=people))
+
+        assert client.updates == []
+        assert sorted(client.uploads) == sorted(person["Id"] for person in people)
+        assert 1 < client.max_active <= writer.IMAGE_PIPELINE_CONCURRENCY
+
+    @patch("bot.services.emby_metadata.writer.fetch_item_snapshot", new_callable=AsyncMock)
+    @patch("bot.services.emby_metadata.writer.apply_item_update", new_callable=AsyncMock)
+    def test_unchanged_item_is_not_rewritten_or_refetched(self, mock_apply: AsyncMock, mock_fetch: AsyncMock) -> None:
+        candidate = self.candidate.model_copy(update={"people": []})
+        before_item = writer.build_item_update_payload({"Id": "item-1"}, candidate)
+        mock_fetch.return_value = ("template-user", before_item)
+
+        result = asyncio.run(writer.apply_metadata_candidate_to_item("item-1", candidate))
+
+        assert result is not None
+        assert result["actual_changes"] == []
+        mock_apply.assert_not_awaited()
+        assert mock_fetch.await_count == 1
+
+    def test_person_images_are_prefetched_with_archive(self) -> None:
+        archive_root = Path(self._tmp.name)
+
+        async def fake_download(url: str, **_: Any) -> tuple[bytes, str]:
+            if url.endswith("/3.jpg"):
+                raise OSError("boom")
+            return _image((50, 50), "JPEG"), "image/jpeg"
+
+        with (
+            patch.object(writer, "IMAGE_ARCHIVE_ROOT", archive_root),
+            patch.object(writer, "download_image", side_effect=fake_download),
+        ):
+            names = {person.name for person in self.candidate.people}
+            images = asyncio.run(writer._prefetch_person_images(self.candidate, names))
+
+        assert len(images) == 10
+        assert images["演员3"] is None
+        assert base64.b64decode(images["演员0"] or "")[:2] == b"\xff\xd8"
+        assert len(list(archive_root.rglob("person_*.jpg"))) == 9
+
+    def test_only_people_kept_in_the_payload_are_prefetched(self) -> None:
+        payload = writer.build_item_update_payload(
+            {"Id": "item-1", "People": [{"Name": "演员1", "Type": "Actor"}]},
+            self.candidate,
+        )
+        names = writer._expected_person_names(payload)
+        downloaded: list[str] = []
+
+        async def fake_download(url: str, **_: Any) -> tuple[bytes, str]:
+            downloaded.append(url)
+            return _image((50, 50), "JPEG"), "image/jpeg"
+
+        with (
+            patch.object(writer, "IMAGE_ARCHIVE_ROOT", Path(self._tmp.name)),
+            patch.object(writer, "download_image", side_effect=fake_download),
+        ):
+            images = asyncio.run(writer._prefetch_person_images(self.candidate, names))
+
+        assert names == {"演员1"}
+        assert list(images) == ["演员1"]
+        assert len(downloaded) == 1
+
+
+if __name__ == "__main__":
+    unittest.main()
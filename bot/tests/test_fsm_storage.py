@@ -0,0 +1,139 @@
+"""数据库 FSM 存储的单元测试。"""
+
+from __future__ import annotations
+import asyncio
+import unittest
+from datetime import timedelta
+from typing import Any
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import StorageKey
+from sqlalchemy import create_engine, func, select, update
+from sqlalchemy.orm import Session
+
+from bot.database.fsm_storage import DatabaseStorage
+from bot.database.models import FsmStateModel
+from bot.utils.datetime import now
+
+KEY = StorageKey(bot_id=1, chat_id=10, user_id=100)
+
+
+class SyncSessionAdapter:
+    """用同步 SQLite 会话模拟 AsyncSession 的最小接口。"""
+
+    def __init__(self, engine: Any, log: list[str]) -> None:
+        self.session = Session(engine)
+        self.bind = engine
+        self.log = log
+
+    async def __aenter__(self) -> SyncSessionAdapter:
+        return self
+
+    async def __aexit__(self, *exc: object) -> None:
+        self.session.close()
+
+    async def execute(self, statement: Any, params: Any = None) -> Any:
+        self.log.append(type(statement).__name__)
+        return self.session.execute(statement, params)
+
+    async def commit(self) -> None:
+        self.session.commit()
+
+
+class DatabaseStorageTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.engine = create_engine("sqlite://")
+        FsmStateModel.metadata.create_all(self.engine, tables=[FsmStateModel.__table__])
+        self.addCleanup(self.engine.dispose)
+        self.log: list[str] = []
+
+    def _storage(self) -> DatabaseStorage:
+        return DatabaseStorage(lambda: SyncSessionAdapter(self.engine, self.log), flush_interval=60)
+
+    def _rows(self) -> list[Any]:
+        with Session(self.engine) as session:
+            return list(session.execute(select(FsmStateModel.state, FsmStateModel.data)).all())
+
+    def test_writes_are_cached_and_batched(self) -> None:
+        async def scenario() -> None:
+            storage = self._storage()
+            await storage.set_state(KEY, State("waiting", group_name="Form"))
+            for index in range(5):
+                await storage.update_data(KEY, {"step": index, "名字": "测试"})
+            assert await storage.get_state(KEY) == "Form:waiting"
+            assert await storage.get_data(KEY) == {"step": 4, "名字": "测试"}
+            # 只有首次读取查库，后续写入都停留在缓冲中
+            assert self.log == ["Select"]
+            assert storage.pending() == 1
+            await storage.close()
+            await storage.close()
+
+        asyncio.run(scenario())
+
+        assert self._rows() == [("Form:waiting", '{"step": 4, "名字": "测试"}')]
+
+    def test_state_survives_restart_and_clear_deletes_row(self) -> None:
+        async def first_run() -> None:
+            storage = self._storage()
+            await storage.set_state(KEY, "menu")
+            await storage.set_data(KEY, {"page": 2})
+            await storage.close()
+
+        async def second_run() -> None:
+            storage = self._storage()
+            assert await storage.get_state(KEY) == "menu"
+            assert await storage.get_value(KEY, "page") == 2
+            await storage.set_state(KEY, None)
+            await storage.set_data(KEY, {})
+            await storage.close()
+
+        asyncio.run(first_run())
+        asyncio.run(second_run())
+
+        assert self._rows() == []
+
+    def test_unserializable_data_is_rejected(self) -> None:
+        async def scenario() -> dict[str, Any]:
+            storage = self._storage()
+            await storage.set_data(KEY, {"page": 1})
+            with self.assertRaises(TypeError):
+                await storage.set_data(KEY, {"page": 2, "when": object()})
+            with self.assertRaises(TypeError):
+                await storage.set_data(KEY, {"page": 2, "messages": {123: 4}})
+            data = await storage.get_data(KEY)
+            await storage.close()
+            return data
+
+        assert asyncio.run(scenario()) == {"page": 1}
+        assert self._rows() == [(None, '{"page": 1}')]
+
+    def test_abandoned_states_expire(self) -> None:
+        async def scenario() -> tuple[str | None, int]:
+            storage = self._storage()
+            await storage.set_state(KEY, "menu")
+            await storage.set_state(StorageKey(bot_id=1, chat_id=20, user_id=200), "menu")
+            await storage.flush()
+            with Session(self.engine) as session:
+                session.execute(
+                    update(FsmStateModel)
+                    .where(FsmStateModel.chat_id == KEY.chat_id)
+                    .values(updated_at=now() - timedelta(days=30))
+                )
+                session.commit()
+            fresh = DatabaseStorage(lambda: SyncSessionAdapter(self.engine, self.log), flush_interval=60)
+            state = await fresh.get_state(KEY)
+            removed = await fresh.cleanup()
+            await storage.close()
+            await fresh.close()
+            return state, removed
+
+        state, removed = asyncio.run(scenario())
+
+        assert state is None
+        assert removed == 1
+        with Session(self.engine) as session:
+            assert session.scalar(select(func.count()).select_from(FsmStateModel)) == 1
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+"""进程内性能指标的单元测试。"""
+
+from __future__ import annotations
+import asyncio
+import json
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from typing import Any
+from unittest.mock import patch
+
+from bot.middlewares.metrics import TimedMiddleware
+from bot.utils import metrics
+from bot.utils.metrics import Counter, Histogram, MetricsRegistry
+
+
+class SleepyMiddleware:
+    async def __call__(self, handler: Any, event: Any, data: dict[str, Any]) -> Any:
+        await asyncio.sleep(0.02)
+        return await handler(event, data)
+
+
+class MetricsTests(unittest.TestCase):
+    def test_histogram_renders_cumulative_buckets_with_process_label(self) -> None:
+        registry = MetricsRegistry(process="api")
+        histogram = registry.histogram("demo_seconds", "示例", ("route",), buckets=(0.1, 1.0))
+        for seconds in (0.05, 0.5, 5.0):
+            histogram.observe(seconds, route="/api/users")
+
+        text = metrics.render_prometheus([registry.snapshot()])
+
+        assert '# TYPE demo_seconds histogram' in text
+        assert 'demo_seconds_bucket{process="api",route="/api/users",le="0.1"} 1' in text
+        assert 'demo_seconds_bucket{process="api",route="/api/users",le="1"} 2' in text
+        assert 'demo_seconds_bucket{process="api",route="/api/users",le="+Inf"} 3' in text
+        assert 'demo_seconds_count{process="api",route="/api/users"} 3' in text
+
+    def test_quantile_interpolates_within_bucket(self) -> None:
+        assert metrics.histogram_quantile(0.5, [0.1, 1.0], [0, 10]) == 0.55
+        assert metrics.histogram_quantile(0.95, [0.1, 1.0], [0, 0]) == 0.0
+
+    def test_series_count_is_capped(self) -> None:
+        counter = Counter("demo_total", "示例", ("user",))
+        with patch.object(metrics, "MAX_SERIES_PER_METRIC", 2):
+            for user in ("a", "b", "c", "d"):
+                counter.inc(user=user)
+
+        assert counter.value(user=metrics.OTHER_LABEL) == 2
+
+    def test_paths_are_normalized(self) -> None:
+        assert metrics.normalize_path("/Users/5f1c0a9e2b/Items/12345?Fields=x") == "/Users/:id/Items/:id"
+        assert metrics.normalize_path("/System/Info") == "/System/Info"
+
+    def test_timed_middleware_excludes_downstream_time(self) -> None:
+        histogram = Histogram("mw_seconds", "示例", ("observer", "middleware"))
+
+        async def slow_handler(event: Any, data: dict[str, Any]) -> str:
+            await asyncio.sleep(0.1)
+            return "ok"
+
+        with patch("bot.middlewares.metrics.MIDDLEWARE_SECONDS", histogram):
+            result = asyncio.run(TimedMiddleware(SleepyMiddleware(), "message")(slow_handler, object(), {}))
+
+        series = histogram.snapshot()["series"][0]
+        assert result == "ok"
+        assert series["labels"] == {"observer": "message", "middleware": "SleepyMiddleware"}
+        assert 0.015 < series["sum"] < 0.09
+
+    def test_snapshots_of_other_processes_are_merged_when_fresh(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            fresh = {"process": "api", "generated_at": time.time(), "metrics": {}}
+            stale = {"process": "old", "generated_at": time.time() - 3600, "metrics": {}}
+            (root / "api.json").write_text(json.dumps(fresh), encoding="utf-8")
+            (root / "old.json").write_text(json.dumps(stale), encoding="utf-8")
+
+            processes = [snapshot["process"] for snapshot in metrics.collect_snapshots(root)]
+
+        assert processes == [metrics.registry.process, "api"]
+
+
+    def test_snapshot_loop_survives_collector_errors(self) -> None:
+        registry = MetricsRegistry(process="worker")
+        calls: list[bool] = []
+
+        def flaky_section() -> list[Any]:
+            calls.append(True)
+            if len(calls) == 1:
+                raise RuntimeError("dictionary changed size during iteration")
+            return []
+
+        registry.section("queries", flaky_section)
+
+        async def scenario() -> None:
+            task = asyncio.create_task(metrics.run_metrics_snapshots("worker", interval=0.01))
+            await asyncio.sleep(0.05)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            with (
+                patch.object(metrics, "registry", registry),
+                patch.object(metrics, "METRICS_SNAPSHOT_ROOT", root),
+            ):
+                asyncio.run(scenario())
+            written = json.loads((root / "worker.json").read_text(encoding="utf-8"))
+
+        assert len(calls) > 1
+        assert written["sections"] == {"queries": []}
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+"""播放策略内存索引的单元测试。"""
+
+from __future__ import annotations
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, patch
+
+from bot.config.constants import KEY_TG_WHITELIST_USER_IDS
+from bot.services.playback_policy import (
+    WARNING_KEY_WEB_PLAYBACK,
+    PlaybackPolicyIndex,
+    UserPolicyState,
+    parse_telegram_whitelist,
+)
+
+
+class PlaybackPolicyIndexTests(unittest.TestCase):
+    def test_whitelist_is_cached_until_config_changes(self) -> None:
+        policy = PlaybackPolicyIndex()
+
+        async def scenario() -> list[bool]:
+            results = [await policy.is_whitelisted("a"), await policy.is_whitelisted("b")]
+            policy.on_config_changed("unrelated.key")
+            results.append(await policy.is_whitelisted("a"))
+            policy.on_config_changed(KEY_TG_WHITELIST_USER_IDS)
+            results.append(await policy.is_whitelisted("b"))
+            return results
+
+        loader = AsyncMock(side_effect=[frozenset({"a"}), frozenset({"b"})])
+        with patch.object(policy, "_load_whitelist", loader):
+            results = asyncio.run(scenario())
+
+        assert results == [True, False, True, True]
+        assert loader.await_count == 2
+
+    def test_warnings_are_counted_in_memory_and_persisted_in_batch(self) -> None:
+        policy = PlaybackPolicyIndex()
+        persisted: list[dict] = []
+
+        async def fake_persist(writes: dict) -> None:
+            persisted.append(dict(writes))
+
+        async def scenario() -> tuple[int | None, int | None, int | None]:
+            state = await policy.user_state("emby-1")
+            assert state is not None
+            first = policy.record_warning("emby-1", state, WARNING_KEY_WEB_PLAYBACK, ("Emby Web", "Chrome"), {"Id": "1"})
+            second = policy.record_warning("emby-1", state, WARNING_KEY_WEB_PLAYBACK, ("Emby Web", "Chrome"), {"Id": "2"})
+            await policy.flush()
+            other = await policy.user_state("emby-1")
+            assert other is state
+            return first, second, state.warnings[WARNING_KEY_WEB_PLAYBACK]["count"]
+
+        loader = AsyncMock(return_value=UserPolicyState(telegram_id=42))
+        with patch.object(policy, "_load_user", loader), patch.object(policy, "_persist", side_effect=fake_persist):
+            first, second, count = asyncio.run(scenario())
+
+        assert (first, second, count) == (1, None, 1)
+        assert loader.await_count == 1
+        assert len(persisted) == 1
+        assert persisted[0][("emby-1", WARNING_KEY_WEB_PLAYBACK)]["history"][0]["item_id"] == "1"
+
+    def test_restricted_client_matcher_and_telegram_whitelist_parsing(self) -> None:
+        policy = PlaybackPolicyIndex()
+
+        assert policy.is_restricted_client("网易爆米花", "")
+        assert policy.is_restricted_client("Infuse", "爆米花 TV")
+        assert not policy.is_restricted_client("Emby Web", "Chrome")
+        assert parse_telegram_whitelist('["12", "abc", "0", 34]') == frozenset({12, 34})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+"""SQL 语句统计与 N+1 检测的单元测试。"""
+
+from __future__ import annotations
+import asyncio
+import unittest
+from unittest.mock import patch
+
+from sqlalchemy import create_engine, text
+
+from bot.database import query_tracker
+from bot.database.query_tracker import QueryReport, install_query_hooks, query_budget, track_queries
+
+
+class QueryTrackerTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.engine = create_engine("sqlite://")
+        install_query_hooks(self.engine)
+        self.report = QueryReport()
+        patcher = patch.object(query_tracker, "query_report", self.report)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.engine.dispose)
+
+    def _select_in_loop(self, times: int) -> None:
+        with self.engine.connect() as conn:
+            for value in range(times):
+                conn.execute(text("SELECT :value"), {"value": value})
+
+    def test_repeated_statements_are_reported_as_n_plus_one(self) -> None:
+        with track_queries("message:user.devices.list"):
+            self._select_in_loop(6)
+            with self.engine.connect() as conn:
+                conn.execute(text("SELECT 1 WHERE 1 IN (:a, :b, :c)"), {"a": 1, "b": 2, "c": 3})
+
+        unit = self.report.snapshot()["units"][0]
+        assert unit["unit"] == "message:user.devices.list"
+        assert unit["max_queries"] == 7
+        assert unit["n_plus_one"] == [{"statement": "SELECT ?", "repeats": 6}]
+
+    def test_query_budget_fails_when_exceeded(self) -> None:
+        with query_budget(3):
+            self._select_in_loop(3)
+
+        with self.assertRaises(AssertionError) as raised, query_budget(2, "handler"):
+            self._select_in_loop(3)
+
+        assert "handler 执行了 3 条 SQL" in str(raised.exception)
+
+    def test_units_follow_the_task_context_and_stop_after_close(self) -> None:
+        async def scenario() -> query_tracker.QueryUnit:
+            with track_queries("update:message") as unit:
+                query_tracker.rename_current_unit("message:start.cmd_start")
+                await asyncio.to_thread(lambda: None)
+                self._select_in_loop(1)
+            self._select_in_loop(1)
+            return unit
+
+        unit = asyncio.run(scenario())
+
+        assert unit.count == 1
+        assert self.report.snapshot()["units"][0]["unit"] == "message:start.cmd_start"
+
+    def test_slow_queries_are_recorded(self) -> None:
+        with patch.object(query_tracker.settings, "DB_SLOW_QUERY_MS", 0), track_queries("job"):
+            self._select_in_loop(1)
+
+        assert self.report.snapshot()["slow"][0]["unit"] == "job"
+
+
+if __name__ == "__main__":
+    unittest.main()
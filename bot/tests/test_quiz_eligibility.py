@@ -0,0 +1,95 @@
+"""问答触发资格内存索引的单元测试。"""
+
+from __future__ import annotations
+import asyncio
+import unittest
+from datetime import timedelta
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from bot.config.constants import KEY_QUIZ_TRIGGER_PROBABILITY
+from bot.services.quiz_eligibility import QuizEligibilityTracker, QuizTriggerConfig, QuizUserState
+from bot.services.quiz_service import QuizService
+from bot.utils.datetime import now
+
+CONFIG = QuizTriggerConfig(enabled=True, probability=0.5, daily_limit=2, cooldown_minutes=10)
+
+
+def fresh_state() -> QuizUserState:
+    return QuizUserState(active_until=None, day=now().date(), daily_count=0, last_quiz_at=None)
+
+
+class QuizEligibilityTests(unittest.TestCase):
+    def check(self, tracker: QuizEligibilityTracker, session: MagicMock, roll: float = 0.1) -> bool:
+        with (
+            patch("bot.services.quiz_service.get_quiz_eligibility", return_value=tracker),
+            patch("bot.services.quiz_service.random.random", return_value=roll),
+        ):
+            return asyncio.run(QuizService.check_trigger_conditions(session, 1, 1))
+
+    def test_missed_roll_does_no_io(self) -> None:
+        tracker = QuizEligibilityTracker()
+        tracker.set_config(CONFIG)
+        session = MagicMock()
+        loader = AsyncMock(return_value=fresh_state())
+
+        with patch.object(tracker, "_load", loader):
+            assert self.check(tracker, session, roll=0.9) is False
+
+        loader.assert_not_awaited()
+        session.execute.assert_not_called()
+
+    def test_state_is_loaded_once_and_follows_session_lifecycle(self) -> None:
+        tracker = QuizEligibilityTracker()
+        tracker.set_config(CONFIG)
+        session = MagicMock()
+        loader = AsyncMock(return_value=fresh_state())
+
+        with patch.object(tracker, "_load", loader):
+            results = [self.check(tracker, session)]
+            tracker.session_started(1, now() + timedelta(minutes=1))
+            results.append(self.check(tracker, session))
+            tracker.session_closed(1)
+            tracker.quiz_logged(1)
+            # 冷却中
+            results.append(self.check(tracker, session))
+
+        assert results == [True, False, False]
+        assert loader.await_count == 1
+        session.execute.assert_not_called()
+
+    def test_daily_limit_resets_on_a_new_day(self) -> None:
+        current = now()
+        state = QuizUserState(
+            active_until=None,
+            day=current.date(),
+            daily_count=2,
+            last_quiz_at=current - timedelta(hours=1),
+        )
+        assert state.count_on(current) == 2
+        assert state.count_on(current + timedelta(days=1)) == 0
+
+        state.record_quiz(current + timedelta(days=1))
+        assert (state.daily_count, state.day) == (1, (current + timedelta(days=1)).date())
+
+    def test_config_change_forces_reload(self) -> None:
+        tracker = QuizEligibilityTracker()
+        tracker.set_config(CONFIG)
+        tracker.on_config_changed("unrelated.key")
+        assert tracker._config is CONFIG
+        tracker.on_config_changed(KEY_QUIZ_TRIGGER_PROBABILITY)
+        assert tracker._config is None
+
+        values = {KEY_QUIZ_TRIGGER_PROBABILITY: 0.3}
+        with patch(
+            "bot.services.quiz_eligibility.get_config",
+            AsyncMock(side_effect=lambda _session, key: values.get(key)),
+        ):
+            config = asyncio.run(tracker.config(MagicMock()))
+
+        assert config.enabled is True
+        assert config.probability == 0.3
+        assert config.daily_limit == 10
+
+
+if __name__ == "__main__":
+    unittest.main()
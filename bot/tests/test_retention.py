@@ -0,0 +1,139 @@
+"""通知/审计表数据保留的单元测试。"""
+
+from __future__ import annotations
+import asyncio
+import tempfile
+import unittest
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+from unittest.mock import patch
+
+from bot.database.models.notification import NotificationModel
+from bot.services import retention
+from bot.services.retention import RETENTION_POLICIES, ArchiveStore, RetentionRunner, read_archive
+
+
+def _notification(row_id: int, event_type: str, month: int) -> NotificationModel:
+    return NotificationModel(
+        id=row_id,
+        type=event_type,
+        title=f"event {row_id}",
+        payload={"Event": event_type, "Item": {"Id": str(row_id), "Overview": "x" * 100}},
+        created_at=datetime(2026, month, 1, 12),
+        updated_at=datetime(2026, month, 1, 12),
+    )
+
+
+class FakeResult:
+    def __init__(self, rows: list[Any]) -> None:
+        self.rows = rows
+
+    def scalars(self) -> FakeResult:
+        return self
+
+    def all(self) -> list[Any]:
+        return self.rows
+
+
+class FakeSession:
+    def __init__(self, owner: FakeSessionmaker) -> None:
+        self.owner = owner
+
+    async def __aenter__(self) -> FakeSession:
+        return self
+
+    async def __aexit__(self, *_: object) -> None:
+        return None
+
+    async def execute(self, statement: Any, params: Any = None) -> FakeResult | None:
+        if statement.is_select:
+            self.owner.selects.append(str(statement))
+            return FakeResult(self.owner.batches.pop(0) if self.owner.batches else [])
+        if statement.is_delete:
+            self.owner.deleted.append(statement)
+        else:
+            self.owner.updates.extend(params)
+        return None
+
+    async def commit(self) -> None:
+        self.owner.commits += 1
+
+
+class FakeSessionmaker:
+    def __init__(self, batches: list[list[Any]]) -> None:
+        self.batches = batches
+        self.selects: list[str] = []
+        self.deleted: list[Any] = []
+        self.updates: list[dict[str, Any]] = []
+        self.commits = 0
+
+    def __call__(self) -> FakeSession:
+        return FakeSession(self)
+
+
+class RetentionTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.store = ArchiveStore(Path(self._tmp.name))
+        self.playback, self.other = RETENTION_POLICIES[0], RETENTION_POLICIES[1]
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def _runner(self) -> RetentionRunner:
+        return RetentionRunner(store=self.store, batch_size=2, batch_pause=0)
+
+    def test_archive_moves_rows_to_monthly_files_in_batches(self) -> None:
+        rows = [
+            _notification(1, "playback.start", 1),
+            _notification(2, "playback.stop", 1),
+            _notification(3, "playback.start", 2),
+        ]
+        factory = FakeSessionmaker([rows[:2], rows[2:]])
+
+        with patch.object(retention, "sessionmaker", factory):
+            archived = asyncio.run(self._runner().archive_policy(self.playback))
+
+        assert archived == 3
+        assert len(factory.deleted) == 2
+        assert factory.commits == 2
+        assert self.store.months("emby_notifications") == ["2026-01", "2026-02"]
+        january = read_archive("emby_notifications", month_to="2026-01", store=self.store)
+        assert [row["id"] for row in january] == [1, 2]
+        assert january[0]["created_at"] == "2026-01-01T12:00:00"
+
+    def test_catch_all_policy_excludes_event_types_claimed_elsewhere(self) -> None:
+        factory = FakeSessionmaker([])
+
+        with patch.object(retention, "sessionmaker", factory):
+            asyncio.run(self._runner().archive_policy(self.other))
+
+        assert "NOT IN" in factory.selects[0]
+
+    def test_strip_replaces_payload_and_advances_watermark(self) -> None:
+        rows = [_notification(5, "playback.start", 3), _notification(6, "playback.start", 3)]
+        factory = FakeSessionmaker([rows, []])
+
+        with patch.object(retention, "sessionmaker", factory):
+            first = asyncio.run(self._runner().strip_policy(self.playback))
+            second = asyncio.run(self._runner().strip_policy(self.playback))
+
+        assert (first, second) == (2, 0)
+        assert factory.updates[0]["payload"] == {"Event": "playback.start", "Item": {"Id": "5"}, "_stripped": True}
+        assert "emby_notifications.id >" in factory.selects[-1]
+        assert self._runner()._read_state()["emby_notifications.playback"]["stripped_id"] == 6
+
+    def test_reader_deduplicates_rows_and_filters_by_event_type(self) -> None:
+        row = {"id": 1, "type": "playback.start", "created_at": datetime(2026, 4, 2)}
+        self.store.append("emby_notifications", [row])
+        self.store.append("emby_notifications", [row, {**row, "id": 2, "type": "item.rate"}])
+
+        rows = read_archive("emby_notifications", event_types={"playback.start"}, store=self.store)
+
+        assert [item["id"] for item in rows] == [1]
+        assert len(read_archive("emby_notifications", store=self.store)) == 2
+
+
+if __name__ == "__main__":
+    unittest.main()
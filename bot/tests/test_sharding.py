@@ -0,0 +1,122 @@
+"""多进程分片转发的单元测试。"""
+
+from __future__ import annotations
+import asyncio
+import json
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+from pathlib import Path
+
+from aiogram.types import Update
+
+from bot.runtime import sharding
+from bot.runtime.sharding import ShardRouter, shard_index
+
+# 把收到的每一行追加到 <目录>/<序号>.jsonl 的最小工作进程
+ECHO_WORKER = "import sys\nwith open(sys.argv[1], 'a') as f:\n    for line in sys.stdin:\n        f.write(line); f.flush()"
+
+
+def make_update(update_id: int, chat_id: int) -> Update:
+    return Update.model_validate(
+        {
+            "update_id": update_id,
+            "message": {
+                "message_id": update_id,
+                "date": 1700000000,
+                "chat": {"id": chat_id, "type": "supergroup", "title": "g"},
+                "from": {"id": 7, "is_bot": False, "first_name": "u"},
+                "text": f"m{update_id}",
+            },
+        }
+    )
+
+
+class ShardingTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.root = Path(tempfile.mkdtemp())
+
+    def _router(self, processes: int) -> ShardRouter:
+        def command(index: int) -> list[str]:
+            return [sys.executable, "-c", ECHO_WORKER, str(self.root / f"{index}.jsonl")]
+
+        return ShardRouter(processes, command)
+
+    def _received(self, index: int) -> list[Update]:
+        path = self.root / f"{index}.jsonl"
+        if not path.exists():
+            return []
+        return [Update.model_validate_json(line) for line in path.read_text().splitlines()]
+
+    def test_updates_are_routed_by_chat_and_keep_order(self) -> None:
+        updates = [make_update(update_id, chat_id=-100 - update_id % 7) for update_id in range(40)]
+
+        async def scenario() -> None:
+            router = self._router(3)
+            await router.start()
+            for update in updates:
+                await router.forward(update)
+            await router.stop()
+
+        asyncio.run(scenario())
+
+        for index in range(3):
+            received = self._received(index)
+            expected = [update for update in updates if shard_index(update, 3) == index]
+            assert [update.update_id for update in received] == [update.update_id for update in expected]
+        # 转发的 JSON 能完整还原更新
+        first = self._received(shard_index(updates[0], 3))[0]
+        assert first.message.from_user.id == 7
+        assert first.message.text == "m0"
+        assert json.loads(first.model_dump_json(exclude_unset=True))["message"]["chat"]["id"] == -100
+
+    def test_crashed_worker_is_restarted(self) -> None:
+        async def scenario() -> None:
+            router = self._router(1)
+            await router.start()
+            router._procs[0].kill()
+            await router._procs[0].wait()
+            await router.forward(make_update(2, chat_id=1))
+            await router.stop()
+
+        with patch.object(sharding, "SHARD_RESTART_DELAY", 0.01):
+            asyncio.run(scenario())
+
+        assert [update.update_id for update in self._received(0)] == [2]
+
+    def test_broken_pipe_of_replaced_worker_does_not_block_forwarding(self) -> None:
+        router = self._router(1)
+
+        class DeadStdin:
+            def write(self, _line: bytes) -> None:
+                # 写入失败时监控协程已经换上新进程
+                router._procs[0] = current
+                raise BrokenPipeError
+
+            async def drain(self) -> None:
+                return None
+
+        class DeadProcess:
+            stdin = DeadStdin()
+
+            async def wait(self) -> int:
+                await asyncio.Event().wait()
+                return 0
+
+        async def scenario() -> None:
+            nonlocal current
+            await router.start()
+            current = router._procs[0]
+            router._procs[0] = DeadProcess()
+            await asyncio.wait_for(router.forward(make_update(3, chat_id=1)), timeout=5)
+            await router.stop()
+
+        current = None
+        asyncio.run(scenario())
+
+        assert [update.update_id for update in self._received(0)] == [3]
+
+
+if __name__ == "__main__":
+    unittest.main()
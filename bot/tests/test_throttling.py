@@ -0,0 +1,125 @@
+"""令牌桶限流的单元测试。"""
+
+from __future__ import annotations
+import asyncio
+import unittest
+from typing import Any
+from unittest.mock import patch
+
+from bot.middlewares.throttling import ThrottlingMiddleware, command_name
+from bot.services import throttling
+from bot.services.throttling import THROTTLED_EVENTS, ThrottlePolicies, ThrottlePolicy, Throttler, parse_policies
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.value = 1000.0
+
+    def __call__(self) -> float:
+        return self.value
+
+
+def make_throttler(policies: ThrottlePolicies, max_buckets: int = 100) -> Throttler:
+    throttler = Throttler(max_buckets=max_buckets)
+    throttler.set_policies(policies)
+    return throttler
+
+
+POLICIES = ThrottlePolicies(
+    default=ThrottlePolicy("default", rate=1, burst=2),
+    chat=ThrottlePolicy("chat", rate=1, burst=3),
+)
+
+
+class ThrottlerTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.clock = FakeClock()
+        patcher = patch.object(throttling.time, "monotonic", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_user_burst_then_refill_and_users_do_not_block_each_other(self) -> None:
+        throttler = make_throttler(POLICIES)
+
+        results = [throttler.acquire(1, 1).allowed for _ in range(3)]
+        other_user = throttler.acquire(2, 2).allowed
+        self.clock.value += 1
+        refilled = throttler.acquire(1, 1).allowed
+
+        assert results == [True, True, False]
+        assert other_user
+        assert refilled
+
+    def test_chat_bucket_limits_the_whole_group(self) -> None:
+        throttler = make_throttler(POLICIES)
+        before = THROTTLED_EVENTS.value(policy="default", scope="chat", action="dropped")
+
+        allowed = [throttler.acquire(user_id, -100).allowed for user_id in range(1, 6)]
+
+        assert allowed == [True, True, True, False, False]
+        assert THROTTLED_EVENTS.value(policy="default", scope="chat", action="dropped") == before + 2
+
+    def test_command_and_callback_policies_queue_or_drop(self) -> None:
+        policies = parse_policies(
+            {
+                "commands": {"/CheckIn": {"rate": 0.5, "burst": 1}},
+                "callbacks": {"quiz:answer": {"rate": 2, "burst": 1, "queue": True, "max_wait": 1}},
+                "chat": {"rate": 0},
+            }
+        )
+        throttler = make_throttler(policies)
+
+        # 取值无效的策略被忽略，保留默认值
+        assert policies.chat == throttling.default_policies().chat
+        assert throttler.acquire(1, 1, command="checkin").allowed
+        assert not throttler.acquire(1, 1, command="checkin").allowed
+        # 其他命令走默认策略，不受 checkin 桶影响
+        assert throttler.acquire(1, 1, command="start").allowed
+
+        first = throttler.acquire(1, 1, callback="quiz:answer:42")
+        second = throttler.acquire(1, 1, callback="quiz:answer:43")
+        third = throttler.acquire(1, 1, callback="quiz:answer:44")
+        assert (first.allowed, first.delay) == (True, 0.0)
+        assert (second.allowed, second.delay) == (True, 0.5)
+        assert (third.allowed, third.delay) == (True, 1.0)
+        assert not throttler.acquire(1, 1, callback="quiz:answer:45").allowed
+
+    def test_bucket_memory_is_bounded(self) -> None:
+        throttler = make_throttler(POLICIES, max_buckets=10)
+
+        for user_id in range(100):
+            throttler.acquire(user_id, user_id)
+
+        assert len(throttler) == 10
+
+
+class FakeUser:
+    def __init__(self, user_id: int) -> None:
+        self.id = user_id
+
+
+class ThrottlingMiddlewareTests(unittest.TestCase):
+    def test_drops_excess_updates(self) -> None:
+        throttler = make_throttler(POLICIES)
+        middleware = ThrottlingMiddleware(throttler)
+        handled: list[Any] = []
+
+        async def handler(event: Any, data: dict[str, Any]) -> str:
+            handled.append(event)
+            return "ok"
+
+        async def scenario() -> list[Any]:
+            data = {"event_from_user": FakeUser(7), "event_chat": FakeUser(7)}
+            return [await middleware(handler, object(), data) for _ in range(3)]
+
+        assert asyncio.run(scenario()) == ["ok", "ok", None]
+        assert len(handled) == 2
+
+    def test_command_name(self) -> None:
+        assert command_name("/Start@my_bot arg") == "start"
+        assert command_name("hello") is None
+        assert command_name("/ ") is None
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,167 @@
+"""Webhook 更新协程池的单元测试。"""
+
+from __future__ import annotations
+import asyncio
+import json
+import random
+import unittest
+from typing import Any
+
+from aiogram.types import Update
+from starlette.requests import Request
+
+from bot.middlewares.album import AlbumMiddleware
+from bot.runtime.update_pool import UpdateWorkerPool
+from bot.runtime.webhook import SECRET_HEADER, create_webhook_app
+
+
+def make_update(update_id: int, chat_id: int) -> Update:
+    return Update.model_validate(
+        {
+            "update_id": update_id,
+            "message": {
+                "message_id": update_id,
+                "date": 0,
+                "chat": {"id": chat_id, "type": "private"},
+                "from": {"id": chat_id, "is_bot": False, "first_name": "u"},
+                "text": "hi",
+            },
+        }
+    )
+
+
+class RecordingDispatcher:
+    def __init__(self, gate: asyncio.Event | None = None) -> None:
+        self.seen: list[tuple[int, int]] = []
+        self.gate = gate
+
+    async def feed_update(self, bot: Any, update: Update) -> None:
+        del bot
+        if self.gate is not None:
+            await self.gate.wait()
+        await asyncio.sleep(random.random() / 1000)
+        self.seen.append((update.message.chat.id, update.update_id))
+
+
+class ChatGateDispatcher:
+    """只阻塞指定会话的 Dispatcher。"""
+
+    def __init__(self, blocked_chat: int) -> None:
+        self.blocked_chat = blocked_chat
+        self.gate = asyncio.Event()
+        self.seen: list[int] = []
+
+    async def feed_update(self, bot: Any, update: Update) -> None:
+        del bot
+        if update.message.chat.id == self.blocked_chat:
+            await self.gate.wait()
+        self.seen.append(update.update_id)
+
+
+class AlbumDispatcher:
+    """只挂相册中间件的最小 Dispatcher，记录处理器收到的内容。"""
+
+    def __init__(self) -> None:
+        self.middleware = AlbumMiddleware(quiet_period=0.05)
+        self.handled: list[list[int]] = []
+
+    async def feed_update(self, bot: Any, update: Update) -> None:
+        del bot
+
+        async def handler(event: Any, data: dict[str, Any]) -> None:
+            self.handled.append([message.message_id for message in data.get("album", [event])])
+
+        await self.middleware(handler, update.message, {})
+
+
+def make_album_part(update_id: int, chat_id: int) -> Update:
+    update = make_update(update_id, chat_id)
+    return update.model_copy(update={"message": update.message.model_copy(update={"media_group_id": "g"})})
+
+
+def make_request(body: dict[str, Any], secret: str) -> Request:
+    payload = json.dumps(body).encode()
+
+    async def receive() -> dict[str, Any]:
+        return {"type": "http.request", "body": payload, "more_body": False}
+
+    headers = [(SECRET_HEADER.lower().encode(), secret.encode())]
+    return Request({"type": "http", "method": "POST", "path": "/hook", "headers": headers}, receive)
+
+
+class UpdateWorkerPoolTests(unittest.TestCase):
+    def test_updates_of_one_chat_keep_their_order(self) -> None:
+        async def scenario() -> list[tuple[int, int]]:
+            dispatcher = RecordingDispatcher()
+            pool = UpdateWorkerPool(dispatcher, None, workers=3, queue_size=300)
+            pool.start()
+            for update_id in range(60):
+                assert await pool.submit(make_update(update_id, chat_id=update_id % 5))
+            await pool.stop()
+            return dispatcher.seen
+
+        seen = asyncio.run(scenario())
+
+        assert len(seen) == 60
+        for chat_id in range(5):
+            ids = [update_id for chat, update_id in seen if chat == chat_id]
+            assert ids == sorted(ids)
+
+    def test_slow_chat_does_not_block_other_chats(self) -> None:
+        async def scenario() -> list[int]:
+            dispatcher = ChatGateDispatcher(blocked_chat=1)
+            pool = UpdateWorkerPool(dispatcher, None, workers=2, queue_size=10)
+            pool.start()
+            # 旧实现中会话 1 与 3 落在同一个队列
+            for update_id, chat_id in ((1, 1), (2, 1), (3, 3), (4, 3)):
+                await pool.submit(make_update(update_id, chat_id))
+            for _ in range(10):
+                await asyncio.sleep(0)
+            seen = list(dispatcher.seen)
+            dispatcher.gate.set()
+            await pool.stop()
+            assert dispatcher.seen == [3, 4, 1, 2]
+            return seen
+
+        assert asyncio.run(scenario()) == [3, 4]
+
+    def test_full_queue_rejects_after_timeout(self) -> None:
+        async def scenario() -> list[bool]:
+            dispatcher = RecordingDispatcher(asyncio.Event())
+            pool = UpdateWorkerPool(dispatcher, None, workers=1, queue_size=2, enqueue_timeout=0.01)
+            return [await pool.submit(make_update(update_id, chat_id=1)) for update_id in range(3)]
+
+        assert asyncio.run(scenario()) == [True, True, False]
+
+    def test_album_parts_are_collected_before_next_update(self) -> None:
+        async def scenario() -> list[list[int]]:
+            dispatcher = AlbumDispatcher()
+            pool = UpdateWorkerPool(dispatcher, None, workers=1, queue_size=10)
+            pool.start()
+            for update_id in (1, 2, 3):
+                await pool.submit(make_album_part(update_id, chat_id=1))
+            await pool.submit(make_update(4, chat_id=1))
+            await pool.stop()
+            return dispatcher.handled
+
+        assert asyncio.run(scenario()) == [[1, 2, 3], [4]]
+
+    def test_webhook_checks_secret_token(self) -> None:
+        async def scenario() -> list[int]:
+            pool = UpdateWorkerPool(RecordingDispatcher(), None, workers=1, queue_size=10)
+            app = create_webhook_app(pool, None, path="/hook", secret="s3cret")
+            endpoint = next(route.endpoint for route in app.routes if getattr(route, "path", "") == "/hook")
+            body = make_update(1, chat_id=1).model_dump(mode="json", exclude_none=True, by_alias=True)
+            statuses = [
+                (await endpoint(make_request(body, "wrong"))).status_code,
+                (await endpoint(make_request({"oops": 1}, "s3cret"))).status_code,
+                (await endpoint(make_request(body, "s3cret"))).status_code,
+            ]
+            assert pool.depth() == 1
+            return statuses
+
+        assert asyncio.run(scenario()) == [401, 400, 200]
+
+
+if __name__ == "__main__":
+    unittest.main()
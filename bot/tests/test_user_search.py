@@ -0,0 +1,85 @@
+"""用户前缀搜索与键集分页的单元测试。"""
+
+from __future__ import annotations
+import unittest
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+
+from bot.database.models import UserModel, UserSearchTermModel
+from bot.services.user_search import build_users_page_query, name_terms, next_users_cursor
+from bot.utils.pagination import InvalidCursorError, decode_cursor, encode_cursor
+
+NAMES = [
+    ("Alice", "Smith", "alice_s"),
+    ("Bob", None, None),
+    ("Alicia", "Keys", "keys"),
+    ("Carol", "Smith-Jones", "carol"),
+    ("Dave", None, "dave"),
+]
+
+
+class UserSearchTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.engine = create_engine("sqlite://")
+        UserModel.metadata.create_all(self.engine, tables=[UserModel.__table__, UserSearchTermModel.__table__])
+        self.addCleanup(self.engine.dispose)
+        base = datetime(2026, 10, 1)
+        with Session(self.engine) as session:
+            for index in range(12):
+                first, last, username = NAMES[index % len(NAMES)]
+                # 每两个用户共享同一创建时间，验证排序列重复时游标仍然稳定
+                created = base + timedelta(days=index // 2)
+                session.add(
+                    UserModel(id=index + 1, first_name=first, last_name=last, username=username, created_at=created)
+                )
+                terms = name_terms(first, last, username)
+                session.execute(insert(UserSearchTermModel), [{"term": t, "user_id": index + 1} for t in terms])
+            session.commit()
+
+    def _ids(self, **kwargs: object) -> list[int]:
+        with Session(self.engine) as session:
+            return [user.id for user in session.scalars(build_users_page_query(**kwargs))]
+
+    def _walk(self, sort: str, *, descending: bool, search: str | None = None) -> list[int]:
+        seen: list[int] = []
+        cursor = None
+        while True:
+            with Session(self.engine) as session:
+                query = build_users_page_query(search=search, sort=sort, descending=descending, cursor=cursor, limit=5)
+                users = list(session.scalars(query))
+            seen.extend(user.id for user in users[:5])
+            cursor = next_users_cursor(users, sort, 5)
+            if cursor is None:
+                return seen
+
+    def test_cursor_pages_cover_every_row_once_in_order(self) -> None:
+        expected = self._ids(search=None, sort="created_at", descending=True, cursor=None, limit=100)
+
+        assert self._walk("created_at", descending=True) == expected
+        assert sorted(self._walk("last_name", descending=False)) == list(range(1, 13))
+        assert self._walk("id", descending=False) == list(range(1, 13))
+
+    def test_prefix_search_matches_any_name_word(self) -> None:
+        alices = self._walk("id", descending=False, search="ali")
+        smiths = self._walk("id", descending=False, search="@SMITH")
+        full_name = self._walk("id", descending=False, search="carol smith")
+
+        assert alices == [1, 3, 6, 8, 11]
+        assert smiths == [1, 4, 6, 9, 11]
+        assert full_name == [4, 9]
+        assert self._walk("id", descending=False, search="100%") == []
+
+    def test_cursor_is_bound_to_sort(self) -> None:
+        cursor = encode_cursor("created_at", (datetime(2026, 10, 2), 3))
+
+        assert decode_cursor(cursor, "created_at") == (datetime(2026, 10, 2), 3)
+        with self.assertRaises(InvalidCursorError):
+            decode_cursor(cursor, "username")
+        with self.assertRaises(InvalidCursorError):
+            decode_cursor("not-a-cursor", "id")
+
+
+if __name__ == "__main__":
+    unittest.main()
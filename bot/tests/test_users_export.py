@@ -0,0 +1,74 @@
+"""用户流式导出的单元测试。"""
+
+from __future__ import annotations
+import asyncio
+import csv
+import gzip
+import io
+import unittest
+from typing import Any
+from unittest.mock import patch
+
+from bot.utils import users_export
+from bot.utils.users_export import ExportInputFile, UnsupportedExportFormatError, export_users
+
+COLUMNS = users_export._column_names()
+
+
+class FakeStreamResult:
+    def __init__(self, rows: list[tuple[Any, ...]], batch_size: int) -> None:
+        self.rows = rows
+        self.batch_size = batch_size
+
+    async def partitions(self) -> Any:
+        for start in range(0, len(self.rows), self.batch_size):
+            yield self.rows[start : start + self.batch_size]
+
+
+class FakeSession:
+    def __init__(self, total: int) -> None:
+        self.rows = [tuple(f"{column}-{index}" for column in COLUMNS) for index in range(total)]
+        self.statements: list[Any] = []
+
+    async def stream(self, statement: Any) -> FakeStreamResult:
+        self.statements.append(statement)
+        return FakeStreamResult(self.rows, statement.get_execution_options()["yield_per"])
+
+
+class UsersExportTests(unittest.TestCase):
+    def test_csv_is_written_in_batches(self) -> None:
+        session = FakeSession(25)
+
+        export = asyncio.run(export_users(session, batch_size=10))
+        content = b"".join(export.iter_chunks(chunk_size=64)).decode()
+
+        rows = list(csv.reader(io.StringIO(content)))
+        assert export.rows == 25
+        assert export.filename.endswith(".csv")
+        assert rows[0] == COLUMNS
+        assert rows[-1][0] == f"{COLUMNS[0]}-24"
+        assert len(rows) == 26
+        assert export.file.closed
+
+    def test_gzip_csv_spills_to_disk_and_uploads_in_chunks(self) -> None:
+        session = FakeSession(200)
+
+        async def scenario() -> bytes:
+            with patch.object(users_export, "SPOOL_MAX_BYTES", 1024):
+                export = await export_users(session, "csv", compress=True, batch_size=50)
+            assert export.file._rolled
+            chunks = [chunk async for chunk in ExportInputFile(export, chunk_size=512).read(None)]
+            assert len(chunks) > 1
+            return b"".join(chunks)
+
+        content = gzip.decompress(asyncio.run(scenario())).decode()
+
+        assert content.count("\n") == 201
+
+    def test_unknown_format_is_rejected(self) -> None:
+        with self.assertRaises(UnsupportedExportFormatError):
+            asyncio.run(export_users(FakeSession(1), "json"))
+
+
+if __name__ == "__main__":
+    unittest.main()
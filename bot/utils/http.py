@@ -1,11 +1,14 @@
 from __future__ import annotations
 import asyncio
 import json
+import time
 from typing import Any
 
 import aiohttp
 from loguru import logger
 
+from bot.utils.metrics import OUTBOUND_SECONDS, normalize_path, status_class
+
 
 class HttpClient:
     """HTTP 客户端
@@ -15,7 +18,13 @@ class HttpClient:
     - 支持默认请求头、JSON 自动解析、连接复用
     """
 
-    def __init__(self, base_url: str, headers: dict[str, str] | None = None, base_path: str | None = None) -> None:
+    def __init__(
+        self,
+        base_url: str,
+        headers: dict[str, str] | None = None,
+        base_path: str | None = None,
+        service: str = "http",
+    ) -> None:
         """初始化 HTTP 客户端
 
         功能说明:
@@ -25,11 +34,13 @@ class HttpClient:
         - base_url: 服务基础地址, 如 `https://your-emby.com`
         - headers: 请求头, 可为 None
         - base_path: 公共路径前缀(可选), 例如 `/emby`
+        - service: 指标中的服务名, 如 `emby`
 
         返回值:
         - None
         """
         self.base_url = base_url.rstrip("/")
+        self.service = service
         self.default_headers = headers or {}
         if base_path is None or not base_path.strip():
             self.base_path = ""
@@ -79,6 +90,8 @@ class HttpClient:
 
         ep = endpoint if endpoint.startswith("/") else "/" + endpoint
         url = f"{self.base_url}{self.base_path}{ep}"
+        status: int | None = None
+        start = time.perf_counter()
         try:
             session = await self._get_session()
             async with session.request(method=method.upper(), url=url, headers=headers, **kwargs) as resp:
@@ -121,6 +134,14 @@ class HttpClient:
                 "❌ HTTP网络异常: {method} {url} -> {err}", method=method.upper(), url=url, err=str(e)
             )
             raise
+        finally:
+            OUTBOUND_SECONDS.observe(
+                time.perf_counter() - start,
+                service=self.service,
+                method=method.upper(),
+                endpoint=normalize_path(ep),
+                status=status_class(status),
+            )
 
 
 class HttpRequestError(Exception):
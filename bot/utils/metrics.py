@@ -0,0 +1,447 @@
+"""进程内性能指标。
+
+提供计数器、仪表与直方图三种指标，按标签维护时间序列，并输出
+Prometheus 文本格式。机器人与 API 是两个进程，各自维护一个注册表，并由
+:func:`run_metrics_snapshots` 定期把快照写到 ``data/metrics/<进程>.json``；
+API 的 ``/metrics`` 与管理员面板读取本进程的实时数据和其他进程的快照文件，
+因此任一入口都能看到两个进程的指标。
+
+每个指标的时间序列数量受 :data:`MAX_SERIES_PER_METRIC` 限制，超出后新标签
+组合会归入 ``_other``，避免用户输入导致标签基数失控。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import math
+import os
+import re
+import time
+from bisect import bisect_left
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from loguru import logger
+
+from bot.core.config import DIR
+
+if TYPE_CHECKING:
+    from aiogram import Bot
+    from aiogram.client.session.middlewares.base import NextRequestMiddlewareType
+    from aiogram.methods import Response, TelegramMethod
+    from aiogram.methods.base import TelegramType
+
+METRICS_SNAPSHOT_ROOT = DIR / "data" / "metrics"
+METRICS_SNAPSHOT_INTERVAL = 15.0
+MAX_SERIES_PER_METRIC = 500
+OTHER_LABEL = "_other"
+
+# 秒，覆盖内存操作到慢速外部接口
+DEFAULT_BUCKETS: tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_ID_SEGMENT = re.compile(r"^(?=.*\d)[0-9A-Za-z_-]{6,}$|^\d+$")
+
+LabelKey = tuple[str, ...]
+
+
+def normalize_path(path: str) -> str:
+    """把 URL 路径中的 ID 段替换为 ``:id``，去掉查询串，控制标签基数。"""
+    path = path.split("?", 1)[0]
+    return "/".join(":id" if _ID_SEGMENT.match(segment) else segment for segment in path.split("/")) or "/"
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...]) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+
+    def _key(self, labels: dict[str, Any], series: dict[LabelKey, Any]) -> LabelKey:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        if key not in series and len(series) >= MAX_SERIES_PER_METRIC:
+            return (OTHER_LABEL,) * len(self.labelnames)
+        return key
+
+    def snapshot(self) -> dict[str, Any]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """单调递增计数器。"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels, self._values)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: Any) -> float:
+        return self._values.get(tuple(str(labels.get(name, "")) for name in self.labelnames), 0.0)
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "type": self.kind,
+            "help": self.documentation,
+            "series": [
+                {"labels": dict(zip(self.labelnames, key)), "value": value} for key, value in self._values.items()
+            ],
+        }
+
+
+class Gauge(_Metric):
+    """采集时通过回调读取当前值的仪表，回调返回 ``[(标签, 值), ...]``。"""
+
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...],
+        collect: Callable[[], list[tuple[dict[str, Any], float]]],
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._collect = collect
+
+    def snapshot(self) -> dict[str, Any]:
+        try:
+            samples = self._collect()
+        except Exception as error:  # noqa: BLE001
+            logger.warning(f"⚠️ 采集指标 {self.name} 失败: {error}")
+            samples = []
+        return {
+            "type": self.kind,
+            "help": self.documentation,
+            "series": [
+                {"labels": {name: str(labels.get(name, "")) for name in self.labelnames}, "value": value}
+                for labels, value in samples
+            ],
+        }
+
+
+class _HistogramSeries:
+    __slots__ = ("count", "counts", "total")
+
+    def __init__(self, size: int) -> None:
+        self.counts = [0] * size
+        self.count = 0
+        self.total = 0.0
+
+
+class Histogram(_Metric):
+    """固定分桶的耗时直方图，单位为秒。"""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: dict[LabelKey, _HistogramSeries] = {}
+
+    def observe(self, seconds: float, **labels: Any) -> None:
+        key = self._key(labels, self._series)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = _HistogramSeries(len(self.buckets) + 1)
+        # 最后一个槽位对应 +Inf
+        series.counts[bisect_left(self.buckets, seconds)] += 1
+        series.count += 1
+        series.total += seconds
+
+    @contextmanager
+    def time(self, **labels: Any) -> Iterator[dict[str, Any]]:
+        """计时上下文；可在块内修改返回的标签字典（如补充状态码）。"""
+        mutable = dict(labels)
+        start = time.perf_counter()
+        try:
+            yield mutable
+        finally:
+            self.observe(time.perf_counter() - start, **mutable)
+
+    def snapshot(self) -> dict[str, Any]:
+        series = []
+        for key, item in self._series.items():
+            cumulative, running = [], 0
+            for count in item.counts:
+                running += count
+                cumulative.append(running)
+            series.append(
+                {
+                    "labels": dict(zip(self.labelnames, key)),
+                    "buckets": cumulative,
+                    "count": item.count,
+                    "sum": item.total,
+                }
+            )
+        return {"type": self.kind, "help": self.documentation, "bounds": list(self.buckets), "series": series}
+
+
+class MetricsRegistry:
+    """一个进程内的全部指标。"""
+
+    def __init__(self, process: str = "bot") -> None:
+        self.process = process
+        self._metrics: dict[str, _Metric] = {}
+        self._sections: dict[str, Callable[[], Any]] = {}
+
+    def _register(self, metric: _Metric) -> Any:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...],
+        collect: Callable[[], list[tuple[dict[str, Any], float]]],
+    ) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames, collect))
+
+    def section(self, name: str, collect: Callable[[], Any]) -> None:
+        """附加一段非指标的诊断数据（如查询报告），随快照一起写出。"""
+        self._sections[name] = collect
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "process": self.process,
+            "generated_at": time.time(),
+            "metrics": {name: metric.snapshot() for name, metric in self._metrics.items()},
+            "sections": {name: collect() for name, collect in self._sections.items()},
+        }
+
+
+registry = MetricsRegistry()
+
+# ---- 机器人 ----
+UPDATE_SECONDS = registry.histogram(
+    "bot_update_duration_seconds", "处理一个 Telegram 更新的总耗时", ("event_type",)
+)
+HANDLER_SECONDS = registry.histogram(
+    "bot_handler_duration_seconds", "aiogram 处理器耗时（不含外层中间件）", ("observer", "handler")
+)
+HANDLER_ERRORS = registry.counter("bot_handler_errors_total", "aiogram 处理器抛出异常的次数", ("observer", "handler"))
+MIDDLEWARE_SECONDS = registry.histogram(
+    "bot_middleware_duration_seconds", "aiogram 中间件自身耗时（扣除下游处理）", ("observer", "middleware")
+)
+
+# ---- API ----
+API_REQUEST_SECONDS = registry.histogram(
+    "api_request_duration_seconds", "FastAPI 请求耗时，按路由模板统计", ("method", "route", "status")
+)
+
+# ---- 外部调用 ----
+OUTBOUND_SECONDS = registry.histogram(
+    "outbound_request_duration_seconds",
+    "调用外部服务（Emby、Telegram、元数据来源、翻译等）的耗时",
+    ("service", "method", "endpoint", "status"),
+)
+
+# ---- 缓存 ----
+CACHE_REQUESTS = registry.counter("cache_requests_total", "缓存查询次数，按命中与否统计", ("cache", "result"))
+
+
+def status_class(status: int | None) -> str:
+    """把 HTTP 状态码归为 ``2xx``/``4xx`` 等；无响应时为 ``error``。"""
+    if not status:
+        return "error"
+    return f"{status // 100}xx"
+
+
+def record_cache(cache: str, *, hit: bool) -> None:
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+class TelegramRequestMetricsMiddleware(BaseRequestMiddleware):
+    """Bot API 请求中间件，按方法名记录调用 Telegram 的耗时。"""
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        with OUTBOUND_SECONDS.time(
+            service="telegram",
+            method="POST",
+            endpoint=getattr(method, "__api_method__", type(method).__name__),
+            status="error",
+        ) as labels:
+            response = await make_request(bot, method)
+            labels["status"] = "2xx"
+            return response
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label(value)}"' for name, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def render_prometheus(snapshots: list[dict[str, Any]]) -> str:
+    """把多个进程的快照合并渲染为 Prometheus 文本格式，附加 ``process`` 标签。"""
+    merged: dict[str, tuple[dict[str, Any], list[tuple[str, dict[str, Any]]]]] = {}
+    for snapshot in snapshots:
+        for name, metric in snapshot.get("metrics", {}).items():
+            entry = merged.setdefault(name, (metric, []))
+            entry[1].extend((snapshot["process"], series) for series in metric["series"])
+
+    lines: list[str] = []
+    for name, (metric, samples) in sorted(merged.items()):
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        for process, series in samples:
+            labels = {"process": process, **series["labels"]}
+            if metric["type"] != "histogram":
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(series['value'])}")
+                continue
+            bounds = [*metric["bounds"], math.inf]
+            for bound, count in zip(bounds, series["buckets"]):
+                bucket_labels = {**labels, "le": _format_value(bound)}
+                lines.append(f"{name}_bucket{_format_labels(bucket_labels)} {count}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(series['sum'])}")
+            lines.append(f"{name}_count{_format_labels(labels)} {series['count']}")
+    return "\n".join(lines) + "\n"
+
+
+def histogram_quantile(quantile: float, bounds: list[float], cumulative: list[int]) -> float:
+    """按分桶线性插值估算分位数（秒），与 Prometheus 的 ``histogram_quantile`` 一致。"""
+    total = cumulative[-1] if cumulative else 0
+    if total == 0:
+        return 0.0
+    rank = quantile * total
+    previous_bound, previous_count = 0.0, 0
+    for bound, count in zip(bounds, cumulative):
+        if count >= rank:
+            if count == previous_count:
+                return bound
+            return previous_bound + (bound - previous_bound) * (rank - previous_count) / (count - previous_count)
+        previous_bound, previous_count = bound, count
+    # 落在 +Inf 桶时只能返回最大有限上界
+    return bounds[-1] if bounds else 0.0
+
+
+def summarize_latency(snapshot: dict[str, Any], metric_name: str, *, top: int = 5) -> list[dict[str, Any]]:
+    """按总耗时降序列出直方图中最重的时间序列，附平均值与 p95（毫秒）。"""
+    metric = snapshot.get("metrics", {}).get(metric_name)
+    if not metric:
+        return []
+    rows = []
+    for series in metric["series"]:
+        if not series["count"]:
+            continue
+        rows.append(
+            {
+                "labels": series["labels"],
+                "count": series["count"],
+                "total_ms": series["sum"] * 1000,
+                "avg_ms": series["sum"] / series["count"] * 1000,
+                "p95_ms": histogram_quantile(0.95, metric["bounds"], series["buckets"]) * 1000,
+            }
+        )
+    rows.sort(key=lambda row: row["total_ms"], reverse=True)
+    return rows[:top]
+
+
+def summarize_cache(snapshot: dict[str, Any]) -> dict[str, tuple[int, float]]:
+    """返回 ``{缓存名: (查询次数, 命中率)}``。"""
+    metric = snapshot.get("metrics", {}).get(CACHE_REQUESTS.name)
+    totals: dict[str, dict[str, float]] = {}
+    for series in (metric or {}).get("series", []):
+        labels = series["labels"]
+        totals.setdefault(labels["cache"], {})[labels["result"]] = series["value"]
+    return {
+        cache: (int(sum(counts.values())), counts.get("hit", 0.0) / max(sum(counts.values()), 1))
+        for cache, counts in sorted(totals.items())
+    }
+
+
+def write_snapshot(root: Path = METRICS_SNAPSHOT_ROOT, snapshot: dict[str, Any] | None = None) -> Path:
+    """把本进程快照原子写入 ``<root>/<进程>.json``。
+
+    在线程中调用时应先在事件循环里生成 ``snapshot``：指标和查询报告只在事件循环中
+    修改，在其他线程遍历可能遇到 "dictionary changed size during iteration"。
+    """
+    if snapshot is None:
+        snapshot = registry.snapshot()
+    root.mkdir(parents=True, exist_ok=True)
+    path = root / f"{snapshot['process']}.json"
+    tmp_path = path.with_suffix(".json.tmp")
+    tmp_path.write_text(json.dumps(snapshot, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp_path, path)
+    return path
+
+
+def collect_snapshots(
+    root: Path = METRICS_SNAPSHOT_ROOT, *, max_age: float = METRICS_SNAPSHOT_INTERVAL * 10
+) -> list[dict[str, Any]]:
+    """返回本进程的实时快照，以及其他进程未过期的快照文件。"""
+    snapshots = [registry.snapshot()]
+    if not root.exists():
+        return snapshots
+    for path in sorted(root.glob("*.json")):
+        if path.stem == registry.process:
+            continue
+        try:
+            snapshot = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError) as error:
+            logger.warning(f"⚠️ 读取指标快照 {path.name} 失败: {error}")
+            continue
+        if time.time() - float(snapshot.get("generated_at", 0)) <= max_age:
+            snapshots.append(snapshot)
+    return snapshots
+
+
+async def run_metrics_snapshots(process: str, interval: float = METRICS_SNAPSHOT_INTERVAL) -> None:
+    """设置本进程名并定期写出快照，供其他进程合并展示。"""
+    registry.process = process
+    while True:
+        try:
+            snapshot = registry.snapshot()
+            await asyncio.to_thread(write_snapshot, METRICS_SNAPSHOT_ROOT, snapshot)
+        except OSError as error:
+            logger.warning(f"⚠️ 写入指标快照失败: {error}")
+        except Exception:  # noqa: BLE001
+            # 快照任务退出后本进程的指标会从 /metrics 中消失，任何错误都只记录
+            logger.exception("❌ 生成指标快照失败")
+        await asyncio.sleep(interval)
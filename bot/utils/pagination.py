@@ -0,0 +1,73 @@
+"""键集（游标）分页工具。
+
+游标是上一页最后一行的排序键（排序列的值 + 主键）经 JSON 与 base64url
+编码后的不透明字符串。下一页通过 ``(排序列, 主键)`` 与该值比较取得，
+数据库沿索引直接定位，翻到多深都只读 ``limit`` 行，不会像 ``OFFSET``
+那样随页码线性变慢；主键兜底保证排序列存在重复值时结果依然稳定。
+"""
+
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import and_, or_
+from sqlalchemy.sql import ColumnElement
+
+_DATETIME_TAG = "$dt"
+
+
+class InvalidCursorError(ValueError):
+    """游标无法解析或与当前排序不匹配。"""
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {_DATETIME_TAG: value.isoformat()}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict) and _DATETIME_TAG in value:
+        return datetime.fromisoformat(value[_DATETIME_TAG])
+    return value
+
+
+def encode_cursor(sort: str, values: tuple[Any, ...]) -> str:
+    """把排序名与最后一行的排序键编码为游标。"""
+    raw = json.dumps([sort, [_encode_value(value) for value in values]], ensure_ascii=False)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str) -> tuple[Any, ...]:
+    """解析游标，排序与生成游标时不同则抛出 :class:`InvalidCursorError`。"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort, values = json.loads(raw)
+        decoded = tuple(_decode_value(value) for value in values)
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError) as err:
+        msg = "无效的分页游标"
+        raise InvalidCursorError(msg) from err
+    if cursor_sort != sort:
+        msg = "分页游标与当前排序不一致"
+        raise InvalidCursorError(msg)
+    return decoded
+
+
+def keyset_after(columns: tuple[ColumnElement[Any], ...], values: tuple[Any, ...], *, descending: bool) -> Any:
+    """生成“排在 ``values`` 之后”的条件：``(c1, c2) > (v1, v2)``（降序为 ``<``）。
+
+    展开为 ``c1 > v1 OR (c1 = v1 AND c2 > v2)``，兼容不支持行值比较的数据库。
+    """
+    if len(columns) != len(values):
+        msg = "分页游标与当前排序不一致"
+        raise InvalidCursorError(msg)
+    clauses = []
+    for index, (column, value) in enumerate(zip(columns, values, strict=True)):
+        equal = [prev == prev_value for prev, prev_value in zip(columns[:index], values[:index], strict=True)]
+        beyond = column < value if descending else column > value
+        clauses.append(and_(*equal, beyond))
+    return or_(*clauses)
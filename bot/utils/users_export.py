@@ -1,24 +1,172 @@
+"""用户数据流式导出。
+
+按主键顺序用服务端游标（``yield_per``）分批读取 ``users`` 表，逐批写入
+``SpooledTemporaryFile``：小文件留在内存，超过 :data:`SPOOL_MAX_BYTES` 后自动
+落盘，内存占用不随用户数增长。机器人的 ``/export_users`` 命令与 API 的
+``GET /api/users/export`` 共用 :func:`export_users`。
+
+支持 CSV（可选 gzip 压缩）与 XLSX；XLSX 依赖可选的 ``openpyxl``，以只写模式
+逐行写入。
+"""
+
 from __future__ import annotations
 import csv
+import gzip
 import io
+import tempfile
+from dataclasses import dataclass
 from datetime import datetime, timezone
+from typing import IO, TYPE_CHECKING, Any
 
-from aiogram.types import BufferedInputFile
+from aiogram.types import InputFile
+from sqlalchemy import select
 
 from bot.database.models import UserModel
 
+try:
+    from openpyxl import Workbook
+except ImportError:
+    Workbook = None
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncGenerator, AsyncIterator, Iterator, Sequence
+
+    from aiogram import Bot
+    from sqlalchemy import Row
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+EXPORT_FORMATS = ("csv", "xlsx")
+EXPORT_BATCH_SIZE = 1000
+SPOOL_MAX_BYTES = 8 * 1024 * 1024
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+_MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "csv.gz": "application/gzip",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+class UnsupportedExportFormatError(ValueError):
+    """导出格式不受支持或缺少对应的可选依赖。"""
+
+
+@dataclass(slots=True)
+class UserExport:
+    """一次导出的结果文件。"""
+
+    file: IO[bytes]
+    filename: str
+    media_type: str
+    rows: int
+
+    def iter_chunks(self, chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[bytes]:
+        """从头分块读取文件内容，读完后关闭文件。"""
+        try:
+            self.file.seek(0)
+            while chunk := self.file.read(chunk_size):
+                yield chunk
+        finally:
+            self.file.close()
+
+
+class ExportInputFile(InputFile):
+    """把导出文件分块上传给 Telegram，避免整体读入内存。"""
+
+    def __init__(self, export: UserExport, chunk_size: int = EXPORT_CHUNK_SIZE) -> None:
+        super().__init__(filename=export.filename, chunk_size=chunk_size)
+        self.export = export
+
+    async def read(self, bot: Bot) -> AsyncGenerator[bytes, None]:
+        del bot
+        for chunk in self.export.iter_chunks(self.chunk_size):
+            yield chunk
+
+
+def _column_names() -> list[str]:
+    return [column.name for column in UserModel.__table__.columns]
+
+
+async def iter_user_rows(
+    session: AsyncSession, batch_size: int = EXPORT_BATCH_SIZE
+) -> AsyncIterator[Sequence[Row[Any]]]:
+    """用服务端游标按主键顺序分批产出 ``users`` 表的行。"""
+    query = select(*UserModel.__table__.columns).order_by(UserModel.id).execution_options(yield_per=batch_size)
+    result = await session.stream(query)
+    async for partition in result.partitions():
+        yield partition
+
+
+async def _write_csv(session: AsyncSession, target: IO[bytes], batch_size: int) -> int:
+    text = io.TextIOWrapper(target, encoding="utf-8", newline="")
+    writer = csv.writer(text)
+    writer.writerow(_column_names())
+    rows = 0
+    async for partition in iter_user_rows(session, batch_size):
+        writer.writerows(partition)
+        rows += len(partition)
+    text.flush()
+    text.detach()
+    return rows
+
+
+async def _write_xlsx(session: AsyncSession, target: IO[bytes], batch_size: int) -> int:
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("users")
+    sheet.append(_column_names())
+    rows = 0
+    async for partition in iter_user_rows(session, batch_size):
+        for row in partition:
+            sheet.append(list(row))
+        rows += len(partition)
+    workbook.save(target)
+    return rows
+
+
+async def export_users(
+    session: AsyncSession,
+    export_format: str = "csv",
+    *,
+    compress: bool = False,
+    batch_size: int = EXPORT_BATCH_SIZE,
+) -> UserExport:
+    """导出全部用户到临时文件
+
+    功能说明:
+    - 分批读取并逐批写入，内存占用与用户总数无关
+    - `compress` 仅对 CSV 生效（XLSX 本身已压缩）
+
+    输入参数:
+    - session: 异步数据库会话
+    - export_format: 导出格式，csv 或 xlsx
+    - compress: 是否 gzip 压缩 CSV
+    - batch_size: 每批读取的行数
 
-async def convert_users_to_csv(users: list[UserModel]) -> BufferedInputFile:
-    """Export all users in csv file."""
-    columns = UserModel.__table__.columns
-    data = [[getattr(user, column.name) for column in columns] for user in users]
+    返回值:
+    - UserExport: 已写完、可从头读取的导出文件
+    """
+    if export_format not in EXPORT_FORMATS:
+        msg = f"不支持的导出格式: {export_format}，可选 {', '.join(EXPORT_FORMATS)}"
+        raise UnsupportedExportFormatError(msg)
+    if export_format == "xlsx" and Workbook is None:
+        msg = "导出 XLSX 需要安装 openpyxl"
+        raise UnsupportedExportFormatError(msg)
 
-    s = io.StringIO()
-    csv.writer(s).writerow(columns)
-    csv.writer(s).writerows(data)
-    s.seek(0)
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)  # noqa: SIM115
+    try:
+        if export_format == "xlsx":
+            kind = "xlsx"
+            rows = await _write_xlsx(session, spool, batch_size)
+        elif compress:
+            kind = "csv.gz"
+            with gzip.GzipFile(filename="users.csv", mode="wb", fileobj=spool) as compressed:
+                rows = await _write_csv(session, compressed, batch_size)
+        else:
+            kind = "csv"
+            rows = await _write_csv(session, spool, batch_size)
+    except BaseException:
+        spool.close()
+        raise
 
-    return BufferedInputFile(
-        file=s.getvalue().encode("utf-8"),
-        filename=f"users_{datetime.now(timezone.utc).strftime('%Y.%m.%d_%H.%M')}.csv",
-    )
+    filename = f"users_{datetime.now(timezone.utc).strftime('%Y.%m.%d_%H.%M')}.{kind}"
+    return UserExport(file=spool, filename=filename, media_type=_MEDIA_TYPES[kind], rows=rows)
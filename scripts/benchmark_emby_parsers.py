@@ -0,0 +1,84 @@
+"""用录制的 HTML 夹具对 Emby 元数据解析器做基准测试。"""
+
+from __future__ import annotations
+import argparse
+import json
+from pathlib import Path
+
+from bot.services.emby_metadata.benchmark import (
+    DEFAULT_BACKENDS,
+    FIXTURES_ROOT,
+    available_backends,
+    compare_to_baseline,
+    discover_cases,
+    run_benchmark,
+    summarize,
+)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """构建命令行参数解析器。"""
+    parser = argparse.ArgumentParser(description="在每个夹具页面上为每个元数据解析器计时。")
+    parser.add_argument("--source", action="append", help="只测试该来源（可重复）")
+    parser.add_argument(
+        "--backend",
+        action="append",
+        help=f"要对比的 BeautifulSoup 后端（可重复，默认：{', '.join(DEFAULT_BACKENDS)} 中已安装的）",
+    )
+    parser.add_argument("--repeats", type=int, default=5, help="每个夹具的计时轮数（默认：5）")
+    parser.add_argument("--fixtures-root", type=Path, default=FIXTURES_ROOT, help="夹具根目录")
+    parser.add_argument("--output", type=Path, help="把逐个夹具的结果写为 JSON")
+    parser.add_argument("--baseline", type=Path, help="与之前 --output 生成的文件对比")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.25,
+        help="夹具比基线慢超过该比例时失败（默认：0.25）",
+    )
+    return parser
+
+
+def main() -> int:
+    """运行基准测试，打印各解析器汇总并检查性能回退。"""
+    parser = build_parser()
+    args = parser.parse_args()
+
+    cases = discover_cases(args.fixtures_root)
+    if args.source:
+        cases = [case for case in cases if case.source in set(args.source)]
+    if not cases:
+        parser.error("未找到夹具")
+    backends = available_backends(tuple(args.backend or DEFAULT_BACKENDS))
+    if not backends:
+        parser.error("请求的后端均未安装")
+
+    rows = run_benchmark(cases, backends, repeats=args.repeats)
+    for row in rows:
+        if "error" in row:
+            print(f"{row['case']:<60} {row['backend']:<12} ERROR {row['error']}")  # noqa: T201
+    print(f"{'source':<16} {'backend':<12} {'cases':>5} {'total ms':>10} {'peak KiB':>10}")  # noqa: T201
+    for source, by_backend in summarize(rows).items():
+        for backend, totals in by_backend.items():
+            print(  # noqa: T201
+                f"{source:<16} {backend:<12} {int(totals['cases']):>5} "
+                f"{totals['median_ms']:>10.2f} {totals['peak_kib']:>10.0f}"
+            )
+    mismatches = [row for row in rows if row.get("identical") is False]
+    for row in mismatches:
+        print(f"输出与 html.parser 不一致: {row['case']} [{row['backend']}]")  # noqa: T201
+
+    if args.output:
+        args.output.write_text(json.dumps(rows, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        regressions = compare_to_baseline(rows, baseline, threshold=args.threshold)
+        for regression in regressions:
+            print(f"性能回退 {regression}")  # noqa: T201
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
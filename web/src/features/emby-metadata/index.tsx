@@ -7,7 +7,7 @@ import { Input } from '@/components/ui/input'
 import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from '@/components/ui/select'
 import { Tabs, TabsContent, TabsList, TabsTrigger } from '@/components/ui/tabs'
 import { Dialog, DialogContent, DialogHeader, DialogTitle } from '@/components/ui/dialog'
-import { apiClient, type MetadataCandidate, type MetadataPerson, type MetadataQueueItem, type MetadataSearchResult } from '@/lib/api'
+import { apiClient, type MetadataCandidate, type MetadataPerson, type MetadataQueueItem, type MetadataSearchResult, type MetadataWritebackJob } from '@/lib/api'
 
 const fields = [
   ['Name', '名称'], ['OriginalTitle', '原标题'], ['Taglines', '宣传语'], ['Overview', '简介'],
@@ -175,7 +175,7 @@ function CoverPreview({ candidate, onChange }: { candidate: MetadataCandidate; o
   return <><div className='mb-4 flex items-center gap-4 rounded-lg border bg-slate-50 p-3'>
     <div className='min-w-0 flex-1'><b className='mb-2 block text-sm'>当前 Emby 封面</b><div className='flex h-28 items-center justify-center overflow-hidden rounded bg-slate-200'>{currentImageUrl ? <img src={currentImageUrl} alt='当前 Emby 封面' className='size-full object-contain' /> : <Database className='size-7 text-slate-400' />}</div></div>
     <div className='min-w-0 flex-1'><div className='mb-2 flex items-center justify-between gap-2'><b className='text-sm'>抓取封面</b><Button type='button' size='sm' variant='outline' disabled={!posterUrls.length} onClick={() => setPickerOpen(true)}><Maximize2 className='size-3.5' />更改封面（{posterUrls.length} 张）</Button></div><label className='flex h-28 cursor-pointer items-center justify-center overflow-hidden rounded bg-slate-200 hover:ring-2 hover:ring-blue-300'>{scrapedImageUrl ? <img src={scrapedImageUrl} alt='抓取封面' className='size-full object-contain' /> : <Database className='size-7 text-slate-400' />}<input type='file' accept='image/*' className='sr-only' onChange={(event) => { const file = event.target.files?.[0]; if (file) selectPoster(file); event.target.value = '' }} /></label></div>
-  </div><Dialog open={pickerOpen} onOpenChange={setPickerOpen}><DialogContent className='max-h-[100dvh] max-w-none overflow-y-auto rounded-none p-4 [scrollbar-width:none] sm:max-w-none sm:p-6 [&::-webkit-scrollbar]:hidden'><DialogHeader><DialogTitle>选择抓取封面（{posterUrls.length} 张）</DialogTitle></DialogHeader><div className='grid grid-cols-1 content-start gap-4 sm:grid-cols-2 md:grid-cols-3 lg:grid-cols-4 xl:grid-cols-5 2xl:grid-cols-6'>{posterUrls.map((posterUrl, index) => <button key={posterUrl} type='button' className={`group relative aspect-video overflow-hidden rounded-lg border-2 bg-slate-100 text-left ${posterUrl === candidate.poster_url && !candidate.poster_data ? 'border-blue-500 ring-2 ring-blue-200' : 'border-transparent hover:border-blue-300'}`} onClick={() => choosePoster(posterUrl)}><img src={apiClient.metadataImageUrl(posterUrl, candidate.raw_url)} alt={`可选封面 ${index + 1}`} className='size-full object-contain' /><span className='absolute bottom-1 left-1 rounded bg-black/65 px-1.5 py-0.5 text-[10px] text-white'>第 {index + 1} 张</span></button>)}</div></DialogContent></Dialog></>
+  </div><Dialog open={pickerOpen} onOpenChange={setPickerOpen}><DialogContent className='max-h-[100dvh] max-w-none overflow-y-auto rounded-none p-4 [scrollbar-width:none] sm:max-w-none sm:p-6 [&::-webkit-scrollbar]:hidden'><DialogHeader><DialogTitle>选择抓取封面（{posterUrls.length} 张）</DialogTitle></DialogHeader><div className='grid grid-cols-1 content-start gap-4 sm:grid-cols-2 md:grid-cols-3 lg:grid-cols-4 xl:grid-cols-5 2xl:grid-cols-6'>{posterUrls.map((posterUrl, index) => <button key={posterUrl} type='button' className={`group relative aspect-video overflow-hidden rounded-lg border-2 bg-slate-100 text-left ${posterUrl === candidate.poster_url && !candidate.poster_data ? 'border-blue-500 ring-2 ring-blue-200' : 'border-transparent hover:border-blue-300'}`} onClick={() => choosePoster(posterUrl)}><img src={apiClient.metadataImageUrl(posterUrl, candidate.raw_url, 480)} alt={`可选封面 ${index + 1}`} className='size-full object-contain' /><span className='absolute bottom-1 left-1 rounded bg-black/65 px-1.5 py-0.5 text-[10px] text-white'>第 {index + 1} 张</span></button>)}</div></DialogContent></Dialog></>
 }
 
 export function EmbyMetadataWorkspace() {
@@ -199,7 +199,9 @@ export function EmbyMetadataWorkspace() {
   const [statusOverrides, setStatusOverrides] = useState<Record<string, string>>({})
   const [, setSearching] = useState(false)
 
-  const queueQuery = useQuery({ queryKey: ['emby-metadata-queue'], queryFn: () => apiClient.getMetadataQueue() })
+  const [queuePage, setQueuePage] = useState(1)
+  const queueQuery = useQuery({ queryKey: ['emby-metadata-queue', queuePage], queryFn: () => apiClient.getMetadataQueue(queuePage) })
+  const queuePages = Math.max(1, Math.ceil((queueQuery.data?.total ?? 0) / (queueQuery.data?.page_size ?? 50)))
   const refreshQueue = async () => {
     try {
       await queueQuery.refetch()
@@ -377,23 +379,14 @@ export function EmbyMetadataWorkspace() {
       if (result.source === 'ko-shop') {
         setPrimarySelectionsByItem((current) => ({ ...current, [owner.notification_id]: { source: result.source, source_id: result.source_id } }))
       }
-      if (autoTranslate && response.candidate.original_title?.trim()) {
+      const title = autoTranslate && response.candidate.original_title?.trim() ? titleForTagline(response.candidate.original_title) : ''
+      const overview = autoTranslate ? response.candidate.overview?.trim() ?? '' : ''
+      if (title || overview) {
         try {
-          const title = titleForTagline(response.candidate.original_title)
-          if (title) {
-            const translatedTitle = await apiClient.translateMetadata(title)
-            nextCandidate = {
-              ...nextCandidate,
-              taglines: translatedTitle,
-            }
-          }
-        } catch (error) { toast.error(error instanceof Error ? error.message : '自动翻译标题失败') }
-      }
-      if (autoTranslate && response.candidate.overview?.trim()) {
-        try {
-          const translation = await apiClient.translateMetadata(response.candidate.overview)
-          nextCandidate = { ...nextCandidate, overview: `${translation}\n\n---\n\n${response.candidate.overview}` }
-        } catch (error) { toast.error(error instanceof Error ? error.message : '自动翻译简介失败') }
+          const [translatedTitle, translation] = await apiClient.translateMetadataBatch([title, overview])
+          if (translatedTitle) nextCandidate = { ...nextCandidate, taglines: translatedTitle }
+          if (translation) nextCandidate = { ...nextCandidate, overview: `${translation}\n\n---\n\n${response.candidate.overview}` }
+        } catch (error) { toast.error(error instanceof Error ? error.message : '自动翻译失败') }
       }
       setCandidate(nextCandidate)
       setStatusOverrides((current) => ({ ...current, [owner.notification_id]: 'fetched' }))
@@ -437,20 +430,24 @@ export function EmbyMetadataWorkspace() {
     const unconfirmed = targets.filter((target) => !target.candidate).map((target) => target.notificationId)
     const ready = targets.filter((target): target is { notificationId: string; candidate: MetadataCandidate } => Boolean(target.candidate))
     if (!ready.length) return toast.error('所选项目都还没有确认候选结果')
-    const failed: string[] = []
     const toastId = toast.loading(`正在写入 ${ready.length} 个项目...`)
-    for (const target of ready) {
-      try {
-        await apiClient.writebackMetadata(target.notificationId, {
-          candidate: target.candidate,
-          fields: fields.map(([key]) => key),
-          confirmed: true,
-        })
-        setStatusOverrides((current) => ({ ...current, [target.notificationId]: 'written' }))
-      } catch {
-        failed.push(target.notificationId)
+    let job: MetadataWritebackJob
+    try {
+      job = await apiClient.createMetadataWritebackJob({
+        entries: ready.map((target) => ({ notification_id: target.notificationId, candidate: target.candidate, fields: fields.map(([key]) => key) })),
+        confirmed: true,
+      })
+      while (job.status === 'running') {
+        toast.loading(`正在写入 ${job.counts.done + job.counts.failed} / ${job.total} 个项目...`, { id: toastId })
+        await new Promise((resolve) => setTimeout(resolve, 1000))
+        job = await apiClient.getMetadataWritebackJob(job.job_id)
       }
+    } catch (error) {
+      return toast.error(error instanceof Error ? error.message : '批量写入失败', { id: toastId })
     }
+    const written = job.entries.filter((entry) => entry.status === 'done').map((entry) => entry.notification_id)
+    setStatusOverrides((current) => ({ ...current, ...Object.fromEntries(written.map((id) => [id, 'written'])) }))
+    const failed = job.entries.filter((entry) => entry.status !== 'done')
     void queueQuery.refetch()
     const summary = `写入成功 ${ready.length - failed.length} 项${failed.length ? `，失败 ${failed.length} 项` : ''}${unconfirmed.length ? `，未确认 ${unconfirmed.length} 项` : ''}`
     if (failed.length || unconfirmed.length) toast.warning(summary, { id: toastId })
@@ -459,7 +456,7 @@ export function EmbyMetadataWorkspace() {
 
   return <main className='flex min-h-screen flex-col bg-slate-50 text-slate-800'>
     <header className='flex items-start justify-between border-b bg-white px-6 py-4'><div><h1 className='flex items-center gap-2 text-2xl font-bold'>Emby 元数据工作台 <Sparkles className='size-6 text-amber-500' /></h1><p className='mt-1 text-sm text-slate-500'>批量搜索、候选对比与写入 Emby</p></div><div className='flex items-center gap-3'><div className='rounded-md border border-emerald-200 bg-emerald-50 px-3 py-2 text-sm text-emerald-700'><Check className='mr-1 inline size-4' />Emby 连接正常</div><Button variant='outline' disabled={queueQuery.isFetching} onClick={() => void refreshQueue()}><RefreshCw className={`size-4 ${queueQuery.isFetching ? 'animate-spin' : ''}`} />{queueQuery.isFetching ? '刷新中' : '刷新队列'}</Button></div></header>
-    <section className='mx-5 mt-2 flex items-center gap-3 rounded-lg border bg-white p-2'><Select value={statusFilter} onValueChange={setStatusFilter}><SelectTrigger className='w-32'><SelectValue placeholder='全部状态' /></SelectTrigger><SelectContent><SelectItem value='all'>全部状态</SelectItem><SelectItem value='pending'>待搜索</SelectItem><SelectItem value='fetched'>已抓取</SelectItem></SelectContent></Select><Select value={categoryFilter} onValueChange={setCategoryFilter}><SelectTrigger className='w-32'><SelectValue placeholder='全部分类' /></SelectTrigger><SelectContent><SelectItem value='all'>全部分类</SelectItem><SelectItem value='japanese_korean'>日韩</SelectItem><SelectItem value='domestic'>国产</SelectItem><SelectItem value='western'>欧美</SelectItem></SelectContent></Select><Input value={query} onChange={(event) => setQuery(event.target.value)} placeholder='搜索词 / 番号 / 名称' className='max-w-sm' /><Button variant='outline' onClick={() => setQuery('')}><X className='size-4' />清空</Button></section>
+    <section className='mx-5 mt-2 flex items-center gap-3 rounded-lg border bg-white p-2'><Select value={statusFilter} onValueChange={setStatusFilter}><SelectTrigger className='w-32'><SelectValue placeholder='全部状态' /></SelectTrigger><SelectContent><SelectItem value='all'>全部状态</SelectItem><SelectItem value='pending'>待搜索</SelectItem><SelectItem value='fetched'>已抓取</SelectItem></SelectContent></Select><Select value={categoryFilter} onValueChange={setCategoryFilter}><SelectTrigger className='w-32'><SelectValue placeholder='全部分类' /></SelectTrigger><SelectContent><SelectItem value='all'>全部分类</SelectItem><SelectItem value='japanese_korean'>日韩</SelectItem><SelectItem value='domestic'>国产</SelectItem><SelectItem value='western'>欧美</SelectItem></SelectContent></Select><Input value={query} onChange={(event) => setQuery(event.target.value)} placeholder='搜索词 / 番号 / 名称' className='max-w-sm' /><Button variant='outline' onClick={() => setQuery('')}><X className='size-4' />清空</Button><div className='ml-auto flex items-center gap-2 text-sm text-slate-500'><span>第 {queuePage} / {queuePages} 页，共 {queueQuery.data?.total ?? 0} 条</span><Button variant='outline' size='sm' disabled={queuePage <= 1} onClick={() => setQueuePage((page) => page - 1)}>上一页</Button><Button variant='outline' size='sm' disabled={queuePage >= queuePages} onClick={() => setQueuePage((page) => page + 1)}>下一页</Button></div></section>
     <section className='grid h-[calc(100vh-158px)] min-h-0 grid-cols-[minmax(220px,.78fr)_minmax(0,1fr)_minmax(0,1.35fr)] gap-2 overflow-hidden px-5 py-2'>
       <CompactQueuePanel items={items} visibleItems={visibleItems} active={active} selectedIds={selectedIds} statusOverrides={statusOverrides} routeFor={routeFor} searchKeywords={searchKeywords} setSearchKeywords={setSearchKeywords} setRouting={setRouting} setActiveId={activateItem} toggle={toggle} searchSelected={searchSelected} setSelectedIds={setSelectedIds} />
       <CompactGroupedResultPanel groups={resultGroups} activeId={active?.notification_id} selectedResult={selectedResult} setActiveId={activateItem} selectCandidate={selectCandidate} clearResults={() => active && setResultsByItem((current) => ({ ...current, [active.notification_id]: [] }))} />
@@ -481,7 +478,7 @@ function CompactGroupedResultPanel({ groups, activeId, selectedResult, setActive
 }
 
 export function GroupedResultPanel({ groups, activeId, selectedResult, setActiveId, selectCandidate, clearResults }: { groups: ResultGroup[]; activeId?: string; selectedResult: string | null; setActiveId: (id: string) => void; selectCandidate: (result: MetadataSearchResult, resultOwnerId?: string) => void; clearResults: () => void }) {
-  return <div className='flex min-h-0 min-w-0 flex-col overflow-hidden rounded-lg border bg-white'><div className='flex justify-between border-b px-4 py-3'><b>搜索结果</b><Button size='icon' variant='ghost' onClick={clearResults}><X className='size-4' /></Button></div><div className='min-h-0 flex-1 space-y-2 overflow-y-auto p-3'>{groups.length ? groups.map((group) => <details key={group.item.notification_id} open={group.item.notification_id === activeId} className={`rounded-lg border ${group.item.notification_id === activeId ? 'border-blue-400 bg-blue-50/40' : 'bg-white'}`} onToggle={(event) => { if ((event.currentTarget as HTMLDetailsElement).open) setActiveId(group.item.notification_id) }}><summary className='cursor-pointer list-none px-3 py-2 text-sm font-semibold'>{group.item.item_name}<span className='ml-2 text-xs font-normal text-slate-500'>（{group.results.length} 条结果）</span></summary><div className='space-y-2 border-t p-2'>{group.results.length ? group.results.map((result) => <div key={`${group.item.notification_id}-${result.source}-${result.source_id}`} className='flex items-center gap-2 rounded border bg-white p-2'><div className='flex h-16 w-24 shrink-0 items-center justify-center overflow-hidden rounded bg-slate-100'>{result.image_urls[0] ? <img src={apiClient.metadataImageUrl(result.image_urls[0], result.detail_url)} alt='' className='size-full object-contain' /> : <Database className='size-5 text-slate-400' />}</div><div className='min-w-0 flex-1'><b className='line-clamp-2 text-xs'>{result.title}</b><ResultDateStatus result={result} className='mt-1 line-clamp-2 text-[11px] text-slate-500' /></div><Button size='sm' className='shrink-0' variant={selectedResult === result.source_id && group.item.notification_id === activeId ? 'default' : 'outline'} onClick={() => { setActiveId(group.item.notification_id); selectCandidate(result, group.item.notification_id) }}>{selectedResult === result.source_id && group.item.notification_id === activeId ? '已选择' : '选择并抓取'} <ExternalLink className='ml-1 size-3' /></Button></div>) : <p className='p-2 text-sm text-slate-500'>该项目没有匹配结果。</p>}</div></details>) : <Empty title='尚未加载搜索结果' text='勾选左侧项目后，点击“批量搜索”。' />}</div></div>
+  return <div className='flex min-h-0 min-w-0 flex-col overflow-hidden rounded-lg border bg-white'><div className='flex justify-between border-b px-4 py-3'><b>搜索结果</b><Button size='icon' variant='ghost' onClick={clearResults}><X className='size-4' /></Button></div><div className='min-h-0 flex-1 space-y-2 overflow-y-auto p-3'>{groups.length ? groups.map((group) => <details key={group.item.notification_id} open={group.item.notification_id === activeId} className={`rounded-lg border ${group.item.notification_id === activeId ? 'border-blue-400 bg-blue-50/40' : 'bg-white'}`} onToggle={(event) => { if ((event.currentTarget as HTMLDetailsElement).open) setActiveId(group.item.notification_id) }}><summary className='cursor-pointer list-none px-3 py-2 text-sm font-semibold'>{group.item.item_name}<span className='ml-2 text-xs font-normal text-slate-500'>（{group.results.length} 条结果）</span></summary><div className='space-y-2 border-t p-2'>{group.results.length ? group.results.map((result) => <div key={`${group.item.notification_id}-${result.source}-${result.source_id}`} className='flex items-center gap-2 rounded border bg-white p-2'><div className='flex h-16 w-24 shrink-0 items-center justify-center overflow-hidden rounded bg-slate-100'>{result.image_urls[0] ? <img src={apiClient.metadataImageUrl(result.image_urls[0], result.detail_url, 240)} alt='' className='size-full object-contain' /> : <Database className='size-5 text-slate-400' />}</div><div className='min-w-0 flex-1'><b className='line-clamp-2 text-xs'>{result.title}</b><ResultDateStatus result={result} className='mt-1 line-clamp-2 text-[11px] text-slate-500' /></div><Button size='sm' className='shrink-0' variant={selectedResult === result.source_id && group.item.notification_id === activeId ? 'default' : 'outline'} onClick={() => { setActiveId(group.item.notification_id); selectCandidate(result, group.item.notification_id) }}>{selectedResult === result.source_id && group.item.notification_id === activeId ? '已选择' : '选择并抓取'} <ExternalLink className='ml-1 size-3' /></Button></div>) : <p className='p-2 text-sm text-slate-500'>该项目没有匹配结果。</p>}</div></details>) : <Empty title='尚未加载搜索结果' text='勾选左侧项目后，点击“批量搜索”。' />}</div></div>
 }
 
 function MetadataEditorPanel({ candidate, beforeItem, autoTranslate, setAutoTranslate, setCandidate, writeback, batchWriteback, batchCount }: { candidate: MetadataCandidate | null; beforeItem: Record<string, unknown>; autoTranslate: boolean; setAutoTranslate: (value: boolean) => void; fieldSelection?: string[]; setFieldSelection?: (value: (current: string[]) => string[]) => void; setCandidate: (value: (current: MetadataCandidate | null) => MetadataCandidate | null) => void; writeback: () => void; batchWriteback: () => void; batchCount: number }) {
@@ -493,7 +490,7 @@ export function MetadataEditorPanelLegacy({ candidate, beforeItem, autoTranslate
 }
 
 function ResultPanel({ results, active, selectedResult, selectCandidate, clearResults }: { results: MetadataSearchResult[]; active?: MetadataQueueItem; selectedResult: string | null; selectCandidate: (result: MetadataSearchResult) => void; clearResults: () => void }) {
-  return <div className='flex min-h-0 min-w-0 flex-col overflow-hidden rounded-lg border bg-white'><div className='flex justify-between border-b px-4 py-3'><b>搜索结果</b><Button size='icon' variant='ghost' onClick={clearResults}><X className='size-4' /></Button></div><div className='min-h-0 flex-1 space-y-2 overflow-y-auto p-3'>{results.length ? results.map((result) => <div key={`${result.source}-${result.source_id}`} className='flex items-center gap-3 rounded-lg border p-3'><div className='flex h-24 w-40 shrink-0 items-center justify-center overflow-hidden rounded bg-slate-100'>{result.image_urls[0] ? <img src={apiClient.metadataImageUrl(result.image_urls[0], result.detail_url)} alt='' className='size-full object-contain' /> : <Database className='size-6 text-slate-400' />}</div><div className='min-w-0 flex-1'><b className='line-clamp-2 text-sm'>{result.title}</b><ResultDateStatus result={result} className='mt-1 text-xs text-slate-500' /></div><Button size='sm' className='shrink-0' variant={selectedResult === result.source_id ? 'default' : 'outline'} onClick={() => selectCandidate(result)}>{selectedResult === result.source_id ? '已选择' : '选择并抓取'} <ExternalLink className='ml-1 size-3' /></Button></div>) : <Empty title='尚未加载搜索结果' text={`勾选左侧项目后，点击“批量搜索”。${active ? '' : ''}`} />}</div></div>
+  return <div className='flex min-h-0 min-w-0 flex-col overflow-hidden rounded-lg border bg-white'><div className='flex justify-between border-b px-4 py-3'><b>搜索结果</b><Button size='icon' variant='ghost' onClick={clearResults}><X className='size-4' /></Button></div><div className='min-h-0 flex-1 space-y-2 overflow-y-auto p-3'>{results.length ? results.map((result) => <div key={`${result.source}-${result.source_id}`} className='flex items-center gap-3 rounded-lg border p-3'><div className='flex h-24 w-40 shrink-0 items-center justify-center overflow-hidden rounded bg-slate-100'>{result.image_urls[0] ? <img src={apiClient.metadataImageUrl(result.image_urls[0], result.detail_url, 320)} alt='' className='size-full object-contain' /> : <Database className='size-6 text-slate-400' />}</div><div className='min-w-0 flex-1'><b className='line-clamp-2 text-sm'>{result.title}</b><ResultDateStatus result={result} className='mt-1 text-xs text-slate-500' /></div><Button size='sm' className='shrink-0' variant={selectedResult === result.source_id ? 'default' : 'outline'} onClick={() => selectCandidate(result)}>{selectedResult === result.source_id ? '已选择' : '选择并抓取'} <ExternalLink className='ml-1 size-3' /></Button></div>) : <Empty title='尚未加载搜索结果' text={`勾选左侧项目后，点击“批量搜索”。${active ? '' : ''}`} />}</div></div>
 }
 
 function ExternalIdsView({ value }: { value: unknown }) {
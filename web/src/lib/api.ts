@@ -110,7 +110,15 @@ export interface MetadataQueueItem {
   category_options: MetadataOption[]; source_options: MetadataOption[]
   source_options_by_category: Record<string, MetadataOption[]>
 }
-export interface MetadataQueueResponse { items: MetadataQueueItem[]; total: number }
+export interface MetadataWritebackJob {
+  job_id: string
+  status: 'running' | 'interrupted' | 'completed' | 'failed'
+  total: number
+  counts: Record<'pending' | 'running' | 'done' | 'failed', number>
+  entries: Array<{ notification_id: string; status: 'pending' | 'running' | 'done' | 'failed'; error: string | null; changed_fields: string[] }>
+}
+
+export interface MetadataQueueResponse { items: MetadataQueueItem[]; total: number; page: number; page_size: number }
 
 /**
  * API 客户端类
@@ -255,8 +263,8 @@ class ApiClient {
     });
   }
 
-  async getMetadataQueue(): Promise<MetadataQueueResponse> {
-    return this.request<MetadataQueueResponse>({ method: 'GET', url: '/emby/metadata/queue' })
+  async getMetadataQueue(page = 1, pageSize = 50): Promise<MetadataQueueResponse> {
+    return this.request<MetadataQueueResponse>({ method: 'GET', url: '/emby/metadata/queue', params: { page, page_size: pageSize } })
   }
 
   async searchMetadataQueue(selections: Array<{ notification_id: string; keyword: string; category: string; source: string }>): Promise<Array<{ notification_id: string; results: MetadataSearchResult[] }>> {
@@ -279,14 +287,29 @@ class ApiClient {
     return response.translation.trim()
   }
 
-  metadataImageUrl(url: string, referer: string): string {
-    return `${this.client.defaults.baseURL}/emby/metadata/images?${new URLSearchParams({ url, referer })}`
+  async translateMetadataBatch(texts: string[]): Promise<string[]> {
+    const response = await this.request<{ translations: string[] }>({ method: 'POST', url: '/emby/metadata/translate/batch', data: { texts } })
+    return response.translations.map((translation) => translation.trim())
+  }
+
+  metadataImageUrl(url: string, referer: string, width?: number): string {
+    const params = new URLSearchParams({ url, referer })
+    if (width) params.set('width', String(width))
+    return `${this.client.defaults.baseURL}/emby/metadata/images?${params}`
   }
 
   async writebackMetadata(notificationId: string, data: { candidate: MetadataCandidate; fields: string[]; confirmed: boolean }): Promise<void> {
     return this.request<void>({ method: 'POST', url: `/emby/metadata/queue/${notificationId}/writeback`, data })
   }
 
+  async createMetadataWritebackJob(data: { entries: Array<{ notification_id: string; candidate: MetadataCandidate; fields: string[] }>; confirmed: boolean }): Promise<MetadataWritebackJob> {
+    return this.request<MetadataWritebackJob>({ method: 'POST', url: '/emby/metadata/writeback-jobs', data })
+  }
+
+  async getMetadataWritebackJob(jobId: string): Promise<MetadataWritebackJob> {
+    return this.request<MetadataWritebackJob>({ method: 'GET', url: `/emby/metadata/writeback-jobs/${jobId}` })
+  }
+
   // ==================== 管理员相关 API ====================
 
   /**